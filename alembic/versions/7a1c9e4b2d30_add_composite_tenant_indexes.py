@@ -0,0 +1,71 @@
+"""add composite tenant indexes
+
+Revision ID: 7a1c9e4b2d30
+Revises: 502404f3543b
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a1c9e4b2d30'
+down_revision: Union[str, Sequence[str], None] = '502404f3543b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (Tabelle, Indexname, Spalten, unique) – entspricht den __table_args__ in app/models.py
+COMPOSITE_INDEXES = [
+    ("project", "ix_project_tenant_status", ["tenant_id", "status"], False),
+    ("report", "ix_report_tenant_project_date", ["tenant_id", "project_id", "report_date"], False),
+    ("timeentry", "ix_timeentry_tenant_project_date", ["tenant_id", "project_id", "work_date"], False),
+    ("timeentry", "ix_timeentry_tenant_employee_date", ["tenant_id", "employee_id", "work_date"], False),
+    ("timeentry", "ix_timeentry_tenant_date", ["tenant_id", "work_date"], False),
+    ("projectimage", "ix_projectimage_tenant_project", ["tenant_id", "project_id"], False),
+    ("materialusage", "ix_materialusage_tenant_project_date", ["tenant_id", "project_id", "usage_date"], False),
+    ("invoice", "ix_invoice_tenant_created", ["tenant_id", "created_at"], False),
+    ("invoice", "ix_invoice_tenant_project", ["tenant_id", "project_id"], False),
+    ("invoice", "ix_invoice_tenant_offer", ["tenant_id", "offer_id"], False),
+    ("invoice", "ix_invoice_tenant_status", ["tenant_id", "status"], False),
+    ("invoice", "ix_invoice_tenant_date", ["tenant_id", "invoice_date"], False),
+    ("offer", "ix_offer_tenant_project", ["tenant_id", "project_id"], False),
+    ("offer", "ix_offer_tenant_status", ["tenant_id", "status"], False),
+    ("reportimage", "ix_reportimage_report_id", ["report_id"], False),
+    ("companylogo", "ix_companylogo_tenant_created", ["tenant_id", "created_at"], False),
+    ("tenant_invitation", "ix_tenant_invitation_token_hash", ["token_hash"], True),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    for table, name, columns, unique in COMPOSITE_INDEXES:
+        if not inspector.has_table(table):
+            continue
+        existing = {idx["name"] for idx in inspector.get_indexes(table)}
+        if name not in existing:
+            op.create_index(name, table, columns, unique=unique)
+
+    # Statistiken für den Query-Planer aktualisieren
+    if bind.dialect.name == "sqlite":
+        op.execute("ANALYZE")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    for table, name, _columns, _unique in reversed(COMPOSITE_INDEXES):
+        # Der Token-Index gehört zur Einladungs-Migration
+        if name == "ix_tenant_invitation_token_hash" or not inspector.has_table(table):
+            continue
+        existing = {idx["name"] for idx in inspector.get_indexes(table)}
+        if name in existing:
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,80 @@
+"""create billing run tables
+
+Revision ID: a4c9e2f7b358
+Revises: f1b7c3d9a2e4
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c9e2f7b358'
+down_revision: Union[str, Sequence[str], None] = 'f1b7c3d9a2e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if not inspector.has_table("billing_run"):
+        op.create_table(
+            "billing_run",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("tenant_id", sa.Integer(), sa.ForeignKey("tenant.id"), nullable=False),
+            sa.Column("created_by", sa.Integer(), sa.ForeignKey("user.id"), nullable=True),
+            sa.Column("period_start", sa.DateTime(), nullable=False),
+            sa.Column("period_end", sa.DateTime(), nullable=False),
+            sa.Column("generation_method", sa.String(length=20), nullable=False, server_default="hybrid"),
+            sa.Column("tax_rate", sa.Float(), nullable=False, server_default="19.0"),
+            sa.Column("labor_cost_percentage", sa.Float(), nullable=False, server_default="0"),
+            sa.Column("include_materials", sa.Boolean(), nullable=False, server_default=sa.true()),
+            sa.Column("include_labor", sa.Boolean(), nullable=False, server_default=sa.true()),
+            sa.Column("status", sa.String(length=20), nullable=False, server_default="offen"),
+            sa.Column("total_projects", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("processed_projects", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("created_invoices", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("skipped_projects", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("failed_projects", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("error", sa.String(length=500), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+            sa.Column("started_at", sa.DateTime(), nullable=True),
+            sa.Column("heartbeat_at", sa.DateTime(), nullable=True),
+            sa.Column("finished_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_billing_run_tenant_created", "billing_run", ["tenant_id", "created_at"])
+
+    if not inspector.has_table("billing_run_item"):
+        op.create_table(
+            "billing_run_item",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("tenant_id", sa.Integer(), sa.ForeignKey("tenant.id"), nullable=False),
+            sa.Column("billing_run_id", sa.Integer(), sa.ForeignKey("billing_run.id"), nullable=False),
+            sa.Column("project_id", sa.Integer(), sa.ForeignKey("project.id"), nullable=False),
+            sa.Column("status", sa.String(length=20), nullable=False, server_default="offen"),
+            sa.Column("invoice_id", sa.Integer(), sa.ForeignKey("invoice.id"), nullable=True),
+            sa.Column("invoice_number", sa.String(length=50), nullable=True),
+            sa.Column("total_amount", sa.Float(), nullable=True),
+            sa.Column("error", sa.String(length=500), nullable=True),
+            sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        )
+        op.create_index(
+            "ix_billing_run_item_run_project", "billing_run_item", ["billing_run_id", "project_id"], unique=True,
+        )
+        op.create_index("ix_billing_run_item_run_status", "billing_run_item", ["billing_run_id", "status"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Erzeugte Rechnungsentwürfe bleiben erhalten; nur die Laufprotokolle entfallen.
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    for name in ("billing_run_item", "billing_run"):
+        if inspector.has_table(name):
+            op.drop_table(name)
@@ -0,0 +1,47 @@
+"""create tenant stats table
+
+Revision ID: b3e8f1a26c47
+Revises: 7a1c9e4b2d30
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3e8f1a26c47'
+down_revision: Union[str, Sequence[str], None] = '7a1c9e4b2d30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    # Zeilen werden beim ersten Dashboard-Aufruf bzw. per
+    # "python -m app.services.tenant_stats rebuild" aufgebaut.
+    if not inspector.has_table("tenant_stats"):
+        op.create_table(
+            "tenant_stats",
+            sa.Column("tenant_id", sa.Integer(), primary_key=True),
+            sa.Column("project_status_counts", sa.String(), nullable=False, server_default="{}"),
+            sa.Column("invoice_status_counts", sa.String(), nullable=False, server_default="{}"),
+            sa.Column("invoice_revenue_by_status", sa.String(), nullable=False, server_default="{}"),
+            sa.Column("revenue_by_month", sa.String(), nullable=False, server_default="{}"),
+            sa.Column("offer_status_counts", sa.String(), nullable=False, server_default="{}"),
+            sa.Column("report_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("total_hours", sa.Float(), nullable=False, server_default="0"),
+            sa.Column("hours_by_week", sa.String(), nullable=False, server_default="{}"),
+            sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+            sa.ForeignKeyConstraint(["tenant_id"], ["tenant.id"], ondelete="CASCADE"),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("tenant_stats")
@@ -0,0 +1,79 @@
+"""create time entry daily rollup
+
+Revision ID: b7d3e8a1c642
+Revises: a4c9e2f7b358
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d3e8a1c642'
+down_revision: Union[str, Sequence[str], None] = 'a4c9e2f7b358'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Eigenständige Kopie der Verdichtung aus app.services.time_rollup:
+# Migrationen dürfen nicht vom aktuellen Anwendungscode abhängen.
+BACKFILL = """
+INSERT INTO time_entry_daily (
+    tenant_id, project_id, employee_id, work_date,
+    entry_count, invalid_entries, hours_worked, break_minutes, total_cost, unrated_hours
+)
+SELECT
+    tenant_id, project_id, employee_id, work_date,
+    COUNT(id),
+    SUM(CASE WHEN COALESCE(hours_worked, 0.0) <= 0 THEN 1 ELSE 0 END),
+    ROUND(SUM(COALESCE(hours_worked, 0.0)), 6),
+    SUM(COALESCE(total_break_minutes, 0)),
+    ROUND(SUM(COALESCE(hours_worked, 0.0) * COALESCE(hourly_rate, 0.0)), 6),
+    ROUND(SUM(CASE WHEN hourly_rate IS NULL THEN COALESCE(hours_worked, 0.0) ELSE 0.0 END), 6)
+FROM timeentry
+WHERE tenant_id IS NOT NULL AND project_id IS NOT NULL AND employee_id IS NOT NULL AND work_date IS NOT NULL
+GROUP BY tenant_id, project_id, employee_id, work_date
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if not inspector.has_table("time_entry_daily"):
+        op.create_table(
+            "time_entry_daily",
+            sa.Column("tenant_id", sa.Integer(), nullable=False),
+            sa.Column("project_id", sa.Integer(), nullable=False),
+            sa.Column("employee_id", sa.Integer(), nullable=False),
+            sa.Column("work_date", sa.Date(), nullable=False),
+            sa.Column("entry_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("invalid_entries", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("hours_worked", sa.Float(), nullable=False, server_default="0"),
+            sa.Column("break_minutes", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("total_cost", sa.Float(), nullable=False, server_default="0"),
+            sa.Column("unrated_hours", sa.Float(), nullable=False, server_default="0"),
+            sa.PrimaryKeyConstraint("tenant_id", "project_id", "employee_id", "work_date"),
+        )
+        op.create_index(
+            "ix_time_entry_daily_tenant_employee_date", "time_entry_daily", ["tenant_id", "employee_id", "work_date"]
+        )
+        op.create_index("ix_time_entry_daily_tenant_date", "time_entry_daily", ["tenant_id", "work_date"])
+
+    if inspector.has_table("timeentry"):
+        # Vollständig neu aufbauen; die Quelle bleibt timeentry
+        bind.execute(sa.text("DELETE FROM time_entry_daily"))
+        bind.execute(sa.text(BACKFILL))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Abgeleitete Tabelle; die Stundeneinträge bleiben die Quelle.
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if inspector.has_table("time_entry_daily"):
+        op.drop_table("time_entry_daily")
@@ -0,0 +1,159 @@
+"""add content addressed blob store
+
+Revision ID: c4d2a9e7f318
+Revises: b3e8f1a26c47
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from datetime import datetime
+import hashlib
+import os
+from typing import Dict, Sequence, Tuple, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d2a9e7f318'
+down_revision: Union[str, Sequence[str], None] = 'b3e8f1a26c47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Tabellen mit Upload-Dateien – entspricht REFERENCING_MODELS in app/services/blob_store.py
+REFERENCING_TABLES = ["reportimage", "projectimage", "companylogo"]
+BLOB_DIR = os.getenv("BLOB_STORE_DIR", os.path.join("uploads", "blobs"))
+THUMBNAIL_SIZES = (160, 480, 1280)
+CHUNK_SIZE = 1024 * 1024
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        while chunk := handle.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _remove_old_thumbnails(path: str) -> None:
+    directory, filename = os.path.split(path)
+    stem = os.path.splitext(filename)[0]
+    for size in THUMBNAIL_SIZES:
+        try:
+            os.remove(os.path.join(directory, "thumbs", f"{stem}_{size}.jpg"))
+        except OSError:
+            pass
+
+
+def _dedupe_existing_files(bind) -> None:
+    """Vorhandene Uploads in den Blob-Speicher verschieben und Duplikate löschen."""
+    moved: Dict[str, Tuple[str, str]] = {}  # alter Pfad -> (Hash, Blob-Pfad)
+    blobs: Dict[str, Tuple[str, int]] = {}  # Hash -> (Blob-Pfad, Größe)
+    duplicates = []
+
+    for table in REFERENCING_TABLES:
+        rows = bind.execute(sa.text(
+            f"SELECT id, file_path FROM {table} WHERE content_hash IS NULL AND file_path IS NOT NULL"
+        )).all()
+        for row_id, file_path in rows:
+            if file_path not in moved:
+                if not os.path.isfile(file_path):
+                    continue
+                content_hash = _sha256(file_path)
+                if content_hash in blobs:
+                    duplicates.append(file_path)
+                else:
+                    target = os.path.join(
+                        BLOB_DIR, content_hash[:2], f"{content_hash}{os.path.splitext(file_path)[1].lower()}"
+                    )
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    if os.path.abspath(target) == os.path.abspath(file_path):
+                        pass  # liegt bereits im Blob-Speicher (z. B. nach einem Downgrade)
+                    elif os.path.exists(target):
+                        duplicates.append(file_path)
+                    else:
+                        os.replace(file_path, target)
+                    _remove_old_thumbnails(file_path)
+                    blobs[content_hash] = (target, os.path.getsize(target))
+                moved[file_path] = (content_hash, blobs[content_hash][0])
+
+            content_hash, blob_path = moved[file_path]
+            bind.execute(
+                sa.text(f"UPDATE {table} SET content_hash = :hash, file_path = :path WHERE id = :id"),
+                {"hash": content_hash, "path": blob_path, "id": row_id},
+            )
+
+    # Referenzzähler aus allen Tabellen neu aufbauen
+    ref_counts: Dict[str, int] = {}
+    for table in REFERENCING_TABLES:
+        for content_hash, count in bind.execute(sa.text(
+            f"SELECT content_hash, COUNT(*) FROM {table} WHERE content_hash IS NOT NULL GROUP BY content_hash"
+        )).all():
+            ref_counts[content_hash] = ref_counts.get(content_hash, 0) + count
+            if content_hash not in blobs:
+                path = bind.execute(
+                    sa.text(f"SELECT file_path FROM {table} WHERE content_hash = :hash LIMIT 1"),
+                    {"hash": content_hash},
+                ).scalar()
+                blobs[content_hash] = (path, os.path.getsize(path) if os.path.isfile(path) else 0)
+
+    now = datetime.utcnow()
+    for content_hash, count in ref_counts.items():
+        path, size = blobs[content_hash]
+        bind.execute(sa.text(
+            "INSERT OR REPLACE INTO stored_blob (content_hash, path, size, ref_count, created_at) "
+            "VALUES (:hash, :path, :size, :count, :created_at)"
+        ), {"hash": content_hash, "path": path, "size": size, "count": count, "created_at": now})
+
+    # Erst nach allen Zeilen-Updates löschen
+    for path in duplicates:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        _remove_old_thumbnails(path)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if not inspector.has_table("stored_blob"):
+        op.create_table(
+            "stored_blob",
+            sa.Column("content_hash", sa.String(length=64), primary_key=True),
+            sa.Column("path", sa.String(length=500), nullable=False),
+            sa.Column("size", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("ref_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        )
+
+    for table in REFERENCING_TABLES:
+        if not inspector.has_table(table):
+            continue
+        columns = {column["name"] for column in inspector.get_columns(table)}
+        if "content_hash" not in columns:
+            op.add_column(table, sa.Column("content_hash", sa.String(length=64), nullable=True))
+        existing = {idx["name"] for idx in inspector.get_indexes(table)}
+        if f"ix_{table}_content_hash" not in existing:
+            op.create_index(f"ix_{table}_content_hash", table, ["content_hash"])
+
+    _dedupe_existing_files(bind)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Dateien bleiben im Blob-Speicher; die Pfade in den Zeilen zeigen weiterhin dorthin
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    for table in REFERENCING_TABLES:
+        if not inspector.has_table(table):
+            continue
+        existing = {idx["name"] for idx in inspector.get_indexes(table)}
+        if f"ix_{table}_content_hash" in existing:
+            op.drop_index(f"ix_{table}_content_hash", table_name=table)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column("content_hash")
+    op.drop_table("stored_blob")
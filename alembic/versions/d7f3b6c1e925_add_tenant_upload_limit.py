@@ -0,0 +1,42 @@
+"""add tenant upload limit
+
+Revision ID: d7f3b6c1e925
+Revises: c4d2a9e7f318
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7f3b6c1e925'
+down_revision: Union[str, Sequence[str], None] = 'c4d2a9e7f318'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table("tenant_settings"):
+        return
+    columns = {column["name"] for column in inspector.get_columns("tenant_settings")}
+    # NULL = Standardgrenze aus MAX_UPLOAD_MB
+    if "max_upload_mb" not in columns:
+        op.add_column("tenant_settings", sa.Column("max_upload_mb", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table("tenant_settings"):
+        return
+    columns = {column["name"] for column in inspector.get_columns("tenant_settings")}
+    if "max_upload_mb" in columns:
+        with op.batch_alter_table("tenant_settings") as batch_op:
+            batch_op.drop_column("max_upload_mb")
@@ -0,0 +1,59 @@
+"""add image file metadata
+
+Revision ID: e2a8c5d4f610
+Revises: d7f3b6c1e925
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a8c5d4f610'
+down_revision: Union[str, Sequence[str], None] = 'd7f3b6c1e925'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLES = ["reportimage", "projectimage"]
+
+
+def _columns():
+    return [
+        sa.Column("mime_type", sa.String(length=100), nullable=True),
+        sa.Column("width", sa.Integer(), nullable=True),
+        sa.Column("height", sa.Integer(), nullable=True),
+        sa.Column("file_mtime", sa.DateTime(), nullable=True),
+        sa.Column("file_missing", sa.Boolean(), nullable=False, server_default=sa.false()),
+    ]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Werte füllt der Abgleich: python -m app.services.attachment_metadata reconcile
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    for table in TABLES:
+        if not inspector.has_table(table):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table)}
+        for column in _columns():
+            if column.name not in existing:
+                op.add_column(table, column)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    for table in TABLES:
+        if not inspector.has_table(table):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table)}
+        with op.batch_alter_table(table) as batch_op:
+            for column in _columns():
+                if column.name in existing:
+                    batch_op.drop_column(column.name)
@@ -0,0 +1,50 @@
+"""add unique invoice number per tenant
+
+Revision ID: e9c4a7b2f153
+Revises: b7d3e8a1c642
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e9c4a7b2f153'
+down_revision: Union[str, Sequence[str], None] = 'b7d3e8a1c642'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEX_NAME = "ux_invoice_tenant_number"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table("invoice"):
+        return
+    if INDEX_NAME in {idx["name"] for idx in inspector.get_indexes("invoice")}:
+        return
+
+    # Doppelte Rechnungsnummern sind Belege und werden nicht automatisch umbenannt
+    duplicates = bind.execute(sa.text(
+        "SELECT tenant_id, invoice_number, COUNT(*) FROM invoice "
+        "GROUP BY tenant_id, invoice_number HAVING COUNT(*) > 1 ORDER BY tenant_id, invoice_number"
+    )).all()
+    if duplicates:
+        listing = ", ".join(f"Mandant {tenant_id}: {number} ({count}×)" for tenant_id, number, count in duplicates)
+        raise RuntimeError(f"Doppelte Rechnungsnummern vor der Migration bereinigen: {listing}")
+
+    op.create_index(INDEX_NAME, "invoice", ["tenant_id", "invoice_number"], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if inspector.has_table("invoice") and INDEX_NAME in {idx["name"] for idx in inspector.get_indexes("invoice")}:
+        op.drop_index(INDEX_NAME, table_name="invoice")
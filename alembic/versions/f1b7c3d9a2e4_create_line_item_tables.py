@@ -0,0 +1,139 @@
+"""create line item tables
+
+Revision ID: f1b7c3d9a2e4
+Revises: e2a8c5d4f610
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+import json
+from typing import Any, Dict, List, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1b7c3d9a2e4'
+down_revision: Union[str, Sequence[str], None] = 'e2a8c5d4f610'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Positionstabelle -> (Elterntabelle, Fremdschlüsselspalte)
+TABLES = {
+    "invoice_line_item": ("invoice", "invoice_id"),
+    "offer_line_item": ("offer", "offer_id"),
+}
+ITEM_TYPES = ("service", "material", "labor")
+BATCH_SIZE = 500
+
+
+def _number(value: Any, default: Any = 0.0) -> Any:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _parse_items(raw: Any) -> List[Dict[str, Any]]:
+    # Eigenständige Kopie von app.services.line_items.parse_items:
+    # Migrationen dürfen nicht vom aktuellen Anwendungscode abhängen.
+    try:
+        items = json.loads(raw or "[]")
+    except (TypeError, ValueError):
+        return []
+    if not isinstance(items, list):
+        return []
+    rows = []
+    for position, item in enumerate(items, start=1):
+        if not isinstance(item, dict):
+            continue
+        item_type = item.get("item_type")
+        rows.append({
+            "position": position,
+            "description": str(item.get("description") or item.get("name") or ""),
+            "quantity": _number(item.get("quantity")),
+            "unit": str(item["unit"])[:20] if item.get("unit") else None,
+            "unit_price": _number(item.get("unit_price")),
+            "total_price": _number(item.get("total_price")),
+            "item_type": item_type if item_type in ITEM_TYPES else "service",
+            "labor_cost": _number(item.get("labor_cost"), None),
+            "material_cost": _number(item.get("material_cost"), None),
+            "service_cost": _number(item.get("service_cost"), None),
+        })
+    return rows
+
+
+def _create_table(name: str, parent: str, parent_column: str) -> None:
+    op.create_table(
+        name,
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("tenant_id", sa.Integer(), sa.ForeignKey("tenant.id"), nullable=False),
+        sa.Column(parent_column, sa.Integer(), sa.ForeignKey(f"{parent}.id"), nullable=False),
+        sa.Column("position", sa.Integer(), nullable=False),
+        sa.Column("description", sa.String(), nullable=False, server_default=""),
+        sa.Column("quantity", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("unit", sa.String(length=20), nullable=True),
+        sa.Column("unit_price", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("total_price", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("item_type", sa.String(length=20), nullable=False, server_default="service"),
+        sa.Column("labor_cost", sa.Float(), nullable=True),
+        sa.Column("material_cost", sa.Float(), nullable=True),
+        sa.Column("service_cost", sa.Float(), nullable=True),
+    )
+    op.create_index(f"ix_{name}_{parent_column}", name, [parent_column])
+    op.create_index(f"ix_{name}_tenant_type", name, ["tenant_id", "item_type"])
+
+
+def _backfill(bind: Any, name: str, parent: str, parent_column: str) -> None:
+    """Positionen aus der JSON-Spalte übertragen (seitenweise, nur fehlende)."""
+    line_table = sa.table(
+        name,
+        sa.column("tenant_id"), sa.column(parent_column), sa.column("position"),
+        sa.column("description"), sa.column("quantity"), sa.column("unit"),
+        sa.column("unit_price"), sa.column("total_price"), sa.column("item_type"),
+        sa.column("labor_cost"), sa.column("material_cost"), sa.column("service_cost"),
+    )
+    parent_table = sa.table(parent, sa.column("id"), sa.column("tenant_id"), sa.column("items"))
+    already_filled = sa.exists().where(line_table.c[parent_column] == parent_table.c.id)
+
+    last_id = 0
+    while True:
+        batch = bind.execute(
+            sa.select(parent_table.c.id, parent_table.c.tenant_id, parent_table.c["items"])
+            .where(parent_table.c.id > last_id, ~already_filled)
+            .order_by(parent_table.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not batch:
+            break
+        last_id = batch[-1].id
+        rows = [
+            {"tenant_id": row.tenant_id or 1, parent_column: row.id, **item}
+            for row in batch
+            for item in _parse_items(row[2])
+        ]
+        if rows:
+            bind.execute(line_table.insert(), rows)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    for name, (parent, parent_column) in TABLES.items():
+        if not inspector.has_table(parent):
+            continue
+        if not inspector.has_table(name):
+            _create_table(name, parent, parent_column)
+        _backfill(bind, name, parent, parent_column)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Die JSON-Spalten bleiben die Quelle; es gehen keine Daten verloren.
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    for name in TABLES:
+        if inspector.has_table(name):
+            op.drop_table(name)
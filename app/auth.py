@@ -7,15 +7,18 @@ from datetime import datetime, timedelta
 from typing import Optional
 import os
 
-from fastapi import HTTPException, status, Depends
+from fastapi import BackgroundTasks, HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.database import get_session
+import app.database as database
+from app.database import get_async_session
 from app.models import User, UserRole
 from app.schemas import TokenData
+from app.services.password_hasher import password_hash_pool
 
 try:
     from dotenv import load_dotenv  # type: ignore
@@ -74,6 +77,16 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Wie ``verify_password``, aber im begrenzten Hash-Pool statt auf der Event-Loop."""
+    return await password_hash_pool.run("verify", verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Wie ``get_password_hash``, aber im begrenzten Hash-Pool statt auf der Event-Loop."""
+    return await password_hash_pool.run("hash", get_password_hash, password)
+
+
 def needs_rehash(hashed_password: str) -> bool:
     """Prüft, ob ein Hash aktualisiert werden sollte."""
     try:
@@ -128,9 +141,60 @@ def authenticate_user(session: Session, username: str, password: str) -> Optiona
     return user
 
 
+async def get_user_by_username_async(session: AsyncSession, username: str) -> Optional[User]:
+    """Holt einen Benutzer anhand des Benutzernamens (async)."""
+    statement = select(User).where(User.username == username)
+    return (await session.exec(statement)).first()
+
+
+async def rehash_user_password(user_id: int, password: str, expected_hash: str) -> None:
+    """
+    Veralteten Passwort-Hash nach dem Login ersetzen (läuft als Hintergrundaufgabe).
+
+    Der Hash wird nur überschrieben, wenn er sich seit dem Login nicht geändert hat.
+    """
+    new_hash = await get_password_hash_async(password)
+    async with AsyncSession(database.async_engine, expire_on_commit=False) as session:
+        user = await session.get(User, user_id)
+        if not user or user.hashed_password != expected_hash:
+            return
+        user.hashed_password = new_hash
+        session.add(user)
+        await session.commit()
+
+
+async def authenticate_user_async(
+    session: AsyncSession,
+    username: str,
+    password: str,
+    background_tasks: Optional[BackgroundTasks] = None,
+) -> Optional[User]:
+    """
+    Authentifiziert einen Benutzer über eine AsyncSession.
+
+    Die Argon2-Prüfung läuft im Hash-Pool. Ein nötiges Rehash wird, sofern
+    ``background_tasks`` übergeben ist, erst nach dem Senden der Antwort ausgeführt.
+    """
+    user = await get_user_by_username_async(session, username)
+    if not user:
+        return None
+    if not await verify_password_async(password, user.hashed_password):
+        return None
+
+    if needs_rehash(user.hashed_password):
+        if background_tasks is not None:
+            background_tasks.add_task(rehash_user_password, user.id, password, user.hashed_password)
+        else:
+            user.hashed_password = await get_password_hash_async(password)
+            session.add(user)
+            await session.commit()
+
+    return user
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ) -> User:
     """Holt den aktuellen Benutzer aus dem Token."""
     credentials_exception = HTTPException(
@@ -143,7 +207,7 @@ async def get_current_user(
     if token_data is None:
         raise credentials_exception
 
-    user = get_user_by_username(session, username=token_data.username)
+    user = await get_user_by_username_async(session, username=token_data.username)
     if user is None:
         raise credentials_exception
     return user
@@ -1,22 +1,152 @@
 """
 Datenbankverbindung und Session-Management für die Bau-Dokumentations-App.
 Verwendet SQLite mit SQLModel für die Datenmodellierung.
+
+Das Engine-Profil wird über Umgebungsvariablen gesteuert:
+
+- ``DATABASE_URL``: Verbindungs-URL (Standard: ``sqlite:///./database.db``)
+- ``DB_PROFILE``: ``production`` (WAL, Pragmas, getrennte Lese-/Schreib-Pools)
+  oder ``legacy`` (bisheriges Verhalten ohne Pragmas)
+- ``DB_BUSY_TIMEOUT_MS``, ``DB_MMAP_SIZE``, ``DB_CACHE_SIZE_KB``: Feintuning der Pragmas
+- ``DB_WRITE_POOL_SIZE``, ``DB_READ_POOL_SIZE``, ``DB_POOL_TIMEOUT``: Poolgrößen
+
+Für ``async def``-Endpunkte steht zusätzlich eine aiosqlite-Engine mit
+``get_async_session`` bereit, damit Datenbankzugriffe die Event-Loop nicht blockieren.
 """
 
 from sqlmodel import SQLModel, create_engine, Session
-from typing import Generator
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from typing import Any, AsyncGenerator, Dict, Generator, Union
 import os
 # Hinweis: Legacy-Datenbanken werden über Alembic/Kompatibilitätsskripte aktualisiert
 
 # SQLite-Datenbankpfad
-DATABASE_URL = "sqlite:///./database.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./database.db")
+DB_PROFILE = os.getenv("DB_PROFILE", "production")
+
+# Engine-Profile: Pragmas werden pro Verbindung im connect-Event gesetzt.
+ENGINE_PROFILES: Dict[str, Dict[str, Any]] = {
+    "legacy": {
+        "pragmas": {},
+        # SQLAlchemy-Standardwerte für QueuePool
+        "write_pool_size": 5,
+        "read_pool_size": 5,
+        "max_overflow": 10,
+    },
+    "production": {
+        "pragmas": {
+            # WAL erlaubt parallele Leser während eines Schreibvorgangs
+            "journal_mode": "WAL",
+            # In WAL-Modus sicher und deutlich schneller als FULL
+            "synchronous": "NORMAL",
+            # Auf Sperren warten statt sofort "database is locked" zu melden
+            "busy_timeout": int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000")),
+            "mmap_size": int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024))),
+            # Negativer Wert = Größe in KiB
+            "cache_size": -int(os.getenv("DB_CACHE_SIZE_KB", "65536")),
+            "temp_store": "MEMORY",
+        },
+        # SQLite kennt nur einen Schreiber; wenige Schreibverbindungen
+        # vermeiden Lock-Konkurrenz, Leser skalieren dank WAL.
+        "write_pool_size": int(os.getenv("DB_WRITE_POOL_SIZE", "4")),
+        "read_pool_size": int(os.getenv("DB_READ_POOL_SIZE", "16")),
+        "max_overflow": None,  # entspricht der Poolgröße
+    },
+}
+
+
+def _is_memory_database(url: str) -> bool:
+    return url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+
+
+def _async_url(url: str) -> str:
+    """Wandelt eine SQLite-URL in die aiosqlite-Variante um."""
+    if url.startswith("sqlite+aiosqlite"):
+        return url
+    return url.replace("sqlite", "sqlite+aiosqlite", 1)
+
+
+def _register_pragmas(engine: Engine, pragmas: Dict[str, Any], read_only: bool) -> None:
+    """Setzt die Profil-Pragmas auf jeder neuen DBAPI-Verbindung."""
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            if read_only:
+                cursor.execute("PRAGMA query_only=ON")
+        finally:
+            cursor.close()
+
+
+def create_sqlite_engine(
+    url: str = DATABASE_URL,
+    profile: str = DB_PROFILE,
+    *,
+    read_only: bool = False,
+    echo: bool = False,
+    use_async: bool = False,
+) -> Union[Engine, AsyncEngine]:
+    """
+    Erstellt eine SQLite-Engine gemäß Profil.
 
-# Engine erstellen mit check_same_thread=False für SQLite
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    echo=False  # SQL-Queries in der Konsole anzeigen (für Entwicklung)
+    Args:
+        url: Datenbank-URL
+        profile: Name des Profils aus ``ENGINE_PROFILES``
+        read_only: Engine nur für Lesezugriffe (``PRAGMA query_only``)
+        echo: SQL-Queries in der Konsole anzeigen (für Entwicklung)
+        use_async: aiosqlite-Engine für ``AsyncSession`` erzeugen
+
+    Returns:
+        Engine | AsyncEngine: Konfigurierte SQLAlchemy-Engine
+    """
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"Unbekanntes Datenbank-Profil: {profile}")
+    settings = ENGINE_PROFILES[profile]
+
+    engine_kwargs: Dict[str, Any] = {
+        "connect_args": {"check_same_thread": False},
+        "echo": echo,
+    }
+    if not _is_memory_database(url):
+        pool_size = settings["read_pool_size"] if read_only else settings["write_pool_size"]
+        engine_kwargs.update(
+            pool_size=pool_size,
+            max_overflow=settings["max_overflow"] if settings["max_overflow"] is not None else pool_size,
+            pool_timeout=int(os.getenv("DB_POOL_TIMEOUT", "30")),
+        )
+
+    if use_async:
+        async_engine = create_async_engine(_async_url(url), **engine_kwargs)
+        # Pragmas werden auf der synchronen Basis-Engine registriert
+        engine = async_engine.sync_engine
+    else:
+        engine = create_engine(url, **engine_kwargs)
+
+    pragmas = dict(settings["pragmas"])
+    if _is_memory_database(url):
+        # WAL und mmap sind für In-Memory-Datenbanken wirkungslos
+        pragmas.pop("journal_mode", None)
+        pragmas.pop("mmap_size", None)
+    if pragmas or read_only:
+        _register_pragmas(engine, pragmas, read_only)
+    return async_engine if use_async else engine
+
+
+# Schreib-Engine (Standard für alle Sessions) und separater Lese-Pool
+engine = create_sqlite_engine(DATABASE_URL, DB_PROFILE)
+read_engine = (
+    create_sqlite_engine(DATABASE_URL, DB_PROFILE, read_only=True)
+    if DB_PROFILE != "legacy" and not _is_memory_database(DATABASE_URL)
+    else engine
 )
+# Engine für async-Endpunkte (aiosqlite führt Queries in einem eigenen Thread aus)
+async_engine = create_sqlite_engine(DATABASE_URL, DB_PROFILE, use_async=True)
 
 def create_db_and_tables() -> None:
     """
@@ -33,3 +163,20 @@ def get_session() -> Generator[Session, None, None]:
     with Session(engine) as session:
         yield session
 
+def get_read_session() -> Generator[Session, None, None]:
+    """
+    FastAPI Dependency für rein lesende Endpunkte.
+    Nutzt den Lese-Pool, damit Dashboard- und Listenabfragen nicht
+    mit Schreibvorgängen um Verbindungen konkurrieren.
+    """
+    with Session(read_engine) as session:
+        yield session
+
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    FastAPI Dependency für ``async def``-Endpunkte.
+    Objekte bleiben nach dem Commit geladen, da implizites Nachladen
+    in async-Kontexten nicht möglich ist.
+    """
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
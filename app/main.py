@@ -3,12 +3,13 @@ Hauptanwendung für die Bau-Dokumentations-App.
 FastAPI-Anwendung mit allen Routen und Middleware.
 """
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, HTMLResponse
 from fastapi.staticfiles import StaticFiles
 import logging
 import os
+from .auth import require_admin
 from .database import create_db_and_tables
 from .routers import (
     projects,
@@ -24,6 +25,12 @@ from .routers import (
     company_logo,
     user_settings,
 )
+from .services.blob_store import blob_collector
+from .services.password_hasher import password_hash_pool
+from .services.pdf_cache import pdf_cache
+from .services.pdf_render_service import pdf_render_service
+from .services.static_assets import static_assets
+from .services.thumbnail_service import thumbnail_pipeline
 from .utils.feature_flags import FEATURE_FLAGS
 from app.utils.db_compat import ensure_tenant_settings_columns
 
@@ -39,6 +46,15 @@ def startup_event():
         ensure_tenant_settings_columns()
     except Exception as e:
         logger.warning(f"Konnte tenant_settings nicht aktualisieren: {e}")
+    static_assets.load()
+    blob_collector.start()
+
+def shutdown_event():
+    """Wird beim Herunterfahren der Anwendung ausgeführt."""
+    password_hash_pool.shutdown()
+    pdf_render_service.shutdown()
+    thumbnail_pipeline.shutdown()
+    blob_collector.shutdown()
 
 # FastAPI-Anwendung erstellen
 app = FastAPI(
@@ -49,6 +65,7 @@ app = FastAPI(
 
 # Startup-Event registrieren
 app.add_event_handler("startup", startup_event)
+app.add_event_handler("shutdown", shutdown_event)
 
 # CORS-Middleware für Frontend-Kommunikation
 app.add_middleware(
@@ -57,6 +74,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Logging konfigurieren
@@ -127,46 +145,56 @@ def read_root():
     }
 
 @app.get("/login", response_class=HTMLResponse)
-def serve_login():
+def serve_login(request: Request):
     """
     Login-Seite ausliefern.
     
     Returns:
         HTML: Login-Interface
     """
-    if os.path.exists("static/login.html"):
-        with open("static/login.html", "r", encoding="utf-8") as f:
-            return HTMLResponse(content=f.read())
-    else:
+    asset = static_assets.get("login.html")
+    if asset is None:
         return HTMLResponse(content="<h1>Login-Seite nicht gefunden</h1>", status_code=404)
+    return static_assets.response(request, asset)
 
 @app.get("/app", response_class=HTMLResponse)
-def serve_frontend():
+def serve_frontend(request: Request):
     """
     Frontend-Anwendung ausliefern.
     
     Returns:
         HTML: Frontend-Interface
     """
-    if os.path.exists("static/index.html"):
-        with open("static/index.html", "r", encoding="utf-8") as f:
-            return HTMLResponse(content=f.read())
-    else:
+    asset = static_assets.get("index.html")
+    if asset is None:
         return HTMLResponse(content="<h1>Frontend nicht gefunden</h1>", status_code=404)
+    return static_assets.response(request, asset)
 
 @app.get("/app_simple.js", response_class=HTMLResponse)
-def serve_js():
+def serve_js(request: Request):
     """
     JavaScript-Datei ausliefern.
     
     Returns:
         JavaScript: Frontend-JavaScript
     """
-    if os.path.exists("static/app_simple.js"):
-        with open("static/app_simple.js", "r", encoding="utf-8") as f:
-            return HTMLResponse(content=f.read(), media_type="application/javascript")
-    else:
+    asset = static_assets.get("app_simple.js")
+    if asset is None:
         return HTMLResponse(content="// JavaScript-Datei nicht gefunden", status_code=404)
+    return static_assets.response(request, asset)
+
+@app.get("/assets/{asset_name}")
+def serve_asset(asset_name: str, request: Request):
+    """
+    Versionierte Frontend-Datei ausliefern (unveränderlich gecacht).
+    
+    Returns:
+        Response: Datei in der vom Client akzeptierten Kodierung
+    """
+    asset = static_assets.get_hashed(asset_name)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Datei nicht gefunden")
+    return static_assets.response(request, asset, immutable=True)
 
 @app.get("/health")
 def health_check():
@@ -178,6 +206,22 @@ def health_check():
     """
     return {"status": "healthy", "message": "API ist erreichbar"}
 
+@app.get("/health/metrics")
+def health_metrics(current_user=Depends(require_admin)):
+    """
+    Laufzeitmetriken der Worker-Pools (nur für Admins).
+    
+    Returns:
+        dict: Warteschlangentiefe und Ausführungszeiten
+    """
+    return {
+        "password_hashing": password_hash_pool.metrics(),
+        "pdf_rendering": pdf_render_service.metrics(),
+        "pdf_cache": pdf_cache.metrics(),
+        "thumbnails": thumbnail_pipeline.metrics(),
+        "static_assets": static_assets.metrics(),
+    }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -4,6 +4,7 @@ Definiert die Datenbankstruktur für Projekte, Berichte und Angebote.
 """
 
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
 from typing import Optional, List, Dict, Any
 from datetime import datetime, date
 from enum import Enum
@@ -72,6 +73,7 @@ class TenantSettings(SQLModel, table=True):
     footer_text: Optional[str] = Field(default=None, max_length=500, description="Footer-Text für PDFs")
     retention_days_time_entries: Optional[int] = Field(default=None, description="Aufbewahrungstage Zeitdaten")
     retention_days_logs: Optional[int] = Field(default=None, description="Aufbewahrungstage Logs")
+    max_upload_mb: Optional[int] = Field(default=None, description="Maximale Uploadgröße in MB (leer = Standard)")
     created_at: datetime = Field(default_factory=datetime.utcnow, description="Erstellungszeitpunkt")
     updated_at: datetime = Field(default_factory=datetime.utcnow, description="Letzte Aktualisierung")
 
@@ -127,6 +129,9 @@ class Project(SQLModel, table=True):
     """
     Datenmodell für Bauprojekte (speziell für Trockenbau).
     """
+    __table_args__ = (
+        Index("ix_project_tenant_status", "tenant_id", "status"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     tenant_id: int = Field(default=1, foreign_key="tenant.id", index=True, description="Mandant")
     name: str = Field(max_length=100, description="Projektname")
@@ -149,6 +154,9 @@ class Report(SQLModel, table=True):
     """
     Datenmodell für Trockenbau-Berichte.
     """
+    __table_args__ = (
+        Index("ix_report_tenant_project_date", "tenant_id", "project_id", "report_date"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     tenant_id: int = Field(default=1, foreign_key="tenant.id", index=True, description="Mandant")
     project_id: int = Field(foreign_key="project.id", description="Zugehöriges Projekt")
@@ -186,6 +194,11 @@ class TimeEntry(SQLModel, table=True):
     """
     Datenmodell für Stundenerfassung mit Ein-/Austempelsystem.
     """
+    __table_args__ = (
+        Index("ix_timeentry_tenant_project_date", "tenant_id", "project_id", "work_date"),
+        Index("ix_timeentry_tenant_employee_date", "tenant_id", "employee_id", "work_date"),
+        Index("ix_timeentry_tenant_date", "tenant_id", "work_date"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     tenant_id: int = Field(default=1, foreign_key="tenant.id", index=True, description="Mandant")
     project_id: int = Field(foreign_key="project.id", description="Zugehöriges Projekt")
@@ -206,10 +219,35 @@ class TimeEntry(SQLModel, table=True):
     created_at: datetime = Field(default_factory=datetime.utcnow, description="Erstellungsdatum")
     updated_at: datetime = Field(default_factory=datetime.utcnow, description="Letzte Aktualisierung")
 
+class TimeEntryDaily(SQLModel, table=True):
+    """
+    Stundeneinträge verdichtet je Mandant, Projekt, Mitarbeiter und Tag.
+    Wird bei jedem Flush inkrementell fortgeschrieben (siehe services/time_rollup.py);
+    abgeleitete Tabelle, daher ohne Fremdschlüssel.
+    """
+    __tablename__ = "time_entry_daily"
+    __table_args__ = (
+        Index("ix_time_entry_daily_tenant_employee_date", "tenant_id", "employee_id", "work_date"),
+        Index("ix_time_entry_daily_tenant_date", "tenant_id", "work_date"),
+    )
+    tenant_id: int = Field(primary_key=True, description="Mandant")
+    project_id: int = Field(primary_key=True, description="Projekt")
+    employee_id: int = Field(primary_key=True, description="Mitarbeiter")
+    work_date: date = Field(primary_key=True, description="Arbeitstag")
+    entry_count: int = Field(default=0, description="Anzahl Stundeneinträge")
+    invalid_entries: int = Field(default=0, description="Einträge mit Stunden <= 0")
+    hours_worked: float = Field(default=0.0, description="Summe der Stunden")
+    break_minutes: int = Field(default=0, description="Summe der Pausen in Minuten")
+    total_cost: float = Field(default=0.0, description="Summe Stunden × Stundensatz des Eintrags")
+    unrated_hours: float = Field(default=0.0, description="Stunden ohne Stundensatz am Eintrag")
+
 class ProjectImage(SQLModel, table=True):
     """
     Datenmodell für Projektbilder.
     """
+    __table_args__ = (
+        Index("ix_projectimage_tenant_project", "tenant_id", "project_id"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     tenant_id: int = Field(default=1, foreign_key="tenant.id", index=True, description="Mandant")
     project_id: int = Field(foreign_key="project.id", description="Zugehöriges Projekt")
@@ -217,6 +255,12 @@ class ProjectImage(SQLModel, table=True):
     original_filename: str = Field(max_length=255, description="Originaler Dateiname")
     file_path: str = Field(max_length=500, description="Dateipfad")
     file_size: Optional[int] = Field(default=None, description="Dateigröße in Bytes")
+    content_hash: Optional[str] = Field(default=None, max_length=64, index=True, description="SHA-256 der Datei im Blob-Speicher")
+    mime_type: Optional[str] = Field(default=None, max_length=100, description="MIME-Type der Datei")
+    width: Optional[int] = Field(default=None, description="Bildbreite in Pixeln (EXIF-Orientierung berücksichtigt)")
+    height: Optional[int] = Field(default=None, description="Bildhöhe in Pixeln (EXIF-Orientierung berücksichtigt)")
+    file_mtime: Optional[datetime] = Field(default=None, description="Änderungszeit der Datei (UTC) beim letzten Abgleich")
+    file_missing: bool = Field(default=False, description="Datei fehlt auf dem Datenträger (vom Abgleich gesetzt)")
     description: Optional[str] = Field(default=None, description="Bildbeschreibung")
     image_type: str = Field(default="progress", max_length=20, description="Bildtyp (progress, before, after, issue)")
     created_at: datetime = Field(default_factory=datetime.utcnow, description="Erstellungsdatum")
@@ -225,6 +269,9 @@ class MaterialUsage(SQLModel, table=True):
     """
     Datenmodell für Materialverbrauch.
     """
+    __table_args__ = (
+        Index("ix_materialusage_tenant_project_date", "tenant_id", "project_id", "usage_date"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     tenant_id: int = Field(default=1, foreign_key="tenant.id", index=True, description="Mandant")
     project_id: int = Field(foreign_key="project.id", description="Zugehöriges Projekt")
@@ -240,6 +287,15 @@ class Invoice(SQLModel, table=True):
     """
     Datenmodell für Rechnungen.
     """
+    __table_args__ = (
+        Index("ix_invoice_tenant_created", "tenant_id", "created_at"),
+        Index("ix_invoice_tenant_project", "tenant_id", "project_id"),
+        Index("ix_invoice_tenant_offer", "tenant_id", "offer_id"),
+        Index("ix_invoice_tenant_status", "tenant_id", "status"),
+        Index("ix_invoice_tenant_date", "tenant_id", "invoice_date"),
+        # Rechnungsnummern sind je Mandant eindeutig (§14 UStG)
+        Index("ux_invoice_tenant_number", "tenant_id", "invoice_number", unique=True),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     tenant_id: int = Field(default=1, foreign_key="tenant.id", index=True, description="Mandant")
     project_id: int = Field(foreign_key="project.id", description="Zugehöriges Projekt")
@@ -262,6 +318,10 @@ class Offer(SQLModel, table=True):
     """
     Datenmodell für Angebote.
     """
+    __table_args__ = (
+        Index("ix_offer_tenant_project", "tenant_id", "project_id"),
+        Index("ix_offer_tenant_status", "tenant_id", "status"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     tenant_id: int = Field(default=1, foreign_key="tenant.id", index=True, description="Mandant")
     project_id: int = Field(foreign_key="project.id", description="Zugehöriges Projekt")
@@ -278,10 +338,111 @@ class Offer(SQLModel, table=True):
     created_at: datetime = Field(default_factory=datetime.utcnow, description="Erstellungsdatum")
     updated_at: datetime = Field(default_factory=datetime.utcnow, description="Letzte Aktualisierung")
 
+class InvoiceLineItem(SQLModel, table=True):
+    """
+    Rechnungsposition als eigene Zeile.
+    Wird bei jedem Flush aus ``Invoice.items`` abgeleitet (siehe services/line_items.py).
+    """
+    __tablename__ = "invoice_line_item"
+    __table_args__ = (
+        Index("ix_invoice_line_item_tenant_type", "tenant_id", "item_type"),
+    )
+    id: Optional[int] = Field(default=None, primary_key=True)
+    tenant_id: int = Field(foreign_key="tenant.id", description="Mandant")
+    invoice_id: int = Field(foreign_key="invoice.id", index=True, description="Zugehörige Rechnung")
+    position: int = Field(description="Reihenfolge innerhalb der Rechnung")
+    description: str = Field(default="", description="Beschreibung")
+    quantity: float = Field(default=0.0, description="Menge")
+    unit: Optional[str] = Field(default=None, max_length=20, description="Einheit")
+    unit_price: float = Field(default=0.0, description="Einzelpreis")
+    total_price: float = Field(default=0.0, description="Gesamtpreis")
+    item_type: str = Field(default="service", max_length=20, description="Positionstyp (service/material/labor)")
+    labor_cost: Optional[float] = Field(default=None, description="Lohnkosten")
+    material_cost: Optional[float] = Field(default=None, description="Materialkosten")
+    service_cost: Optional[float] = Field(default=None, description="Dienstleistungskosten")
+
+class OfferLineItem(SQLModel, table=True):
+    """
+    Angebotsposition als eigene Zeile.
+    Wird bei jedem Flush aus ``Offer.items`` abgeleitet (siehe services/line_items.py).
+    """
+    __tablename__ = "offer_line_item"
+    __table_args__ = (
+        Index("ix_offer_line_item_tenant_type", "tenant_id", "item_type"),
+    )
+    id: Optional[int] = Field(default=None, primary_key=True)
+    tenant_id: int = Field(foreign_key="tenant.id", description="Mandant")
+    offer_id: int = Field(foreign_key="offer.id", index=True, description="Zugehöriges Angebot")
+    position: int = Field(description="Reihenfolge innerhalb des Angebots")
+    description: str = Field(default="", description="Beschreibung")
+    quantity: float = Field(default=0.0, description="Menge")
+    unit: Optional[str] = Field(default=None, max_length=20, description="Einheit")
+    unit_price: float = Field(default=0.0, description="Einzelpreis")
+    total_price: float = Field(default=0.0, description="Gesamtpreis")
+    item_type: str = Field(default="service", max_length=20, description="Positionstyp (service/material/labor)")
+    labor_cost: Optional[float] = Field(default=None, description="Lohnkosten")
+    material_cost: Optional[float] = Field(default=None, description="Materialkosten")
+    service_cost: Optional[float] = Field(default=None, description="Dienstleistungskosten")
+
+class BillingRun(SQLModel, table=True):
+    """
+    Sammelabrechnung: Rechnungsentwürfe für alle abrechenbaren Projekte eines Zeitraums.
+    Ablauf und Wiederaufnahme siehe services/billing_runs.py.
+    """
+    __tablename__ = "billing_run"
+    __table_args__ = (
+        Index("ix_billing_run_tenant_created", "tenant_id", "created_at"),
+    )
+    id: Optional[int] = Field(default=None, primary_key=True)
+    tenant_id: int = Field(foreign_key="tenant.id", description="Mandant")
+    created_by: Optional[int] = Field(default=None, foreign_key="user.id", description="Angelegt von")
+    period_start: datetime = Field(description="Beginn des Abrechnungszeitraums")
+    period_end: datetime = Field(description="Ende des Abrechnungszeitraums")
+    generation_method: str = Field(default="hybrid", max_length=20, description="Generierungsmethode")
+    tax_rate: float = Field(default=19.0, description="USt-Satz")
+    labor_cost_percentage: float = Field(default=0.0, description="Lohnanteil in Prozent")
+    include_materials: bool = Field(default=True, description="Material abrechnen")
+    include_labor: bool = Field(default=True, description="Arbeitsstunden abrechnen")
+    status: str = Field(default="offen", max_length=20, description="Status (offen/laeuft/abgeschlossen/fehlgeschlagen)")
+    total_projects: int = Field(default=0, description="Anzahl Projekte im Lauf")
+    processed_projects: int = Field(default=0, description="Bearbeitete Projekte")
+    created_invoices: int = Field(default=0, description="Erzeugte Rechnungsentwürfe")
+    skipped_projects: int = Field(default=0, description="Projekte ohne abrechenbare Positionen")
+    failed_projects: int = Field(default=0, description="Projekte mit Fehler")
+    error: Optional[str] = Field(default=None, max_length=500, description="Letzter Fehler des Laufs")
+    created_at: datetime = Field(default_factory=datetime.utcnow, description="Erstellungsdatum")
+    started_at: Optional[datetime] = Field(default=None, description="Start der ersten Ausführung")
+    heartbeat_at: Optional[datetime] = Field(default=None, description="Letztes Lebenszeichen des Workers")
+    finished_at: Optional[datetime] = Field(default=None, description="Abschluss des Laufs")
+
+class BillingRunItem(SQLModel, table=True):
+    """
+    Ein Projekt innerhalb einer Sammelabrechnung.
+    Status und Rechnung werden in derselben Transaktion geschrieben wie der Rechnungsentwurf.
+    """
+    __tablename__ = "billing_run_item"
+    __table_args__ = (
+        Index("ix_billing_run_item_run_project", "billing_run_id", "project_id", unique=True),
+        Index("ix_billing_run_item_run_status", "billing_run_id", "status"),
+    )
+    id: Optional[int] = Field(default=None, primary_key=True)
+    tenant_id: int = Field(foreign_key="tenant.id", description="Mandant")
+    billing_run_id: int = Field(foreign_key="billing_run.id", description="Zugehöriger Abrechnungslauf")
+    project_id: int = Field(foreign_key="project.id", description="Projekt")
+    status: str = Field(default="offen", max_length=20, description="Status (offen/erstellt/uebersprungen/fehlgeschlagen)")
+    invoice_id: Optional[int] = Field(default=None, foreign_key="invoice.id", description="Erzeugter Rechnungsentwurf")
+    invoice_number: Optional[str] = Field(default=None, max_length=50, description="Vergebene Rechnungsnummer")
+    total_amount: Optional[float] = Field(default=None, description="Bruttobetrag des Entwurfs")
+    error: Optional[str] = Field(default=None, max_length=500, description="Fehler- bzw. Hinweistext")
+    updated_at: datetime = Field(default_factory=datetime.utcnow, description="Letzte Aktualisierung")
+
 class ReportImage(SQLModel, table=True):
     """
     Datenmodell für Berichtsbilder.
     """
+    __table_args__ = (
+        Index("ix_reportimage_report_id", "report_id"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     tenant_id: int = Field(default=1, foreign_key="tenant.id", index=True, description="Mandant")
     report_id: int = Field(foreign_key="report.id", description="Zugehöriger Bericht")
@@ -289,6 +450,12 @@ class ReportImage(SQLModel, table=True):
     original_filename: str = Field(max_length=255, description="Originaler Dateiname")
     file_path: str = Field(max_length=500, description="Dateipfad")
     file_size: Optional[int] = Field(default=None, description="Dateigröße in Bytes")
+    content_hash: Optional[str] = Field(default=None, max_length=64, index=True, description="SHA-256 der Datei im Blob-Speicher")
+    mime_type: Optional[str] = Field(default=None, max_length=100, description="MIME-Type der Datei")
+    width: Optional[int] = Field(default=None, description="Bildbreite in Pixeln (EXIF-Orientierung berücksichtigt)")
+    height: Optional[int] = Field(default=None, description="Bildhöhe in Pixeln (EXIF-Orientierung berücksichtigt)")
+    file_mtime: Optional[datetime] = Field(default=None, description="Änderungszeit der Datei (UTC) beim letzten Abgleich")
+    file_missing: bool = Field(default=False, description="Datei fehlt auf dem Datenträger (vom Abgleich gesetzt)")
     description: Optional[str] = Field(default=None, description="Bildbeschreibung")
     image_type: str = Field(default="progress", max_length=20, description="Bildtyp (progress, before, after, issue)")
     created_at: datetime = Field(default_factory=datetime.utcnow, description="Erstellungsdatum")
@@ -297,6 +464,9 @@ class CompanyLogo(SQLModel, table=True):
     """
     Datenmodell für Firmenlogos.
     """
+    __table_args__ = (
+        Index("ix_companylogo_tenant_created", "tenant_id", "created_at"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     tenant_id: int = Field(default=1, foreign_key="tenant.id", index=True, description="Mandant")
     user_id: int = Field(foreign_key="user.id", description="Zugehöriger Admin-Benutzer")
@@ -304,11 +474,25 @@ class CompanyLogo(SQLModel, table=True):
     original_filename: str = Field(max_length=255, description="Originaler Dateiname")
     file_path: str = Field(max_length=500, description="Dateipfad")
     file_size: Optional[int] = Field(default=None, description="Dateigröße in Bytes")
+    content_hash: Optional[str] = Field(default=None, max_length=64, index=True, description="SHA-256 der Datei im Blob-Speicher")
     is_active: bool = Field(default=True, description="Aktives Logo")
     created_at: datetime = Field(default_factory=datetime.utcnow, description="Erstellungsdatum")
     updated_at: datetime = Field(default_factory=datetime.utcnow, description="Letzte Aktualisierung")
 
 
+class StoredBlob(SQLModel, table=True):
+    """
+    Inhaltsadressierte Datei im Blob-Speicher.
+    ``ref_count`` zählt die Bild- und Logo-Zeilen mit diesem Hash (siehe services/blob_store.py).
+    """
+    __tablename__ = "stored_blob"
+    content_hash: str = Field(primary_key=True, max_length=64, description="SHA-256 des Inhalts")
+    path: str = Field(max_length=500, description="Dateipfad im Blob-Speicher")
+    size: int = Field(default=0, description="Dateigröße in Bytes")
+    ref_count: int = Field(default=0, description="Anzahl referenzierender Zeilen")
+    created_at: datetime = Field(default_factory=datetime.utcnow, description="Erstellungsdatum")
+
+
 class TenantInvitation(SQLModel, table=True):
     """
     Einladungen für neue Benutzer zu einem Mandanten.
@@ -317,7 +501,7 @@ class TenantInvitation(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     tenant_id: int = Field(foreign_key="tenant.id", index=True, description="Zugehöriger Mandant")
     email: str = Field(max_length=255, index=True, description="E-Mail-Adresse des Eingeladenen")
-    token_hash: str = Field(max_length=64, description="Gehashtes Einladungstoken")
+    token_hash: str = Field(max_length=64, index=True, unique=True, description="Gehashtes Einladungstoken")
     role: UserRole = Field(default=UserRole.MITARBEITER, description="Rolle des Eingeladenen")
     invited_by: Optional[int] = Field(default=None, foreign_key="user.id", description="Einladender Benutzer")
     accepted_at: Optional[datetime] = Field(default=None, description="Zeitpunkt der Annahme")
@@ -326,3 +510,21 @@ class TenantInvitation(SQLModel, table=True):
     updated_at: datetime = Field(default_factory=datetime.utcnow, description="Letzte Aktualisierung")
 
 
+
+
+class TenantStats(SQLModel, table=True):
+    """
+    Vorberechnete Dashboard-Kennzahlen pro Mandant.
+    Wird bei jedem Flush inkrementell fortgeschrieben (siehe services/tenant_stats.py).
+    """
+    __tablename__ = "tenant_stats"
+    tenant_id: int = Field(foreign_key="tenant.id", primary_key=True, description="Mandant")
+    project_status_counts: str = Field(default="{}", description="Projekte je Status als JSON")
+    invoice_status_counts: str = Field(default="{}", description="Rechnungen je Status als JSON")
+    invoice_revenue_by_status: str = Field(default="{}", description="Rechnungssummen je Status als JSON")
+    revenue_by_month: str = Field(default="{}", description="Rechnungssummen je Monat (YYYY-MM) als JSON")
+    offer_status_counts: str = Field(default="{}", description="Angebote je Status als JSON")
+    report_count: int = Field(default=0, description="Anzahl Berichte")
+    total_hours: float = Field(default=0.0, description="Summe der erfassten Stunden")
+    hours_by_week: str = Field(default="{}", description="Stunden je Kalenderwoche (Montag, ISO-Datum) als JSON")
+    updated_at: datetime = Field(default_factory=datetime.utcnow, description="Letzte Aktualisierung")
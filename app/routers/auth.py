@@ -3,9 +3,10 @@ Authentifizierungs-Endpoints für die Bau-Dokumentations-App.
 """
 
 from datetime import datetime, timedelta
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from sqlmodel import Session, select
-from app.database import get_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import get_async_session
 from app.models import User, TenantInvitation, UserRole, TenantSettings
 from app.schemas import (
     UserCreate,
@@ -17,21 +18,28 @@ from app.schemas import (
     TenantSettingsUpdate
 )
 from app.auth import (
-    get_password_hash, 
-    authenticate_user, 
+    get_password_hash_async, 
+    authenticate_user_async, 
     create_access_token, 
     get_current_user,
     require_admin,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
 from app.services.invite_service import InvitationService, TOKEN_TTL_HOURS
+from app.utils.fast_json import FastJSONRoute
 
-router = APIRouter(prefix="/auth", tags=["Authentication"])
+router = APIRouter(prefix="/auth", tags=["Authentication"], route_class=FastJSONRoute)
 
 @router.post("/login", response_model=Token)
-async def login(user_credentials: UserLogin, session: Session = Depends(get_session)):
+async def login(
+    user_credentials: UserLogin,
+    background_tasks: BackgroundTasks,
+    session: AsyncSession = Depends(get_async_session),
+):
     """Benutzeranmeldung."""
-    user = authenticate_user(session, user_credentials.username, user_credentials.password)
+    user = await authenticate_user_async(
+        session, user_credentials.username, user_credentials.password, background_tasks
+    )
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -48,7 +56,7 @@ async def login(user_credentials: UserLogin, session: Session = Depends(get_sess
     # Update last login
     user.last_login = datetime.utcnow()
     session.add(user)
-    session.commit()
+    await session.commit()
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -59,14 +67,14 @@ async def login(user_credentials: UserLogin, session: Session = Depends(get_sess
 @router.post("/register", response_model=UserSchema)
 async def register(
     user_data: UserCreate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     _: User = Depends(require_admin)
 ):
     """Benutzerregistrierung (nur für Admins)."""
     # Prüfe ob Benutzername bereits existiert
-    existing_user = session.exec(
+    existing_user = (await session.exec(
         select(User).where(User.username == user_data.username)
-    ).first()
+    )).first()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -74,9 +82,9 @@ async def register(
         )
     
     # Prüfe ob E-Mail bereits existiert
-    existing_email = session.exec(
+    existing_email = (await session.exec(
         select(User).where(User.email == user_data.email)
-    ).first()
+    )).first()
     if existing_email:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -84,7 +92,7 @@ async def register(
         )
     
     # Erstelle neuen Benutzer
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     db_user = User(
         username=user_data.username,
         email=user_data.email,
@@ -94,15 +102,15 @@ async def register(
     )
     
     session.add(db_user)
-    session.commit()
-    session.refresh(db_user)
+    await session.commit()
+    await session.refresh(db_user)
     
     return db_user
 
 @router.get("/users", response_model=list[UserSchema])
-async def list_users(_: User = Depends(require_admin), session: Session = Depends(get_session)):
+async def list_users(_: User = Depends(require_admin), session: AsyncSession = Depends(get_async_session)):
     """Alle Benutzer für die Verwaltung abrufen."""
-    users = session.exec(select(User)).all()
+    users = (await session.exec(select(User))).all()
     return [
         UserSchema(
             id=user.id,
@@ -124,10 +132,10 @@ async def update_user(
     user_id: int,
     user_update: UserUpdate,
     current_user: User = Depends(require_admin),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Bestehenden Benutzer aktualisieren (Admin)."""
-    db_user = session.get(User, user_id)
+    db_user = await session.get(User, user_id)
     if not db_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Benutzer nicht gefunden")
 
@@ -141,8 +149,8 @@ async def update_user(
 
     db_user.updated_at = datetime.utcnow()
     session.add(db_user)
-    session.commit()
-    session.refresh(db_user)
+    await session.commit()
+    await session.refresh(db_user)
 
     return UserSchema(
         id=db_user.id,
@@ -162,10 +170,10 @@ async def reset_user_password(
     user_id: int,
     new_password: dict,
     current_user: User = Depends(require_admin),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Passwort eines Benutzers zurücksetzen (Admin)."""
-    db_user = session.get(User, user_id)
+    db_user = await session.get(User, user_id)
     if not db_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Benutzer nicht gefunden")
 
@@ -173,10 +181,10 @@ async def reset_user_password(
     if not password or len(password) < 8:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Passwort muss mindestens 8 Zeichen haben")
 
-    db_user.hashed_password = get_password_hash(password)
+    db_user.hashed_password = await get_password_hash_async(password)
     db_user.updated_at = datetime.utcnow()
     session.add(db_user)
-    session.commit()
+    await session.commit()
 
     return {"message": "Passwort wurde aktualisiert"}
 
@@ -185,7 +193,7 @@ async def reset_user_password(
 async def create_invitation(
     payload: dict,
     current_user: User = Depends(require_admin),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Admin lädt einen neuen Benutzer per E-Mail ein."""
     email = payload.get("email")
@@ -199,14 +207,15 @@ async def create_invitation(
     except ValueError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Ungültige Rolle")
 
-    invitation_service = InvitationService(session)
-
-    invitation, token = invitation_service.create_invitation(
-        tenant_id=current_user.tenant_id,
-        email=email,
-        role=role,
-        invited_by=current_user.id,
-        ttl_hours=payload.get("ttl_hours", TOKEN_TTL_HOURS),
+    # InvitationService arbeitet synchron; run_sync führt ihn ohne Blockieren der Event-Loop aus
+    invitation, token = await session.run_sync(
+        lambda sync_session: InvitationService(sync_session).create_invitation(
+            tenant_id=current_user.tenant_id,
+            email=email,
+            role=role,
+            invited_by=current_user.id,
+            ttl_hours=payload.get("ttl_hours", TOKEN_TTL_HOURS),
+        )
     )
 
     return {
@@ -216,26 +225,22 @@ async def create_invitation(
     }
 
 
-@router.post("/invite/accept")
-async def accept_invitation(payload: dict, session: Session = Depends(get_session)):
-    """Eingeladener Benutzer akzeptiert Einladung, setzt Passwort."""
-    token = payload.get("token")
-    full_name = payload.get("full_name")
-    password = payload.get("password")
-
-    if not token or not full_name or not password:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Token, Name und Passwort erforderlich")
-
-    invitation_service = InvitationService(session)
-    invitation = invitation_service.get_invitation_by_token(token)
+def _get_acceptable_invitation(session: Session, token: str) -> TenantInvitation:
+    """Einladung prüfen, bevor teures Passwort-Hashing angestoßen wird."""
+    invitation = InvitationService(session).get_invitation_by_token(token)
     if not invitation:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Einladung ungültig oder abgelaufen")
 
     existing_user = session.exec(select(User).where(User.email == invitation.email)).first()
     if existing_user:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Benutzer existiert bereits")
+    return invitation
+
 
-    hashed_password = get_password_hash(password)
+def _accept_invitation_sync(session: Session, token: str, full_name: str, hashed_password: str) -> User:
+    """Synchroner Ablauf der Einladungsannahme (wird über run_sync ausgeführt)."""
+    invitation = _get_acceptable_invitation(session, token)
+    invitation_service = InvitationService(session)
 
     new_user = invitation_service.create_user_from_invitation(
         invitation=invitation,
@@ -245,6 +250,22 @@ async def accept_invitation(payload: dict, session: Session = Depends(get_sessio
 
     invitation_service.accept_invitation(invitation)
     invitation_service.ensure_employee_for_user(new_user)
+    return new_user
+
+
+@router.post("/invite/accept")
+async def accept_invitation(payload: dict, session: AsyncSession = Depends(get_async_session)):
+    """Eingeladener Benutzer akzeptiert Einladung, setzt Passwort."""
+    token = payload.get("token")
+    full_name = payload.get("full_name")
+    password = payload.get("password")
+
+    if not token or not full_name or not password:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Token, Name und Passwort erforderlich")
+
+    await session.run_sync(_get_acceptable_invitation, token)
+    hashed_password = await get_password_hash_async(password)
+    new_user = await session.run_sync(_accept_invitation_sync, token, full_name, hashed_password)
 
     return {
         "message": "Einladung akzeptiert",
@@ -256,24 +277,28 @@ async def accept_invitation(payload: dict, session: Session = Depends(get_sessio
 async def resend_invitation(
     payload: dict,
     current_user: User = Depends(require_admin),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Einladung erneut senden (generiert neues Token)."""
     email = payload.get("email")
     if not email:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email erforderlich")
 
-    invitation_service = InvitationService(session)
-    existing = invitation_service.find_active_invitation(current_user.tenant_id, email)
-    if existing:
-        invitation_service.delete_invitation(existing)
-
-    invitation, token = invitation_service.create_invitation(
-        tenant_id=current_user.tenant_id,
-        email=email,
-        role=role,
-        invited_by=current_user.id,
-    )
+    def _resend(sync_session: Session):
+        invitation_service = InvitationService(sync_session)
+        existing = invitation_service.find_active_invitation(current_user.tenant_id, email)
+        role = existing.role if existing else UserRole(payload.get("role", UserRole.MITARBEITER.value))
+        if existing:
+            invitation_service.delete_invitation(existing)
+
+        return invitation_service.create_invitation(
+            tenant_id=current_user.tenant_id,
+            email=email,
+            role=role,
+            invited_by=current_user.id,
+        )
+
+    invitation, token = await session.run_sync(_resend)
 
     return {
         "invitation_id": invitation.id,
@@ -282,14 +307,14 @@ async def resend_invitation(
     }
 
 @router.get("/invitations")
-async def list_invitations(current_user: User = Depends(require_admin), session: Session = Depends(get_session)):
+async def list_invitations(current_user: User = Depends(require_admin), session: AsyncSession = Depends(get_async_session)):
     statement = select(TenantInvitation).where(TenantInvitation.tenant_id == current_user.tenant_id)
-    invitations = session.exec(statement).all()
+    invitations = (await session.exec(statement)).all()
     result = []
     for invitation in invitations:
         invited_by_name = None
         if invitation.invited_by:
-            inviter = session.get(User, invitation.invited_by)
+            inviter = await session.get(User, invitation.invited_by)
             invited_by_name = inviter.full_name if inviter else None
         result.append({
             'id': invitation.id,
@@ -308,29 +333,29 @@ async def list_invitations(current_user: User = Depends(require_admin), session:
 async def delete_invitation(
     invitation_id: int,
     current_user: User = Depends(require_admin),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
-    invitation = session.get(TenantInvitation, invitation_id)
+    invitation = await session.get(TenantInvitation, invitation_id)
     if not invitation or invitation.tenant_id != current_user.tenant_id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Einladung nicht gefunden")
-    session.delete(invitation)
-    session.commit()
+    await session.delete(invitation)
+    await session.commit()
     return {"message": "Einladung gelöscht"}
 
 @router.get("/me")
 async def read_users_me(
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
-    settings = session.exec(
+    settings = (await session.exec(
         select(TenantSettings).where(TenantSettings.tenant_id == current_user.tenant_id)
-    ).first()
+    )).first()
 
     if not settings:
         settings = TenantSettings(tenant_id=current_user.tenant_id)
         session.add(settings)
-        session.commit()
-        session.refresh(settings)
+        await session.commit()
+        await session.refresh(settings)
 
     tenant_schema = TenantSettingsResponse.model_validate(settings)
     user_schema = UserSchema(
@@ -354,17 +379,17 @@ async def read_users_me(
 @router.get("/tenant/settings", response_model=TenantSettingsResponse)
 async def get_tenant_settings(
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
-    settings = session.exec(
+    settings = (await session.exec(
         select(TenantSettings).where(TenantSettings.tenant_id == current_user.tenant_id)
-    ).first()
+    )).first()
 
     if not settings:
         settings = TenantSettings(tenant_id=current_user.tenant_id)
         session.add(settings)
-        session.commit()
-        session.refresh(settings)
+        await session.commit()
+        await session.refresh(settings)
 
     return TenantSettingsResponse.model_validate(settings)
 
@@ -373,11 +398,11 @@ async def get_tenant_settings(
 async def update_tenant_settings(
     payload: TenantSettingsUpdate,
     current_user: User = Depends(require_admin),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
-    settings = session.exec(
+    settings = (await session.exec(
         select(TenantSettings).where(TenantSettings.tenant_id == current_user.tenant_id)
-    ).first()
+    )).first()
 
     if not settings:
         settings = TenantSettings(tenant_id=current_user.tenant_id)
@@ -388,8 +413,8 @@ async def update_tenant_settings(
 
     settings.updated_at = datetime.utcnow()
     session.add(settings)
-    session.commit()
-    session.refresh(settings)
+    await session.commit()
+    await session.refresh(settings)
 
     return TenantSettingsResponse.model_validate(settings)
 
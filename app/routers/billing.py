@@ -8,16 +8,18 @@ from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.responses import JSONResponse
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.auth import require_admin, get_current_user
-from app.database import get_session
+from app.database import get_async_session, get_session
 from app.models import Tenant, User
 from app.services import StripeService
 from app.utils import feature_flags
+from app.utils.fast_json import FastJSONRoute
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/billing", tags=["Billing"])
+router = APIRouter(prefix="/billing", tags=["Billing"], route_class=FastJSONRoute)
 
 
 @router.post("/checkout")
@@ -41,7 +43,7 @@ def create_checkout_session(
 
 
 @router.post("/webhook")
-async def stripe_webhook(request: Request, session: Session = Depends(get_session)) -> Any:
+async def stripe_webhook(request: Request, session: AsyncSession = Depends(get_async_session)) -> Any:
     """Empfängt Stripe-Webhooks und verarbeitet relevante Events."""
     if not feature_flags.get_feature_flag("billing_enabled", False):
         return JSONResponse(status_code=200, content={"ignored": True})
@@ -50,14 +52,15 @@ async def stripe_webhook(request: Request, session: Session = Depends(get_sessio
 
     logger.info("Stripe-Webhook empfangen: %s", event_type)
 
-    service = StripeService(session)
-
-    if event_type == "customer.subscription.updated":
-        service.handle_subscription_updated(payload)
-    elif event_type == "invoice.payment_failed":
-        service.handle_invoice_payment_failed(payload)
-    elif event_type == "invoice.payment_succeeded":
-        service.handle_invoice_payment_succeeded(payload)
+    handlers = {
+        "customer.subscription.updated": StripeService.handle_subscription_updated,
+        "invoice.payment_failed": StripeService.handle_invoice_payment_failed,
+        "invoice.payment_succeeded": StripeService.handle_invoice_payment_succeeded,
+    }
+    handler = handlers.get(event_type)
+    if handler:
+        # StripeService arbeitet synchron; run_sync hält die Event-Loop frei
+        await session.run_sync(lambda sync_session: handler(StripeService(sync_session), payload))
     else:
         logger.debug("Stripe-Event ignoriert: %s", event_type)
 
@@ -67,7 +70,6 @@ async def stripe_webhook(request: Request, session: Session = Depends(get_sessio
 @router.get("/status")
 async def get_billing_status(
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
 ):
     # Einfache Rückgabe - Multi-Tenant-Modus ist nicht aktiviert
     return {
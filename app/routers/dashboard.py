@@ -3,92 +3,72 @@ Router für Dashboard-Daten.
 Bietet aggregierte Statistiken und Übersichten.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Any, Dict
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from ..auth import get_current_user
-from ..database import get_session
-from ..models import Invoice, Offer, Project, Report, TimeEntry
+from ..database import get_async_session
+from ..services.tenant_stats import TenantStatsService, month_key, week_key
+from ..utils.fast_json import FastJSONRoute
 
-router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+router = APIRouter(prefix="/dashboard", tags=["dashboard"], route_class=FastJSONRoute)
 
 @router.get("/")
 async def get_dashboard_data(
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user = Depends(get_current_user)
 ) -> Dict[str, Any]:
     """
     Dashboard-Statistiken abrufen.
+
+    Liest die vorberechneten Kennzahlen aus ``tenant_stats``. Fehlt die Zeile,
+    wird sie einmalig aufgebaut (daher Schreib-Session, über ``run_sync``).
     
     Returns:
         Dict mit verschiedenen Statistiken
     """
     try:
+        # Eine Zeile mit inkrementell gepflegten Kennzahlen statt elf Aggregationen
         tenant_id = current_user.tenant_id
-
-        def scalar(query):
-            value = session.exec(query).one()
-            return value if value is not None else 0
+        stats = await session.run_sync(
+            lambda sync_session: TenantStatsService(sync_session).get_or_rebuild(tenant_id)
+        )
 
         # Projekte
-        total_projects = scalar(select(func.count()).select_from(Project).where(Project.tenant_id == tenant_id))
-        active_projects = scalar(
-            select(func.count()).select_from(Project).where(
-                Project.tenant_id == tenant_id, Project.status == "aktiv"
-            )
-        )
+        project_counts = stats["project_status_counts"]
+        total_projects = sum(project_counts.values())
+        active_projects = project_counts.get("aktiv", 0)
 
         # Rechnungen
-        total_invoices = scalar(select(func.count()).select_from(Invoice).where(Invoice.tenant_id == tenant_id))
-        total_revenue = scalar(select(func.sum(Invoice.total_amount)).where(Invoice.tenant_id == tenant_id))
-
-        # Offene Rechnungen (bezahlt == False)
-        open_invoices = scalar(
-            select(func.count()).select_from(Invoice).where(
-                Invoice.tenant_id == tenant_id, Invoice.status != "bezahlt"
-            )
-        )
+        invoice_counts = stats["invoice_status_counts"]
+        total_invoices = sum(invoice_counts.values())
+        total_revenue = sum(stats["invoice_revenue_by_status"].values())
+        open_invoices = total_invoices - invoice_counts.get("bezahlt", 0)
 
         # Angebote
-        total_offers = scalar(select(func.count()).select_from(Offer).where(Offer.tenant_id == tenant_id))
-        pending_offers = scalar(
-            select(func.count()).select_from(Offer).where(
-                Offer.tenant_id == tenant_id, Offer.status == "offen"
-            )
-        )
+        offer_counts = stats["offer_status_counts"]
+        total_offers = sum(offer_counts.values())
+        pending_offers = offer_counts.get("offen", 0)
 
         # Berichte
-        total_reports = scalar(select(func.count()).select_from(Report).where(Report.tenant_id == tenant_id))
+        total_reports = stats["report_count"]
 
         # Stundeneinträge
-        total_hours = scalar(select(func.sum(TimeEntry.hours_worked)).where(TimeEntry.tenant_id == tenant_id))
-        
-        # Aktuelle Woche
+        total_hours = stats["total_hours"]
+
+        # Aktuelle Woche (Buckets sind nach dem Montag der Woche benannt)
         today = datetime.now()
-        week_start = today - timedelta(days=today.weekday())
-        week_end = week_start + timedelta(days=6)
-        
-        hours_this_week = scalar(
-            select(func.sum(TimeEntry.hours_worked)).where(
-                TimeEntry.tenant_id == tenant_id,
-                TimeEntry.work_date >= week_start.date(),
-                TimeEntry.work_date <= week_end.date(),
-            )
-        )
-        
-        # Aktueller Monat
-        month_start = today.replace(day=1)
-        revenue_this_month = scalar(
-            select(func.sum(Invoice.total_amount)).where(
-                Invoice.tenant_id == tenant_id,
-                Invoice.invoice_date >= month_start,
-            )
+        hours_this_week = stats["hours_by_week"].get(week_key(today), 0.0)
+
+        # Aktueller Monat (inklusive vordatierter Rechnungen wie bisher)
+        current_month = month_key(today)
+        revenue_this_month = sum(
+            amount for month, amount in stats["revenue_by_month"].items() if month >= current_month
         )
-        
+
         return {
             "projects": {
                 "total": total_projects,
@@ -3,26 +3,34 @@ Router für Mitarbeiter-Management.
 Bietet CRUD-Operationen für Mitarbeiter.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlmodel import Session, select
-from typing import List
-from ..database import get_session
+from typing import List, Optional
+from ..database import get_read_session, get_session
 from ..models import Employee
 from ..schemas import EmployeeCreate, EmployeeUpdate, Employee as EmployeeSchema
 from ..auth import get_current_user, require_admin
+from ..utils.fast_json import FastJSONRoute
+from ..utils.pagination import paginate
 from ..utils.tenant_scoping import add_tenant_filter, ensure_tenant_access, set_tenant_on_model
 
-router = APIRouter(prefix="/employees", tags=["employees"])
+router = APIRouter(prefix="/employees", tags=["employees"], route_class=FastJSONRoute)
 
 @router.get("/", response_model=List[EmployeeSchema])
-def get_employees(session: Session = Depends(get_session), current_user=Depends(get_current_user)):
+def get_employees(
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    response: Response = None,
+    session: Session = Depends(get_read_session),
+    current_user=Depends(get_current_user),
+):
     """
-    Alle Mitarbeiter des Tenants abrufen.
+    Alle Mitarbeiter des Tenants abrufen (optional seitenweise per ``limit``/``cursor``).
     """
     try:
         statement = add_tenant_filter(select(Employee), Employee, current_user.tenant_id)
         statement = statement.where(Employee.is_active == True)
-        employees = session.exec(statement).all()
+        employees = paginate(session, statement, [(Employee.id, False)], limit=limit, cursor=cursor, response=response)
 
         result = []
         for employee in employees:
@@ -40,6 +48,8 @@ def get_employees(session: Session = Depends(get_session), current_user=Depends(
             result.append(employee_dict)
 
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in get_employees: {e}")
         raise HTTPException(status_code=500, detail=f"Fehler beim Laden der Mitarbeiter: {str(e)}")
@@ -3,14 +3,27 @@ Router für automatische Rechnungsgenerierung.
 Separater Router um Konflikte mit {invoice_id} zu vermeiden.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session
-from ..database import get_session
-from ..schemas import InvoiceGenerationRequest, InvoiceCalculationResult
+from typing import List
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from sqlmodel import Session, select
+from ..database import get_read_session, get_session
+from ..models import BillingRun, BillingRunItem
+from ..schemas import (
+    BillingRun as BillingRunSchema,
+    BillingRunCreate,
+    BillingRunItem as BillingRunItemSchema,
+    InvoiceGenerationRequest,
+    InvoiceCalculationResult,
+)
+from ..services.billing_runs import BillingRunError, billing_run_service
 from ..services.invoice_generator import InvoiceGenerator
+from ..services.invoice_numbers import InvoiceNumberTaken
 from ..auth import get_current_user, require_buchhalter_or_admin
+from ..utils.fast_json import FastJSONRoute
+from ..utils.tenant_scoping import add_tenant_filter, ensure_tenant_access
 
-router = APIRouter(prefix="/invoice-generation", tags=["invoice-generation"])
+router = APIRouter(prefix="/invoice-generation", tags=["invoice-generation"], route_class=FastJSONRoute)
 
 @router.get("/methods")
 def get_generation_methods(current_user = Depends(get_current_user)):
@@ -83,7 +96,8 @@ def create_invoice_from_calculation(
     Erstellt eine tatsächliche Rechnung aus einem Berechnungsergebnis.
     
     Args:
-        request_data: Dict mit project_id, calculation, invoice_number, client_name, client_address
+        request_data: Dict mit project_id, calculation, client_name, client_address und
+            optional invoice_number (sonst nächste fortlaufende Nummer)
         
     Returns:
         Invoice: Erstellte Rechnung
@@ -104,11 +118,10 @@ def create_invoice_from_calculation(
         print(f"  - client_name: {client_name}")
         print(f"  - calculation vorhanden: {calculation is not None}")
         
-        if not all([project_id, calculation, invoice_number, client_name]):
+        if not all([project_id, calculation, client_name]):
             missing = []
             if not project_id: missing.append('project_id')
             if not calculation: missing.append('calculation')
-            if not invoice_number: missing.append('invoice_number')
             if not client_name: missing.append('client_name')
             raise HTTPException(status_code=400, detail=f"Fehlende erforderliche Parameter: {missing}")
         
@@ -118,6 +131,94 @@ def create_invoice_from_calculation(
         )
         print(f"DEBUG: Rechnung erfolgreich erstellt: {invoice.id}")
         return invoice
+    except InvoiceNumberTaken as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"DEBUG: Fehler beim Erstellen der Rechnung: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Fehler beim Erstellen der Rechnung: {str(e)}")
+
+
+# ---------------------------------------------------------------------------
+# Sammelabrechnung
+# ---------------------------------------------------------------------------
+
+def _get_billing_run(session: Session, run_id: int, tenant_id: int) -> BillingRun:
+    run = session.get(BillingRun, run_id)
+    return ensure_tenant_access(run, tenant_id, not_found_detail="Abrechnungslauf nicht gefunden")
+
+
+@router.post("/billing-runs", response_model=BillingRunSchema, status_code=202)
+def create_billing_run(
+    payload: BillingRunCreate,
+    background_tasks: BackgroundTasks,
+    session: Session = Depends(get_session),
+    current_user = Depends(require_buchhalter_or_admin)
+):
+    """
+    Legt eine Sammelabrechnung für alle abrechenbaren Projekte des Zeitraums an
+    und erzeugt die Rechnungsentwürfe im Hintergrund.
+
+    Returns:
+        BillingRun: Angelegter Lauf; Fortschritt über GET /billing-runs/{run_id}
+    """
+    try:
+        run = billing_run_service.create_run(current_user.tenant_id, payload, created_by=current_user.id)
+    except BillingRunError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if billing_run_service.claim(current_user.tenant_id, run.id):
+        background_tasks.add_task(billing_run_service.process, current_user.tenant_id, run.id)
+    return _get_billing_run(session, run.id, current_user.tenant_id)
+
+
+@router.get("/billing-runs", response_model=List[BillingRunSchema])
+def list_billing_runs(
+    session: Session = Depends(get_read_session),
+    current_user = Depends(require_buchhalter_or_admin)
+):
+    """Abrechnungsläufe des Mandanten, neueste zuerst."""
+    statement = add_tenant_filter(select(BillingRun), BillingRun, current_user.tenant_id)
+    return session.exec(statement.order_by(BillingRun.created_at.desc(), BillingRun.id.desc())).all()
+
+
+@router.get("/billing-runs/{run_id}", response_model=BillingRunSchema)
+def get_billing_run(
+    run_id: int,
+    session: Session = Depends(get_read_session),
+    current_user = Depends(require_buchhalter_or_admin)
+):
+    """Status und Fortschritt eines Abrechnungslaufs."""
+    return _get_billing_run(session, run_id, current_user.tenant_id)
+
+
+@router.get("/billing-runs/{run_id}/items", response_model=List[BillingRunItemSchema])
+def get_billing_run_items(
+    run_id: int,
+    session: Session = Depends(get_read_session),
+    current_user = Depends(require_buchhalter_or_admin)
+):
+    """Ergebnis je Projekt (Rechnung, übersprungen oder Fehler)."""
+    _get_billing_run(session, run_id, current_user.tenant_id)
+    return session.exec(
+        select(BillingRunItem).where(BillingRunItem.billing_run_id == run_id).order_by(BillingRunItem.project_id)
+    ).all()
+
+
+@router.post("/billing-runs/{run_id}/resume", response_model=BillingRunSchema, status_code=202)
+def resume_billing_run(
+    run_id: int,
+    background_tasks: BackgroundTasks,
+    session: Session = Depends(get_session),
+    current_user = Depends(require_buchhalter_or_admin)
+):
+    """
+    Setzt einen unterbrochenen oder fehlgeschlagenen Lauf bei den offenen Projekten fort.
+    Bereits erzeugte Entwürfe werden nicht erneut angelegt.
+    """
+    _get_billing_run(session, run_id, current_user.tenant_id)
+    if not billing_run_service.claim(current_user.tenant_id, run_id):
+        raise HTTPException(status_code=409, detail="Abrechnungslauf läuft bereits oder ist abgeschlossen")
+    background_tasks.add_task(billing_run_service.process, current_user.tenant_id, run_id)
+    session.expire_all()
+    return _get_billing_run(session, run_id, current_user.tenant_id)
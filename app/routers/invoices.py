@@ -3,26 +3,27 @@
 from __future__ import annotations
 
 import json
-import os
-import tempfile
-from datetime import datetime, timedelta
-from typing import Iterable, List, Tuple
-
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import FileResponse
-from starlette.background import BackgroundTask
+import re
+from collections import deque
+from datetime import date, datetime, time, timedelta
+from itertools import islice
+from typing import Any, Deque, Iterable, Iterator, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Float, String, literal, union_all
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select, func
 
 from ..auth import get_current_user, require_buchhalter_or_admin
-from ..database import get_session
+from ..database import get_read_session, get_session
 from ..models import (
-    Employee,
     Invoice,
     MaterialUsage,
     Offer,
     Project,
     TenantSettings,
-    TimeEntry,
+    TimeEntryDaily,
 )
 from ..schemas import (
     Invoice as InvoiceSchema,
@@ -32,12 +33,20 @@ from ..schemas import (
     InvoiceItem,
     InvoiceUpdate,
 )
-from ..services.beautiful_pdf_generator import create_beautiful_invoice_pdf
+from ..services.beautiful_pdf_generator import load_invoice_branding
 from ..services.invoice_generator import InvoiceGenerator
-from ..utils.pdf_utils import create_invoice_pdf
+from ..services.invoice_numbers import InvoiceNumberAllocator, InvoiceNumberTaken
+from ..services.line_items import invoice_line_item_totals
+from ..services.pdf_cache import cache_key, logo_fingerprint, pdf_cache
+from ..services.time_rollup import TimeRollupService, join_employee, labor_cost
+from ..services.pdf_render_service import pdf_render_service
+from ..utils.fast_json import FastJSONRoute
+from ..utils.pagination import paginate
+from ..utils.pdf_utils import pdf_streaming_response
 from ..utils.tenant_scoping import add_tenant_filter, ensure_tenant_access, set_tenant_on_model
+from ..utils.zip_stream import stream_zip
 
-router = APIRouter(prefix="/invoices", tags=["invoices"])
+router = APIRouter(prefix="/invoices", tags=["invoices"], route_class=FastJSONRoute)
 
 
 # ---------------------------------------------------------------------------
@@ -69,41 +78,51 @@ def _ensure_offer(session: Session, offer_id: int, tenant_id: int) -> Offer:
     return ensure_tenant_access(offer, tenant_id, not_found_detail="Angebot nicht gefunden")
 
 
-def _calculate_personnel_costs(session: Session, project_id: int, tenant_id: int) -> Tuple[float, float]:
-    """Summiere Stunden und Kosten aller Stundeneinträge eines Projekts."""
-    entry_statement = add_tenant_filter(
-        select(TimeEntry).where(TimeEntry.project_id == project_id),
-        TimeEntry,
+def _project_cost_rows(session: Session, project_id: int, tenant_id: int) -> List[Any]:
+    """
+    Personal- und Materialkosten eines Projekts in einer Abfrage.
+
+    Die erste Zeile (``kind`` = ``personnel``) enthält Stunden und Kosten aller
+    Stundeneinträge aus der Tagesverdichtung; fehlt am Eintrag der Stundensatz,
+    gilt der des Mitarbeiters. Danach folgt je Materialverbrauch eine Zeile
+    (``kind`` = ``material``).
+    """
+    TimeRollupService(session).ensure(tenant_id)
+    personnel = join_employee(
+        select(
+            literal("personnel").label("kind"),
+            literal(0).label("id"),
+            literal(None, String).label("name"),
+            func.coalesce(func.sum(TimeEntryDaily.hours_worked), 0.0).label("quantity"),
+            literal(None, String).label("unit"),
+            literal(None, Float).label("unit_price"),
+            func.coalesce(func.sum(labor_cost()), 0.0).label("total_price"),
+        ).select_from(TimeEntryDaily),
         tenant_id,
-    )
-    time_entries = session.exec(entry_statement).all()
-
-    total_hours = 0.0
-    total_cost = 0.0
-    for entry in time_entries:
-        hours = entry.hours_worked or 0.0
-        total_hours += hours
-
-        rate = entry.hourly_rate
-        if rate is None:
-            employee_statement = add_tenant_filter(
-                select(Employee).where(Employee.id == entry.employee_id),
-                Employee,
-                tenant_id,
-            )
-            employee = session.exec(employee_statement).first()
-            rate = employee.hourly_rate if employee and employee.hourly_rate else 0.0
-
-        total_cost += hours * (rate or 0.0)
-
-    return total_hours, total_cost
+    ).where(TimeEntryDaily.tenant_id == tenant_id, TimeEntryDaily.project_id == project_id)
+    materials = select(
+        literal("material").label("kind"),
+        MaterialUsage.id,
+        MaterialUsage.material_name,
+        func.coalesce(MaterialUsage.quantity, 0.0),
+        MaterialUsage.unit,
+        MaterialUsage.unit_price,
+        func.coalesce(MaterialUsage.total_cost, MaterialUsage.unit_price * MaterialUsage.quantity, 0.0),
+    ).where(MaterialUsage.tenant_id == tenant_id, MaterialUsage.project_id == project_id)
+
+    combined = union_all(personnel, materials).subquery()
+    # "personnel" sortiert nach "material"; Personal zuerst, Material in Erfassungsreihenfolge
+    return session.execute(
+        select(combined).order_by(combined.c.kind.desc(), combined.c.id)
+    ).all()
 
 
 def _collect_project_items(session: Session, project_id: int, tenant_id: int) -> Tuple[List[InvoiceItem], float]:
     """Generiere Standard-Rechnungspositionen aus Projektressourcen."""
     items: List[InvoiceItem] = []
 
-    hours, personnel_cost = _calculate_personnel_costs(session, project_id, tenant_id)
+    personnel, *materials = _project_cost_rows(session, project_id, tenant_id)
+    hours, personnel_cost = personnel.quantity, personnel.total_price
     if hours > 0 and personnel_cost > 0:
         average_rate = personnel_cost / hours if hours else 0.0
         items.append(
@@ -119,25 +138,12 @@ def _collect_project_items(session: Session, project_id: int, tenant_id: int) ->
             )
         )
 
-    material_statement = add_tenant_filter(
-        select(MaterialUsage).where(MaterialUsage.project_id == project_id),
-        MaterialUsage,
-        tenant_id,
-    )
-    materials = session.exec(material_statement).all()
-
-    material_total = 0.0
     for material in materials:
-        total_price = material.total_cost
-        if total_price is None and material.unit_price is not None:
-            total_price = (material.unit_price or 0.0) * (material.quantity or 0.0)
-        total_price = round(total_price or 0.0, 2)
-        material_total += total_price
-
+        total_price = round(material.total_price, 2)
         items.append(
             InvoiceItem(
-                description=f"Material: {material.material_name}",
-                quantity=round(material.quantity or 0.0, 2),
+                description=f"Material: {material.name}",
+                quantity=round(material.quantity, 2),
                 unit=material.unit or "Stk",
                 unit_price=round(material.unit_price or 0.0, 2),
                 total_price=total_price,
@@ -181,18 +187,22 @@ def _combine_items(
 
 @router.get("/", response_model=List[InvoiceSchema])
 def get_invoices(
-    session: Session = Depends(get_session),
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    response: Response = None,
+    session: Session = Depends(get_read_session),
     current_user=Depends(require_buchhalter_or_admin),
 ):
-    """Alle Rechnungen des aktuellen Mandanten abrufen."""
-    statement = add_tenant_filter(select(Invoice).order_by(Invoice.created_at.desc()), Invoice, current_user.tenant_id)
-    invoices = session.exec(statement).all()
-
-    for invoice in invoices:
-        if invoice.items is None:
-            invoice.items = "[]"
-        elif not isinstance(invoice.items, str):
-            invoice.items = json.dumps(invoice.items)
+    """Alle Rechnungen des aktuellen Mandanten abrufen (neueste zuerst, optional seitenweise)."""
+    statement = add_tenant_filter(select(Invoice), Invoice, current_user.tenant_id)
+    invoices = paginate(
+        session,
+        statement,
+        [(Invoice.created_at, True), (Invoice.id, True)],
+        limit=limit,
+        cursor=cursor,
+        response=response,
+    )
     return invoices
 
 
@@ -209,6 +219,12 @@ def create_invoice(
     items, total_amount = _combine_items(invoice_data.items, generated_items, invoice_data.total_amount)
 
     payload = invoice_data.model_dump(exclude={"items", "total_amount", "invoice_date", "due_date"})
+    try:
+        payload["invoice_number"] = InvoiceNumberAllocator(session, current_user.tenant_id).assign(
+            invoice_data.invoice_number
+        )
+    except InvoiceNumberTaken as e:
+        raise HTTPException(status_code=409, detail=str(e))
     payload["total_amount"] = total_amount
     payload["invoice_date"] = invoice_data.invoice_date or datetime.utcnow()
     payload["due_date"] = invoice_data.due_date
@@ -218,7 +234,12 @@ def create_invoice(
     set_tenant_on_model(db_invoice, current_user.tenant_id)
 
     session.add(db_invoice)
-    session.commit()
+    try:
+        session.commit()
+    except IntegrityError:
+        # Eindeutiger Index: dieselbe Nummer wurde parallel vergeben
+        session.rollback()
+        raise HTTPException(status_code=409, detail=f"Rechnungsnummer {payload['invoice_number']} ist bereits vergeben")
     session.refresh(db_invoice)
     return db_invoice
 
@@ -236,8 +257,9 @@ def update_invoice(
     update_data = invoice_update.model_dump(exclude_unset=True)
 
     if "items" in update_data:
-        items = update_data.pop("items")
-        invoice.items = _serialize_items(items)
+        # model_dump() liefert Dicts; serialisiert werden die Schema-Instanzen
+        update_data.pop("items")
+        invoice.items = _serialize_items(invoice_update.items)
 
     for field, value in update_data.items():
         if field == "total_amount" and value is not None:
@@ -283,19 +305,8 @@ def get_invoice(
 # PDF / Zusatzfunktionen
 # ---------------------------------------------------------------------------
 
-@router.get("/{invoice_id}/pdf")
-def generate_invoice_pdf(
-    invoice_id: int,
-    session: Session = Depends(get_session),
-    current_user=Depends(require_buchhalter_or_admin),
-):
-    """PDF einer Rechnung erzeugen und zum Download bereitstellen."""
-    invoice = _ensure_invoice(session, invoice_id, current_user.tenant_id)
-
-    tenant_settings = session.exec(
-        select(TenantSettings).where(TenantSettings.tenant_id == current_user.tenant_id)
-    ).first()
-
+def _invoice_letterhead(tenant_settings: Optional[TenantSettings]) -> Tuple[Optional[str], Optional[str]]:
+    """Firmen- und Steuerblock für den PDF-Briefkopf aus den Mandanten-Einstellungen."""
     company_block = None
     tax_block = None
     if tenant_settings:
@@ -326,8 +337,12 @@ def generate_invoice_pdf(
         if tenant_settings.bank_name:
             tax_lines.append(f"Bank: {tenant_settings.bank_name}")
         tax_block = "\n".join(tax_lines)
+    return company_block, tax_block
+
 
-    invoice_data = {
+def _invoice_pdf_data(invoice: Invoice, company_block: Optional[str], tax_block: Optional[str]) -> dict:
+    """Render-Eingaben einer Rechnung (ohne Datenbankobjekte, daher picklebar)."""
+    return {
         "invoice_number": invoice.invoice_number,
         "title": invoice.title,
         "description": invoice.description,
@@ -342,25 +357,141 @@ def generate_invoice_pdf(
         "tax_block": tax_block,
     }
 
+
+def _invoice_pdf_key(invoice_data: dict, branding: dict) -> str:
+    """Cache-Schlüssel über alle Render-Eingaben inkl. Logo-Datei."""
+    return cache_key("invoice", invoice_data, branding, logo_fingerprint(branding.get("logo_path")))
+
+
+@router.get("/{invoice_id}/pdf")
+def generate_invoice_pdf(
+    invoice_id: int,
+    session: Session = Depends(get_session),
+    current_user=Depends(require_buchhalter_or_admin),
+):
+    """PDF einer Rechnung erzeugen und zum Download bereitstellen."""
+    invoice = _ensure_invoice(session, invoice_id, current_user.tenant_id)
+
+    tenant_settings = session.exec(
+        select(TenantSettings).where(TenantSettings.tenant_id == current_user.tenant_id)
+    ).first()
+    invoice_data = _invoice_pdf_data(invoice, *_invoice_letterhead(tenant_settings))
+
+    # Rendern im Prozesspool; Briefkopf und Logo werden vorher hier geladen.
+    # Der Cache-Schlüssel umfasst alle Render-Eingaben inkl. Logo-Datei.
     if hasattr(current_user, "id"):
-        pdf_bytes = create_beautiful_invoice_pdf(invoice_data, session, current_user.id)
+        branding = load_invoice_branding(session, current_user.id)
+        key = _invoice_pdf_key(invoice_data, branding)
+        pdf_bytes = pdf_cache.get_or_render(
+            current_user.tenant_id, "invoice", invoice_id, key,
+            lambda: pdf_render_service.render_sync("invoice", invoice_data, branding),
+        )
     else:  # pragma: no cover - Fallback für Service-Aufrufe ohne User
-        pdf_bytes = create_invoice_pdf(invoice_data)
-
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-        tmp_file.write(pdf_bytes)
-        tmp_file_path = tmp_file.name
+        pdf_bytes = pdf_render_service.render_sync("invoice_simple", invoice_data)
 
     filename = f"Rechnung_{invoice.invoice_number}_{invoice_id}.pdf"
+    return pdf_streaming_response(pdf_bytes, filename)
+
+
+def _export_filename(invoice_number: str, invoice_id: int) -> str:
+    safe_number = re.sub(r"[^A-Za-z0-9._-]+", "_", invoice_number or "").strip("_") or "ohne_Nummer"
+    return f"Rechnung_{safe_number}_{invoice_id}.pdf"
+
+
+def _render_invoice_export(
+    entries: List[Tuple[int, str, dict, str]],
+    tenant_id: int,
+    branding: dict,
+) -> Iterator[Tuple[str, bytes]]:
+    """
+    PDFs für den ZIP-Export in Archiv-Reihenfolge liefern.
+
+    Es sind höchstens ``window`` Render-Jobs gleichzeitig im Prozesspool; erst
+    wenn das älteste PDF ins Archiv geschrieben wurde, wird der nächste Job
+    eingereicht. Der Speicherbedarf hängt damit nur von der Fenstergröße ab,
+    nicht von der Anzahl der Rechnungen.
+    """
+    window = max(2, pdf_render_service.workers * 2)
+    remaining = iter(entries)
+    pending: Deque[Tuple[int, str, str, Optional[bytes], Optional[str]]] = deque()
+
+    def _start(entry: Tuple[int, str, dict, str]) -> None:
+        invoice_id, filename, invoice_data, key = entry
+        cached = pdf_cache.get(tenant_id, "invoice", invoice_id, key)
+        job_id = None if cached is not None else pdf_render_service.submit("invoice", invoice_data, branding)
+        pending.append((invoice_id, filename, key, cached, job_id))
+
+    for entry in islice(remaining, window):
+        _start(entry)
+    try:
+        while pending:
+            invoice_id, filename, key, pdf_bytes, job_id = pending.popleft()
+            next_entry = next(remaining, None)
+            if next_entry is not None:
+                _start(next_entry)
+            if pdf_bytes is None:
+                pdf_bytes = pdf_render_service.result(job_id)
+                pdf_cache.put(tenant_id, "invoice", invoice_id, key, pdf_bytes)
+            yield filename, pdf_bytes
+    finally:
+        # Abbruch durch den Client: noch wartende Jobs aus dem Pool nehmen
+        for _invoice_id, _filename, _key, _pdf_bytes, job_id in pending:
+            if job_id is not None:
+                pdf_render_service.cancel(job_id)
+
+
+@router.get("/export/zip")
+def export_invoices_zip(
+    start_date: date,
+    end_date: date,
+    status: Optional[str] = None,
+    session: Session = Depends(get_session),
+    current_user=Depends(require_buchhalter_or_admin),
+):
+    """
+    Alle Rechnungen eines Zeitraums als ZIP-Archiv mit PDFs herunterladen.
+
+    Der Zeitraum bezieht sich auf das Rechnungsdatum (beide Grenzen inklusive),
+    optional gefiltert nach Status. Das Archiv wird gestreamt, während die PDFs
+    parallel im Prozesspool gerendert werden; bereits gecachte PDFs werden
+    direkt übernommen.
+    """
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date muss vor end_date liegen")
+
+    statement = select(Invoice).where(
+        Invoice.invoice_date >= datetime.combine(start_date, time.min),
+        Invoice.invoice_date < datetime.combine(end_date + timedelta(days=1), time.min),
+    )
+    if status:
+        statement = statement.where(Invoice.status == status)
+    statement = add_tenant_filter(statement, Invoice, current_user.tenant_id)
+    invoices = session.exec(statement.order_by(Invoice.invoice_date, Invoice.id)).all()
+    if not invoices:
+        raise HTTPException(status_code=404, detail="Keine Rechnungen im gewählten Zeitraum")
 
-    cleanup_task = BackgroundTask(lambda: os.path.exists(tmp_file_path) and os.unlink(tmp_file_path))
+    tenant_settings = session.exec(
+        select(TenantSettings).where(TenantSettings.tenant_id == current_user.tenant_id)
+    ).first()
+    company_block, tax_block = _invoice_letterhead(tenant_settings)
+    branding = load_invoice_branding(session, current_user.id)
 
-    return FileResponse(
-        path=tmp_file_path,
-        filename=filename,
-        media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename={filename}"},
-        background=cleanup_task,
+    # Render-Eingaben vorab aus der Session lösen; der Stream läuft ohne DB-Zugriff
+    entries = []
+    for invoice in invoices:
+        invoice_data = _invoice_pdf_data(invoice, company_block, tax_block)
+        entries.append((
+            invoice.id,
+            _export_filename(invoice.invoice_number, invoice.id),
+            invoice_data,
+            _invoice_pdf_key(invoice_data, branding),
+        ))
+
+    filename = f"Rechnungen_{start_date.isoformat()}_{end_date.isoformat()}.zip"
+    return StreamingResponse(
+        stream_zip(_render_invoice_export(entries, current_user.tenant_id, branding)),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
 
 
@@ -400,7 +531,7 @@ def create_invoice_from_offer(
     if existing_invoice:
         raise HTTPException(status_code=400, detail="Für dieses Angebot existiert bereits eine Rechnung")
 
-    invoice_number = f"RE-{datetime.now().strftime('%Y%m%d')}-{offer.id:03d}"
+    invoice_number = InvoiceNumberAllocator(session, current_user.tenant_id).next_number()
     invoice_payload = Invoice(
         project_id=offer.project_id,
         offer_id=offer.id,
@@ -441,7 +572,7 @@ def auto_generate_invoice(
     if not items:
         raise HTTPException(status_code=400, detail="Keine abrechenbaren Positionen gefunden")
 
-    invoice_number = f"RE-{datetime.utcnow().strftime('%Y%m%d')}-{project_id:04d}"
+    invoice_number = InvoiceNumberAllocator(session, current_user.tenant_id).next_number()
     invoice = Invoice(
         project_id=project.id,
         invoice_number=invoice_number,
@@ -513,7 +644,6 @@ def create_invoice_from_calculation(
         field
         for field, value in {
             "calculation": calculation,
-            "invoice_number": invoice_number,
             "client_name": client_name,
         }.items()
         if not value
@@ -524,13 +654,16 @@ def create_invoice_from_calculation(
     _ensure_project(session, project_id, current_user.tenant_id)
 
     generator = InvoiceGenerator(session, current_user.tenant_id)
-    invoice = generator.create_invoice_from_calculation(
-        project_id=project_id,
-        calculation=calculation,
-        invoice_number=invoice_number,
-        client_name=client_name,
-        client_address=client_address,
-    )
+    try:
+        invoice = generator.create_invoice_from_calculation(
+            project_id=project_id,
+            calculation=calculation,
+            invoice_number=invoice_number,
+            client_name=client_name,
+            client_address=client_address,
+        )
+    except InvoiceNumberTaken as e:
+        raise HTTPException(status_code=409, detail=str(e))
     return invoice
 
 
@@ -555,3 +688,26 @@ def get_invoice_summary(
         "total_invoices": total_invoices or 0,
         "paid_revenue": float(paid_total or 0.0),
     }
+
+
+@router.get("/stats/line-items")
+def get_line_item_summary(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    status: Optional[str] = None,
+    session: Session = Depends(get_read_session),
+    current_user=Depends(require_buchhalter_or_admin),
+):
+    """Rechnungspositionen je Positionstyp summieren (z. B. Lohn- gegenüber Materialanteil)."""
+    totals = invoice_line_item_totals(
+        session,
+        current_user.tenant_id,
+        start_date=datetime.combine(start_date, time.min) if start_date else None,
+        end_date=datetime.combine(end_date, time.max) if end_date else None,
+        status=status,
+    )
+    return {
+        "by_item_type": totals,
+        "total_price": round(sum(entry["total_price"] for entry in totals.values()), 2),
+        "currency": "EUR",
+    }
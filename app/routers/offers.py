@@ -3,28 +3,34 @@ Router für Angebot-Management.
 Bietet CRUD-Operationen für Angebote und PDF-Export.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlmodel import Session, select
 from typing import List
 import json
-import tempfile
-import os
-from ..database import get_session
+from ..database import get_read_session, get_session
 from ..models import Offer, Project, Invoice
 from ..schemas import OfferCreate, OfferUpdate, Offer as OfferSchema, OfferItem, InvoiceCreate, OfferGenerationRequest
-from ..utils.pdf_utils import create_offer_pdf
+from ..services import line_items  # noqa: F401 - registriert die Positions-Listener
+from ..services.invoice_numbers import InvoiceNumberAllocator
+from ..services.pdf_cache import cache_key, pdf_cache
+from ..services.pdf_render_service import pdf_render_service
 from ..auth import get_current_user, require_buchhalter_or_admin
+from ..utils.fast_json import FastJSONRoute
+from ..utils.pagination import paginate
+from ..utils.pdf_utils import pdf_streaming_response
 from ..utils.tenant_scoping import add_tenant_filter, ensure_tenant_access, set_tenant_on_model
 from datetime import datetime, timedelta
 from typing import Optional
 
-router = APIRouter(prefix="/offers", tags=["offers"])
+router = APIRouter(prefix="/offers", tags=["offers"], route_class=FastJSONRoute)
 
 @router.get("/", response_model=List[OfferSchema])
 def get_offers(
     auto_generated: Optional[bool] = None,
-    session: Session = Depends(get_session),
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    response: Response = None,
+    session: Session = Depends(get_read_session),
     current_user=Depends(get_current_user)
 ):
     """
@@ -32,6 +38,8 @@ def get_offers(
     
     Args:
         auto_generated: Optional filter - True=nur automatische, False=nur manuelle, None=alle
+        limit: Optionale Seitengröße (Keyset-Paginierung nach ID)
+        cursor: Cursor der nächsten Seite aus ``X-Next-Cursor``
     
     Returns:
         List[OfferSchema]: Liste der Angebote
@@ -43,18 +51,11 @@ def get_offers(
         if auto_generated is not None:
             statement = statement.where(Offer.auto_generated == auto_generated)
         
-        offers = session.exec(statement).all()
-        
-        # Stelle sicher, dass items ein JSON-String ist
-        for offer in offers:
-            if isinstance(offer.items, list):
-                offer.items = json.dumps(offer.items)
-            elif offer.items is None:
-                offer.items = "[]"
-            elif not isinstance(offer.items, str):
-                offer.items = "[]"
+        offers = paginate(session, statement, [(Offer.id, False)], limit=limit, cursor=cursor, response=response)
         
         return offers
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in get_offers: {e}")
         raise HTTPException(status_code=500, detail=f"Fehler beim Laden der Angebote: {str(e)}")
@@ -347,7 +348,7 @@ def generate_offer_pdf(
         session: Datenbank-Session
         
     Returns:
-        FileResponse: PDF-Datei
+        StreamingResponse: PDF-Datei
         
     Raises:
         HTTPException: Wenn Angebot nicht gefunden wird
@@ -368,24 +369,19 @@ def generate_offer_pdf(
             'items': offer.items  # Bereits als JSON-String
         }
         
-        # PDF generieren
-        pdf_bytes = create_offer_pdf(offer_data)
-        
-        # Temporäre Datei erstellen
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-            tmp_file.write(pdf_bytes)
-            tmp_file_path = tmp_file.name
+        # PDF aus dem Cache oder im Prozesspool generieren
+        pdf_bytes = pdf_cache.get_or_render(
+            current_user.tenant_id, "offer", offer_id, cache_key("offer", offer_data),
+            lambda: pdf_render_service.render_sync("offer", offer_data),
+        )
         
         # Dateiname für Download
         filename = f"Angebot_{offer.title.replace(' ', '_')}_{offer_id}.pdf"
         
-        return FileResponse(
-            path=tmp_file_path,
-            filename=filename,
-            media_type='application/pdf',
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
+        return pdf_streaming_response(pdf_bytes, filename)
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Fehler beim Generieren des PDFs: {str(e)}")
 
@@ -452,9 +448,8 @@ def create_invoice_from_offer(
         )
     
     try:
-        # Rechnungsnummer generieren
-        from datetime import datetime
-        invoice_number = f"RE-{datetime.now().strftime('%Y%m%d')}-{offer.id:03d}"
+        # Fortlaufende Rechnungsnummer in derselben Transaktion vergeben
+        invoice_number = InvoiceNumberAllocator(session, current_user.tenant_id).next_number()
         
         # Rechnung aus Angebot erstellen
         invoice_data = {
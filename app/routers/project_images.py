@@ -4,22 +4,27 @@ from __future__ import annotations
 
 import os
 import uuid
-from io import BytesIO
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
-from PIL import Image
+from fastapi import APIRouter, Depends, File, HTTPException, Request, Response, UploadFile
 from sqlmodel import Session, select
 
 from ..auth import get_current_user
-from ..database import get_session
+from ..database import get_read_session, get_session
 from ..models import Project, ProjectImage
 from ..schemas import ProjectImage as ProjectImageSchema
+from ..services.attachment_metadata import read_metadata
+from ..services.blob_store import blob_store
+from ..services.thumbnail_service import remove_thumbnails, rendition_path, thumbnail_pipeline
+from ..services.upload_service import image_media_type, store_image_upload, upload_limit_bytes
+from ..utils.fast_json import FastJSONRoute
+from ..utils.http_cache import cached_file_response
+from ..utils.pagination import paginate
 from ..utils.tenant_scoping import add_tenant_filter, ensure_tenant_access, set_tenant_on_model
 
-router = APIRouter(prefix="/project-images", tags=["project-images"])
+router = APIRouter(prefix="/project-images", tags=["project-images"], route_class=FastJSONRoute)
 
-# Upload-Verzeichnis für Projektbilder
+# Upload-Verzeichnis für Projektbilder (Altbestand; neue Uploads liegen im Blob-Speicher)
 UPLOAD_DIR = "uploads/project_images"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
@@ -36,12 +41,15 @@ def _ensure_image(session: Session, image_id: int, tenant_id: int) -> ProjectIma
 
 @router.get("/", response_model=List[ProjectImageSchema])
 def get_project_images(
-    session: Session = Depends(get_session),
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    response: Response = None,
+    session: Session = Depends(get_read_session),
     current_user=Depends(get_current_user),
 ):
-    """Alle Projektbilder des aktuellen Mandanten abrufen."""
+    """Alle Projektbilder des aktuellen Mandanten abrufen (optional seitenweise)."""
     statement = add_tenant_filter(select(ProjectImage), ProjectImage, current_user.tenant_id)
-    return session.exec(statement).all()
+    return paginate(session, statement, [(ProjectImage.id, False)], limit=limit, cursor=cursor, response=response)
 
 
 @router.post("/", response_model=ProjectImageSchema)
@@ -59,38 +67,36 @@ def create_project_image(
     if not file.content_type or not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="Nur Bilddateien sind erlaubt")
 
-    content = file.file.read()
-    if len(content) > 10 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="Datei ist zu groß (max 10MB)")
-
     file_extension = os.path.splitext(file.filename or "")[1] or ".jpg"
     unique_filename = f"{uuid.uuid4()}{file_extension}"
-    file_path = os.path.join(UPLOAD_DIR, unique_filename)
 
-    try:
-        image = Image.open(BytesIO(content))
-        image.thumbnail((1920, 1080), Image.Resampling.LANCZOS)
-        if image.mode in ("RGBA", "P"):
-            image = image.convert("RGB")
-        image.save(file_path, "JPEG", quality=85, optimize=True)
-    except Exception as exc:  # pragma: no cover - Bildverarbeitung
-        if os.path.exists(file_path):
-            os.remove(file_path)
-        raise HTTPException(status_code=500, detail=f"Fehler beim Speichern der Datei: {exc}")
+    # Blockweise prüfen, hashen und im Blob-Speicher ablegen (identische Fotos nur einmal)
+    stored = store_image_upload(file, upload_limit_bytes(session, current_user.tenant_id))
 
     db_image = ProjectImage(
         project_id=project_id,
         filename=unique_filename,
         original_filename=file.filename or "unknown",
-        file_path=file_path,
-        file_size=os.path.getsize(file_path),
+        file_path=stored.path,
+        content_hash=stored.content_hash,
+        **read_metadata(stored.path),
         description=description,
         image_type=image_type,
     )
     set_tenant_on_model(db_image, current_user.tenant_id)
 
-    session.add(db_image)
-    session.commit()
+    try:
+        session.add(db_image)
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        # Neu angelegter Blob ohne Datenbankzeile würde nie aufgeräumt
+        if stored.created:
+            blob_store.remove(stored.path)
+        raise HTTPException(status_code=500, detail=f"Fehler beim Speichern: {str(e)}")
+
+    # Vorschauen erzeugt die Hintergrund-Pipeline, erst für gespeicherte Bilder
+    thumbnail_pipeline.enqueue(stored.path)
     session.refresh(db_image)
     return db_image
 
@@ -105,6 +111,32 @@ def get_project_image(
     return _ensure_image(session, image_id, current_user.tenant_id)
 
 
+@router.get("/{image_id}/view")
+def view_project_image(
+    image_id: int,
+    request: Request,
+    size: Optional[int] = None,
+    v: Optional[str] = None,
+    session: Session = Depends(get_session),
+    current_user=Depends(get_current_user),
+):
+    """Projektbild anzeigen, mit ``?size=160|480|1280`` als Vorschau und ``?v=<content_hash>`` unveränderlich gecacht."""
+    image = _ensure_image(session, image_id, current_user.tenant_id)
+    if not image.file_path or not os.path.exists(image.file_path):
+        raise HTTPException(status_code=404, detail="Bilddatei nicht gefunden")
+
+    path, media_type = rendition_path(image.file_path, size)
+    return cached_file_response(
+        request,
+        path,
+        # Original immer mit Bild-MIME-Type, nie nach der Dateiendung geraten
+        media_type=media_type or image_media_type(path),
+        content_hash=image.content_hash,
+        variant=str(size) if media_type else None,
+        immutable=bool(image.content_hash) and v == image.content_hash,
+    )
+
+
 @router.delete("/{image_id}")
 def delete_project_image(
     image_id: int,
@@ -114,11 +146,14 @@ def delete_project_image(
     """Projektbild löschen."""
     image = _ensure_image(session, image_id, current_user.tenant_id)
 
-    if image.file_path and os.path.exists(image.file_path):
-        try:
-            os.remove(image.file_path)
-        except OSError as exc:  # pragma: no cover - Dateisystemfehler
-            raise HTTPException(status_code=500, detail=f"Fehler beim Löschen der Datei: {exc}")
+    # Blobs ohne Verweis entfernt die Speicherbereinigung (collect_garbage)
+    if not image.content_hash and image.file_path:
+        if os.path.exists(image.file_path):
+            try:
+                os.remove(image.file_path)
+            except OSError as exc:  # pragma: no cover - Dateisystemfehler
+                raise HTTPException(status_code=500, detail=f"Fehler beim Löschen der Datei: {exc}")
+        remove_thumbnails(image.file_path)
 
     session.delete(image)
     session.commit()
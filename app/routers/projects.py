@@ -3,53 +3,41 @@ Router für Projekt-Management.
 Bietet CRUD-Operationen für Bauprojekte.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlmodel import Session, select
-from typing import List
+from typing import List, Optional
 from datetime import datetime
-from ..database import get_session
+from ..database import get_read_session, get_session
 from ..models import Project
 from ..schemas import ProjectCreate, ProjectUpdate, Project as ProjectSchema
 from ..auth import get_current_user, require_buchhalter_or_admin
+from ..utils.fast_json import FastJSONRoute
+from ..utils.pagination import paginate
 from ..utils.tenant_scoping import add_tenant_filter, ensure_tenant_access, set_tenant_on_model
 
-router = APIRouter(prefix="/projects", tags=["projects"])
+router = APIRouter(prefix="/projects", tags=["projects"], route_class=FastJSONRoute)
 
 @router.get("/", response_model=List[ProjectSchema])
-def get_projects(session: Session = Depends(get_session), current_user=Depends(get_current_user)):
+def get_projects(
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    response: Response = None,
+    session: Session = Depends(get_read_session),
+    current_user=Depends(get_current_user),
+):
     """
     Alle Projekte abrufen.
+
+    Args:
+        limit: Optionale Seitengröße (Keyset-Paginierung nach ID)
+        cursor: Cursor der nächsten Seite aus ``X-Next-Cursor``
     
     Returns:
         List[ProjectSchema]: Liste aller Projekte
     """
     statement = add_tenant_filter(select(Project), Project, current_user.tenant_id)
-    projects = session.exec(statement).all()
-    
-    # Manuelle Serialisierung für name mapping
-    result = []
-    for project in projects:
-        project_dict = {
-            "id": project.id,
-            "name": project.name,
-            "description": project.description,
-            "address": project.address,
-            "client_name": project.client_name,
-            "client_phone": project.client_phone,
-            "client_email": project.client_email,
-            "project_type": project.project_type,
-            "total_area": project.total_area,
-            "estimated_hours": project.estimated_hours,
-            "hourly_rate": project.hourly_rate,
-            "start_date": project.start_date,
-            "end_date": project.end_date,
-            "status": project.status,
-            "created_at": project.created_at,
-            "updated_at": project.updated_at
-        }
-        result.append(project_dict)
-    
-    return result
+    projects = paginate(session, statement, [(Project.id, False)], limit=limit, cursor=cursor, response=response)
+    return projects
 
 @router.post("/", response_model=ProjectSchema)
 def create_project(
@@ -3,98 +3,133 @@ Router für Bericht-Management.
 Bietet CRUD-Operationen für Bauberichte und Bild-Uploads.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session, select
-from typing import List
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Dict, List, Optional
 import os
+import re
 import uuid
 from datetime import datetime
-from ..database import get_session
+from ..database import get_async_session, get_read_session, get_session
 from ..models import Report, Project, ReportImage
 from ..schemas import ReportCreate, ReportUpdate, Report as ReportSchema, ReportImage as ReportImageSchema
 from ..auth import get_current_user, require_buchhalter_or_admin
+from ..services.attachment_metadata import read_metadata
+from ..services.blob_store import blob_store
+from ..services.thumbnail_service import remove_thumbnails, rendition_path, thumbnail_pipeline
+from ..services.upload_service import (
+    image_media_type,
+    store_image_upload,
+    upload_limit_bytes,
+    upload_limit_bytes_async,
+)
+from ..utils.fast_json import FastJSONRoute
+from ..utils.http_cache import cached_file_response
+from ..utils.pagination import paginate
 from ..utils.tenant_scoping import add_tenant_filter, ensure_tenant_access, set_tenant_on_model
 
-router = APIRouter(prefix="/reports", tags=["reports"])
+router = APIRouter(prefix="/reports", tags=["reports"], route_class=FastJSONRoute)
 
 # Upload-Verzeichnis für Bilder
 UPLOAD_DIR = "uploads/images"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-def _get_report_attachments(session: Session, report_id: int, tenant_id: int) -> list:
-    attachments = []
+def _attachment_to_dict(img: ReportImage) -> dict:
+    return {
+        "filename": img.filename,
+        "original_filename": img.original_filename,
+        "size": img.file_size,
+        "description": getattr(img, 'description', None),
+        "image_type": getattr(img, 'image_type', None),
+        "content_hash": getattr(img, 'content_hash', None)
+    }
+
+def _get_attachments_for_reports(session: Session, report_ids: List[int], tenant_id: int) -> Dict[int, list]:
+    """Lädt die Anhänge mehrerer Berichte mit einer einzigen IN-Abfrage."""
+    attachments: Dict[int, list] = {report_id: [] for report_id in report_ids}
+    if not report_ids:
+        return attachments
+
     statement = add_tenant_filter(
-        select(ReportImage).where(ReportImage.report_id == report_id),
+        select(ReportImage)
+        .where(ReportImage.report_id.in_(report_ids))
+        .order_by(ReportImage.report_id, ReportImage.id),
         ReportImage,
         tenant_id,
     )
-    report_images = session.exec(statement).all()
-
-    for img in report_images:
-        attachments.append({
-            "filename": img.filename,
-            "original_filename": img.original_filename,
-            "size": img.file_size,
-            "description": getattr(img, 'description', None),
-            "image_type": getattr(img, 'image_type', None)
-        })
+    for img in session.exec(statement).all():
+        attachments[img.report_id].append(_attachment_to_dict(img))
     return attachments
 
+def _get_report_attachments(session: Session, report_id: int, tenant_id: int) -> list:
+    return _get_attachments_for_reports(session, [report_id], tenant_id)[report_id]
+
+def _report_to_dict(report: Report, project_name: str, attachments: list) -> dict:
+    """Bericht-Daten mit Projekt-Namen und Anhängen erweitern."""
+    return {
+        "id": report.id,
+        "project_id": report.project_id,
+        "project_name": project_name,
+        "title": report.title,
+        "content": report.content,
+        "report_date": report.report_date,
+        "work_type": report.work_type,
+        "status": report.status,
+        "area_completed": report.area_completed,
+        "materials_used": report.materials_used,
+        "quality_check": report.quality_check,
+        "issues_encountered": report.issues_encountered,
+        "next_steps": report.next_steps,
+        "progress_percentage": report.progress_percentage,
+        "attachments": attachments,
+        "created_at": report.created_at,
+        "updated_at": report.updated_at
+    }
+
 @router.get("/", response_model=List[ReportSchema])
-def get_reports(session: Session = Depends(get_session), current_user=Depends(get_current_user)):
+def get_reports(
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    response: Response = None,
+    session: Session = Depends(get_read_session),
+    current_user=Depends(get_current_user),
+):
     """
     Alle Berichte abrufen.
+
+    Projektnamen werden per Join, Anhänge per gebündelter IN-Abfrage geladen,
+    sodass die Anzahl der Queries unabhängig von der Anzahl der Berichte ist.
+    Mit ``limit``/``cursor`` wird seitenweise (neueste zuerst) geladen.
     
     Returns:
         List[ReportSchema]: Liste aller Berichte
     """
     try:
-        # Verwende die übergebene Session
-        statement = add_tenant_filter(select(Report).order_by(Report.id.desc()), Report, current_user.tenant_id)
-        reports = session.exec(statement).all()
-        print(f"DEBUG: {len(reports)} Berichte gefunden")
-        
-        # Konvertiere zu Liste für JSON-Serialisierung und füge Projekt-Namen hinzu
-        result = []
-        for report in reports:
-            # Projekt-Informationen abrufen
-            project = session.get(Project, report.project_id)
-            project = ensure_tenant_access(project, current_user.tenant_id, not_found_detail="Projekt nicht gefunden")
-            project_name = project.name
-            
-            # Anhänge für diesen Bericht abrufen (nur die Bilder dieses Berichts!)
-            attachments = _get_report_attachments(session, report.id, current_user.tenant_id)
-            print(f"DEBUG: Bericht {report.id} - {len(attachments)} Anhänge aus Datenbank")
-            
-            # Debug-Ausgabe
-            print(f"DEBUG: Bericht {report.id} - Finale Anhänge: {len(attachments)}")
-            if len(attachments) > 0:
-                print(f"DEBUG: Anhänge für Bericht {report.id}: {[a['filename'] for a in attachments]}")
-            
-            # Bericht-Daten mit Projekt-Namen und Anhängen erweitern
-            report_dict = {
-                "id": report.id,
-                "project_id": report.project_id,
-                "project_name": project_name,
-                "title": report.title,
-                "content": report.content,
-                "report_date": report.report_date,
-                "work_type": report.work_type,
-                "status": report.status,
-                "area_completed": report.area_completed,
-                "materials_used": report.materials_used,
-                "quality_check": report.quality_check,
-                "issues_encountered": report.issues_encountered,
-                "next_steps": report.next_steps,
-                "progress_percentage": report.progress_percentage,
-                "attachments": attachments,
-                "created_at": report.created_at,
-                "updated_at": report.updated_at
-            }
-            result.append(report_dict)
-        
-        print(f"DEBUG: {len(result)} Berichte zurückgegeben")
-        return result
+        tenant_id = current_user.tenant_id
+        statement = (
+            select(Report, Project.name)
+            .join(Project, Project.id == Report.project_id)
+            .where(Report.tenant_id == tenant_id, Project.tenant_id == tenant_id)
+        )
+        rows = paginate(
+            session,
+            statement,
+            [(Report.id, True)],
+            limit=limit,
+            cursor=cursor,
+            response=response,
+            entity=lambda row: row[0],
+        )
+
+        attachments = _get_attachments_for_reports(session, [report.id for report, _ in rows], tenant_id)
+        return [
+            _report_to_dict(report, project_name, attachments[report.id])
+            for report, project_name in rows
+        ]
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in get_reports: {e}")
         import traceback
@@ -192,34 +227,10 @@ def get_report(
     # Projekt-Informationen abrufen
     project = session.get(Project, report.project_id)
     project = ensure_tenant_access(project, current_user.tenant_id, not_found_detail="Projekt nicht gefunden")
-    project_name = project.name
 
-    # Anhänge für diesen Bericht abrufen (vereinfachte Lösung)
+    # Anhänge für diesen Bericht abrufen
     attachments = _get_report_attachments(session, report.id, current_user.tenant_id)
-    print(f"DEBUG: Einzelner Bericht {report.id} - {len(attachments)} Anhänge aus Datenbank")
-    
-    # Bericht-Daten mit Projekt-Namen und Anhängen erweitern
-    report_dict = {
-        "id": report.id,
-        "project_id": report.project_id,
-        "project_name": project_name,
-        "title": report.title,
-        "content": report.content,
-        "report_date": report.report_date,
-        "work_type": report.work_type,
-        "status": report.status,
-        "area_completed": report.area_completed,
-        "materials_used": report.materials_used,
-        "quality_check": report.quality_check,
-        "issues_encountered": report.issues_encountered,
-        "next_steps": report.next_steps,
-        "progress_percentage": report.progress_percentage,
-        "attachments": attachments,
-        "created_at": report.created_at,
-        "updated_at": report.updated_at
-    }
-    
-    return report_dict
+    return _report_to_dict(report, project.name, attachments)
 
 @router.put("/{report_id}", response_model=ReportSchema)
 def update_report(
@@ -303,10 +314,12 @@ def delete_report(
     session.commit()
     return {"message": "Bericht erfolgreich gelöscht"}
 
-@router.post("/{report_id}/upload_image")
+@router.post("/{report_id}/upload_image", response_model=ReportImageSchema)
 def upload_image(
     report_id: int,
     file: UploadFile = File(...),
+    description: str = None,
+    image_type: str = "progress",
     session: Session = Depends(get_session),
     current_user=Depends(get_current_user)
 ):
@@ -316,10 +329,12 @@ def upload_image(
     Args:
         report_id: Bericht-ID
         file: Hochgeladene Bilddatei
+        description: Optionale Bildbeschreibung
+        image_type: Art des Bildes (Standard: ``progress``)
         session: Datenbank-Session
         
     Returns:
-        dict: Upload-Informationen
+        ReportImage: Angelegter Bildeintrag
         
     Raises:
         HTTPException: Wenn Bericht nicht gefunden wird oder Datei ungültig ist
@@ -335,24 +350,37 @@ def upload_image(
     # Eindeutigen Dateinamen generieren
     file_extension = os.path.splitext(file.filename)[1] if file.filename else '.jpg'
     unique_filename = f"{uuid.uuid4()}{file_extension}"
-    file_path = os.path.join(UPLOAD_DIR, unique_filename)
+    max_bytes = upload_limit_bytes(session, current_user.tenant_id)
     
-    try:
-        # Datei speichern
-        with open(file_path, "wb") as buffer:
-            content = file.file.read()
-            buffer.write(content)
-        
-        return {
-            "message": "Bild erfolgreich hochgeladen",
-            "filename": unique_filename,
-            "original_filename": file.filename,
-            "file_path": file_path,
-            "file_size": len(content)
-        }
+    # Blockweise prüfen, hashen und im Blob-Speicher ablegen (identische Fotos nur einmal)
+    stored = store_image_upload(file, max_bytes)
+    report_image = ReportImage(
+        report_id=report_id,
+        filename=unique_filename,
+        original_filename=file.filename or "unknown",
+        file_path=stored.path,
+        content_hash=stored.content_hash,
+        **read_metadata(stored.path),
+        description=description,
+        image_type=image_type
+    )
+    set_tenant_on_model(report_image, current_user.tenant_id)
     
+    try:
+        session.add(report_image)
+        session.commit()
     except Exception as e:
+        session.rollback()
+        # Neu angelegter Blob ohne Datenbankzeile würde nie aufgeräumt
+        if stored.created:
+            blob_store.remove(stored.path)
         raise HTTPException(status_code=500, detail=f"Fehler beim Speichern der Datei: {str(e)}")
+    
+    # Vorschaubilder entstehen im Hintergrund, die Antwort wartet nicht darauf
+    thumbnail_pipeline.enqueue(stored.path)
+    
+    session.refresh(report_image)
+    return report_image
 
 @router.get("/project/{project_id}", response_model=List[ReportSchema])
 def get_reports_by_project(
@@ -382,11 +410,35 @@ def get_reports_by_project(
     return reports
 
 # Foto-Upload Endpunkte
+def _list_report_files(report_images: List[ReportImage]) -> List[dict]:
+    """Dateiinformationen aus den gespeicherten Metadaten (ohne Dateisystemzugriff)."""
+    return [
+        {
+            "filename": image.filename,
+            "size": image.file_size,
+            "created": image.created_at.isoformat(),
+            "original_filename": image.original_filename,
+            "content_hash": image.content_hash,
+            "mime_type": image.mime_type,
+            "width": image.width,
+            "height": image.height,
+        }
+        for image in report_images
+    ]
+
+
+def _remove_file(file_path: str) -> bool:
+    if os.path.exists(file_path):
+        os.remove(file_path)
+        return True
+    return False
+
+
 @router.post("/{report_id}/upload")
 async def upload_report_file(
     report_id: int,
     file: UploadFile = File(...),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user=Depends(get_current_user)
 ):
     """
@@ -394,7 +446,7 @@ async def upload_report_file(
     """
     try:
         # Prüfe ob Bericht existiert
-        report = session.get(Report, report_id)
+        report = await session.get(Report, report_id)
         ensure_tenant_access(report, current_user.tenant_id, not_found_detail="Bericht nicht gefunden")
         
         # Prüfe Dateityp (nur Bilder)
@@ -404,80 +456,58 @@ async def upload_report_file(
         # Verwende den Originalnamen, aber stelle sicher, dass er eindeutig ist
         original_filename = file.filename
         # Entferne ungültige Zeichen aus dem Dateinamen
-        import re
         safe_filename = re.sub(r'[^\w\.-]', '_', original_filename)
         
         # Füge Zeitstempel hinzu, um Eindeutigkeit zu gewährleisten
-        from datetime import datetime
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename_parts = os.path.splitext(safe_filename)
         unique_filename = f"{filename_parts[0]}_{timestamp}{filename_parts[1]}"
-        file_path = os.path.join(UPLOAD_DIR, unique_filename)
         
-        # Speichere Datei
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+        # Datei blockweise hashen, prüfen und im Blob-Speicher ablegen (Threadpool, die Event-Loop bleibt frei)
+        max_bytes = await upload_limit_bytes_async(session, current_user.tenant_id)
+        stored = await run_in_threadpool(store_image_upload, file, max_bytes)
+        metadata = await run_in_threadpool(read_metadata, stored.path)
         
         # Speichere Bild-Informationen in der Datenbank
-        from app.models import ReportImage
-        print(f"DEBUG: Erstelle ReportImage für Bericht {report_id}")
-        print(f"DEBUG: filename={unique_filename}, original={file.filename}, size={len(content)}")
-        
-        # Erstelle das ReportImage-Objekt
         report_image = ReportImage(
             report_id=report_id,
             filename=unique_filename,
             original_filename=file.filename,
-            file_path=file_path,
-            file_size=len(content)
+            file_path=stored.path,
+            content_hash=stored.content_hash,
+            **metadata
         )
         set_tenant_on_model(report_image, current_user.tenant_id)
         
-        # Speichere in der Datenbank
         try:
-            print(f"DEBUG: Füge ReportImage zur Session hinzu...")
             session.add(report_image)
-            print(f"DEBUG: Committe Session...")
-            session.commit()
-            print(f"DEBUG: ReportImage erfolgreich gespeichert")
-            
-            # Verifiziere, dass es wirklich gespeichert wurde
-            from sqlmodel import select
-            statement = add_tenant_filter(
-                select(ReportImage).where(ReportImage.filename == unique_filename),
-                ReportImage,
-                current_user.tenant_id,
-            )
-            saved_image = session.exec(statement).first()
-            if saved_image:
-                print(f"DEBUG: Verifizierung erfolgreich - ReportImage ID {saved_image.id} für Bericht {saved_image.report_id} gespeichert")
-            else:
-                print(f"WARNUNG: ReportImage konnte nicht verifiziert werden!")
-            # Zähle alle ReportImage-Einträge in der DB
-            all_images = session.exec(add_tenant_filter(select(ReportImage), ReportImage, current_user.tenant_id)).all()
-            print(f"DEBUG: ReportImage-Einträge in DB nach Speichern: {len(all_images)}")
-            
-        except Exception as e:
-            print(f"FEHLER beim Speichern der ReportImage: {e}")
-            import traceback
-            traceback.print_exc()
-            session.rollback()
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            # Neu angelegter Blob ohne Datenbankzeile würde nie aufgeräumt
+            if stored.created:
+                await run_in_threadpool(blob_store.remove, stored.path)
+            raise
+        
+        # Vorschaubilder entstehen im Hintergrund, die Antwort wartet nicht darauf
+        await run_in_threadpool(thumbnail_pipeline.enqueue, stored.path)
         
         return {
             "message": "Foto erfolgreich hochgeladen",
             "filename": unique_filename,
             "original_name": file.filename,
-            "size": len(content)
+            "size": stored.size
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Fehler beim Hochladen: {str(e)}")
 
 @router.get("/{report_id}/files")
 async def get_report_files(
     report_id: int,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user=Depends(get_current_user)
 ):
     """
@@ -485,59 +515,22 @@ async def get_report_files(
     """
     try:
         # Prüfe ob Bericht existiert
-        report = session.get(Report, report_id)
+        report = await session.get(Report, report_id)
         ensure_tenant_access(report, current_user.tenant_id, not_found_detail="Bericht nicht gefunden")
         
-        # Lade die Bilder aus der Datenbank für diesen spezifischen Bericht
-        files = []
-        try:
-            from app.models import ReportImage
-            # Suche alle ReportImage-Einträge für diesen Bericht
-            statement = add_tenant_filter(
-                select(ReportImage).where(ReportImage.report_id == report_id),
-                ReportImage,
-                current_user.tenant_id,
-            )
-            report_images = session.exec(statement).all()
-            
-            # Konvertiere zu Datei-Informationen
-            for image in report_images:
-                if os.path.exists(image.file_path):
-                    stat = os.stat(image.file_path)
-                    files.append({
-                        "filename": image.filename,
-                        "size": image.file_size or stat.st_size,
-                        "created": datetime.fromtimestamp(stat.st_ctime).isoformat(),
-                        "original_filename": image.original_filename
-                    })
-            
-            print(f"DEBUG: Bericht {report_id} - {len(files)} Bilder aus Datenbank geladen")
-            
-            # Wenn keine Bilder in der Datenbank gefunden wurden, versuche es mit Dateisystem-Fallback
-            if len(files) == 0:
-                print(f"DEBUG: Keine Bilder in Datenbank für Bericht {report_id}, versuche Dateisystem-Fallback")
-                if os.path.exists(UPLOAD_DIR):
-                    for filename in os.listdir(UPLOAD_DIR):
-                        file_path = os.path.join(UPLOAD_DIR, filename)
-                        if os.path.isfile(file_path):
-                            stat = os.stat(file_path)
-                            files.append({
-                                "filename": filename,
-                                "size": stat.st_size,
-                                "created": datetime.fromtimestamp(stat.st_ctime).isoformat()
-                            })
-                
-                print(f"DEBUG: Bericht {report_id} - {len(files)} Dateien im Fallback gefunden")
-        except Exception as e:
-            print(f"FEHLER beim Laden der Bilder aus der Datenbank: {e}")
-            import traceback
-            traceback.print_exc()
-        
-        # Sortiere nach Erstellungsdatum (neueste zuerst)
-        files.sort(key=lambda x: x['created'], reverse=True)
-        
-        return files
+        # Bilder samt Metadaten aus der Datenbank, neueste zuerst; fehlende Dateien markiert der Abgleich
+        statement = add_tenant_filter(
+            select(ReportImage)
+            .where(ReportImage.report_id == report_id, ReportImage.file_missing == False)  # noqa: E712
+            .order_by(ReportImage.created_at.desc(), ReportImage.id.desc()),
+            ReportImage,
+            current_user.tenant_id,
+        )
+        report_images = (await session.exec(statement)).all()
+        return _list_report_files(report_images)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Fehler beim Laden der Dateien: {str(e)}")
 
@@ -545,25 +538,46 @@ async def get_report_files(
 async def get_report_file(
     report_id: int,
     filename: str,
-    session: Session = Depends(get_session),
+    request: Request,
+    v: Optional[str] = None,
+    session: AsyncSession = Depends(get_async_session),
     current_user = Depends(get_current_user)
 ):
     """
     Einzelnes Foto eines Berichts abrufen.
+
+    Mit ``?v=<content_hash>`` ist die URL inhaltsadressiert und wird unveränderlich gecacht.
     """
     try:
         # Prüfe ob Bericht existiert
-        report = session.get(Report, report_id)
+        report = await session.get(Report, report_id)
         if not report:
             raise HTTPException(status_code=404, detail="Bericht nicht gefunden")
         
-        file_path = os.path.join(UPLOAD_DIR, filename)
-        if not os.path.exists(file_path):
+        # Dateien im Blob-Speicher über den Datenbankeintrag auflösen
+        attachment_statement = add_tenant_filter(
+            select(ReportImage).where(
+                ReportImage.report_id == report_id,
+                ReportImage.filename == filename
+            ),
+            ReportImage,
+            current_user.tenant_id,
+        )
+        attachment = (await session.exec(attachment_statement)).first()
+        if attachment is None or not await run_in_threadpool(os.path.exists, attachment.file_path):
             raise HTTPException(status_code=404, detail="Datei nicht gefunden")
         
-        from fastapi.responses import FileResponse
-        return FileResponse(file_path)
+        content_hash = attachment.content_hash
+        return await run_in_threadpool(
+            cached_file_response,
+            request,
+            attachment.file_path,
+            content_hash=content_hash,
+            immutable=bool(content_hash) and v == content_hash,
+        )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Fehler beim Laden der Datei: {str(e)}")
 
@@ -571,7 +585,7 @@ async def get_report_file(
 async def delete_report_file(
     report_id: int,
     filename: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user=Depends(require_buchhalter_or_admin)
 ):
     """
@@ -579,101 +593,35 @@ async def delete_report_file(
     """
     try:
         # Prüfe ob Bericht existiert
-        report = session.get(Report, report_id)
+        report = await session.get(Report, report_id)
         ensure_tenant_access(report, current_user.tenant_id, not_found_detail="Bericht nicht gefunden")
         
-        # Lösche Datei aus der Datenbank
-        try:
-            from app.models import ReportImage
-            attachment_statement = add_tenant_filter(
-                select(ReportImage).where(
-                    ReportImage.report_id == report_id,
-                    ReportImage.filename == filename
-                ),
-                ReportImage,
-                current_user.tenant_id,
-            )
-            attachment = session.exec(attachment_statement).first()
-            
-            if attachment:
-                session.delete(attachment)
-                session.commit()
-                print(f"DEBUG: ReportImage {attachment.id} aus Datenbank gelöscht")
-            else:
-                print(f"WARNUNG: ReportImage für {filename} nicht in Datenbank gefunden")
-        except Exception as e:
-            print(f"Fehler beim Löschen aus der Datenbank: {e}")
-        
-        # Lösche Datei vom Dateisystem
-        file_path = os.path.join(UPLOAD_DIR, filename)
-        if os.path.exists(file_path):
-            os.remove(file_path)
-            return {"message": "Datei erfolgreich gelöscht"}
-        else:
+        # Nur Dateien mit Datenbankeintrag des Mandanten dürfen gelöscht werden
+        attachment_statement = add_tenant_filter(
+            select(ReportImage).where(
+                ReportImage.report_id == report_id,
+                ReportImage.filename == filename
+            ),
+            ReportImage,
+            current_user.tenant_id,
+        )
+        attachment = (await session.exec(attachment_statement)).first()
+        if attachment is None:
             raise HTTPException(status_code=404, detail="Datei nicht gefunden")
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Fehler beim Löschen der Datei: {str(e)}")
 
-@router.post("/{report_id}/upload_image", response_model=ReportImageSchema)
-def upload_image(
-    report_id: int,
-    file: UploadFile = File(...),
-    description: str = None,
-    image_type: str = "progress",
-    session: Session = Depends(get_session),
-    current_user=Depends(get_current_user)
-):
-    """
-    Lädt ein Bild für einen Bericht hoch.
-    """
-    # Bericht existiert prüfen
-    report = session.get(Report, report_id)
-    ensure_tenant_access(report, current_user.tenant_id, not_found_detail="Bericht nicht gefunden")
-    
-    # Dateityp prüfen
-    if not file.content_type.startswith('image/'):
-        raise HTTPException(status_code=400, detail="Nur Bilddateien sind erlaubt")
-    
-    # Dateigröße prüfen (5MB Limit)
-    content = file.file.read()
-    if len(content) > 5 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="Dateigröße darf 5MB nicht überschreiten")
-    
-    # Eindeutigen Dateinamen generieren
-    file_extension = os.path.splitext(file.filename)[1]
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
-    file_path = os.path.join(UPLOAD_DIR, unique_filename)
-    
-    # Verzeichnis erstellen falls nicht vorhanden
-    os.makedirs(UPLOAD_DIR, exist_ok=True)
-    
-    try:
-        # Datei speichern
-        with open(file_path, "wb") as buffer:
-            buffer.write(content)
-        
-        # Datenbank-Eintrag erstellen
-        report_image = ReportImage(
-            report_id=report_id,
-            filename=unique_filename,
-            original_filename=file.filename or "unknown",
-            file_path=file_path,
-            file_size=len(content),
-            description=description,
-            image_type=image_type
-        )
-        set_tenant_on_model(report_image, current_user.tenant_id)
-        session.add(report_image)
-        session.commit()
-        session.refresh(report_image)
-        return report_image
+        file_path, content_hash = attachment.file_path, attachment.content_hash
+        await session.delete(attachment)
+        await session.commit()
+        # Blobs ohne Verweis entfernt die Speicherbereinigung (collect_garbage)
+        if not content_hash:
+            await run_in_threadpool(remove_thumbnails, file_path)
+            await run_in_threadpool(_remove_file, file_path)
+        return {"message": "Datei erfolgreich gelöscht"}
         
+    except HTTPException:
+        raise
     except Exception as e:
-        # Datei löschen falls Datenbank-Fehler
-        if os.path.exists(file_path):
-            os.remove(file_path)
-        raise HTTPException(status_code=500, detail=f"Fehler beim Speichern: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Fehler beim Löschen der Datei: {str(e)}")
 
 @router.get("/{report_id}/images", response_model=List[ReportImageSchema])
 def get_report_images(
@@ -704,9 +652,11 @@ def delete_image(
     image = session.get(ReportImage, image_id)
     image = ensure_tenant_access(image, current_user.tenant_id, not_found_detail="Bild nicht gefunden")
     
-    # Datei vom Dateisystem löschen
-    if os.path.exists(image.file_path):
-        os.remove(image.file_path)
+    # Dateien ohne Blob-Referenz direkt löschen; Blobs ohne Verweis entfernt die Speicherbereinigung
+    if not image.content_hash:
+        if os.path.exists(image.file_path):
+            os.remove(image.file_path)
+        remove_thumbnails(image.file_path)
     
     # Datenbank-Eintrag löschen
     session.delete(image)
@@ -716,56 +666,60 @@ def delete_image(
 @router.get("/images/{image_id}/download")
 def download_image(
     image_id: int,
+    request: Request,
+    v: Optional[str] = None,
     session: Session = Depends(get_session),
     current_user=Depends(get_current_user)
 ):
     """
     Lädt ein Berichtsbild herunter.
     """
-    from fastapi.responses import FileResponse
-    
     image = session.get(ReportImage, image_id)
     image = ensure_tenant_access(image, current_user.tenant_id, not_found_detail="Bild nicht gefunden")
     
     if not os.path.exists(image.file_path):
         raise HTTPException(status_code=404, detail="Bilddatei nicht gefunden")
     
-    return FileResponse(
-        path=image.file_path,
+    return cached_file_response(
+        request,
+        image.file_path,
         filename=image.original_filename,
-        media_type="application/octet-stream"
+        media_type="application/octet-stream",
+        content_hash=image.content_hash,
+        immutable=bool(image.content_hash) and v == image.content_hash,
     )
 
 @router.get("/images/{image_id}/view")
 def view_report_image(
     image_id: int,
+    request: Request,
+    size: Optional[int] = None,
+    v: Optional[str] = None,
     session: Session = Depends(get_session),
     current_user=Depends(get_current_user)
 ):
     """
     Berichtsbild anzeigen (öffentlicher Endpoint für <img> tags).
+
+    Mit ``?size=160|480|1280`` wird die entsprechende Vorschau statt des Originals geliefert,
+    mit ``?v=<content_hash>`` wird die Antwort unveränderlich gecacht.
     """
-    from fastapi.responses import FileResponse
-    
     image = session.get(ReportImage, image_id)
     image = ensure_tenant_access(image, current_user.tenant_id, not_found_detail="Bild nicht gefunden")
     
     if not os.path.exists(image.file_path):
         raise HTTPException(status_code=404, detail="Bilddatei nicht gefunden")
     
-    # Bestimme den korrekten MIME-Type basierend auf der Dateiendung
-    file_extension = os.path.splitext(image.file_path)[1].lower()
-    media_type_map = {
-        '.jpg': 'image/jpeg',
-        '.jpeg': 'image/jpeg',
-        '.png': 'image/png',
-        '.gif': 'image/gif',
-        '.webp': 'image/webp'
-    }
-    media_type = media_type_map.get(file_extension, 'image/jpeg')
-    
-    return FileResponse(
-        path=image.file_path,
-        media_type=media_type
+    # MIME-Type aus dem Bildinhalt, nicht aus der (evtl. vom Client stammenden) Dateiendung
+    media_type = image_media_type(image.file_path)
+
+    path, rendition_type = rendition_path(image.file_path, size)
+    return cached_file_response(
+        request,
+        path,
+        media_type=rendition_type or media_type,
+        content_hash=image.content_hash,
+        variant=str(size) if rendition_type else None,
+        immutable=bool(image.content_hash) and v == image.content_hash,
     )
 
@@ -3,21 +3,45 @@ Router für Stundenerfassung.
 Bietet CRUD-Operationen für Arbeitszeiten.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date
+
+from fastapi import APIRouter, Depends, File, HTTPException, Response, UploadFile
 from sqlmodel import Session, select
-from typing import List
-from ..database import get_session
+from typing import List, Optional
+from ..database import get_read_session, get_session
 from ..models import TimeEntry, Employee, Project
-from ..schemas import TimeEntryCreate, TimeEntryUpdate, TimeEntry as TimeEntrySchema
+from ..schemas import (
+    TimeEntryBulkCreate,
+    TimeEntryCreate,
+    TimeEntryImportResult,
+    TimeEntrySummary,
+    TimeEntryUpdate,
+    TimeEntry as TimeEntrySchema,
+)
 from ..auth import get_current_user, require_employee_or_admin
+from ..services.time_entry_import import ImportFormatError, TimeEntryImporter, parse_import_file
+from ..services.time_rollup import summarize
+from ..services.upload_service import read_upload, upload_limit_bytes
+from ..utils.fast_json import FastJSONRoute
+from ..utils.pagination import paginate
 from ..utils.tenant_scoping import add_tenant_filter, ensure_tenant_access, set_tenant_on_model
 
-router = APIRouter(prefix="/time-entries", tags=["time-entries"])
+router = APIRouter(prefix="/time-entries", tags=["time-entries"], route_class=FastJSONRoute)
 
 @router.get("/", response_model=List[TimeEntrySchema])
-def get_time_entries(session: Session = Depends(get_session), current_user=Depends(get_current_user)):
+def get_time_entries(
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    response: Response = None,
+    session: Session = Depends(get_read_session),
+    current_user=Depends(get_current_user),
+):
     """
     Stundeneinträge abrufen - rollenbasiert gefiltert.
+
+    Args:
+        limit: Optionale Seitengröße (Keyset-Paginierung nach Arbeitstag und ID)
+        cursor: Cursor der nächsten Seite aus ``X-Next-Cursor``
     
     Returns:
         List[TimeEntrySchema]: Liste der Stundeneinträge (gefiltert nach Rolle)
@@ -41,34 +65,18 @@ def get_time_entries(session: Session = Depends(get_session), current_user=Depen
         else:
             statement = add_tenant_filter(select(TimeEntry), TimeEntry, current_user.tenant_id)
         
-        time_entries = session.exec(statement).all()
-        
-        # Manuelle Serialisierung für problematische Felder
-        result = []
-        for entry in time_entries:
-            entry_dict = {
-                "id": entry.id,
-                "project_id": entry.project_id,
-                "employee_id": entry.employee_id,
-                "work_date": entry.work_date.isoformat() if entry.work_date else None,
-                "clock_in": entry.clock_in,
-                "clock_out": entry.clock_out,
-                "break_start": entry.break_start,
-                "break_end": entry.break_end,
-                "total_break_minutes": entry.total_break_minutes,
-                "hours_worked": entry.hours_worked,
-                "description": entry.description,
-                "hourly_rate": entry.hourly_rate,
-                "total_cost": entry.total_cost,
-                "is_edited": entry.is_edited,
-                "edit_reason": entry.edit_reason,
-                "edited_by": entry.edited_by,
-                "created_at": entry.created_at,
-                "updated_at": entry.updated_at
-            }
-            result.append(entry_dict)
+        time_entries = paginate(
+            session,
+            statement,
+            [(TimeEntry.work_date, False), (TimeEntry.id, False)],
+            limit=limit,
+            cursor=cursor,
+            response=response,
+        )
         
-        return result
+        return time_entries
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in get_time_entries: {e}")
         raise HTTPException(status_code=500, detail=f"Fehler beim Laden der Stundeneinträge: {str(e)}")
@@ -155,6 +163,117 @@ def create_time_entry(
         "updated_at": db_time_entry.updated_at
     }
 
+@router.post("/bulk", response_model=TimeEntryImportResult)
+def create_time_entries_bulk(
+    payload: TimeEntryBulkCreate,
+    session: Session = Depends(get_session),
+    current_user=Depends(require_employee_or_admin),
+):
+    """
+    Viele Stundeneinträge in einem Aufruf anlegen.
+
+    Jede Zeile wird gegen die vorab geladenen Projekte und Mitarbeiter des
+    Mandanten geprüft; gültige Zeilen werden blockweise gespeichert, ungültige
+    mit Position (ab 1) und Fehlertexten zurückgemeldet.
+
+    Args:
+        payload: Einträge (Felder wie bei ``POST /time-entries``) und ``dry_run``
+
+    Returns:
+        TimeEntryImportResult: Anzahl importierter Zeilen und Fehler je Zeile
+    """
+    try:
+        return TimeEntryImporter(session, current_user.tenant_id).run(payload.entries, dry_run=payload.dry_run)
+    except ImportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/import", response_model=TimeEntryImportResult)
+def import_time_entries(
+    file: UploadFile = File(...),
+    dry_run: bool = False,
+    session: Session = Depends(get_session),
+    current_user=Depends(require_employee_or_admin),
+):
+    """
+    Stundeneinträge aus einer CSV- oder XLSX-Datei importieren.
+
+    Die erste Zeile enthält die Spaltennamen (z. B. ``Projekt;Mitarbeiter;Datum;Stunden``).
+    Fehler werden mit der Zeilennummer der Datei gemeldet.
+
+    Args:
+        file: CSV- (``;``, ``,`` oder Tab) oder XLSX-Datei
+        dry_run: Nur prüfen, nichts speichern
+
+    Returns:
+        TimeEntryImportResult: Anzahl importierter Zeilen und Fehler je Zeile
+    """
+    data = read_upload(file, upload_limit_bytes(session, current_user.tenant_id))
+    try:
+        rows = parse_import_file(data, file.filename)
+        # Zeile 1 ist die Kopfzeile
+        return TimeEntryImporter(session, current_user.tenant_id).run(rows, first_row=2, dry_run=dry_run)
+    except ImportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/summary", response_model=List[TimeEntrySummary])
+def get_time_entry_summary(
+    group_by: str = "day",
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    project_id: Optional[int] = None,
+    employee_id: Optional[int] = None,
+    session: Session = Depends(get_session),
+    current_user=Depends(get_current_user),
+):
+    """
+    Stunden, Pausen und Kosten verdichtet abrufen.
+
+    Liest die Tagesverdichtung ``time_entry_daily`` statt der einzelnen
+    Stundeneinträge; fehlt sie für den Mandanten, wird sie einmalig aufgebaut
+    (daher Schreib-Session). Mitarbeiter sehen nur die eigenen Stunden, ohne Kosten.
+
+    Args:
+        group_by: Kommagetrennt ``day``, ``project`` und/oder ``employee``
+        start_date: Erster Tag (inklusive)
+        end_date: Letzter Tag (inklusive)
+        project_id: Optional nur ein Projekt
+        employee_id: Optional nur ein Mitarbeiter
+
+    Returns:
+        List[TimeEntrySummary]: Eine Zeile je Gruppe, sortiert nach den Gruppenschlüsseln
+    """
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date muss vor end_date liegen")
+
+    if current_user.role == "mitarbeiter":
+        employee_statement = add_tenant_filter(
+            select(Employee).where(Employee.user_id == current_user.id),
+            Employee,
+            current_user.tenant_id,
+        )
+        employee = session.exec(employee_statement).first()
+        if not employee or (employee_id is not None and employee_id != employee.id):
+            return []
+        employee_id = employee.id
+
+    try:
+        rows = summarize(
+            session,
+            current_user.tenant_id,
+            group_by=[name.strip() for name in group_by.split(",") if name.strip()],
+            start=start_date,
+            end=end_date,
+            project_id=project_id,
+            employee_id=employee_id,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if current_user.role == "mitarbeiter":
+        for row in rows:
+            row["total_cost"] = 0.0
+    return rows
+
 @router.get("/{time_entry_id}", response_model=TimeEntrySchema)
 def get_time_entry(
     time_entry_id: int,
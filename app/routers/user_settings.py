@@ -3,42 +3,44 @@
 from datetime import datetime
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.auth import get_current_user
-from app.database import get_session
+from app.database import get_async_session
 from app.models import User, UserSettings
 from app.schemas import UserSettingsResponse, UserSettingsUpdate
+from app.utils.fast_json import FastJSONRoute
 
-router = APIRouter(prefix="/user/settings", tags=["User Settings"])
+router = APIRouter(prefix="/user/settings", tags=["User Settings"], route_class=FastJSONRoute)
 
 SUPPORTED_THEMES = {"light", "dark"}
 
 
-def _get_or_create_user_settings(session: Session, user_id: int) -> UserSettings:
+async def _get_or_create_user_settings(session: AsyncSession, user_id: int) -> UserSettings:
     """Lädt die Einstellungen des Benutzers oder legt sie mit Standardwerten an."""
 
-    settings = session.exec(
+    settings = (await session.exec(
         select(UserSettings).where(UserSettings.user_id == user_id)
-    ).first()
+    )).first()
     if settings:
         return settings
 
     settings = UserSettings(user_id=user_id)
     session.add(settings)
-    session.commit()
-    session.refresh(settings)
+    await session.commit()
+    await session.refresh(settings)
     return settings
 
 
 @router.get("", response_model=UserSettingsResponse)
 async def read_user_settings(
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ) -> UserSettingsResponse:
     """Gibt die gespeicherten Einstellungen des aktuellen Benutzers zurück."""
 
-    settings = _get_or_create_user_settings(session, current_user.id)
+    settings = await _get_or_create_user_settings(session, current_user.id)
     return UserSettingsResponse.model_validate(settings)
 
 
@@ -46,11 +48,11 @@ async def read_user_settings(
 async def update_user_settings(
     update: UserSettingsUpdate,
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ) -> UserSettingsResponse:
     """Aktualisiert die benutzerspezifischen Einstellungen (z. B. Theme)."""
 
-    settings = _get_or_create_user_settings(session, current_user.id)
+    settings = await _get_or_create_user_settings(session, current_user.id)
 
     if update.theme_preference is not None:
         normalized_theme = update.theme_preference.lower()
@@ -63,6 +65,6 @@ async def update_user_settings(
 
     settings.updated_at = datetime.utcnow()
     session.add(settings)
-    session.commit()
-    session.refresh(settings)
+    await session.commit()
+    await session.refresh(settings)
     return UserSettingsResponse.model_validate(settings)
@@ -3,7 +3,7 @@ Pydantic-Schemas für API-Requests und -Responses.
 Definiert die Datenstrukturen für die Kommunikation mit dem Frontend.
 """
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from datetime import date
@@ -188,6 +188,7 @@ class TenantSettingsBase(BaseModel):
     branding_primary_color: Optional[str] = None
     branding_secondary_color: Optional[str] = None
     footer_text: Optional[str] = None
+    max_upload_mb: Optional[int] = Field(default=None, ge=1, le=100)
 
 
 class TenantSettingsUpdate(TenantSettingsBase):
@@ -388,6 +389,36 @@ class TimeEntry(BaseModel):
     class Config:
         from_attributes = True
 
+class TimeEntryBulkCreate(BaseModel):
+    """Schema für den Massenimport von Stundeneinträgen (Felder wie TimeEntryCreate)."""
+    entries: List[Dict[str, Any]]  # Prüfung je Zeile im Import-Service
+    dry_run: bool = False  # Nur prüfen, nichts speichern
+
+class TimeEntryImportError(BaseModel):
+    """Fehler einer Importzeile (Zeilennummer der Datei bzw. Position in ``entries``)."""
+    row: int
+    errors: List[str]
+
+class TimeEntryImportResult(BaseModel):
+    """Schema für das Ergebnis eines Massenimports."""
+    total_rows: int
+    valid_rows: int
+    imported: int
+    failed: int
+    dry_run: bool
+    errors: List[TimeEntryImportError]
+    errors_truncated: bool = False
+
+class TimeEntrySummary(BaseModel):
+    """Schema für verdichtete Stunden (nur die gruppierten Schlüssel sind gesetzt)."""
+    work_date: Optional[date] = None
+    project_id: Optional[int] = None
+    employee_id: Optional[int] = None
+    entry_count: int
+    hours_worked: float
+    break_minutes: int
+    total_cost: float
+
 # Project Image Schemas
 class ProjectImageBase(BaseModel):
     """Basis-Schema für Projektbilder."""
@@ -406,6 +437,10 @@ class ProjectImage(ProjectImageBase):
     original_filename: str
     file_path: str
     file_size: Optional[int] = None
+    content_hash: Optional[str] = None
+    mime_type: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
     created_at: datetime
 
     class Config:
@@ -473,7 +508,7 @@ class InvoiceBase(BaseModel):
 
 class InvoiceCreate(InvoiceBase):
     """Schema für die Erstellung neuer Rechnungen."""
-    pass
+    invoice_number: Optional[str] = None  # ohne Angabe: nächste fortlaufende Nummer
 
 class InvoiceUpdate(BaseModel):
     """Schema für die Aktualisierung von Rechnungen."""
@@ -514,11 +549,11 @@ class InvoiceGenerationRequest(BaseModel):
 class InvoiceGenerationData(BaseModel):
     """Schema für Rechnungsgenerierungs-Daten."""
     project: Dict[str, Any]
-    time_entries: List[Dict[str, Any]]
+    employee_hours: List[Dict[str, Any]]  # Stunden und Kosten je Mitarbeiter
+    report_groups: List[Dict[str, Any]]  # Anzahl Berichte je Arbeitsart
     reports: List[Dict[str, Any]]
     offers: List[Dict[str, Any]]
-    materials: List[Dict[str, Any]]
-    employees: List[Dict[str, Any]]
+    materials: List[Dict[str, Any]]  # Menge und Kosten je Material und Einheit
 
 class InvoiceCalculationResult(BaseModel):
     """Schema für Rechnungsberechnungsergebnis."""
@@ -531,6 +566,56 @@ class InvoiceCalculationResult(BaseModel):
     labor_percentage: float
     items: List[InvoiceItem]
 
+# Billing Run Schemas
+class BillingRunCreate(BaseModel):
+    """Schema für das Anlegen einer Sammelabrechnung."""
+    start_date: date
+    end_date: date
+    generation_method: str = "hybrid"  # "reports", "offers", "time_entries", "hybrid"
+    include_materials: bool = True
+    include_labor: bool = True
+    tax_rate: float = 19.0
+    labor_cost_percentage: float = 0.0
+
+class BillingRun(BaseModel):
+    """Schema für Abrechnungslauf inkl. Fortschritt."""
+    id: int
+    status: str
+    period_start: datetime
+    period_end: datetime
+    generation_method: str
+    tax_rate: float
+    labor_cost_percentage: float
+    include_materials: bool
+    include_labor: bool
+    total_projects: int
+    processed_projects: int
+    created_invoices: int
+    skipped_projects: int
+    failed_projects: int
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class BillingRunItem(BaseModel):
+    """Schema für ein Projekt innerhalb eines Abrechnungslaufs."""
+    id: int
+    project_id: int
+    status: str
+    invoice_id: Optional[int] = None
+    invoice_number: Optional[str] = None
+    total_amount: Optional[float] = None
+    error: Optional[str] = None
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
 # Report Image Schemas
 class ReportImageBase(BaseModel):
     """Basis-Schema für Berichtsbilder."""
@@ -549,6 +634,10 @@ class ReportImage(ReportImageBase):
     """Schema für Berichtsbild-Responses."""
     id: int
     report_id: int
+    content_hash: Optional[str] = None
+    mime_type: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
     created_at: datetime
 
     class Config:
@@ -571,6 +660,7 @@ class CompanyLogo(CompanyLogoBase):
     """Schema für Firmenlogo-Responses."""
     id: int
     user_id: int
+    content_hash: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
@@ -0,0 +1,162 @@
+"""Datei-Metadaten der Bildtabellen (Größe, Änderungszeit, Abmessungen, MIME-Type).
+
+``ReportImage`` und ``ProjectImage`` speichern beim Upload alles, was Listen
+und Galerien brauchen, damit kein Endpunkt pro Request ``os.stat`` aufrufen
+muss. Der Abgleich prüft die Zeilen gegen die Dateien: Geänderte Dateien
+(Größe oder mtime weichen ab) werden neu vermessen, fehlende erhalten
+``file_missing`` und verschwinden aus den Listen, wiederaufgetauchte werden
+wieder freigegeben.
+
+Aufruf (z. B. nächtlich per Cron und einmalig nach der Migration):
+    python -m app.services.attachment_metadata reconcile [--tenant-id ID]
+    python -m app.services.attachment_metadata check [--tenant-id ID]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime
+from mimetypes import guess_type
+from typing import Any, Dict, List, Optional
+
+from PIL import Image
+from sqlmodel import Session, select
+
+from app.models import ProjectImage, ReportImage
+
+METADATA_MODELS = (ReportImage, ProjectImage)
+METADATA_COLUMNS = ("file_size", "file_mtime", "mime_type", "width", "height", "file_missing")
+
+# EXIF-Orientierungen, bei denen Breite und Höhe vertauscht angezeigt werden
+_ROTATED_ORIENTATIONS = {5, 6, 7, 8}
+_ORIENTATION_TAG = 0x0112
+BATCH_SIZE = 500
+
+
+def _mtime(stat_result: os.stat_result) -> datetime:
+    return datetime.utcfromtimestamp(stat_result.st_mtime).replace(microsecond=0)
+
+
+def read_metadata(path: str) -> Dict[str, Any]:
+    """
+    Metadaten einer Datei ermitteln (blockierend; liest nur den Bild-Header).
+
+    Returns:
+        Dict[str, Any]: Spaltenwerte für ``METADATA_COLUMNS``
+
+    Raises:
+        OSError: Wenn die Datei nicht existiert
+    """
+    stat_result = os.stat(path)
+    metadata: Dict[str, Any] = {
+        "file_size": stat_result.st_size,
+        "file_mtime": _mtime(stat_result),
+        "mime_type": guess_type(path)[0],
+        "width": None,
+        "height": None,
+        "file_missing": False,
+    }
+    try:
+        with Image.open(path) as image:
+            width, height = image.size
+            if image.getexif().get(_ORIENTATION_TAG) in _ROTATED_ORIENTATIONS:
+                width, height = height, width
+            metadata["width"], metadata["height"] = width, height
+            metadata["mime_type"] = Image.MIME.get(image.format, metadata["mime_type"])
+    except Exception:
+        pass  # kein lesbares Bild: Größe und mtime genügen
+    return metadata
+
+
+def _current_metadata(row: Any) -> Dict[str, Any]:
+    """Soll-Werte einer Zeile; den Bild-Header nur bei geänderter Datei neu lesen."""
+    try:
+        stat_result = os.stat(row.file_path)
+    except OSError:
+        return {"file_missing": True}
+    unchanged = (
+        row.file_size == stat_result.st_size
+        and row.file_mtime == _mtime(stat_result)
+        and row.mime_type is not None
+    )
+    if unchanged:
+        return {"file_missing": False}
+    return read_metadata(row.file_path)
+
+
+@dataclass
+class ReconcileResult:
+    """Ergebnis eines Abgleichs."""
+
+    checked: int = 0
+    updated: int = 0
+    missing: int = 0
+    differences: List[str] = field(default_factory=list)
+
+
+def reconcile(session: Session, tenant_id: Optional[int] = None, apply: bool = True) -> ReconcileResult:
+    """
+    Metadaten aller Bildzeilen gegen die Dateien abgleichen.
+
+    Args:
+        session: Datenbank-Session
+        tenant_id: Nur diesen Mandanten prüfen
+        apply: Abweichungen speichern (``False`` = nur melden)
+    """
+    result = ReconcileResult()
+    for model in METADATA_MODELS:
+        last_id = 0
+        while True:
+            statement = select(model).where(model.id > last_id)
+            if tenant_id is not None:
+                statement = statement.where(model.tenant_id == tenant_id)
+            rows = session.exec(statement.order_by(model.id).limit(BATCH_SIZE)).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            for row in rows:
+                result.checked += 1
+                metadata = _current_metadata(row)
+                if metadata["file_missing"]:
+                    result.missing += 1
+                changes = {column: value for column, value in metadata.items() if getattr(row, column) != value}
+                if not changes:
+                    continue
+                result.updated += 1
+                result.differences.append(
+                    f"{model.__tablename__} {row.id}: "
+                    + ", ".join(f"{column}={value}" for column, value in sorted(changes.items()))
+                )
+                if apply:
+                    for column, value in changes.items():
+                        setattr(row, column, value)
+                    session.add(row)
+            if apply:
+                session.commit()
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bild-Metadaten mit den Dateien abgleichen oder prüfen")
+    parser.add_argument("command", choices=["reconcile", "check"])
+    parser.add_argument("--tenant-id", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    from app.database import engine
+
+    with Session(engine) as session:
+        result = reconcile(session, args.tenant_id, apply=args.command == "reconcile")
+
+    for line in result.differences:
+        print(line)
+    print(f"{result.checked} Bild(er) geprüft, {result.updated} abweichend, {result.missing} ohne Datei")
+    if args.command == "check":
+        return 1 if result.differences else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,25 +6,100 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, Tabl
 from reportlab.lib import colors
 from reportlab.pdfgen import canvas
 from datetime import datetime, timedelta
-import tempfile
+from typing import Any, Dict, Optional
+import io
 import os
 import json
 from sqlmodel import Session, select
 from fastapi import HTTPException
 from app.models import CompanyLogo, TenantSettings, User
 
+# Standard-Briefkopf, falls keine TenantSettings gepflegt sind
+DEFAULT_BRANDING: Dict[str, Any] = {
+    "company_name": "Trockenbau Stuttgart GmbH",
+    "company_address": "Musterstraße 123<br/>70173 Stuttgart",
+    "company_contact": "Tel: 0711-123456",
+    "company_email": "info@trockenbau-stuttgart.de",
+    "tax_number": "12/345/67890",
+    "vat_id": "DE123456789",
+    "bank_iban": "DE12 3456 7890 1234 5678 90",
+    "bank_bic": "GENODEF1S02",
+    "bank_name": "Musterbank Stuttgart",
+    "logo_path": None,
+}
+
+
+def load_invoice_branding(session: Optional[Session], user_id: Optional[int]) -> Dict[str, Any]:
+    """
+    Briefkopf (TenantSettings) und aktives Logo für die Rechnungs-PDF laden.
+
+    Das Ergebnis ist ein einfaches Dict und kann an einen Render-Prozess
+    übergeben werden; ``render_invoice_pdf`` greift selbst nicht auf die Datenbank zu.
+    """
+    branding = dict(DEFAULT_BRANDING)
+    if session is None or user_id is None:
+        return branding
+
+    try:
+        logo = session.exec(
+            select(CompanyLogo)
+            .where(CompanyLogo.user_id == user_id)
+            .where(CompanyLogo.is_active == True)
+        ).first()
+
+        if logo and logo.file_path and os.path.exists(logo.file_path):
+            branding["logo_path"] = logo.file_path
+    except Exception as e:
+        print(f"Fehler beim Laden des Logos: {e}")
+
+    try:
+        user = session.get(User, user_id)
+        tenant_settings = None
+        if user:
+            tenant_settings = session.exec(
+                select(TenantSettings).where(TenantSettings.tenant_id == user.tenant_id)
+            ).first()
+
+        if tenant_settings:
+            branding["company_name"] = tenant_settings.company_name or branding["company_name"]
+            branding["company_address"] = (tenant_settings.company_address or "Musterstraße 123, 70173 Stuttgart").replace(", ", "<br/>")
+            phone = tenant_settings.company_phone or "0711-123456"
+            fax = tenant_settings.company_fax
+            branding["company_contact"] = f"Tel: {phone}" + (f" • Fax: {fax}" if fax else "")
+            branding["company_email"] = tenant_settings.company_email or branding["company_email"]
+            branding["tax_number"] = tenant_settings.tax_number or branding["tax_number"]
+            branding["vat_id"] = tenant_settings.vat_id or branding["vat_id"]
+            branding["bank_iban"] = tenant_settings.bank_iban or branding["bank_iban"]
+            branding["bank_bic"] = tenant_settings.bank_bic or branding["bank_bic"]
+            branding["bank_name"] = tenant_settings.bank_name or branding["bank_name"]
+    except Exception as e:
+        print(f"Fehler beim Laden der Tenant Settings: {e}")
+
+    return branding
+
+
 def create_beautiful_invoice_pdf(invoice_data, session: Session, user_id: int):
     """
     Erstellt eine professionelle PDF-Rechnung mit Logo-Integration.
     """
     print(f"PDF-Generierung für Benutzer {user_id} gestartet")
-    
-    # Temporäre PDF-Datei erstellen
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-        tmp_file_path = tmp_file.name
-    
-    # PDF-Dokument erstellen
-    doc = SimpleDocTemplate(tmp_file_path, pagesize=A4, 
+    return render_invoice_pdf(invoice_data, load_invoice_branding(session, user_id))
+
+
+def render_invoice_pdf(invoice_data: Dict[str, Any], branding: Dict[str, Any]) -> bytes:
+    """
+    Rendert die Rechnungs-PDF ohne Datenbankzugriff (CPU-lastig, prozessfähig).
+
+    Args:
+        invoice_data: Rechnungsfelder
+        branding: Ergebnis von ``load_invoice_branding``
+
+    Returns:
+        bytes: PDF-Inhalt
+    """
+    # PDF-Dokument direkt in einen Speicherpuffer rendern (keine temporäre Datei)
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, 
                            rightMargin=2*cm, leftMargin=2*cm, 
                            topMargin=2*cm, bottomMargin=2*cm)
     
@@ -48,20 +123,7 @@ def create_beautiful_invoice_pdf(invoice_data, session: Session, user_id: int):
     styles = getSampleStyleSheet()
     black = HexColor('#000000')
     
-    # Logo aus Datenbank laden
-    logo_path = None
-    if session is not None and user_id is not None:
-        try:
-            logo = session.exec(
-                select(CompanyLogo)
-                .where(CompanyLogo.user_id == user_id)
-                .where(CompanyLogo.is_active == True)
-            ).first()
-
-            if logo and logo.file_path and os.path.exists(logo.file_path):
-                logo_path = logo.file_path
-        except Exception as e:
-            print(f"Fehler beim Laden des Logos: {e}")
+    logo_path = branding.get("logo_path")
     
     # PROFESSIONELLES LAYOUT - Genau wie in der Vorschau
     
@@ -90,39 +152,15 @@ def create_beautiful_invoice_pdf(invoice_data, session: Session, user_id: int):
         logo_cell = Paragraph("Firmenlogo", ParagraphStyle('LogoPlaceholder', parent=styles['Normal'], fontSize=10, textColor=black, fontName='Helvetica'))
 
     # Kopfbereich: Firmeninfos, Logo und Steuerblock untereinander, Logo rechts ausgerichtet
-    company_name = "Trockenbau Stuttgart GmbH"
-    company_address = "Musterstraße 123<br/>70173 Stuttgart"
-    company_contact = "Tel: 0711-123456"
-    company_email = "info@trockenbau-stuttgart.de"
-    tax_number = "12/345/67890"
-    vat_id = "DE123456789"
-    bank_iban = "DE12 3456 7890 1234 5678 90"
-    bank_bic = "GENODEF1S02"
-    bank_name = "Musterbank Stuttgart"
-
-    if session is not None and user_id is not None:
-        try:
-            user = session.get(User, user_id)
-            tenant_settings = None
-            if user:
-                tenant_settings = session.exec(
-                    select(TenantSettings).where(TenantSettings.tenant_id == user.tenant_id)
-                ).first()
-
-            if tenant_settings:
-                company_name = tenant_settings.company_name or company_name
-                company_address = (tenant_settings.company_address or "Musterstraße 123, 70173 Stuttgart").replace(", ", "<br/>")
-                phone = tenant_settings.company_phone or "0711-123456"
-                fax = tenant_settings.company_fax
-                company_contact = f"Tel: {phone}" + (f" • Fax: {fax}" if fax else "")
-                company_email = tenant_settings.company_email or company_email
-                tax_number = tenant_settings.tax_number or tax_number
-                vat_id = tenant_settings.vat_id or vat_id
-                bank_iban = tenant_settings.bank_iban or bank_iban
-                bank_bic = tenant_settings.bank_bic or bank_bic
-                bank_name = tenant_settings.bank_name or bank_name
-        except Exception as e:
-            print(f"Fehler beim Laden der Tenant Settings: {e}")
+    company_name = branding["company_name"]
+    company_address = branding["company_address"]
+    company_contact = branding["company_contact"]
+    company_email = branding["company_email"]
+    tax_number = branding["tax_number"]
+    vat_id = branding["vat_id"]
+    bank_iban = branding["bank_iban"]
+    bank_bic = branding["bank_bic"]
+    bank_name = branding["bank_name"]
 
     info_lines = [company_address]
     if company_contact:
@@ -340,12 +378,4 @@ def create_beautiful_invoice_pdf(invoice_data, session: Session, user_id: int):
     # PDF erstellen
     doc.build(story)
     
-    # PDF-Bytes lesen
-    with open(tmp_file_path, 'rb') as f:
-        pdf_bytes = f.read()
-    
-    # Temporäre Datei löschen
-    os.unlink(tmp_file_path)
-    
-    print(f"PDF erfolgreich generiert: {len(pdf_bytes)} Bytes")
-    return pdf_bytes
\ No newline at end of file
+    return buffer.getvalue()
\ No newline at end of file
@@ -0,0 +1,454 @@
+"""Sammelabrechnung: Rechnungsentwürfe für alle Projekte eines Zeitraums.
+
+Ein Abrechnungslauf hält beim Anlegen fest, welche Projekte des Mandanten im
+Zeitraum abrechenbare Daten haben (je Projekt eine Zeile ``billing_run_item``).
+Die Ausführung
+
+1. beansprucht den Lauf über einen Lease (``heartbeat_at``), sodass ihn nie
+   zwei Worker gleichzeitig bearbeiten,
+2. berechnet die ``InvoiceGenerator``-Ergebnisse parallel in einem Threadpool,
+   jeder Worker mit eigener Lese-Session,
+3. schreibt die Entwürfe blockweise: Rechnungen, Rechnungsnummern (ein
+   reservierter Nummernblock je Block), Positionsstatus und Fortschritt in
+   einer Transaktion.
+
+Weil Positionsstatus und Rechnung gemeinsam committet werden, setzt ein
+unterbrochener Lauf beim Wiederaufnehmen genau bei den offenen Projekten fort;
+bereits erzeugte Entwürfe entstehen nicht doppelt.
+
+Konfiguration:
+- ``BILLING_RUN_WORKERS``: parallele Berechnungen (Standard: min(4, CPU-Kerne))
+- ``BILLING_RUN_BATCH_SIZE``: Entwürfe je Schreibtransaktion (Standard: 50)
+- ``BILLING_RUN_LEASE_SECONDS``: ohne Lebenszeichen gilt ein laufender Lauf
+  nach dieser Zeit als unterbrochen (Standard: 300)
+
+Aufruf:
+    python -m app.services.billing_runs resume RUN_ID
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, insert, or_, union
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, func, select
+
+from app.models import BillingRun, BillingRunItem, Invoice, MaterialUsage, Offer, Project, Report, TimeEntryDaily
+from app.schemas import BillingRunCreate, InvoiceCalculationResult, InvoiceGenerationRequest
+from app.services.invoice_generator import InvoiceGenerator
+from app.services.invoice_numbers import InvoiceNumberAllocator
+from app.services.time_rollup import TimeRollupService, day_filter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_LEASE_SECONDS = 300
+
+GENERATION_METHODS = ("time_entries", "reports", "offers", "hybrid")
+# Läufe in diesen Zuständen dürfen (wieder) gestartet werden
+RESUMABLE_STATUSES = ("offen", "fehlgeschlagen")
+# Positionen in diesen Zuständen werden bei einer Ausführung bearbeitet
+PENDING_ITEM_STATUSES = ("offen", "fehlgeschlagen")
+ERROR_MAX_LENGTH = 500
+
+Outcome = Tuple[Optional[InvoiceCalculationResult], Optional[str]]
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _error_text(exc: BaseException) -> str:
+    return f"{type(exc).__name__}: {exc}"[:ERROR_MAX_LENGTH]
+
+
+def _batches(values: Iterable[Any], size: int) -> Iterable[List[Any]]:
+    iterator = iter(values)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class BillingRunError(Exception):
+    """Lauf kann nicht angelegt oder gestartet werden (Meldung für den Client)."""
+
+
+class BillingRunLeaseLost(BillingRunError):
+    """Ein anderer Worker hat den Lauf nach abgelaufenem Lease übernommen."""
+
+
+class BillingRunService:
+    """Anlegen, Ausführen und Wiederaufnehmen von Abrechnungsläufen."""
+
+    def __init__(
+        self,
+        engine: Optional[Engine] = None,
+        read_engine: Optional[Engine] = None,
+        workers: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        lease_seconds: Optional[int] = None,
+    ):
+        if engine is None:
+            from app.database import engine as default_engine, read_engine as default_read_engine
+
+            engine = default_engine
+            read_engine = read_engine or default_read_engine
+        self.engine = engine
+        self.read_engine = read_engine or engine
+        self.workers = max(1, workers or _env_int("BILLING_RUN_WORKERS", DEFAULT_WORKERS))
+        self.batch_size = max(1, batch_size or _env_int("BILLING_RUN_BATCH_SIZE", DEFAULT_BATCH_SIZE))
+        self.lease = timedelta(seconds=lease_seconds or _env_int("BILLING_RUN_LEASE_SECONDS", DEFAULT_LEASE_SECONDS))
+
+    # ------------------------------------------------------------------
+    # Anlegen
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def candidate_project_ids(session: Session, tenant_id: int, start: datetime, end: datetime, method: str) -> List[int]:
+        """
+        Projekte mit Daten im Zeitraum, die die Methode abrechnen kann.
+
+        Vorfilter in einer Abfrage; ob tatsächlich Positionen entstehen,
+        entscheidet die Berechnung (sonst ``uebersprungen``).
+        """
+        sources = []
+        if method in ("time_entries", "hybrid"):
+            # Schreib-Session: die Berechnungen lesen später über den Lese-Pool
+            TimeRollupService(session).ensure(tenant_id)
+            sources.append(select(TimeEntryDaily.project_id).where(*day_filter(tenant_id, start, end)))
+            if method == "hybrid":
+                sources.append(select(MaterialUsage.project_id).where(
+                    MaterialUsage.tenant_id == tenant_id,
+                    MaterialUsage.usage_date >= start,
+                    MaterialUsage.usage_date <= end,
+                ))
+        if method in ("reports", "hybrid"):
+            sources.append(select(Report.project_id).where(
+                Report.tenant_id == tenant_id, Report.report_date >= start, Report.report_date <= end,
+            ))
+        if method == "offers":
+            sources.append(select(Offer.project_id).where(Offer.tenant_id == tenant_id))
+
+        project_ids = union(*sources).subquery()
+        return list(session.exec(
+            select(Project.id)
+            .where(Project.tenant_id == tenant_id, Project.id.in_(select(project_ids.c[0])))
+            .order_by(Project.id)
+        ).all())
+
+    def create_run(self, tenant_id: int, payload: BillingRunCreate, created_by: Optional[int] = None) -> BillingRun:
+        """
+        Lauf mit allen abrechenbaren Projekten des Zeitraums anlegen (noch nicht ausführen).
+
+        Raises:
+            BillingRunError: Bei ungültigem Zeitraum oder unbekannter Methode
+        """
+        if payload.generation_method not in GENERATION_METHODS:
+            raise BillingRunError(f"Unbekannte Generierungsmethode: {payload.generation_method}")
+        if payload.start_date > payload.end_date:
+            raise BillingRunError("Der Zeitraum beginnt nach seinem Ende")
+
+        period_start = datetime.combine(payload.start_date, datetime.min.time())
+        period_end = datetime.combine(payload.end_date, datetime.max.time())
+
+        with Session(self.engine) as session:
+            run = BillingRun(
+                tenant_id=tenant_id,
+                created_by=created_by,
+                period_start=period_start,
+                period_end=period_end,
+                generation_method=payload.generation_method,
+                tax_rate=payload.tax_rate,
+                labor_cost_percentage=payload.labor_cost_percentage,
+                include_materials=payload.include_materials,
+                include_labor=payload.include_labor,
+            )
+            project_ids = self.candidate_project_ids(
+                session, tenant_id, period_start, period_end, payload.generation_method,
+            )
+            run.total_projects = len(project_ids)
+            session.add(run)
+            session.flush()
+
+            if project_ids:
+                now = datetime.utcnow()
+                session.execute(insert(BillingRunItem), [
+                    {
+                        "tenant_id": tenant_id, "billing_run_id": run.id, "project_id": project_id,
+                        "status": "offen", "updated_at": now,
+                    }
+                    for project_id in project_ids
+                ])
+            session.commit()
+            session.refresh(run)
+            return run
+
+    # ------------------------------------------------------------------
+    # Ausführen
+    # ------------------------------------------------------------------
+
+    def claim(self, tenant_id: int, run_id: int) -> bool:
+        """
+        Lauf für eine Ausführung beanspruchen.
+
+        Gelingt für offene und fehlgeschlagene Läufe sowie für laufende, deren
+        Lease abgelaufen ist (Prozess abgestürzt oder neu gestartet).
+        """
+        now = datetime.utcnow()
+        table = BillingRun.__table__
+        with Session(self.engine) as session:
+            result = session.connection().execute(
+                table.update()
+                .where(
+                    table.c.id == run_id,
+                    table.c.tenant_id == tenant_id,
+                    or_(
+                        table.c.status.in_(RESUMABLE_STATUSES),
+                        and_(table.c.status == "laeuft", table.c.heartbeat_at < now - self.lease),
+                    ),
+                )
+                .values(
+                    status="laeuft",
+                    started_at=func.coalesce(table.c.started_at, now),
+                    heartbeat_at=now,
+                    finished_at=None,
+                    error=None,
+                )
+            )
+            session.commit()
+            return result.rowcount == 1
+
+    def _request(self, run: BillingRun, project_id: int) -> InvoiceGenerationRequest:
+        return InvoiceGenerationRequest(
+            project_id=project_id,
+            generation_method=run.generation_method,
+            start_date=run.period_start,
+            end_date=run.period_end,
+            include_materials=run.include_materials,
+            include_labor=run.include_labor,
+            tax_rate=run.tax_rate,
+            labor_cost_percentage=run.labor_cost_percentage,
+        )
+
+    def _calculate(self, run: BillingRun, project_id: int) -> Outcome:
+        try:
+            with Session(self.read_engine) as session:
+                result = InvoiceGenerator(session, run.tenant_id).generate_invoice(self._request(run, project_id))
+            return result, None
+        except Exception as exc:
+            logger.warning("Abrechnungslauf %s: Projekt %s fehlgeschlagen: %s", run.id, project_id, exc)
+            return None, _error_text(exc)
+
+    @staticmethod
+    def _renew_lease(session: Session, run_id: int, token: datetime) -> datetime:
+        """
+        Lebenszeichen setzen, solange der Lauf noch diesem Worker gehört.
+
+        Als erste Anweisung der Schreibtransaktion hält das UPDATE zugleich die
+        Schreibsperre, bevor Positionsstatus gelesen werden.
+
+        Raises:
+            BillingRunLeaseLost: Wenn ein anderer Worker den Lauf übernommen hat
+        """
+        now = datetime.utcnow()
+        table = BillingRun.__table__
+        result = session.connection().execute(
+            table.update()
+            .where(table.c.id == run_id, table.c.status == "laeuft", table.c.heartbeat_at == token)
+            .values(heartbeat_at=now)
+        )
+        if result.rowcount != 1:
+            raise BillingRunLeaseLost(f"Abrechnungslauf {run_id} wurde von einem anderen Worker übernommen")
+        return now
+
+    @staticmethod
+    def _update_progress(session: Session, run_id: int, **values: Any) -> None:
+        counts: Dict[str, int] = dict(session.exec(
+            select(BillingRunItem.status, func.count())
+            .where(BillingRunItem.billing_run_id == run_id)
+            .group_by(BillingRunItem.status)
+        ).all())
+        table = BillingRun.__table__
+        session.connection().execute(
+            table.update().where(table.c.id == run_id).values(
+                created_invoices=counts.get("erstellt", 0),
+                skipped_projects=counts.get("uebersprungen", 0),
+                failed_projects=counts.get("fehlgeschlagen", 0),
+                processed_projects=sum(count for status, count in counts.items() if status != "offen"),
+                **values,
+            )
+        )
+
+    def _write_batch(self, run: BillingRun, token: datetime, batch: List[Tuple[int, Outcome]]) -> datetime:
+        """Entwürfe, Positionsstatus und Fortschritt eines Blocks in einer Transaktion schreiben."""
+        with Session(self.engine) as session:
+            token = self._renew_lease(session, run.id, token)
+            project_ids = [project_id for project_id, _ in batch]
+            items = {
+                item.project_id: item
+                for item in session.exec(select(BillingRunItem).where(
+                    BillingRunItem.billing_run_id == run.id, BillingRunItem.project_id.in_(project_ids),
+                )).all()
+            }
+            projects = {
+                project.id: project
+                for project in session.exec(select(Project).where(
+                    Project.tenant_id == run.tenant_id, Project.id.in_(project_ids),
+                )).all()
+            }
+
+            pending = [(project_id, outcome) for project_id, outcome in batch if items[project_id].status != "erstellt"]
+            billable = [
+                (project_id, result) for project_id, (result, error) in pending
+                if result is not None and result.items and result.total_amount > 0
+            ]
+            numbers = iter(InvoiceNumberAllocator(session, run.tenant_id).allocate(len(billable))) if billable else None
+            invoices: Dict[int, Invoice] = {}
+            for project_id, result in billable:
+                project = projects[project_id]
+                invoice_number = next(numbers)
+                invoices[project_id] = Invoice(
+                    tenant_id=run.tenant_id,
+                    project_id=project_id,
+                    invoice_number=invoice_number,
+                    title=f"Rechnung {invoice_number}",
+                    description=(
+                        f"Sammelabrechnung {run.period_start:%d.%m.%Y} – {run.period_end:%d.%m.%Y}: {project.name}"
+                    ),
+                    client_name=project.client_name or "Kunde",
+                    client_address=project.address,
+                    total_amount=round(result.total_amount, 2),
+                    currency="EUR",
+                    invoice_date=token,
+                    due_date=token + timedelta(days=30),
+                    items=json.dumps([item.model_dump() for item in result.items]),
+                    status="entwurf",
+                )
+            session.add_all(invoices.values())
+            session.flush()
+
+            for project_id, (result, error) in pending:
+                item = items[project_id]
+                invoice = invoices.get(project_id)
+                if invoice is not None:
+                    item.status = "erstellt"
+                    item.invoice_id = invoice.id
+                    item.invoice_number = invoice.invoice_number
+                    item.total_amount = invoice.total_amount
+                    item.error = None
+                else:
+                    item.status = "fehlgeschlagen" if error else "uebersprungen"
+                    item.error = error or "Keine abrechenbaren Positionen im Zeitraum"
+                    item.total_amount = None
+                item.updated_at = token
+                session.add(item)
+
+            self._update_progress(session, run.id)
+            session.commit()
+            return token
+
+    def process(self, tenant_id: int, run_id: int) -> BillingRun:
+        """
+        Beanspruchten Lauf ausführen bzw. fortsetzen.
+
+        Fehler einzelner Projekte werden an der Position vermerkt; bricht der
+        Lauf selbst ab, steht er auf ``fehlgeschlagen`` und kann erneut gestartet
+        werden.
+        """
+        with Session(self.engine) as session:
+            run = session.exec(select(BillingRun).where(BillingRun.id == run_id, BillingRun.tenant_id == tenant_id)).one()
+            project_ids = list(session.exec(
+                select(BillingRunItem.project_id)
+                .where(BillingRunItem.billing_run_id == run_id, BillingRunItem.status.in_(PENDING_ITEM_STATUSES))
+                .order_by(BillingRunItem.project_id)
+            ).all())
+            session.expunge(run)
+        token = run.heartbeat_at
+
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="billing-run")
+        try:
+            # map() reicht alle Projekte sofort ein: Berechnung und Schreiben überlappen
+            outcomes = zip(project_ids, executor.map(lambda project_id: self._calculate(run, project_id), project_ids))
+            for batch in _batches(outcomes, self.batch_size):
+                token = self._write_batch(run, token, batch)
+        except BillingRunLeaseLost:
+            logger.warning("Abrechnungslauf %s: Lease verloren, Ausführung beendet", run_id)
+            final = None
+        except Exception as exc:
+            logger.exception("Abrechnungslauf %s abgebrochen", run_id)
+            final = {"status": "fehlgeschlagen", "error": _error_text(exc)}
+        else:
+            final = {"status": "abgeschlossen", "finished_at": datetime.utcnow()}
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        with Session(self.engine) as session:
+            if final is not None:
+                try:
+                    self._renew_lease(session, run_id, token)
+                except BillingRunLeaseLost:
+                    session.rollback()
+                else:
+                    self._update_progress(session, run_id, **final)
+                    session.commit()
+            return session.get(BillingRun, run_id)
+
+    def run(self, tenant_id: int, run_id: int) -> BillingRun:
+        """
+        Lauf beanspruchen und ausführen.
+
+        Raises:
+            BillingRunError: Wenn der Lauf bereits läuft oder abgeschlossen ist
+        """
+        if not self.claim(tenant_id, run_id):
+            raise BillingRunError("Abrechnungslauf läuft bereits oder ist abgeschlossen")
+        return self.process(tenant_id, run_id)
+
+
+billing_run_service = BillingRunService()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Abrechnungsläufe verwalten")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    resume = subparsers.add_parser("resume", help="Unterbrochenen oder fehlgeschlagenen Lauf fortsetzen")
+    resume.add_argument("run_id", type=int)
+    args = parser.parse_args(argv)
+
+    with Session(billing_run_service.engine) as session:
+        tenant_id = session.exec(select(BillingRun.tenant_id).where(BillingRun.id == args.run_id)).first()
+    if tenant_id is None:
+        print(f"Abrechnungslauf {args.run_id} nicht gefunden", file=sys.stderr)
+        return 1
+
+    try:
+        run = billing_run_service.run(tenant_id, args.run_id)
+    except BillingRunError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    print(json.dumps({
+        "id": run.id,
+        "status": run.status,
+        "processed_projects": run.processed_projects,
+        "total_projects": run.total_projects,
+        "created_invoices": run.created_invoices,
+        "skipped_projects": run.skipped_projects,
+        "failed_projects": run.failed_projects,
+    }, ensure_ascii=False))
+    return 0 if run.status == "abgeschlossen" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,403 @@
+"""Inhaltsadressierter Blob-Speicher für hochgeladene Bilder und Logos.
+
+Jede Datei liegt genau einmal unter ``<BLOB_STORE_DIR>/<hh>/<sha256><endung>``
+(``hh`` = erste zwei Hex-Zeichen). ``ReportImage``, ``ProjectImage`` und
+``CompanyLogo`` verweisen über ``content_hash`` darauf; dasselbe Foto an zehn
+Berichten belegt den Speicher nur einmal. Die Endung stammt vom ersten Upload
+des Inhalts, damit Endpunkte den MIME-Type weiter aus dem Pfad ableiten können.
+
+Der Hash wird beim Upload blockweise berechnet, während die Datei in eine
+temporäre Datei im Zielverzeichnis geschrieben wird; erst danach wird sie
+atomar an ihren Platz verschoben. Existiert der Inhalt schon, ersetzt die
+neue Kopie die vorhandene Datei ebenfalls atomar; das frische mtime schützt
+sie vor der Speicherbereinigung, bis der Upload seine Zeile committet hat.
+
+``stored_blob.ref_count`` wird von Session-Listenern gepflegt: Einfügen einer
+referenzierenden Zeile erhöht, Löschen verringert den Zähler. Beim Erhöhen muss
+die Datei existieren (sonst ``BlobMissing``, die Transaktion scheitert). Zeilen
+mit Zähler 0 bleiben stehen; erst ``collect_garbage`` löscht sie samt Datei und
+Vorschaubildern, sofern der Zähler weiterhin 0 ist und die Datei seit
+``BLOB_GC_GRACE_SECONDS`` nicht angefasst wurde. Ein Upload, der denselben
+Inhalt gerade wiederverwendet, verliert seine Datei so nicht an einen
+parallel gelöschten letzten Verweis. Zeilen ohne ``content_hash`` (vor der
+Migration angelegt) verwalten ihre Dateien weiterhin selbst.
+
+Die Bereinigung läuft im Hintergrund (``blob_collector``, alle
+``BLOB_GC_INTERVAL_SECONDS``) oder per
+``python -m app.services.blob_store sweep [--grace-seconds N]``.
+
+Konfiguration über Umgebungsvariablen:
+
+- ``BLOB_STORE_DIR``: Verzeichnis (Standard: ``uploads/blobs``)
+- ``BLOB_GC_GRACE_SECONDS``: Mindestalter unreferenzierter Dateien (Standard: 3600)
+- ``BLOB_GC_INTERVAL_SECONDS``: Abstand der Hintergrundläufe (Standard: 3600, 0 = aus)
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from io import BytesIO
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session, select
+
+from app.models import CompanyLogo, ProjectImage, ReportImage, StoredBlob
+from app.services.thumbnail_service import remove_thumbnails
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BLOB_DIR = os.path.join("uploads", "blobs")
+CHUNK_SIZE = 1024 * 1024
+GC_GRACE_SECONDS = int(os.getenv("BLOB_GC_GRACE_SECONDS", "3600"))
+GC_INTERVAL_SECONDS = int(os.getenv("BLOB_GC_INTERVAL_SECONDS", "3600"))
+
+# Modelle, deren Zeilen Blobs referenzieren
+REFERENCING_MODELS = (ReportImage, ProjectImage, CompanyLogo)
+
+_DELTAS_KEY = "blob_ref_deltas"
+
+
+class BlobTooLarge(ValueError):
+    """Upload überschreitet die erlaubte Größe."""
+
+
+class BlobMissing(OSError):
+    """Eine neue Referenz zeigt auf eine Blob-Datei, die nicht (mehr) existiert."""
+
+
+def copy_stream(
+    source: BinaryIO,
+    target: BinaryIO,
+    digest: Any,
+    max_bytes: Optional[int] = None,
+    validate_head: Optional[Callable[[bytes], Optional[str]]] = None,
+) -> int:
+    """
+    Quelle in festen Blöcken nach ``target`` kopieren und dabei hashen.
+
+    Args:
+        source: Lesbarer Binärstrom
+        target: Schreibbarer Binärstrom
+        digest: Hash-Objekt (z. B. ``hashlib.sha256()``), wird fortgeschrieben
+        max_bytes: Optionale Größengrenze; Abbruch, sobald sie überschritten ist
+        validate_head: Prüft den ersten Block (bei leerer Quelle ``b""``) und
+            wirft bei ungültigem Inhalt, bevor etwas geschrieben wurde; der
+            Rückgabewert wird hier ignoriert (siehe ``BlobStore.store_stream``)
+
+    Returns:
+        int: Anzahl kopierter Bytes
+
+    Raises:
+        BlobTooLarge: Wenn ``max_bytes`` überschritten wird
+    """
+    size = 0
+    while chunk := source.read(CHUNK_SIZE):
+        if size == 0 and validate_head is not None:
+            validate_head(chunk)
+        size += len(chunk)
+        if max_bytes is not None and size > max_bytes:
+            raise BlobTooLarge(f"Datei ist größer als {max_bytes} Bytes")
+        digest.update(chunk)
+        target.write(chunk)
+    if size == 0 and validate_head is not None:
+        validate_head(b"")
+    return size
+
+
+@dataclass
+class StoredFile:
+    """Ergebnis eines Uploads in den Blob-Speicher."""
+
+    content_hash: str
+    path: str
+    size: int
+    created: bool
+
+
+class BlobStore:
+    """Dateiablage nach SHA-256 mit Deduplizierung."""
+
+    def __init__(self, directory: str = DEFAULT_BLOB_DIR):
+        self.directory = directory
+
+    def _shard_dir(self, content_hash: str) -> str:
+        return os.path.join(self.directory, content_hash[:2])
+
+    def path_for(self, content_hash: str, extension: str = "") -> str:
+        """Pfad eines Blobs mit der angegebenen Endung."""
+        return os.path.join(self._shard_dir(content_hash), f"{content_hash}{extension.lower()}")
+
+    def find(self, content_hash: str) -> Optional[str]:
+        """Pfad eines vorhandenen Blobs (beliebige Endung) oder ``None``."""
+        shard = self._shard_dir(content_hash)
+        try:
+            names = os.listdir(shard)
+        except OSError:
+            return None
+        for name in names:
+            if os.path.splitext(name)[0] == content_hash:
+                return os.path.join(shard, name)
+        return None
+
+    def store_stream(
+        self,
+        source: BinaryIO,
+        extension: str = "",
+        max_bytes: Optional[int] = None,
+        validate_head: Optional[Callable[[bytes], Optional[str]]] = None,
+    ) -> StoredFile:
+        """
+        Datei blockweise hashen und ablegen (blockierend, im Threadpool aufrufen).
+
+        Args:
+            source: Lesbarer Binärstrom, z. B. ``UploadFile.file``
+            extension: Dateiendung inkl. Punkt für neu angelegte Blobs
+            max_bytes: Optionale Größengrenze
+            validate_head: Optionale Prüfung des ersten Blocks (siehe ``copy_stream``);
+                liefert sie eine am Inhalt erkannte Endung, ersetzt diese ``extension``
+
+        Raises:
+            BlobTooLarge: Wenn ``max_bytes`` überschritten wird
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".upload")
+        detected: List[str] = []
+
+        def check_head(head: bytes) -> None:
+            result = validate_head(head)
+            if result:
+                detected.append(result)
+
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                size = copy_stream(source, handle, digest, max_bytes, check_head if validate_head else None)
+
+            content_hash = digest.hexdigest()
+            existing = self.find(content_hash)
+            if existing is not None:
+                # Gleicher Inhalt: atomar ersetzen statt verwerfen – stellt eine parallel
+                # gelöschte Datei wieder her und frischt das mtime für collect_garbage auf
+                os.replace(tmp_path, existing)
+                return StoredFile(content_hash, existing, size, created=False)
+
+            # Endung nach dem Inhalt statt nach dem Dateinamen des Clients
+            path = self.path_for(content_hash, detected[0] if detected else extension)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+            return StoredFile(content_hash, path, size, created=True)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def store_bytes(self, data: bytes, extension: str = "") -> StoredFile:
+        """Bereits geladenen Inhalt ablegen."""
+        return self.store_stream(BytesIO(data), extension)
+
+    def remove(self, path: str) -> None:
+        """Blob-Datei und ihre Vorschaubilder löschen."""
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        remove_thumbnails(path)
+
+
+blob_store = BlobStore(os.getenv("BLOB_STORE_DIR", DEFAULT_BLOB_DIR))
+
+
+# ---------------------------------------------------------------------------
+# Referenzzählung
+# ---------------------------------------------------------------------------
+
+def _collect_references(session: OrmSession, flush_context: Any, instances: Any) -> None:
+    deltas: Dict[str, Tuple[int, Optional[str], int]] = {}
+
+    def add(obj: Any, sign: int) -> None:
+        content_hash = getattr(obj, "content_hash", None)
+        if not content_hash:
+            return
+        count, path, size = deltas.get(content_hash, (0, None, 0))
+        deltas[content_hash] = (count + sign, path or obj.file_path, size or obj.file_size or 0)
+
+    for obj in session.new:
+        if isinstance(obj, REFERENCING_MODELS):
+            add(obj, 1)
+    for obj in session.deleted:
+        if isinstance(obj, REFERENCING_MODELS):
+            add(obj, -1)
+    if deltas:
+        session.info[_DELTAS_KEY] = deltas
+
+
+def _apply_references(session: OrmSession, flush_context: Any) -> None:
+    deltas = session.info.pop(_DELTAS_KEY, None)
+    if not deltas:
+        return
+
+    table = StoredBlob.__table__
+    connection = session.connection()
+    try:
+        for content_hash, (delta, path, size) in deltas.items():
+            if delta > 0:
+                # Unter der Schreibsperre: die Bereinigung kann die Datei nicht mehr
+                # unbemerkt löschen, nachdem der Zähler erhöht ist
+                if not os.path.exists(path):
+                    raise BlobMissing(f"Blob-Datei fehlt: {path}")
+                connection.execute(
+                    table.insert().prefix_with("OR IGNORE"),
+                    {
+                        "content_hash": content_hash,
+                        "path": path,
+                        "size": size,
+                        "ref_count": 0,
+                        "created_at": datetime.utcnow(),
+                    },
+                )
+            if delta == 0:
+                continue
+            # Zeilen mit Zähler 0 bleiben stehen, siehe collect_garbage
+            connection.execute(
+                table.update()
+                .where(table.c.content_hash == content_hash)
+                .values(ref_count=table.c.ref_count + delta)
+            )
+    except OperationalError as exc:
+        # Datenbank ohne stored_blob-Tabelle (Migration noch nicht gelaufen)
+        if "no such table" not in str(exc):
+            raise
+
+
+def _discard_deltas(session: OrmSession) -> None:
+    session.info.pop(_DELTAS_KEY, None)
+
+
+def register_blob_store_listeners() -> None:
+    """Registriert die Session-Listener (idempotent)."""
+    if not event.contains(OrmSession, "before_flush", _collect_references):
+        event.listen(OrmSession, "before_flush", _collect_references)
+        event.listen(OrmSession, "after_flush", _apply_references)
+        event.listen(OrmSession, "after_rollback", _discard_deltas)
+
+
+register_blob_store_listeners()
+
+
+# ---------------------------------------------------------------------------
+# Speicherbereinigung
+# ---------------------------------------------------------------------------
+
+def _touched_since(path: str, cutoff: float) -> bool:
+    try:
+        return os.stat(path).st_mtime > cutoff
+    except OSError:
+        return False
+
+
+def collect_garbage(session: Session, grace_seconds: int = GC_GRACE_SECONDS) -> List[str]:
+    """
+    Unreferenzierte Blobs löschen.
+
+    Eine Zeile wird nur entfernt, wenn ihr Zähler beim Löschen noch 0 ist und
+    die Datei länger als ``grace_seconds`` nicht angefasst wurde; die Dateien
+    werden erst nach dem Commit gelöscht.
+
+    Returns:
+        List[str]: Gelöschte Blob-Pfade
+    """
+    cutoff = time.time() - grace_seconds
+    table = StoredBlob.__table__
+    candidates = session.exec(
+        select(StoredBlob.content_hash, StoredBlob.path).where(StoredBlob.ref_count <= 0)
+    ).all()
+
+    released = []
+    connection = session.connection()
+    for content_hash, path in candidates:
+        if _touched_since(path, cutoff):
+            continue
+        result = connection.execute(
+            table.delete().where(table.c.content_hash == content_hash, table.c.ref_count <= 0)
+        )
+        if result.rowcount == 1:
+            released.append(path)
+    session.commit()
+
+    removed = []
+    for path in released:
+        # Inzwischen erneut hochgeladen: Datei bleibt, der Upload legt die Zeile neu an
+        if _touched_since(path, cutoff):
+            continue
+        blob_store.remove(path)
+        removed.append(path)
+    return removed
+
+
+class BlobCollector:
+    """Führt ``collect_garbage`` periodisch in einem Hintergrund-Thread aus."""
+
+    def __init__(self, interval_seconds: int = GC_INTERVAL_SECONDS):
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _loop(self) -> None:
+        from app.database import engine
+
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                with Session(engine) as session:
+                    removed = collect_garbage(session)
+                if removed:
+                    logger.info("Blob-Speicher: %s unreferenzierte Datei(en) gelöscht", len(removed))
+            except Exception:  # pragma: no cover - nächster Lauf versucht es erneut
+                logger.exception("Bereinigung des Blob-Speichers fehlgeschlagen")
+
+    def start(self) -> None:
+        if self.interval_seconds <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="blob-gc", daemon=True)
+        self._thread.start()
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+blob_collector = BlobCollector()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Unreferenzierte Dateien im Blob-Speicher löschen")
+    parser.add_argument("command", choices=["sweep"])
+    parser.add_argument("--grace-seconds", type=int, default=GC_GRACE_SECONDS)
+    args = parser.parse_args(argv)
+
+    from app.database import engine
+
+    with Session(engine) as session:
+        removed = collect_garbage(session, args.grace_seconds)
+    for path in removed:
+        print(path)
+    print(f"{len(removed)} Datei(en) gelöscht")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
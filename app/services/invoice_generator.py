@@ -8,10 +8,15 @@ import json
 import logging
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional, Tuple
-from sqlmodel import Session, select
+from sqlalchemy import and_
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, func, select
 
-from app.models import Project, TimeEntry, Report, Offer, MaterialUsage, Employee, Invoice
+from app.models import Project, TimeEntryDaily, Report, Offer, OfferLineItem, MaterialUsage, Employee, Invoice
 from app.schemas import InvoiceGenerationRequest, InvoiceGenerationData, InvoiceCalculationResult, InvoiceItem as InvoiceItemSchema
+from app.services import line_items  # noqa: F401 - registriert die Positions-Listener
+from app.services.invoice_numbers import InvoiceNumberAllocator, InvoiceNumberTaken
+from app.services.time_rollup import TimeRollupService, day_filter
 from app.utils.tenant_scoping import add_tenant_filter
 
 # Logger konfigurieren
@@ -43,7 +48,7 @@ class InvoiceGenerator:
             
             # 1. Daten sammeln
             data = self._collect_invoice_data(request)
-            logger.info(f"Daten gesammelt: {len(data.time_entries)} Stundeneinträge, {len(data.reports)} Berichte, {len(data.offers)} Angebote")
+            logger.info(f"Daten gesammelt: {len(data.employee_hours)} Mitarbeiter, {len(data.reports)} Berichte, {len(data.offers)} Angebote")
             
             # 2. Rechnungspositionen generieren
             items = self._generate_invoice_items(data, request)
@@ -60,7 +65,13 @@ class InvoiceGenerator:
             raise
     
     def _collect_invoice_data(self, request: InvoiceGenerationRequest) -> InvoiceGenerationData:
-        """Sammelt alle relevanten Daten für die Rechnungsgenerierung."""
+        """
+        Sammelt die Kennzahlen für die Rechnungsgenerierung.
+
+        Stunden und Kosten stammen aus der Tagesverdichtung ``time_entry_daily``;
+        Material und Berichte werden per GROUP BY in SQLite verdichtet. Geladen
+        werden nur die benötigten Spalten.
+        """
         
         # Projekt laden
         project = self.session.get(Project, request.project_id)
@@ -71,61 +82,86 @@ class InvoiceGenerator:
         start_date = request.start_date or datetime.now() - timedelta(days=30)
         end_date = request.end_date or datetime.now()
         
-        # Stundeneinträge laden
-        time_entries_query = add_tenant_filter(
-            select(TimeEntry).where(
-                TimeEntry.project_id == request.project_id,
-                TimeEntry.work_date >= start_date,
-                TimeEntry.work_date <= end_date,
-            ),
-            TimeEntry,
-            self.tenant_id,
-        )
-        time_entries = self.session.exec(time_entries_query).all()
-        
-        # Berichte laden
-        reports_query = add_tenant_filter(
-            select(Report).where(
-                Report.project_id == request.project_id,
-                Report.report_date >= start_date,
-                Report.report_date <= end_date,
-            ),
-            Report,
-            self.tenant_id,
+        # Stunden und Kosten je Mitarbeiter aus der Tagesverdichtung (Name per Join)
+        TimeRollupService(self.session).ensure(self.tenant_id)
+        daily_filter = (
+            # work_date ist ein Datum: ganze Tage, der erste Tag zählt mit
+            *day_filter(self.tenant_id, start_date, end_date),
+            TimeEntryDaily.project_id == request.project_id,
         )
-        reports = self.session.exec(reports_query).all()
+        employee_hours = self.session.exec(
+            select(
+                TimeEntryDaily.employee_id.label("employee_id"),
+                Employee.full_name.label("full_name"),
+                func.sum(TimeEntryDaily.entry_count).label("entry_count"),
+                func.sum(TimeEntryDaily.invalid_entries).label("invalid_entries"),
+                func.coalesce(func.sum(TimeEntryDaily.hours_worked), 0.0).label("total_hours"),
+                func.coalesce(func.sum(TimeEntryDaily.total_cost), 0.0).label("total_cost"),
+            )
+            .outerjoin(Employee, and_(Employee.id == TimeEntryDaily.employee_id, Employee.tenant_id == self.tenant_id))
+            .where(*daily_filter)
+            .group_by(TimeEntryDaily.employee_id, Employee.full_name)
+            .order_by(TimeEntryDaily.employee_id)
+        ).all()
         
-        # Angebote laden
-        offers_query = add_tenant_filter(
-            select(Offer).where(Offer.project_id == request.project_id),
-            Offer,
-            self.tenant_id,
+        # Berichte: Anzahl je Arbeitsart und Titel für die Hybrid-Methode
+        report_filter = (
+            Report.tenant_id == self.tenant_id,
+            Report.project_id == request.project_id,
+            Report.report_date >= start_date,
+            Report.report_date <= end_date,
         )
-        offers = self.session.exec(offers_query).all()
+        work_type = func.coalesce(Report.work_type, "Allgemeine Arbeiten")
+        report_groups = self.session.exec(
+            select(work_type.label("work_type"), func.count(Report.id).label("report_count"))
+            .where(*report_filter)
+            .group_by(work_type)
+            .order_by(work_type)
+        ).all()
+        reports = self.session.exec(
+            select(Report.id.label("id"), Report.title.label("title")).where(*report_filter).order_by(Report.id)
+        ).all()
+        
+        # Angebote (Positionen liest _generate_from_offers aus offer_line_item)
+        offers = self.session.exec(
+            select(
+                Offer.id.label("id"),
+                Offer.title.label("title"),
+                Offer.status.label("status"),
+                Offer.total_amount.label("total_amount"),
+            )
+            .where(Offer.tenant_id == self.tenant_id, Offer.project_id == request.project_id)
+            .order_by(Offer.id)
+        ).all()
         
-        # Materialverbrauch laden
-        materials_query = add_tenant_filter(
-            select(MaterialUsage).where(
+        # Materialsummen je Material und Einheit; fehlende Gesamtkosten aus Menge × Preis
+        material_cost = func.coalesce(
+            MaterialUsage.total_cost, MaterialUsage.quantity * MaterialUsage.unit_price, 0.0
+        )
+        materials = self.session.exec(
+            select(
+                MaterialUsage.material_name.label("material_name"),
+                MaterialUsage.unit.label("unit"),
+                func.coalesce(func.sum(MaterialUsage.quantity), 0.0).label("quantity"),
+                func.coalesce(func.sum(material_cost), 0.0).label("total_cost"),
+            )
+            .where(
+                MaterialUsage.tenant_id == self.tenant_id,
                 MaterialUsage.project_id == request.project_id,
                 MaterialUsage.usage_date >= start_date,
                 MaterialUsage.usage_date <= end_date,
-            ),
-            MaterialUsage,
-            self.tenant_id,
-        )
-        materials = self.session.exec(materials_query).all()
-        
-        # Mitarbeiter laden
-        employees_query = add_tenant_filter(select(Employee), Employee, self.tenant_id)
-        employees = self.session.exec(employees_query).all()
+            )
+            .group_by(MaterialUsage.material_name, MaterialUsage.unit)
+            .order_by(MaterialUsage.material_name, MaterialUsage.unit)
+        ).all()
         
         return InvoiceGenerationData(
-            project=project.__dict__,
-            time_entries=[entry.__dict__ for entry in time_entries],
-            reports=[report.__dict__ for report in reports],
-            offers=[offer.__dict__ for offer in offers],
-            materials=[material.__dict__ for material in materials],
-            employees=[employee.__dict__ for employee in employees]
+            project=project.model_dump(),
+            employee_hours=[row._asdict() for row in employee_hours],
+            report_groups=[row._asdict() for row in report_groups],
+            reports=[row._asdict() for row in reports],
+            offers=[row._asdict() for row in offers],
+            materials=[row._asdict() for row in materials],
         )
     
     def _generate_invoice_items(self, data: InvoiceGenerationData, request: InvoiceGenerationRequest) -> List[InvoiceItemSchema]:
@@ -145,66 +181,41 @@ class InvoiceGenerator:
         return items
     
     def _generate_from_time_entries(self, data: InvoiceGenerationData, request: InvoiceGenerationRequest) -> List[InvoiceItemSchema]:
-        """Generiert Rechnungspositionen aus Stundeneinträgen."""
+        """Generiert Rechnungspositionen aus den Stunden je Mitarbeiter."""
         items = []
         
-        # Gruppiere Stundeneinträge nach Mitarbeiter
-        employee_hours = {}
-        for entry in data.time_entries:
-            employee_id = entry.get('employee_id')
-            if employee_id not in employee_hours:
-                employee_hours[employee_id] = {
-                    'total_hours': 0,
-                    'total_cost': 0,
-                    'employee': None
-                }
-            
-            hours = entry.get('hours_worked', 0)
-            hourly_rate = entry.get('hourly_rate', 0)
+        for employee in data.employee_hours:
+            total_hours = employee['total_hours']
+            if total_hours <= 0:
+                continue
+            total_cost = employee['total_cost']
+            employee_name = employee['full_name'] or f"Mitarbeiter {employee['employee_id']}"
             
-            employee_hours[employee_id]['total_hours'] += hours
-            employee_hours[employee_id]['total_cost'] += hours * hourly_rate
+            # Lohnanteil berechnen
+            labor_cost = total_cost * (request.labor_cost_percentage / 100)
+            service_cost = total_cost - labor_cost
             
-            # Finde Mitarbeiter
-            for emp in data.employees:
-                if emp['id'] == employee_id:
-                    employee_hours[employee_id]['employee'] = emp
-                    break
-        
-        # Erstelle Rechnungspositionen
-        for employee_id, data_emp in employee_hours.items():
-            if data_emp['total_hours'] > 0:
-                employee = data_emp['employee']
-                employee_name = employee['full_name'] if employee else f"Mitarbeiter {employee_id}"
-                
-                # Lohnanteil berechnen
-                labor_cost = data_emp['total_cost'] * (request.labor_cost_percentage / 100)
-                service_cost = data_emp['total_cost'] - labor_cost
-                
-                items.append(InvoiceItemSchema(
-                    description=f"Arbeitsstunden - {employee_name}",
-                    quantity=round(data_emp['total_hours'], 2),
-                    unit="Std",
-                    unit_price=round(data_emp['total_cost'] / data_emp['total_hours'] if data_emp['total_hours'] > 0 else 0, 2),
-                    total_price=round(data_emp['total_cost'], 2),
-                    item_type="service",
-                    labor_cost=round(labor_cost, 2),
-                    service_cost=round(service_cost, 2)
-                ))
+            items.append(InvoiceItemSchema(
+                description=f"Arbeitsstunden - {employee_name}",
+                quantity=round(total_hours, 2),
+                unit="Std",
+                unit_price=round(total_cost / total_hours, 2),
+                total_price=round(total_cost, 2),
+                item_type="service",
+                labor_cost=round(labor_cost, 2),
+                service_cost=round(service_cost, 2)
+            ))
         
         return items
     
     def _generate_from_reports(self, data: InvoiceGenerationData, request: InvoiceGenerationRequest) -> List[InvoiceItemSchema]:
-        """Generiert Rechnungspositionen aus Berichten."""
+        """Generiert Rechnungspositionen aus Berichten (eine Position je Arbeitsart)."""
         items = []
         
-        for report in data.reports:
-            # Gruppiere Berichte nach Arbeitsart
-            work_type = report.get('work_type', 'Allgemeine Arbeiten')
-            
+        for group in data.report_groups:
             items.append(InvoiceItemSchema(
-                description=f"Bericht: {work_type}",
-                quantity=1,
+                description=f"Bericht: {group['work_type']}",
+                quantity=group['report_count'],
                 unit="Stk",
                 unit_price=0,  # Wird später berechnet
                 total_price=0,
@@ -214,33 +225,46 @@ class InvoiceGenerator:
         return items
     
     def _generate_from_offers(self, data: InvoiceGenerationData, request: InvoiceGenerationRequest) -> List[InvoiceItemSchema]:
-        """Generiert Rechnungspositionen aus Angeboten."""
+        """Generiert Rechnungspositionen aus den Positionen angenommener Angebote."""
+        accepted = [offer for offer in data.offers if offer.get('status') == 'accepted']
+        if not accepted:
+            return []
+
+        # Alle Positionen in einer Abfrage statt JSON je Angebot zu parsen
+        line_items: Dict[int, List[OfferLineItem]] = {}
+        for line in self.session.exec(
+            select(OfferLineItem)
+            .where(
+                OfferLineItem.tenant_id == self.tenant_id,
+                OfferLineItem.offer_id.in_([offer['id'] for offer in accepted]),
+            )
+            .order_by(OfferLineItem.offer_id, OfferLineItem.position)
+        ).all():
+            line_items.setdefault(line.offer_id, []).append(line)
+
         items = []
-        
-        for offer in data.offers:
-            if offer.get('status') == 'accepted':
-                # Parse Angebotspositionen
-                try:
-                    offer_items = json.loads(offer.get('items', '[]'))
-                    for item in offer_items:
-                        items.append(InvoiceItemSchema(
-                            description=item.get('description', ''),
-                            quantity=round(item.get('quantity', 1), 2),
-                            unit=item.get('unit', 'Stk'),
-                            unit_price=round(item.get('unit_price', 0), 2),
-                            total_price=round(item.get('total_price', 0), 2),
-                            item_type=item.get('item_type', 'service')
-                        ))
-                except json.JSONDecodeError:
-                    # Fallback: Einzelposition
-                    items.append(InvoiceItemSchema(
-                        description=offer.get('title', 'Angebot'),
-                        quantity=1,
-                        unit="Stk",
-                        unit_price=round(offer.get('total_amount', 0), 2),
-                        total_price=round(offer.get('total_amount', 0), 2),
-                        item_type="service"
-                    ))
+        for offer in accepted:
+            lines = line_items.get(offer['id'])
+            if not lines:
+                # Fallback: Einzelposition
+                items.append(InvoiceItemSchema(
+                    description=offer.get('title', 'Angebot'),
+                    quantity=1,
+                    unit="Stk",
+                    unit_price=round(offer.get('total_amount', 0), 2),
+                    total_price=round(offer.get('total_amount', 0), 2),
+                    item_type="service"
+                ))
+                continue
+            for line in lines:
+                items.append(InvoiceItemSchema(
+                    description=line.description,
+                    quantity=round(line.quantity, 2),
+                    unit=line.unit or 'Stk',
+                    unit_price=round(line.unit_price, 2),
+                    total_price=round(line.total_price, 2),
+                    item_type=line.item_type
+                ))
         
         return items
     
@@ -255,14 +279,16 @@ class InvoiceGenerator:
         # 2. Materialverbrauch
         if request.include_materials:
             for material in data.materials:
+                quantity = material['quantity']
+                total_cost = material['total_cost']
                 items.append(InvoiceItemSchema(
-                    description=f"Material: {material.get('material_name', '')}",
-                    quantity=round(material.get('quantity', 0), 2),
-                    unit=material.get('unit', 'Stk'),
-                    unit_price=round(material.get('unit_price', 0), 2),
-                    total_price=round(material.get('total_cost', 0), 2),
+                    description=f"Material: {material['material_name']}",
+                    quantity=round(quantity, 2),
+                    unit=material['unit'] or 'Stk',
+                    unit_price=round(total_cost / quantity if quantity else 0, 2),
+                    total_price=round(total_cost, 2),
                     item_type="material",
-                    material_cost=round(material.get('total_cost', 0), 2)
+                    material_cost=round(total_cost, 2)
                 ))
         
         # 3. Berichte (zusätzliche Leistungen)
@@ -307,11 +333,20 @@ class InvoiceGenerator:
         self,
         project_id: int,
         calculation: dict,
-        invoice_number: str,
+        invoice_number: Optional[str],
         client_name: str,
         client_address: str = None,
     ) -> Invoice:
-        """Erstellt eine tatsächliche Rechnung aus dem Berechnungsergebnis."""
+        """
+        Erstellt eine tatsächliche Rechnung aus dem Berechnungsergebnis.
+
+        Ohne ``invoice_number`` wird die nächste fortlaufende Nummer des
+        Mandanten vergeben.
+
+        Raises:
+            InvoiceNumberTaken: Wenn die vorgegebene Nummer bereits existiert
+        """
+        invoice_number = InvoiceNumberAllocator(self.session, self.tenant_id).assign(invoice_number)
 
         # Rechnung erstellen
         invoice = Invoice(
@@ -331,36 +366,16 @@ class InvoiceGenerator:
         invoice.tenant_id = self.tenant_id
 
         self.session.add(invoice)
-        self.session.commit()
+        try:
+            self.session.commit()
+        except IntegrityError:
+            # Eindeutiger Index: dieselbe Nummer wurde parallel vergeben
+            self.session.rollback()
+            raise InvoiceNumberTaken(f"Rechnungsnummer {invoice_number} ist bereits vergeben")
         self.session.refresh(invoice)
 
         return invoice
     
-    def generate_invoice_number(self, project_id: int, prefix: str = "RE") -> str:
-        """
-        Generiert eine eindeutige Rechnungsnummer.
-        
-        Args:
-            project_id: Projekt-ID
-            prefix: Präfix für Rechnungsnummer
-            
-        Returns:
-            str: Eindeutige Rechnungsnummer
-        """
-        # Aktuelle Rechnungsnummern für das Projekt zählen
-        existing_invoices = self.session.exec(
-            add_tenant_filter(
-                select(Invoice).where(Invoice.project_id == project_id),
-                Invoice,
-                self.tenant_id,
-            )
-        ).all()
-        
-        invoice_count = len(existing_invoices) + 1
-        date_str = datetime.now().strftime("%Y%m%d")
-        
-        return f"{prefix}-{date_str}-{project_id:03d}-{invoice_count:03d}"
-    
     def validate_invoice_data(self, data: InvoiceGenerationData) -> Tuple[bool, List[str]]:
         """
         Validiert die Rechnungsdaten auf Vollständigkeit.
@@ -378,13 +393,16 @@ class InvoiceGenerator:
             errors.append("Kein Projekt gefunden")
         
         # Mindestens eine Datenquelle vorhanden
-        if not data.time_entries and not data.reports and not data.offers:
+        if not data.employee_hours and not data.reports and not data.offers:
             errors.append("Keine abrechenbaren Daten gefunden")
         
         # Stundeneinträge validieren
-        for entry in data.time_entries:
-            if not entry.get('hours_worked', 0) > 0:
-                errors.append(f"Ungültige Arbeitsstunden in Eintrag {entry.get('id')}")
+        for employee in data.employee_hours:
+            if employee['invalid_entries']:
+                errors.append(
+                    f"Ungültige Arbeitsstunden in {employee['invalid_entries']} Eintrag/Einträgen "
+                    f"von Mitarbeiter {employee['employee_id']}"
+                )
         
         return len(errors) == 0, errors
     
@@ -0,0 +1,168 @@
+"""Lückenlose, fortlaufende Rechnungsnummern pro Mandant (§14 UStG).
+
+Der Zähler ist ``TenantSettings.invoice_next_number``. Eine Vergabe erhöht ihn
+mit einem einzigen ``UPDATE … RETURNING`` in der Transaktion der Session:
+
+- Die Schreibsperre (SQLite) bzw. Zeilensperre hält bis zum Commit; parallele
+  Vergaben warten (``busy_timeout``) und erhalten nie dieselbe Nummer.
+- Ein Rollback setzt den Zähler zusammen mit der Rechnung zurück, es entstehen
+  also keine Lücken.
+
+Für Sammelläufe lässt sich ein Block von Nummern in einem Schritt reservieren;
+nicht verbrauchte Nummern am Blockende können vor dem Commit zurückgegeben
+werden. Manuell vorgegebene Nummern prüft ``assign``: Nummern im Format des
+Zählers (``<Präfix>-NNNNN``) bleiben ihm vorbehalten, alle anderen müssen beim
+Mandanten neu sein. Der eindeutige Index ``ux_invoice_tenant_number`` sichert
+das auch bei parallelen Anfragen ab.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Iterator, List, Optional
+
+from sqlalchemy import and_
+from sqlmodel import Session, select
+
+from app.models import Invoice, TenantSettings
+
+DEFAULT_PREFIX = "RE"
+NUMBER_DIGITS = 5
+
+
+def format_invoice_number(prefix: Optional[str], number: int) -> str:
+    """Rechnungsnummer aus Präfix und laufender Nummer bilden (z. B. ``RE-00042``)."""
+    return f"{prefix or DEFAULT_PREFIX}-{number:0{NUMBER_DIGITS}d}"
+
+
+class InvoiceNumberTaken(ValueError):
+    """Die vorgegebene Rechnungsnummer ist vergeben oder dem Zähler vorbehalten."""
+
+
+@dataclass(frozen=True)
+class InvoiceNumberBlock:
+    """Zusammenhängend reservierte laufende Nummern ``start`` bis ``end - 1``."""
+
+    prefix: Optional[str]
+    start: int
+    count: int
+
+    @property
+    def end(self) -> int:
+        return self.start + self.count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[str]:
+        for number in range(self.start, self.end):
+            yield format_invoice_number(self.prefix, number)
+
+    def numbers(self) -> List[str]:
+        return list(self)
+
+
+class InvoiceNumberAllocator:
+    """Vergibt Rechnungsnummern aus dem Zähler in ``tenant_settings``."""
+
+    def __init__(self, session: Session, tenant_id: int):
+        self.session = session
+        self.tenant_id = tenant_id
+
+    def prefix(self) -> Optional[str]:
+        """Aktuelles Präfix des Mandanten (Standardwert, solange keine Einstellungen existieren)."""
+        settings = self.session.exec(
+            select(TenantSettings.invoice_prefix).where(TenantSettings.tenant_id == self.tenant_id)
+        ).first()
+        return settings if settings is not None else TenantSettings(tenant_id=self.tenant_id).invoice_prefix
+
+    def _ensure_settings_row(self) -> None:
+        # Mandanten ohne Einstellungen erhalten die Standardwerte (Zähler bei 1)
+        values = TenantSettings(tenant_id=self.tenant_id).model_dump(exclude={"id"})
+        self.session.connection().execute(TenantSettings.__table__.insert().prefix_with("OR IGNORE"), values)
+
+    def allocate(self, count: int = 1) -> InvoiceNumberBlock:
+        """
+        ``count`` fortlaufende Nummern reservieren.
+
+        Die Reservierung wird mit der Transaktion der Session festgeschrieben
+        oder verworfen.
+
+        Raises:
+            ValueError: Wenn ``count`` kleiner als 1 ist
+        """
+        if count < 1:
+            raise ValueError("Es muss mindestens eine Rechnungsnummer reserviert werden")
+
+        table = TenantSettings.__table__
+        statement = (
+            table.update()
+            .where(table.c.tenant_id == self.tenant_id)
+            .values(invoice_next_number=table.c.invoice_next_number + count)
+            .returning(table.c.invoice_next_number, table.c.invoice_prefix)
+        )
+        connection = self.session.connection()
+        row = connection.execute(statement).first()
+        if row is None:
+            self._ensure_settings_row()
+            row = connection.execute(statement).one()
+
+        next_number, prefix = row
+        return InvoiceNumberBlock(prefix=prefix, start=next_number - count, count=count)
+
+    def next_number(self) -> str:
+        """Eine einzelne Rechnungsnummer vergeben."""
+        return next(iter(self.allocate(1)))
+
+    def assign(self, requested: Optional[str] = None) -> str:
+        """
+        Rechnungsnummer für eine neue Rechnung festlegen.
+
+        Ohne Vorgabe wird die nächste fortlaufende Nummer vergeben, eine
+        vorgegebene Nummer wird übernommen, sofern der Mandant sie noch nicht
+        verwendet und sie nicht im Format des Zählers liegt.
+
+        Raises:
+            InvoiceNumberTaken: Wenn die Nummer existiert oder dem Zähler vorbehalten ist
+        """
+        requested = (requested or "").strip()
+        if not requested:
+            return self.next_number()
+
+        prefix = self.prefix() or DEFAULT_PREFIX
+        if re.fullmatch(rf"{re.escape(prefix)}-\d+", requested, flags=re.IGNORECASE):
+            raise InvoiceNumberTaken(
+                f"Rechnungsnummern im Format {prefix}-{'N' * NUMBER_DIGITS} vergibt der fortlaufende Zähler"
+            )
+
+        existing = self.session.exec(
+            select(Invoice.id).where(Invoice.tenant_id == self.tenant_id, Invoice.invoice_number == requested)
+        ).first()
+        if existing is not None:
+            raise InvoiceNumberTaken(f"Rechnungsnummer {requested} ist bereits vergeben")
+        return requested
+
+    def release(self, block: InvoiceNumberBlock, used: int) -> bool:
+        """
+        Unverbrauchte Nummern am Ende eines Blocks zurückgeben.
+
+        Gelingt nur, solange seit der Reservierung in dieser Transaktion keine
+        weitere Nummer vergeben wurde; andernfalls bleibt der Zähler unverändert
+        und der Aufrufer muss die Transaktion verwerfen, um Lücken zu vermeiden.
+
+        Returns:
+            bool: True, wenn der Zähler zurückgesetzt wurde (oder nichts offen war)
+        """
+        if not 0 <= used <= block.count:
+            raise ValueError("Anzahl verbrauchter Nummern liegt außerhalb des Blocks")
+        if used == block.count:
+            return True
+
+        table = TenantSettings.__table__
+        result = self.session.connection().execute(
+            table.update()
+            .where(and_(table.c.tenant_id == self.tenant_id, table.c.invoice_next_number == block.end))
+            .values(invoice_next_number=block.start + used)
+        )
+        return result.rowcount == 1
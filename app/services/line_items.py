@@ -0,0 +1,195 @@
+"""Relationale Rechnungs- und Angebotspositionen.
+
+``Invoice.items`` und ``Offer.items`` bleiben der JSON-Schnappschuss, den die
+API unverändert ausliefert. Jeder Flush, der eine Rechnung oder ein Angebot
+anlegt, dessen Positionen ändert oder es löscht, schreibt die Positionen in
+derselben Transaktion nach ``invoice_line_item`` bzw. ``offer_line_item``.
+Dadurch werden alle Schreibpfade (Router, Generator, Importe) abgedeckt, und
+Auswertungen über Positionstypen oder Beschreibungen laufen als einzelne
+SQL-Abfrage.
+
+Bestandsdaten überträgt die Migration ``f1b7c3d9a2e4``.
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session, func, select
+
+from app.models import Invoice, InvoiceLineItem, Offer, OfferLineItem
+
+# Elternmodell -> (Positionstabelle, Fremdschlüsselspalte)
+LINE_ITEM_TABLES: Dict[type, Tuple[Any, str]] = {
+    Invoice: (InvoiceLineItem.__table__, "invoice_id"),
+    Offer: (OfferLineItem.__table__, "offer_id"),
+}
+ITEM_TYPES = ("service", "material", "labor")
+_COST_COLUMNS = ("labor_cost", "material_cost", "service_cost")
+
+_PENDING_KEY = "line_item_parents"
+
+
+def _number(value: Any, default: Optional[float] = 0.0) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def parse_items(raw: Any) -> List[Dict[str, Any]]:
+    """
+    JSON-Positionen in Spaltenwerte übersetzen.
+
+    Unlesbare Werte ergeben eine leere Liste, fehlende Felder Standardwerte –
+    Altbestände enthalten nicht immer alle Felder.
+    """
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw or "[]")
+        except json.JSONDecodeError:
+            return []
+    if not isinstance(raw, list):
+        return []
+
+    rows = []
+    for position, item in enumerate(raw, start=1):
+        if not isinstance(item, dict):
+            continue
+        item_type = item.get("item_type")
+        row = {
+            "position": position,
+            "description": str(item.get("description") or item.get("name") or ""),
+            "quantity": _number(item.get("quantity")),
+            "unit": (str(item["unit"])[:20] if item.get("unit") else None),
+            "unit_price": _number(item.get("unit_price")),
+            "total_price": _number(item.get("total_price")),
+            "item_type": item_type if item_type in ITEM_TYPES else "service",
+        }
+        for column in _COST_COLUMNS:
+            row[column] = _number(item.get(column), None)
+        rows.append(row)
+    return rows
+
+
+# ---------------------------------------------------------------------------
+# Flush-Listener
+# ---------------------------------------------------------------------------
+
+def _delete_rows(connection: Any, model: type, parent_ids: List[int]) -> None:
+    table, parent_column = LINE_ITEM_TABLES[model]
+    connection.execute(table.delete().where(table.c[parent_column].in_(parent_ids)))
+
+
+def _collect_parents(session: OrmSession, flush_context: Any, instances: Any) -> None:
+    pending = [obj for obj in session.new if type(obj) in LINE_ITEM_TABLES]
+    for obj in session.dirty:
+        if type(obj) not in LINE_ITEM_TABLES:
+            continue
+        state = inspect(obj)
+        if any(state.attrs[field].history.has_changes() for field in ("items", "tenant_id")):
+            pending.append(obj)
+
+    deleted: Dict[type, List[int]] = {}
+    for obj in session.deleted:
+        if type(obj) in LINE_ITEM_TABLES and obj.id is not None:
+            deleted.setdefault(type(obj), []).append(obj.id)
+    if deleted:
+        # Vor dem Löschen der Elternzeile, damit Fremdschlüssel nicht verletzt werden
+        try:
+            connection = session.connection()
+            for model, parent_ids in deleted.items():
+                _delete_rows(connection, model, parent_ids)
+        except OperationalError as exc:
+            if "no such table" not in str(exc):
+                raise
+
+    session.info[_PENDING_KEY] = pending
+
+
+def _write_line_items(session: OrmSession, flush_context: Any) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+
+    connection = session.connection()
+    try:
+        for obj in pending:
+            if obj.id is None:
+                continue
+            table, parent_column = LINE_ITEM_TABLES[type(obj)]
+            _delete_rows(connection, type(obj), [obj.id])
+            rows = [
+                {"tenant_id": obj.tenant_id, parent_column: obj.id, **row}
+                for row in parse_items(obj.items)
+            ]
+            if rows:
+                connection.execute(table.insert(), rows)
+    except OperationalError as exc:
+        # Legacy-Datenbank ohne Positionstabellen: nur den JSON-Schnappschuss pflegen
+        if "no such table" not in str(exc):
+            raise
+
+
+def register_line_item_listeners() -> None:
+    """Registriert die Flush-Listener (idempotent)."""
+    if not event.contains(OrmSession, "before_flush", _collect_parents):
+        event.listen(OrmSession, "before_flush", _collect_parents)
+        event.listen(OrmSession, "after_flush", _write_line_items)
+
+
+register_line_item_listeners()
+
+
+# ---------------------------------------------------------------------------
+# Auswertungen
+# ---------------------------------------------------------------------------
+
+def invoice_line_item_totals(
+    session: Session,
+    tenant_id: int,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    status: Optional[str] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Summen der Rechnungspositionen je Positionstyp in einer Abfrage.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Positionstyp -> Anzahl und Summen
+    """
+    statement = (
+        select(
+            InvoiceLineItem.item_type,
+            func.count(InvoiceLineItem.id),
+            func.coalesce(func.sum(InvoiceLineItem.total_price), 0.0),
+            func.coalesce(func.sum(InvoiceLineItem.labor_cost), 0.0),
+            func.coalesce(func.sum(InvoiceLineItem.material_cost), 0.0),
+            func.coalesce(func.sum(InvoiceLineItem.service_cost), 0.0),
+        )
+        .join(Invoice, Invoice.id == InvoiceLineItem.invoice_id)
+        .where(InvoiceLineItem.tenant_id == tenant_id)
+        .group_by(InvoiceLineItem.item_type)
+    )
+    if start_date is not None:
+        statement = statement.where(Invoice.invoice_date >= start_date)
+    if end_date is not None:
+        statement = statement.where(Invoice.invoice_date <= end_date)
+    if status is not None:
+        statement = statement.where(Invoice.status == status)
+
+    totals = {}
+    for item_type, count, total, labor, material, service in session.exec(statement).all():
+        totals[item_type] = {
+            "item_count": count,
+            "total_price": round(total, 2),
+            "labor_cost": round(labor, 2),
+            "material_cost": round(material, 2),
+            "service_cost": round(service, 2),
+        }
+    return totals
@@ -0,0 +1,121 @@
+"""Begrenzter Worker-Pool für Argon2-Hashing und -Verifikation.
+
+Argon2 ist absichtlich teuer (64 MiB, drei Durchläufe). Direkt in ``async def``
+ausgeführt, blockiert jeder Login die Event-Loop. Der Pool verlagert die Arbeit in
+einen Threadpool (argon2-cffi gibt den GIL frei) und begrenzt die Zahl wartender
+Aufträge: Ist die Warteschlange voll, wird sofort mit HTTP 503 abgewiesen, statt
+die Latenz aller Requests zu erhöhen.
+
+Konfiguration über Umgebungsvariablen:
+
+- ``PASSWORD_HASH_WORKERS``: parallele Hash-Vorgänge (Standard: min(4, CPU-Kerne))
+- ``PASSWORD_HASH_MAX_QUEUE``: maximal wartende Aufträge (Standard: 64)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException, status
+
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+DEFAULT_MAX_QUEUE = 64
+
+
+class PasswordHashPool:
+    """Threadpool mit Kapazitätsgrenze und Laufzeitmetriken."""
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, max_queue: int = DEFAULT_MAX_QUEUE):
+        if workers < 1:
+            raise ValueError("workers muss mindestens 1 sein")
+        self.workers = workers
+        self.max_queue = max(0, max_queue)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._rejected = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pwhash")
+            return self._executor
+
+    def _reserve_slot(self) -> None:
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self._rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Anmeldedienst ausgelastet, bitte erneut versuchen",
+                    headers={"Retry-After": "1"},
+                )
+            self._pending += 1
+
+    def _record(self, operation: str, seconds: float) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(operation, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+            stats["count"] += 1
+            stats["total_seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+
+    def _execute(self, operation: str, func: Callable[..., Any], args: tuple) -> Any:
+        with self._lock:
+            self._running += 1
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self._record(operation, time.perf_counter() - started)
+            with self._lock:
+                self._running -= 1
+
+    async def run(self, operation: str, func: Callable[..., Any], *args: Any) -> Any:
+        """``func(*args)`` im Pool ausführen; wirft HTTP 503 bei voller Warteschlange."""
+        self._reserve_slot()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), self._execute, operation, func, args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """Momentaufnahme von Warteschlange und Hash-Zeiten."""
+        with self._lock:
+            operations = {
+                name: {
+                    "count": int(stats["count"]),
+                    "avg_ms": round(stats["total_seconds"] / stats["count"] * 1000, 2) if stats["count"] else 0.0,
+                    "max_ms": round(stats["max_seconds"] * 1000, 2),
+                }
+                for name, stats in self._stats.items()
+            }
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_progress": self._running,
+                "queue_depth": self._pending - self._running,
+                "rejected": self._rejected,
+                "operations": operations,
+            }
+
+    def shutdown(self) -> None:
+        """Worker-Threads beenden (beim Herunterfahren der Anwendung)."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+password_hash_pool = PasswordHashPool(
+    workers=int(os.getenv("PASSWORD_HASH_WORKERS", str(DEFAULT_WORKERS))),
+    max_queue=int(os.getenv("PASSWORD_HASH_MAX_QUEUE", str(DEFAULT_MAX_QUEUE))),
+)
@@ -0,0 +1,307 @@
+"""Inhaltsadressierter Datei-Cache für gerenderte Rechnungs- und Angebots-PDFs.
+
+Der Schlüssel ist ein SHA-256 über alle Eingaben des Renderers: die Felder des
+Dokuments, den Briefkopf aus ``TenantSettings`` und das aktive Firmenlogo
+(Pfad, Größe, Änderungszeit). Ändert sich eine Eingabe, ändert sich der
+Schlüssel – veraltete PDFs können also nie ausgeliefert werden.
+
+Damit alte Einträge nicht liegen bleiben, werden sie zusätzlich aktiv entfernt:
+
+- Änderungen oder Löschungen an ``Invoice``/``Offer`` löschen die PDFs des Dokuments,
+- Änderungen an ``TenantSettings``/``CompanyLogo`` leeren den Cache des Mandanten,
+
+jeweils nach erfolgreichem Commit (Session-Listener). Daneben gelten eine
+Größen- (LRU nach Zugriffszeit) und eine Altersgrenze.
+
+Konfiguration über Umgebungsvariablen:
+
+- ``PDF_CACHE_DIR``: Verzeichnis (Standard: ``cache/pdf``)
+- ``PDF_CACHE_MAX_BYTES``: Maximale Gesamtgröße; ``0`` deaktiviert den Cache
+- ``PDF_CACHE_MAX_AGE_DAYS``: Maximales Alter eines Eintrags
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+
+from app.models import CompanyLogo, Invoice, Offer, TenantSettings
+
+# Bei Layoutänderungen an den Renderern erhöhen, damit alte PDFs nicht mehr passen
+RENDERER_VERSION = 1
+
+DEFAULT_CACHE_DIR = os.path.join("cache", "pdf")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_AGE_DAYS = 30
+# Altersbereinigung höchstens so oft (Sekunden)
+AGE_SWEEP_INTERVAL = 3600
+
+_PENDING_KEY = "pdf_cache_invalidations"
+
+# Modell -> Dokumentart im Cache
+DOCUMENT_KINDS = {Invoice: "invoice", Offer: "offer"}
+# Modelle, deren Änderung den gesamten Mandanten-Cache betrifft
+BRANDING_MODELS = (TenantSettings, CompanyLogo)
+
+
+def _json_default(value: Any) -> Any:
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def logo_fingerprint(logo_path: Optional[str]) -> Optional[List[Any]]:
+    """Pfad, Größe und Änderungszeit des Logos (ändert sich beim Austausch)."""
+    if not logo_path:
+        return None
+    try:
+        stat = os.stat(logo_path)
+    except OSError:
+        return [logo_path, None, None]
+    return [logo_path, stat.st_size, stat.st_mtime_ns]
+
+
+def cache_key(*parts: Any) -> str:
+    """SHA-256 über die kanonische JSON-Darstellung aller Render-Eingaben."""
+    payload = json.dumps([RENDERER_VERSION, *parts], sort_keys=True, default=_json_default, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PdfCache:
+    """Dateibasierter PDF-Cache mit Größen- und Altersgrenze."""
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_CACHE_DIR,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_age_days: float = DEFAULT_MAX_AGE_DAYS,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_days * 86400
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+        self._last_age_sweep = 0.0
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _tenant_dir(self, tenant_id: int) -> str:
+        return os.path.join(self.directory, f"tenant_{tenant_id}")
+
+    def _path(self, tenant_id: int, kind: str, entity_id: int, key: str) -> str:
+        return os.path.join(self._tenant_dir(tenant_id), f"{kind}_{entity_id}_{key}.pdf")
+
+    def _entries(self) -> List[Tuple[str, os.stat_result]]:
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for root, _dirs, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".pdf"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    entries.append((path, os.stat(path)))
+                except OSError:
+                    continue
+        return entries
+
+    def _current_size(self) -> int:
+        if self._size is None:
+            self._size = sum(stat.st_size for _path, stat in self._entries())
+        return self._size
+
+    def _remove(self, path: str) -> int:
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return 0
+        if self._size is not None:
+            self._size = max(0, self._size - size)
+        return size
+
+    def get(self, tenant_id: int, kind: str, entity_id: int, key: str) -> Optional[bytes]:
+        """PDF aus dem Cache lesen oder ``None`` bei Fehlschlag."""
+        if not self.enabled:
+            return None
+        path = self._path(tenant_id, kind, entity_id, key)
+        try:
+            with open(path, "rb") as handle:
+                stat = os.fstat(handle.fileno())
+                data = handle.read()
+        except OSError:
+            with self._lock:
+                self._counters["misses"] += 1
+            return None
+
+        if time.time() - stat.st_mtime > self.max_age_seconds:
+            with self._lock:
+                self._remove(path)
+                self._counters["evictions"] += 1
+                self._counters["misses"] += 1
+            return None
+
+        # Zugriffszeit für LRU-Verdrängung festhalten (mtime bleibt Erstellungszeit)
+        try:
+            os.utime(path, (time.time(), stat.st_mtime))
+        except OSError:
+            pass
+        with self._lock:
+            self._counters["hits"] += 1
+        return data
+
+    def put(self, tenant_id: int, kind: str, entity_id: int, key: str, data: bytes) -> None:
+        """PDF atomar ablegen und bei Bedarf alte Einträge verdrängen."""
+        if not self.enabled or len(data) > self.max_bytes:
+            return
+        tenant_dir = self._tenant_dir(tenant_id)
+        os.makedirs(tenant_dir, exist_ok=True)
+        path = self._path(tenant_id, kind, entity_id, key)
+
+        fd, tmp_path = tempfile.mkstemp(dir=tenant_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        with self._lock:
+            self._counters["stores"] += 1
+            if self._size is None:
+                self._current_size()  # Verzeichnis-Scan enthält die neue Datei bereits
+            else:
+                self._size += len(data)
+            self._evict(keep=path)
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        """Zu alte Einträge löschen, danach nach Zugriffszeit bis unter die Größengrenze."""
+        now = time.time()
+        sweep_age = now - self._last_age_sweep > AGE_SWEEP_INTERVAL
+        if not sweep_age and self._current_size() <= self.max_bytes:
+            return
+
+        entries = self._entries()
+        self._size = sum(stat.st_size for _path, stat in entries)
+        if sweep_age:
+            self._last_age_sweep = now
+            for path, stat in list(entries):
+                if now - stat.st_mtime > self.max_age_seconds:
+                    self._remove(path)
+                    self._counters["evictions"] += 1
+                    entries.remove((path, stat))
+
+        for path, _stat in sorted(entries, key=lambda entry: entry[1].st_atime):
+            if self._size <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            self._remove(path)
+            self._counters["evictions"] += 1
+
+    def get_or_render(
+        self,
+        tenant_id: int,
+        kind: str,
+        entity_id: int,
+        key: str,
+        render: Callable[[], bytes],
+    ) -> bytes:
+        """Gecachte PDF liefern oder über ``render`` erzeugen und ablegen."""
+        data = self.get(tenant_id, kind, entity_id, key)
+        if data is not None:
+            return data
+        data = render()
+        self.put(tenant_id, kind, entity_id, key, data)
+        return data
+
+    def invalidate(self, tenant_id: int, kind: Optional[str] = None, entity_id: Optional[int] = None) -> int:
+        """PDFs eines Dokuments oder (ohne ``kind``) des ganzen Mandanten löschen."""
+        tenant_dir = self._tenant_dir(tenant_id)
+        if not os.path.isdir(tenant_dir):
+            return 0
+        prefix = f"{kind}_{entity_id}_" if kind is not None else ""
+        removed = 0
+        with self._lock:
+            for name in os.listdir(tenant_dir):
+                if name.endswith(".pdf") and name.startswith(prefix):
+                    self._remove(os.path.join(tenant_dir, name))
+                    removed += 1
+            self._counters["invalidations"] += removed
+        return removed
+
+    def metrics(self) -> Dict[str, Any]:
+        """Treffer-/Fehlschlagzähler und aktuelle Größe."""
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                "enabled": self.enabled,
+                **self._counters,
+                "hit_ratio": round(self._counters["hits"] / lookups, 3) if lookups else 0.0,
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
+
+
+pdf_cache = PdfCache(
+    directory=os.getenv("PDF_CACHE_DIR", DEFAULT_CACHE_DIR),
+    max_bytes=int(os.getenv("PDF_CACHE_MAX_BYTES", str(DEFAULT_MAX_BYTES))),
+    max_age_days=float(os.getenv("PDF_CACHE_MAX_AGE_DAYS", str(DEFAULT_MAX_AGE_DAYS))),
+)
+
+
+# ---------------------------------------------------------------------------
+# Automatische Invalidierung
+# ---------------------------------------------------------------------------
+
+def _collect_invalidations(session: OrmSession, flush_context: Any, instances: Any) -> None:
+    pending: Set[Tuple[int, Optional[str], Optional[int]]] = session.info.setdefault(_PENDING_KEY, set())
+    for obj in list(session.dirty) + list(session.deleted):
+        tenant_id = getattr(obj, "tenant_id", None)
+        if tenant_id is None:
+            continue
+        kind = DOCUMENT_KINDS.get(type(obj))
+        if kind is not None and obj.id is not None:
+            pending.add((tenant_id, kind, obj.id))
+        elif isinstance(obj, BRANDING_MODELS):
+            pending.add((tenant_id, None, None))
+    for obj in session.new:
+        if isinstance(obj, BRANDING_MODELS) and getattr(obj, "tenant_id", None) is not None:
+            pending.add((obj.tenant_id, None, None))
+
+
+def _apply_invalidations(session: OrmSession) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending or not pdf_cache.enabled:
+        return
+    for tenant_id, kind, entity_id in pending:
+        pdf_cache.invalidate(tenant_id, kind, entity_id)
+
+
+def _discard_invalidations(session: OrmSession) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def register_pdf_cache_listeners() -> None:
+    """Registriert die Session-Listener (idempotent)."""
+    if not event.contains(OrmSession, "before_flush", _collect_invalidations):
+        event.listen(OrmSession, "before_flush", _collect_invalidations)
+        event.listen(OrmSession, "after_commit", _apply_invalidations)
+        event.listen(OrmSession, "after_rollback", _discard_invalidations)
+
+
+register_pdf_cache_listeners()
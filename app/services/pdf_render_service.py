@@ -0,0 +1,375 @@
+"""Rendern von Rechnungs- und Angebots-PDFs in einem Prozesspool.
+
+ReportLab und fpdf sind CPU-lastig und halten den GIL. Im Request-Worker
+ausgeführt, bremst ein Schwung PDF-Downloads am Monatsende alle anderen
+Anfragen aus. ``PdfRenderService`` verlagert das Rendern in eigene Prozesse:
+
+- ``submit`` legt einen Render-Job an und liefert dessen ID,
+- ``status`` / ``result`` fragen den Job ab (Polling oder blockierend),
+- ``render`` (async) bzw. ``render_sync`` warten auf das Ergebnis.
+
+Jeder Worker ist ein eigener Ein-Prozess-Pool; Jobs warten in einer eigenen
+Warteschlange, bis ein Worker frei ist. Der Timeout läuft deshalb erst ab dem
+Start des Jobs, Wartezeit in der Warteschlange zählt nicht mit. Überschreitet
+ein laufender Job den Timeout oder wird er abgebrochen, wird sein Worker-Prozess
+beendet und ersetzt, sodass ein hängender Renderer keine Kapazität blockiert;
+wartende Aufrufer erhalten HTTP 504. Ist die Warteschlange voll, lehnt
+``submit`` neue Jobs sofort mit HTTP 503 ab, statt sie in den Timeout laufen
+zu lassen.
+
+Konfiguration über Umgebungsvariablen:
+
+- ``PDF_RENDER_WORKERS``: Anzahl Render-Prozesse; ``0`` rendert direkt im
+  aufrufenden Thread (Tests, Entwicklung)
+- ``PDF_RENDER_TIMEOUT``: Timeout pro Job ab Start in Sekunden (Standard: 30)
+- ``PDF_RENDER_MAX_QUEUE``: Höchstzahl wartender Jobs (Standard: 32)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import CancelledError, Future, InvalidStateError, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from app.services.beautiful_pdf_generator import render_invoice_pdf
+from app.utils.pdf_utils import create_invoice_pdf, create_offer_pdf
+
+# Renderer werden per Name übergeben, damit nur einfache Daten in den Prozess wandern
+RENDERERS: Dict[str, Callable[..., bytes]] = {
+    "invoice": render_invoice_pdf,
+    "invoice_simple": create_invoice_pdf,
+    "offer": create_offer_pdf,
+}
+
+DEFAULT_WORKERS = min(2, os.cpu_count() or 1)
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_MAX_QUEUE = 32
+# Abgeschlossene Jobs, die für Polling vorgehalten werden
+MAX_FINISHED_JOBS = 256
+
+
+class RenderTimeout(Exception):
+    """Job lief länger als sein Timeout und wurde beendet."""
+
+
+def _render(kind: str, args: tuple) -> bytes:
+    """Einstiegspunkt im Worker-Prozess."""
+    return RENDERERS[kind](*args)
+
+
+def _settle(future: Future, result: Optional[bytes] = None, exc: Optional[BaseException] = None) -> None:
+    """Ergebnis setzen, sofern der Job nicht inzwischen abgebrochen wurde."""
+    try:
+        if exc is not None:
+            future.set_exception(exc)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+def _kill_worker(executor: ProcessPoolExecutor) -> None:
+    """Ein-Prozess-Pool sofort beenden, auch wenn sein Renderer hängt."""
+    kill_workers = getattr(executor, "kill_workers", None)  # ab Python 3.14
+    if kill_workers is not None:
+        kill_workers()
+    else:
+        for process in list((getattr(executor, "_processes", None) or {}).values()):
+            process.kill()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+@dataclass(eq=False)
+class RenderJob:
+    """Ein eingereichter Render-Auftrag."""
+
+    id: str
+    kind: str
+    args: tuple
+    timeout: float
+    future: Future = field(default_factory=Future)
+    submitted_at: float = field(default_factory=time.monotonic)
+    started_at: Optional[float] = None
+    slot: Optional[int] = None
+    timer: Optional[threading.Timer] = None
+    cancelled: bool = False
+    timed_out: bool = False
+
+    @property
+    def state(self) -> str:
+        if self.timed_out:
+            return "timeout"
+        if self.cancelled or self.future.cancelled():
+            return "cancelled"
+        if not self.future.done():
+            return "pending" if self.started_at is None else "running"
+        return "failed" if self.future.exception() is not None else "done"
+
+
+class PdfRenderService:
+    """Job-basierter PDF-Renderer mit Prozesspool."""
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        timeout: float = DEFAULT_TIMEOUT,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+    ):
+        self.workers = max(0, workers)
+        self.timeout = timeout
+        self.max_queue = max(0, max_queue)
+        self._lock = threading.Lock()
+        # Ein Ein-Prozess-Pool pro Worker, damit ein hängender Job einzeln ersetzt werden kann
+        self._slots: List[Optional[ProcessPoolExecutor]] = [None] * self.workers
+        self._running: Dict[int, RenderJob] = {}
+        self._queue: Deque[RenderJob] = deque()
+        self._jobs: Dict[str, RenderJob] = {}
+        self._counters = {
+            "submitted": 0, "completed": 0, "failed": 0, "timeouts": 0,
+            "cancelled": 0, "rejected": 0, "recycled": 0,
+        }
+        self._render_seconds = 0.0
+
+    def _prune_jobs(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.future.done()]
+        for job_id in finished[: max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+    def _release_slot(self, job: RenderJob, recycle: bool) -> Optional[ProcessPoolExecutor]:
+        """Worker eines laufenden Jobs freigeben (Aufruf unter ``_lock``).
+
+        Returns:
+            Optional[ProcessPoolExecutor]: Zu beendender Pool, wenn ``recycle`` gesetzt ist
+        """
+        del self._running[job.slot]
+        if job.timer is not None:
+            job.timer.cancel()
+        if not recycle:
+            return None
+        executor, self._slots[job.slot] = self._slots[job.slot], None
+        self._counters["recycled"] += 1
+        return executor
+
+    def _dispatch(self) -> None:
+        """Wartende Jobs auf freie Worker verteilen."""
+        while True:
+            with self._lock:
+                slot = next((index for index in range(self.workers) if index not in self._running), None)
+                if slot is None or not self._queue:
+                    return
+                job = self._queue.popleft()
+                executor = self._slots[slot]
+                if executor is None:
+                    executor = self._slots[slot] = ProcessPoolExecutor(max_workers=1)
+                job.slot = slot
+                job.started_at = time.monotonic()
+                job.timer = threading.Timer(job.timeout, self._expire, (job,))
+                job.timer.daemon = True
+                self._running[slot] = job
+            job.timer.start()
+            try:
+                running = executor.submit(_render, job.kind, job.args)
+            except RuntimeError as exc:  # Pool wurde parallel beendet
+                with self._lock:
+                    if self._running.get(slot) is job:
+                        self._release_slot(job, recycle=True)
+                        self._counters["failed"] += 1
+                _settle(job.future, exc=exc)
+                continue
+            running.add_done_callback(lambda done, job=job: self._on_done(job, done))
+
+    def _on_done(self, job: RenderJob, running: Future) -> None:
+        with self._lock:
+            if self._running.get(job.slot) is not job:
+                # Bereits durch Timeout oder Abbruch freigegeben
+                return
+            self._release_slot(job, recycle=False)
+            exc = CancelledError() if running.cancelled() else running.exception()
+            if exc is not None:
+                self._counters["failed"] += 1
+            else:
+                self._counters["completed"] += 1
+                self._render_seconds += time.monotonic() - job.started_at
+        if exc is not None:
+            _settle(job.future, exc=exc)
+        else:
+            _settle(job.future, running.result())
+        self._dispatch()
+
+    def _expire(self, job: RenderJob) -> None:
+        """Timeout eines laufenden Jobs: Worker-Prozess ersetzen und Wartende mit 504 bedienen."""
+        with self._lock:
+            if self._running.get(job.slot) is not job:
+                return
+            executor = self._release_slot(job, recycle=True)
+            job.timed_out = True
+            self._counters["timeouts"] += 1
+        if executor is not None:
+            _kill_worker(executor)
+        _settle(job.future, exc=RenderTimeout(job.id))
+        self._dispatch()
+
+    def submit(self, kind: str, *args: Any, timeout: Optional[float] = None) -> str:
+        """
+        Render-Job einreichen und Job-ID zurückgeben.
+
+        Args:
+            kind: Name des Renderers aus ``RENDERERS``
+            timeout: Laufzeitgrenze ab Start des Jobs (Standard: ``self.timeout``)
+
+        Raises:
+            HTTPException: 503, wenn die Warteschlange voll ist
+        """
+        if kind not in RENDERERS:
+            raise ValueError(f"Unbekannter PDF-Typ: {kind}")
+
+        job = RenderJob(
+            id=uuid.uuid4().hex, kind=kind, args=args,
+            timeout=self.timeout if timeout is None else timeout,
+        )
+        if self.workers == 0:
+            job.started_at = job.submitted_at
+            try:
+                job.future.set_result(_render(kind, args))
+            except Exception as exc:
+                job.future.set_exception(exc)
+            elapsed = time.monotonic() - job.started_at
+
+        with self._lock:
+            if self.workers > 0:
+                if len(self._queue) >= self.max_queue:
+                    self._counters["rejected"] += 1
+                    raise HTTPException(
+                        status_code=503,
+                        detail="PDF-Erstellung ist ausgelastet, bitte später erneut versuchen",
+                        headers={"Retry-After": str(max(1, int(self.timeout)))},
+                    )
+                self._queue.append(job)
+            elif job.future.exception() is not None:
+                self._counters["failed"] += 1
+            else:
+                self._counters["completed"] += 1
+                self._render_seconds += elapsed
+            self._counters["submitted"] += 1
+            self._jobs[job.id] = job
+            self._prune_jobs()
+        self._dispatch()
+        return job.id
+
+    def _get_job(self, job_id: str) -> RenderJob:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        return job
+
+    def status(self, job_id: str) -> str:
+        """Zustand eines Jobs: pending, running, done, failed, timeout oder cancelled."""
+        return self._get_job(job_id).state
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Job abbrechen.
+
+        Wartende Jobs werden aus der Warteschlange entfernt. Für laufende Jobs wird
+        der Worker-Prozess beendet und ersetzt, damit der Platz sofort frei wird.
+
+        Returns:
+            bool: True, wenn der Job abgebrochen wurde
+        """
+        job = self._get_job(job_id)
+        executor = None
+        with self._lock:
+            if job.future.done():
+                return job.future.cancelled()
+            job.cancelled = True
+            self._counters["cancelled"] += 1
+            if self._running.get(job.slot) is job:
+                executor = self._release_slot(job, recycle=True)
+            elif job in self._queue:
+                self._queue.remove(job)
+        if executor is not None:
+            _kill_worker(executor)
+            self._dispatch()
+        return job.future.cancel()
+
+    def _outcome(self, job: RenderJob) -> bytes:
+        try:
+            return job.future.result()
+        except RenderTimeout:
+            raise HTTPException(status_code=504, detail="PDF-Erstellung hat zu lange gedauert")
+        except CancelledError:
+            raise HTTPException(status_code=409, detail="PDF-Job wurde abgebrochen")
+
+    def result(self, job_id: str) -> bytes:
+        """
+        Auf das Ergebnis warten (blockierend).
+
+        Die Wartezeit ist durch die Warteschlangengrenze und den Timeout ab Start begrenzt.
+
+        Raises:
+            HTTPException: 504 bei Timeout, 409 bei abgebrochenem Job
+        """
+        return self._outcome(self._get_job(job_id))
+
+    async def wait(self, job_id: str) -> bytes:
+        """Auf das Ergebnis warten, ohne die Event-Loop zu blockieren."""
+        job = self._get_job(job_id)
+        try:
+            # shield: Abbruch des wartenden Tasks bricht nicht den Job ab
+            await asyncio.shield(asyncio.wrap_future(job.future))
+        except (Exception, asyncio.CancelledError):
+            if not job.future.done():
+                raise
+        return self._outcome(job)
+
+    def render_sync(self, kind: str, *args: Any, timeout: Optional[float] = None) -> bytes:
+        """Rendern und blockierend warten (für synchrone Endpunkte im Threadpool)."""
+        return self.result(self.submit(kind, *args, timeout=timeout))
+
+    async def render(self, kind: str, *args: Any, timeout: Optional[float] = None) -> bytes:
+        """Rendern und asynchron warten (für ``async def``-Endpunkte)."""
+        return await self.wait(self.submit(kind, *args, timeout=timeout))
+
+    def metrics(self) -> Dict[str, Any]:
+        """Zähler, Auslastung und durchschnittliche Renderdauer."""
+        with self._lock:
+            completed = self._counters["completed"]
+            return {
+                "workers": self.workers,
+                "pending": len(self._queue),
+                "running": len(self._running),
+                "max_queue": self.max_queue,
+                **self._counters,
+                "avg_ms": round(self._render_seconds / completed * 1000, 2) if completed else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        """Prozesspool beenden; wartende Jobs werden verworfen, laufende zu Ende gerendert."""
+        with self._lock:
+            queued = list(self._queue)
+            self._queue.clear()
+            executors = [executor for executor in self._slots if executor is not None]
+        for job in queued:
+            job.cancelled = True
+            job.future.cancel()
+        # Hängende Jobs beendet weiterhin ihr Timeout
+        for executor in executors:
+            executor.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            self._slots = [None] * self.workers
+
+
+pdf_render_service = PdfRenderService(
+    workers=int(os.getenv("PDF_RENDER_WORKERS", str(DEFAULT_WORKERS))),
+    timeout=float(os.getenv("PDF_RENDER_TIMEOUT", str(DEFAULT_TIMEOUT))),
+    max_queue=int(os.getenv("PDF_RENDER_MAX_QUEUE", str(DEFAULT_MAX_QUEUE))),
+)
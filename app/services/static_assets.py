@@ -0,0 +1,227 @@
+"""Vorkomprimierte, fingerprinted Auslieferung der Frontend-Dateien.
+
+Beim Start werden ``index.html``, ``login.html``, ``app.js`` und
+``app_simple.js`` einmal gelesen, per SHA-256 mit einem Fingerprint versehen
+und als gzip- und (falls das Paket ``brotli`` installiert ist) Brotli-Variante
+im Speicher abgelegt. Pro Request wird nur noch anhand von
+``Accept-Encoding`` die passende Variante gewählt.
+
+- Versionierte URLs ``/assets/<name>.<fingerprint><endung>`` sind unveränderlich
+  und werden ein Jahr gecacht (``immutable``).
+- ``/app``, ``/login`` und ``/app_simple.js`` behalten ihre URL und werden per
+  ETag revalidiert. Verweise in den HTML-Seiten auf gebündelte Dateien
+  (``src="static/app.js"``) werden beim Laden auf die versionierte URL umgeschrieben.
+
+Konfiguration über Umgebungsvariablen:
+
+- ``STATIC_DIR``: Verzeichnis der Frontend-Dateien (Standard: ``static``)
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from mimetypes import guess_type
+from typing import Dict, Iterable, Optional
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+    brotli = None
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from app.utils.http_cache import IMMUTABLE_MAX_AGE, etag_matches
+
+logger = logging.getLogger(__name__)
+
+ASSET_NAMES = ("index.html", "login.html", "app.js", "app_simple.js")
+ASSET_URL_PREFIX = "/assets/"
+FINGERPRINT_LENGTH = 12
+# Kleinere Dateien lohnen die Komprimierung nicht
+MIN_COMPRESS_SIZE = 1024
+
+# Bevorzugte Reihenfolge bei gleicher Gewichtung im Accept-Encoding
+ENCODING_PREFERENCE = ("br", "gzip")
+
+_REFERENCE_PATTERN = re.compile(r'(src|href)="/?static/([\w.-]+)"')
+
+
+@dataclass
+class StaticAsset:
+    """Eine Frontend-Datei mit allen vorberechneten Kodierungen."""
+
+    name: str
+    media_type: str
+    fingerprint: str
+    bodies: Dict[str, bytes] = field(default_factory=dict)  # "identity", "gzip", "br"
+
+    @property
+    def hashed_name(self) -> str:
+        stem, extension = os.path.splitext(self.name)
+        return f"{stem}.{self.fingerprint}{extension}"
+
+    @property
+    def url(self) -> str:
+        return f"{ASSET_URL_PREFIX}{self.hashed_name}"
+
+    def etag(self, encoding: str) -> str:
+        if encoding == "identity":
+            return f'"{self.fingerprint}"'
+        return f'"{self.fingerprint}-{encoding}"'
+
+
+def negotiate_encoding(accept_encoding: Optional[str], available: Iterable[str]) -> str:
+    """
+    Kodierung anhand von ``Accept-Encoding`` wählen.
+
+    Returns:
+        str: ``"br"``, ``"gzip"`` oder ``"identity"``
+    """
+    if not accept_encoding:
+        return "identity"
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding] = weight
+
+    wildcard = weights.get("*", 0.0)
+    best, best_weight = "identity", 0.0
+    for coding in ENCODING_PREFERENCE:
+        if coding not in available:
+            continue
+        weight = weights.get(coding, wildcard)
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+class StaticAssetBundle:
+    """Hält die Frontend-Dateien vorkomprimiert im Speicher."""
+
+    def __init__(self, directory: str = "static", names: Iterable[str] = ASSET_NAMES):
+        self.directory = directory
+        self.names = tuple(names)
+        self._assets: Dict[str, StaticAsset] = {}
+        self._by_hashed_name: Dict[str, StaticAsset] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _build(self, name: str, content: bytes) -> StaticAsset:
+        media_type = guess_type(name)[0] or "application/octet-stream"
+        if media_type.endswith("javascript") and not media_type.startswith("text/"):
+            # text/* erhält den Zeichensatz bereits von Starlette
+            media_type = f"{media_type}; charset=utf-8"
+        asset = StaticAsset(
+            name=name,
+            media_type=media_type,
+            fingerprint=hashlib.sha256(content).hexdigest()[:FINGERPRINT_LENGTH],
+            bodies={"identity": content},
+        )
+        if len(content) >= MIN_COMPRESS_SIZE:
+            # mtime=0: identische Eingaben ergeben identische Bytes
+            compressed = gzip.compress(content, compresslevel=9, mtime=0)
+            if len(compressed) < len(content):
+                asset.bodies["gzip"] = compressed
+            if BROTLI_AVAILABLE:
+                compressed = brotli.compress(content, quality=11)
+                if len(compressed) < len(content):
+                    asset.bodies["br"] = compressed
+        return asset
+
+    def _rewrite_references(self, html: bytes, assets: Dict[str, StaticAsset]) -> bytes:
+        def replace(match: re.Match) -> str:
+            asset = assets.get(match.group(2))
+            if asset is None:
+                return match.group(0)
+            return f'{match.group(1)}="{asset.url}"'
+
+        return _REFERENCE_PATTERN.sub(replace, html.decode("utf-8")).encode("utf-8")
+
+    def load(self) -> None:
+        """Dateien lesen, fingerprinten und komprimieren (beim Start aufrufen)."""
+        sources: Dict[str, bytes] = {}
+        for name in self.names:
+            try:
+                with open(os.path.join(self.directory, name), "rb") as handle:
+                    sources[name] = handle.read()
+            except OSError:
+                logger.warning("Frontend-Datei %s nicht gefunden", name)
+
+        # Skripte zuerst, damit HTML-Seiten auf ihre versionierten URLs verweisen
+        assets: Dict[str, StaticAsset] = {}
+        for name, content in sources.items():
+            if not name.endswith(".html"):
+                assets[name] = self._build(name, content)
+        for name, content in sources.items():
+            if name.endswith(".html"):
+                assets[name] = self._build(name, self._rewrite_references(content, assets))
+
+        with self._lock:
+            self._assets = assets
+            self._by_hashed_name = {asset.hashed_name: asset for asset in assets.values()}
+            self._loaded = True
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            self.load()
+
+    def get(self, name: str) -> Optional[StaticAsset]:
+        """Datei unter ihrem ursprünglichen Namen."""
+        self._ensure_loaded()
+        return self._assets.get(name)
+
+    def get_hashed(self, hashed_name: str) -> Optional[StaticAsset]:
+        """Datei unter ihrem versionierten Namen."""
+        self._ensure_loaded()
+        return self._by_hashed_name.get(hashed_name)
+
+    def response(self, request: Request, asset: StaticAsset, immutable: bool = False) -> Response:
+        """Passende Kodierung ausliefern bzw. ``304`` bei unverändertem ETag."""
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"), asset.bodies)
+        etag = asset.etag(encoding)
+        headers = {
+            "ETag": etag,
+            "Vary": "Accept-Encoding",
+            "Cache-Control": f"public, max-age={IMMUTABLE_MAX_AGE}, immutable" if immutable else "no-cache",
+        }
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None and etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=asset.bodies[encoding], media_type=asset.media_type, headers=headers)
+
+    def metrics(self) -> Dict[str, object]:
+        """Anzahl und Größen der vorgehaltenen Dateien je Kodierung."""
+        sizes: Dict[str, int] = {}
+        for asset in self._assets.values():
+            for encoding, body in asset.bodies.items():
+                sizes[encoding] = sizes.get(encoding, 0) + len(body)
+        return {
+            "assets": len(self._assets),
+            "brotli_available": BROTLI_AVAILABLE,
+            "bytes": sizes,
+        }
+
+
+static_assets = StaticAssetBundle(os.getenv("STATIC_DIR", "static"))
@@ -0,0 +1,416 @@
+"""Inkrementell gepflegte Dashboard-Kennzahlen pro Mandant.
+
+Jeder Flush einer Session, der Projekte, Rechnungen, Angebote, Berichte oder
+Stundeneinträge anlegt, ändert oder löscht, schreibt die Differenz in die
+Zeile ``tenant_stats`` des Mandanten – in derselben Transaktion wie die
+eigentliche Änderung. Das Dashboard liest danach nur noch diese eine Zeile.
+
+Fehlt die Zeile (z. B. bei Bestandsdaten), wird sie beim ersten Dashboard-Aufruf
+aus den Quelltabellen neu berechnet.
+
+Aufruf:
+    python -m app.services.tenant_stats rebuild [--tenant-id ID]
+    python -m app.services.tenant_stats check [--tenant-id ID]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, inspect, select as sa_select
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session, select, func
+
+from app.models import Invoice, Offer, Project, Report, Tenant, TenantStats, TimeEntry, TimeEntryDaily
+
+
+JSON_COLUMNS = (
+    "project_status_counts",
+    "invoice_status_counts",
+    "invoice_revenue_by_status",
+    "revenue_by_month",
+    "offer_status_counts",
+    "hours_by_week",
+)
+SCALAR_COLUMNS = ("report_count", "total_hours")
+
+# Abweichungen unterhalb dieser Schwelle gelten als Rundungsrauschen
+FLOAT_TOLERANCE = 0.01
+
+_PENDING_KEY = "tenant_stats_deltas"
+
+# (Spalte, Schlüssel im JSON-Objekt oder None für Skalare) -> Differenz
+Delta = Dict[Tuple[str, Optional[str]], float]
+
+
+def month_key(value: Any) -> Optional[str]:
+    """Monats-Bucket (``YYYY-MM``) für ein Datum."""
+    if value is None:
+        return None
+    return f"{value.year:04d}-{value.month:02d}"
+
+
+def week_key(value: Any) -> Optional[str]:
+    """Wochen-Bucket: ISO-Datum des Montags der Woche."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        value = value.date()
+    return (value - timedelta(days=value.weekday())).isoformat()
+
+
+def _project_contribution(values: Dict[str, Any]) -> Delta:
+    return {("project_status_counts", values["status"]): 1}
+
+
+def _invoice_contribution(values: Dict[str, Any]) -> Delta:
+    amount = values["total_amount"] or 0.0
+    return {
+        ("invoice_status_counts", values["status"]): 1,
+        ("invoice_revenue_by_status", values["status"]): amount,
+        ("revenue_by_month", month_key(values["invoice_date"])): amount,
+    }
+
+
+def _offer_contribution(values: Dict[str, Any]) -> Delta:
+    return {("offer_status_counts", values["status"]): 1}
+
+
+def _report_contribution(values: Dict[str, Any]) -> Delta:
+    return {("report_count", None): 1}
+
+
+def _time_entry_contribution(values: Dict[str, Any]) -> Delta:
+    hours = values["hours_worked"] or 0.0
+    return {
+        ("total_hours", None): hours,
+        ("hours_by_week", week_key(values["work_date"])): hours,
+    }
+
+
+# Modell -> (relevante Felder, Beitrag zur Statistik)
+TRACKED_MODELS: Dict[type, Tuple[Tuple[str, ...], Callable[[Dict[str, Any]], Delta]]] = {
+    Project: (("tenant_id", "status"), _project_contribution),
+    Invoice: (("tenant_id", "status", "total_amount", "invoice_date"), _invoice_contribution),
+    Offer: (("tenant_id", "status"), _offer_contribution),
+    Report: (("tenant_id",), _report_contribution),
+    TimeEntry: (("tenant_id", "hours_worked", "work_date"), _time_entry_contribution),
+}
+
+
+def empty_stats() -> Dict[str, Any]:
+    stats: Dict[str, Any] = {column: {} for column in JSON_COLUMNS}
+    stats["report_count"] = 0
+    stats["total_hours"] = 0.0
+    return stats
+
+
+def _normalize(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Rundet Summen und entfernt leere Buckets, damit Vergleiche stabil sind."""
+    normalized: Dict[str, Any] = {}
+    for column in JSON_COLUMNS:
+        buckets = {}
+        for key, value in stats[column].items():
+            value = round(float(value), 6)
+            if abs(value) > 1e-9:
+                buckets[key] = int(value) if column.endswith("_counts") else value
+        normalized[column] = dict(sorted(buckets.items()))
+    normalized["report_count"] = int(stats["report_count"])
+    normalized["total_hours"] = round(float(stats["total_hours"]), 6)
+    return normalized
+
+
+def apply_delta(stats: Dict[str, Any], delta: Delta) -> Dict[str, Any]:
+    for (column, key), value in delta.items():
+        if column in SCALAR_COLUMNS:
+            stats[column] += value
+        elif key is not None:
+            stats[column][key] = stats[column].get(key, 0) + value
+    return _normalize(stats)
+
+
+def _row_to_stats(row: Any) -> Dict[str, Any]:
+    stats = {column: json.loads(getattr(row, column) or "{}") for column in JSON_COLUMNS}
+    for column in SCALAR_COLUMNS:
+        stats[column] = getattr(row, column) or 0
+    return stats
+
+
+def _stats_to_columns(stats: Dict[str, Any]) -> Dict[str, Any]:
+    columns = {column: json.dumps(stats[column], separators=(",", ":")) for column in JSON_COLUMNS}
+    for column in SCALAR_COLUMNS:
+        columns[column] = stats[column]
+    columns["updated_at"] = datetime.utcnow()
+    return columns
+
+
+# ---------------------------------------------------------------------------
+# Flush-Listener
+# ---------------------------------------------------------------------------
+
+def old_values(session: OrmSession, obj: Any, fields: Iterable[str]) -> Dict[str, Any]:
+    """Werte vor der Änderung; unbekannte Altwerte werden aus der Datenbank gelesen."""
+    state = inspect(obj)
+    values: Dict[str, Any] = {}
+    missing = []
+    for field in fields:
+        history = state.attrs[field].history
+        if history.deleted:
+            values[field] = history.deleted[0]
+        elif history.unchanged:
+            values[field] = history.unchanged[0]
+        else:
+            # Nicht geladen oder ohne vorheriges Laden überschrieben
+            missing.append(field)
+
+    if missing:
+        table = type(obj).__table__
+        row = session.connection().execute(
+            sa_select(*[table.c[field] for field in missing]).where(table.c.id == obj.id)
+        ).first()
+        for field in missing:
+            values[field] = getattr(row, field) if row is not None else None
+    return values
+
+
+def _collect_deltas(session: OrmSession, flush_context: Any, instances: Any) -> None:
+    deltas: Dict[int, Delta] = defaultdict(lambda: defaultdict(float))
+
+    def add(values: Dict[str, Any], contribution: Callable, sign: int) -> None:
+        tenant_id = values["tenant_id"]
+        if tenant_id is None:
+            return
+        for key, value in contribution(values).items():
+            deltas[tenant_id][key] += sign * value
+
+    for obj in session.new:
+        tracked = TRACKED_MODELS.get(type(obj))
+        if tracked:
+            fields, contribution = tracked
+            add({field: getattr(obj, field) for field in fields}, contribution, 1)
+
+    for obj in session.dirty:
+        tracked = TRACKED_MODELS.get(type(obj))
+        if not tracked or not session.is_modified(obj, include_collections=False):
+            continue
+        fields, contribution = tracked
+        state = inspect(obj)
+        if not any(state.attrs[field].history.has_changes() for field in fields):
+            continue
+        old = old_values(session, obj, fields)
+        new = {field: getattr(obj, field) for field in fields}
+        add(old, contribution, -1)
+        add(new, contribution, 1)
+
+    for obj in session.deleted:
+        tracked = TRACKED_MODELS.get(type(obj))
+        if tracked:
+            fields, contribution = tracked
+            add(old_values(session, obj, fields), contribution, -1)
+
+    session.info[_PENDING_KEY] = deltas
+
+
+def _write_deltas(connection: Any, deltas: Dict[int, Delta], new_tenant_ids: Iterable[int] = ()) -> None:
+    table = TenantStats.__table__
+    try:
+        for tenant_id in new_tenant_ids:
+            connection.execute(
+                table.insert().prefix_with("OR IGNORE"),
+                {"tenant_id": tenant_id, **_stats_to_columns(empty_stats())},
+            )
+
+        for tenant_id, delta in deltas.items():
+            row = connection.execute(table.select().where(table.c.tenant_id == tenant_id)).first()
+            if row is None:
+                # Noch nicht aufgebaut – wird beim nächsten Dashboard-Aufruf neu berechnet
+                continue
+            stats = apply_delta(_row_to_stats(row), delta)
+            connection.execute(
+                table.update().where(table.c.tenant_id == tenant_id).values(**_stats_to_columns(stats))
+            )
+    except OperationalError as exc:
+        # Legacy-Datenbank ohne tenant_stats-Tabelle: Kennzahlen nicht pflegen
+        if "no such table" not in str(exc):
+            raise
+
+
+def _apply_deltas(session: OrmSession, flush_context: Any) -> None:
+    deltas = session.info.pop(_PENDING_KEY, None) or {}
+    new_tenant_ids = [obj.id for obj in session.new if isinstance(obj, Tenant) and obj.id is not None]
+    if not deltas and not new_tenant_ids:
+        return
+    _write_deltas(session.connection(), deltas, new_tenant_ids)
+
+
+def record_bulk_insert(session: OrmSession, model: type, rows: Iterable[Dict[str, Any]]) -> None:
+    """
+    Kennzahlen für Zeilen fortschreiben, die per Core-Insert am ORM vorbei
+    angelegt wurden (z. B. Massenimport). Läuft in der Transaktion der Session.
+    """
+    _, contribution = TRACKED_MODELS[model]
+    deltas: Dict[int, Delta] = defaultdict(lambda: defaultdict(float))
+    for values in rows:
+        if values.get("tenant_id") is None:
+            continue
+        for key, value in contribution(values).items():
+            deltas[values["tenant_id"]][key] += value
+    if deltas:
+        _write_deltas(session.connection(), deltas)
+
+
+def register_tenant_stats_listeners() -> None:
+    """Registriert die Flush-Listener (idempotent)."""
+    if not event.contains(OrmSession, "before_flush", _collect_deltas):
+        event.listen(OrmSession, "before_flush", _collect_deltas)
+        event.listen(OrmSession, "after_flush", _apply_deltas)
+
+
+register_tenant_stats_listeners()
+
+
+# ---------------------------------------------------------------------------
+# Service
+# ---------------------------------------------------------------------------
+
+class TenantStatsService:
+    """Lesen, Neuaufbau und Konsistenzprüfung der Mandanten-Kennzahlen."""
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def compute(self, tenant_id: int) -> Dict[str, Any]:
+        """Kennzahlen vollständig aus den Quelltabellen berechnen."""
+        stats = empty_stats()
+
+        for status, count in self.session.exec(
+            select(Project.status, func.count()).where(Project.tenant_id == tenant_id).group_by(Project.status)
+        ).all():
+            stats["project_status_counts"][status] = count
+
+        for status, count, amount in self.session.exec(
+            select(Invoice.status, func.count(), func.sum(Invoice.total_amount))
+            .where(Invoice.tenant_id == tenant_id)
+            .group_by(Invoice.status)
+        ).all():
+            stats["invoice_status_counts"][status] = count
+            stats["invoice_revenue_by_status"][status] = amount or 0.0
+
+        month = func.strftime("%Y-%m", Invoice.invoice_date)
+        for bucket, amount in self.session.exec(
+            select(month, func.sum(Invoice.total_amount)).where(Invoice.tenant_id == tenant_id).group_by(month)
+        ).all():
+            if bucket is not None:
+                stats["revenue_by_month"][bucket] = amount or 0.0
+
+        for status, count in self.session.exec(
+            select(Offer.status, func.count()).where(Offer.tenant_id == tenant_id).group_by(Offer.status)
+        ).all():
+            stats["offer_status_counts"][status] = count
+
+        stats["report_count"] = self.session.exec(
+            select(func.count()).select_from(Report).where(Report.tenant_id == tenant_id)
+        ).one()
+
+        # Aus der Tagesverdichtung; Montag der Woche, passend zu week_key()
+        from app.services.time_rollup import TimeRollupService  # time_rollup importiert dieses Modul
+
+        TimeRollupService(self.session).ensure(tenant_id)
+        week = func.date(TimeEntryDaily.work_date, "weekday 0", "-6 days")
+        for bucket, hours in self.session.exec(
+            select(week, func.sum(TimeEntryDaily.hours_worked))
+            .where(TimeEntryDaily.tenant_id == tenant_id)
+            .group_by(week)
+        ).all():
+            hours = hours or 0.0
+            stats["total_hours"] += hours
+            if bucket is not None:
+                stats["hours_by_week"][bucket] = hours
+
+        return _normalize(stats)
+
+    def get(self, tenant_id: int) -> Optional[Dict[str, Any]]:
+        row = self.session.get(TenantStats, tenant_id)
+        return _normalize(_row_to_stats(row)) if row else None
+
+    def rebuild(self, tenant_id: int) -> Dict[str, Any]:
+        """Zeile des Mandanten neu berechnen und speichern."""
+        stats = self.compute(tenant_id)
+        row = self.session.get(TenantStats, tenant_id)
+        if row is None:
+            row = TenantStats(tenant_id=tenant_id)
+        for column, value in _stats_to_columns(stats).items():
+            setattr(row, column, value)
+        self.session.add(row)
+        try:
+            self.session.commit()
+        except IntegrityError:
+            # Parallel angelegt – die andere Transaktion hat bereits aufgebaut
+            self.session.rollback()
+            return self.get(tenant_id) or stats
+        return stats
+
+    def get_or_rebuild(self, tenant_id: int) -> Dict[str, Any]:
+        return self.get(tenant_id) or self.rebuild(tenant_id)
+
+    def check(self, tenant_id: int) -> List[str]:
+        """Gespeicherte Kennzahlen mit einer Neuberechnung vergleichen."""
+        stored = self.get(tenant_id)
+        if stored is None:
+            return [f"Mandant {tenant_id}: keine Kennzahlen gespeichert"]
+        expected = self.compute(tenant_id)
+
+        differences = []
+        for column in SCALAR_COLUMNS:
+            if abs(stored[column] - expected[column]) > FLOAT_TOLERANCE:
+                differences.append(
+                    f"Mandant {tenant_id}: {column} gespeichert={stored[column]} erwartet={expected[column]}"
+                )
+        for column in JSON_COLUMNS:
+            for key in sorted(set(stored[column]) | set(expected[column])):
+                have = stored[column].get(key, 0)
+                want = expected[column].get(key, 0)
+                if abs(have - want) > FLOAT_TOLERANCE:
+                    differences.append(
+                        f"Mandant {tenant_id}: {column}[{key}] gespeichert={have} erwartet={want}"
+                    )
+        return differences
+
+    def tenant_ids(self) -> List[int]:
+        return list(self.session.exec(select(Tenant.id).order_by(Tenant.id)).all())
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Mandanten-Kennzahlen neu aufbauen oder prüfen")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--tenant-id", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    from app.database import engine
+
+    with Session(engine) as session:
+        service = TenantStatsService(session)
+        tenant_ids = [args.tenant_id] if args.tenant_id else service.tenant_ids()
+
+        if args.command == "rebuild":
+            for tenant_id in tenant_ids:
+                service.rebuild(tenant_id)
+                print(f"Mandant {tenant_id}: Kennzahlen neu aufgebaut")
+            return 0
+
+        differences = [line for tenant_id in tenant_ids for line in service.check(tenant_id)]
+        for line in differences:
+            print(line)
+        if not differences:
+            print(f"{len(tenant_ids)} Mandant(en) konsistent")
+        return 1 if differences else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+"""Hintergrund-Pipeline für Vorschaubilder von Berichts- und Projektfotos.
+
+Uploads speichern nur das Original und reichen einen Auftrag an die Pipeline
+weiter; die Antwort wartet nicht auf die Bildverarbeitung. Ein Auftrag erzeugt
+alle Größen aus ``THUMBNAIL_SIZES`` (längste Kante in Pixeln) als JPEG im
+Unterverzeichnis ``thumbs`` neben dem Original:
+
+- JPEGs werden im Draft-Modus dekodiert (der Decoder skaliert bereits um 1/2,
+  1/4 oder 1/8 herunter, statt das volle 12-MP-Foto zu entpacken),
+- die EXIF-Orientierung wird angewendet, damit Handyfotos aufrecht stehen,
+- kleinere Größen entstehen aus der jeweils nächstgrößeren Vorschau.
+
+Wird eine Vorschau angefragt, bevor der Auftrag fertig ist, wartet der Aufruf
+auf den laufenden Auftrag bzw. erzeugt die Größe direkt.
+
+Konfiguration über Umgebungsvariablen:
+
+- ``THUMBNAIL_WORKERS``: parallele Aufträge (Standard: 2; ``0`` = direkt im Request)
+- ``THUMBNAIL_MAX_QUEUE``: maximal wartende Aufträge (Standard: 256)
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from fastapi import HTTPException
+from PIL import Image, ImageOps
+
+THUMBNAIL_SIZES: Tuple[int, ...] = (160, 480, 1280)
+THUMBNAIL_DIRNAME = "thumbs"
+THUMBNAIL_QUALITY = 82
+
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_QUEUE = 256
+# Maximale Wartezeit auf einen laufenden Auftrag beim Abruf (Sekunden)
+DEFAULT_WAIT_TIMEOUT = 30.0
+
+
+def thumbnail_path(file_path: str, size: int) -> str:
+    """Pfad der Vorschau ``size`` zum Original ``file_path``."""
+    directory, filename = os.path.split(file_path)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, THUMBNAIL_DIRNAME, f"{stem}_{size}.jpg")
+
+
+def _save_jpeg(image: Image.Image, target: str) -> None:
+    directory = os.path.dirname(target)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            image.save(handle, "JPEG", quality=THUMBNAIL_QUALITY, optimize=True)
+        os.replace(tmp_path, target)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def generate_thumbnails(file_path: str, sizes: Iterable[int] = THUMBNAIL_SIZES) -> Dict[int, str]:
+    """
+    Vorschaubilder für ``file_path`` erzeugen.
+
+    Args:
+        file_path: Pfad des Originalbilds
+        sizes: Längste Kante der Vorschauen in Pixeln
+
+    Returns:
+        Dict[int, str]: Größe -> Pfad der erzeugten Datei
+    """
+    sizes = sorted(set(sizes), reverse=True)
+    if not sizes:
+        return {}
+    created: Dict[int, str] = {}
+    with Image.open(file_path) as source:
+        # Nur JPEG unterstützt Draft; das Ergebnis ist mindestens so groß wie angefragt
+        source.draft("RGB", (sizes[0], sizes[0]))
+        image = ImageOps.exif_transpose(source)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        for size in sizes:
+            image.thumbnail((size, size), Image.Resampling.LANCZOS)
+            target = thumbnail_path(file_path, size)
+            _save_jpeg(image, target)
+            created[size] = target
+    return created
+
+
+def remove_thumbnails(file_path: str) -> None:
+    """Alle Vorschauen eines Originals löschen."""
+    for size in THUMBNAIL_SIZES:
+        try:
+            os.remove(thumbnail_path(file_path, size))
+        except OSError:
+            pass
+
+
+class ThumbnailPipeline:
+    """Threadpool für Vorschau-Aufträge mit Warteschlangengrenze und Metriken."""
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, max_queue: int = DEFAULT_MAX_QUEUE):
+        self.workers = max(0, workers)
+        self.max_queue = max(0, max_queue)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Future] = {}
+        self._counters = {"submitted": 0, "completed": 0, "failed": 0, "skipped": 0, "on_demand": 0}
+        self._seconds = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="thumbs")
+            return self._executor
+
+    def _run(self, file_path: str) -> Dict[int, str]:
+        started = time.perf_counter()
+        try:
+            created = generate_thumbnails(file_path)
+        except Exception:
+            with self._lock:
+                self._counters["failed"] += 1
+            raise
+        with self._lock:
+            self._counters["completed"] += 1
+            self._seconds += time.perf_counter() - started
+        return created
+
+    def _forget(self, file_path: str, future: Future) -> None:
+        with self._lock:
+            if self._jobs.get(file_path) is future:
+                del self._jobs[file_path]
+
+    def enqueue(self, file_path: str) -> bool:
+        """
+        Vorschauen für ``file_path`` im Hintergrund erzeugen.
+
+        Returns:
+            bool: False, wenn die Warteschlange voll ist; die Vorschauen entstehen
+            dann beim ersten Abruf.
+        """
+        # Deduplizierte Blobs: Vorschauen existieren bereits vom ersten Upload
+        if all(os.path.exists(thumbnail_path(file_path, size)) for size in THUMBNAIL_SIZES):
+            return True
+
+        if self.workers == 0:
+            with self._lock:
+                self._counters["submitted"] += 1
+            try:
+                self._run(file_path)
+            except Exception:
+                return False
+            return True
+
+        with self._lock:
+            if file_path in self._jobs:
+                return True
+            if len(self._jobs) >= self.workers + self.max_queue:
+                self._counters["skipped"] += 1
+                return False
+            self._counters["submitted"] += 1
+        future = self._get_executor().submit(self._run, file_path)
+        with self._lock:
+            if not future.done():
+                self._jobs[file_path] = future
+        future.add_done_callback(lambda done: self._forget(file_path, done))
+        return True
+
+    def ensure(self, file_path: str, size: int, timeout: float = DEFAULT_WAIT_TIMEOUT) -> str:
+        """
+        Pfad der Vorschau ``size`` liefern und sie bei Bedarf erzeugen (blockierend).
+
+        Läuft bereits ein Auftrag für das Bild, wird auf ihn gewartet; sonst wird
+        nur die angefragte Größe direkt erzeugt.
+        """
+        if size not in THUMBNAIL_SIZES:
+            raise ValueError(f"Ungültige Vorschaugröße: {size}")
+        target = thumbnail_path(file_path, size)
+        if os.path.exists(target):
+            return target
+
+        with self._lock:
+            future = self._jobs.get(file_path)
+        if future is not None:
+            try:
+                future.result(timeout=timeout)
+            except Exception:
+                pass  # Zeitüberschreitung oder Fehler des Auftrags: unten direkt erzeugen
+            if os.path.exists(target):
+                return target
+
+        with self._lock:
+            self._counters["on_demand"] += 1
+        return generate_thumbnails(file_path, [size])[size]
+
+    def metrics(self) -> Dict[str, Any]:
+        """Zähler, Warteschlangentiefe und durchschnittliche Dauer pro Auftrag."""
+        with self._lock:
+            completed = self._counters["completed"]
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "queued": len(self._jobs),
+                **self._counters,
+                "avg_ms": round(self._seconds / completed * 1000, 2) if completed else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        """Worker-Threads beenden; laufende Aufträge werden abgeschlossen."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+thumbnail_pipeline = ThumbnailPipeline(
+    workers=int(os.getenv("THUMBNAIL_WORKERS", str(DEFAULT_WORKERS))),
+    max_queue=int(os.getenv("THUMBNAIL_MAX_QUEUE", str(DEFAULT_MAX_QUEUE))),
+)
+
+
+def rendition_path(file_path: str, size: Optional[int]) -> Tuple[str, Optional[str]]:
+    """
+    Auszuliefernde Datei für den ``?size=``-Parameter der Ansichts-Endpunkte.
+
+    Returns:
+        Tuple[str, Optional[str]]: Pfad und MIME-Type (``None`` = wie Original)
+
+    Raises:
+        HTTPException: 400 bei einer nicht unterstützten Größe
+    """
+    if size is None:
+        return file_path, None
+    if size not in THUMBNAIL_SIZES:
+        allowed = ", ".join(str(value) for value in THUMBNAIL_SIZES)
+        raise HTTPException(status_code=400, detail=f"Ungültige Bildgröße, erlaubt: {allowed}")
+    try:
+        return thumbnail_pipeline.ensure(file_path, size), "image/jpeg"
+    except (OSError, Image.DecompressionBombError):
+        # Nicht dekodierbares (UnidentifiedImageError ist ein OSError) oder
+        # übergroßes Bild: Original ausliefern
+        return file_path, None
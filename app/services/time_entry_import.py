@@ -0,0 +1,333 @@
+"""Massenimport von Stundeneinträgen (JSON, CSV, XLSX).
+
+Statt jeden Eintrag einzeln über ``POST /time-entries`` anzulegen (je Eintrag
+zwei Lookups und ein Commit), wird ein ganzer Stapel in einem Durchgang
+geprüft:
+
+- Projekte und Mitarbeiter des Mandanten werden einmal vorab geladen; jede
+  Zeile wird nur noch gegen diese Maps geprüft.
+- ``total_cost`` wird spaltenweise für alle gültigen Zeilen berechnet
+  (Stunden × Satz, ohne Satz gilt wie bisher der Satz des Mitarbeiters).
+- Gültige Zeilen werden per ``executemany`` in Blöcken eingefügt, ein Commit
+  je Block; ``tenant_stats`` und ``time_entry_daily`` werden in derselben
+  Transaktion fortgeschrieben.
+- Ungültige Zeilen werden nicht importiert, sondern mit Zeilennummer und
+  Fehlertexten zurückgemeldet.
+
+Spaltennamen dürfen deutsch oder englisch sein (``Projekt``/``project_id``,
+``Datum``/``work_date``, ``Stunden``/``hours_worked`` …); Zahlen mit Komma und
+Datumswerte im Format ``TT.MM.JJJJ`` werden akzeptiert. XLSX benötigt das
+optionale Paket ``openpyxl``.
+
+Konfiguration:
+- ``TIME_ENTRY_IMPORT_MAX_ROWS``: maximale Zeilen je Import (Standard: 100 000)
+- ``TIME_ENTRY_IMPORT_CHUNK_SIZE``: Zeilen je Transaktion (Standard: 5 000)
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import os
+import re
+from datetime import date, datetime, time
+from functools import lru_cache
+from operator import mul
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from sqlalchemy import insert
+from sqlmodel import Session, select
+
+from app.models import Employee, Project, TimeEntry
+from app.services import time_rollup
+from app.services.tenant_stats import record_bulk_insert
+
+try:
+    import openpyxl
+
+    OPENPYXL_AVAILABLE = True
+except ImportError:  # pragma: no cover - abhängig von der Installation
+    OPENPYXL_AVAILABLE = False
+    openpyxl = None
+
+MAX_IMPORT_ROWS = int(os.getenv("TIME_ENTRY_IMPORT_MAX_ROWS", "100000"))
+CHUNK_SIZE = int(os.getenv("TIME_ENTRY_IMPORT_CHUNK_SIZE", "5000"))
+# Mehr Fehler werden gezählt, aber nicht einzeln zurückgemeldet
+MAX_REPORTED_ERRORS = 1000
+MAX_HOURS_PER_ENTRY = 24.0
+
+COLUMN_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "project_id": ("projekt_id", "projekt", "project"),
+    "employee_id": ("mitarbeiter_id", "mitarbeiter", "employee"),
+    "work_date": ("datum", "arbeitstag", "date"),
+    "hours_worked": ("stunden", "hours"),
+    "hourly_rate": ("stundensatz", "rate"),
+    "description": ("beschreibung", "tätigkeit", "taetigkeit"),
+    "clock_in": ("beginn", "kommen"),
+    "clock_out": ("ende", "gehen"),
+    "break_start": ("pausenbeginn",),
+    "break_end": ("pausenende",),
+    "total_break_minutes": ("pause", "pause_minuten", "pausenminuten"),
+}
+REQUIRED_COLUMNS = ("project_id", "employee_id", "work_date", "hours_worked")
+TIME_COLUMNS = ("clock_in", "clock_out", "break_start", "break_end")
+
+_ALIAS_LOOKUP = {alias: column for column, aliases in COLUMN_ALIASES.items() for alias in (column, *aliases)}
+_TIME_PATTERN = re.compile(r"^(\d{1,2}):(\d{2})$")
+
+
+class ImportFormatError(ValueError):
+    """Datei oder Anfrage kann als Ganzes nicht importiert werden."""
+
+
+@lru_cache(maxsize=256)
+def _column(header: Any) -> Optional[str]:
+    key = re.sub(r"[\s\-]+", "_", str(header or "").strip().lower())
+    return _ALIAS_LOOKUP.get(key)
+
+
+def _blank(value: Any) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _to_int(value: Any) -> int:
+    if isinstance(value, bool):
+        raise ValueError
+    if isinstance(value, float):
+        if not value.is_integer():
+            raise ValueError
+        return int(value)
+    return int(str(value).strip()) if not isinstance(value, int) else value
+
+
+def _to_float(value: Any) -> float:
+    if isinstance(value, bool):
+        raise ValueError
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip().replace(" ", "")
+    if "," in text:
+        # Deutsches Zahlenformat: 1.234,5
+        text = text.replace(".", "").replace(",", ".")
+    return float(text)
+
+
+def _to_date(value: Any) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value).strip()
+    if "." in text:
+        return datetime.strptime(text, "%d.%m.%Y").date()
+    return date.fromisoformat(text[:10])
+
+
+def _to_time(value: Any) -> str:
+    if isinstance(value, (time, datetime)):
+        return value.strftime("%H:%M")
+    match = _TIME_PATTERN.match(str(value).strip())
+    if not match or int(match.group(1)) > 23 or int(match.group(2)) > 59:
+        raise ValueError
+    return f"{int(match.group(1)):02d}:{match.group(2)}"
+
+
+# ---------------------------------------------------------------------------
+# Dateien lesen
+# ---------------------------------------------------------------------------
+
+def _rows_from_table(table: Iterator[Iterable[Any]]) -> List[Dict[str, Any]]:
+    header = next(table, None)
+    if header is None:
+        raise ImportFormatError("Die Datei ist leer")
+    columns = [_column(name) for name in header]
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+    if missing:
+        raise ImportFormatError(f"Fehlende Spalten: {', '.join(missing)}")
+
+    indexed = [(index, column) for index, column in enumerate(columns) if column is not None]
+    rows = []
+    for values in table:
+        values = list(values)
+        row = {column: values[index] if index < len(values) else None for index, column in indexed}
+        rows.append(row)
+        if len(rows) > MAX_IMPORT_ROWS:
+            raise ImportFormatError(f"Zu viele Zeilen (max {MAX_IMPORT_ROWS})")
+    return rows
+
+
+def parse_csv(data: bytes) -> List[Dict[str, Any]]:
+    """CSV (UTF-8 oder Windows-1252, Trennzeichen ``;``, ``,`` oder Tab) einlesen."""
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        text = data.decode("cp1252")
+    first_line = text.split("\n", 1)[0]
+    delimiter = max(";,\t", key=first_line.count)
+    return _rows_from_table(csv.reader(io.StringIO(text, newline=""), delimiter=delimiter))
+
+
+def parse_xlsx(data: bytes) -> List[Dict[str, Any]]:
+    """Erstes Tabellenblatt einer XLSX-Datei einlesen."""
+    if not OPENPYXL_AVAILABLE:
+        raise ImportFormatError("XLSX-Import ist nicht verfügbar (Paket openpyxl fehlt)")
+    try:
+        workbook = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    except Exception as exc:
+        raise ImportFormatError(f"XLSX-Datei kann nicht gelesen werden: {exc}")
+    try:
+        return _rows_from_table(workbook.active.iter_rows(values_only=True))
+    finally:
+        workbook.close()
+
+
+def parse_import_file(data: bytes, filename: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Importdatei anhand von Inhalt bzw. Endung als XLSX oder CSV lesen."""
+    if data.startswith(b"PK\x03\x04") or (filename or "").lower().endswith(".xlsx"):
+        return parse_xlsx(data)
+    return parse_csv(data)
+
+
+# ---------------------------------------------------------------------------
+# Prüfen und Einfügen
+# ---------------------------------------------------------------------------
+
+class TimeEntryImporter:
+    """Prüft und importiert Stundeneinträge eines Mandanten stapelweise."""
+
+    def __init__(self, session: Session, tenant_id: int, chunk_size: int = CHUNK_SIZE):
+        self.session = session
+        self.tenant_id = tenant_id
+        self.chunk_size = max(1, chunk_size)
+
+    def _load_maps(self) -> Tuple[set, Dict[int, Optional[float]]]:
+        project_ids = set(self.session.exec(select(Project.id).where(Project.tenant_id == self.tenant_id)).all())
+        employee_rates = dict(self.session.exec(
+            select(Employee.id, Employee.hourly_rate).where(Employee.tenant_id == self.tenant_id)
+        ).all())
+        return project_ids, employee_rates
+
+    def validate(
+        self, rows: Iterable[Mapping[str, Any]], first_row: int = 1,
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], int]:
+        """
+        Zeilen prüfen und in Spaltenwerte für ``time_entry`` umwandeln.
+
+        Returns:
+            Tuple: (gültige Einträge, Fehler je Zeile, Anzahl nicht-leerer Zeilen)
+        """
+        project_ids, employee_rates = self._load_maps()
+        entries: List[Dict[str, Any]] = []
+        errors: List[Dict[str, Any]] = []
+        total = 0
+
+        for row_number, raw in enumerate(rows, start=first_row):
+            row = {_column(key) or key: value for key, value in raw.items()}
+            if all(_blank(value) for value in row.values()):
+                continue
+            total += 1
+            problems: List[str] = []
+            entry: Dict[str, Any] = {}
+
+            for column, convert, label in (
+                ("project_id", _to_int, "Projekt"),
+                ("employee_id", _to_int, "Mitarbeiter"),
+                ("work_date", _to_date, "Datum"),
+                ("hours_worked", _to_float, "Stunden"),
+            ):
+                value = row.get(column)
+                if _blank(value):
+                    problems.append(f"{label} fehlt")
+                    continue
+                try:
+                    entry[column] = convert(value)
+                except (TypeError, ValueError):
+                    problems.append(f"{label} ist ungültig: {value}")
+
+            if "project_id" in entry and entry["project_id"] not in project_ids:
+                problems.append("Projekt nicht gefunden")
+            if "employee_id" in entry and entry["employee_id"] not in employee_rates:
+                problems.append("Mitarbeiter nicht gefunden")
+            hours = entry.get("hours_worked")
+            if hours is not None and not 0 < hours <= MAX_HOURS_PER_ENTRY:
+                problems.append(f"Stunden müssen größer 0 und höchstens {MAX_HOURS_PER_ENTRY:g} sein")
+
+            rate = row.get("hourly_rate")
+            entry["hourly_rate"] = None
+            if not _blank(rate):
+                try:
+                    entry["hourly_rate"] = _to_float(rate)
+                    if entry["hourly_rate"] < 0:
+                        problems.append("Stundensatz darf nicht negativ sein")
+                except (TypeError, ValueError):
+                    problems.append(f"Stundensatz ist ungültig: {rate}")
+
+            minutes = row.get("total_break_minutes")
+            entry["total_break_minutes"] = 0
+            if not _blank(minutes):
+                try:
+                    entry["total_break_minutes"] = _to_int(_to_float(minutes))
+                    if entry["total_break_minutes"] < 0:
+                        problems.append("Pause darf nicht negativ sein")
+                except (TypeError, ValueError):
+                    problems.append(f"Pause ist ungültig: {minutes}")
+
+            for column in TIME_COLUMNS:
+                value = row.get(column)
+                entry[column] = None
+                if not _blank(value):
+                    try:
+                        entry[column] = _to_time(value)
+                    except (TypeError, ValueError):
+                        problems.append(f"Uhrzeit {column} ist ungültig: {value}")
+
+            description = row.get("description")
+            entry["description"] = None if _blank(description) else str(description).strip()
+
+            if problems:
+                errors.append({"row": row_number, "errors": problems})
+            else:
+                entries.append(entry)
+
+        # Stundensatz wie bei POST /time-entries: ohne (oder 0) gilt der Satz des Mitarbeiters
+        rates = [entry["hourly_rate"] or employee_rates[entry["employee_id"]] for entry in entries]
+        costs = map(mul, (entry["hours_worked"] for entry in entries), (rate or 0.0 for rate in rates))
+        now = datetime.utcnow()
+        for entry, rate, cost in zip(entries, rates, costs):
+            entry.update(
+                tenant_id=self.tenant_id, hourly_rate=rate, total_cost=cost, is_edited=False,
+                edit_reason=None, edited_by=None, created_at=now, updated_at=now,
+            )
+        return entries, errors, total
+
+    def insert(self, entries: List[Dict[str, Any]]) -> int:
+        """Einträge blockweise per executemany einfügen (ein Commit je Block)."""
+        table = TimeEntry.__table__
+        for start in range(0, len(entries), self.chunk_size):
+            chunk = entries[start:start + self.chunk_size]
+            self.session.connection().execute(insert(table), chunk)
+            record_bulk_insert(self.session, TimeEntry, chunk)
+            time_rollup.record_bulk_insert(self.session, chunk)
+            self.session.commit()
+        return len(entries)
+
+    def run(self, rows: Sequence[Mapping[str, Any]], first_row: int = 1, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Zeilen prüfen, gültige importieren und das Ergebnis zusammenfassen.
+
+        Raises:
+            ImportFormatError: Wenn mehr als ``MAX_IMPORT_ROWS`` Zeilen übergeben werden
+        """
+        if len(rows) > MAX_IMPORT_ROWS:
+            raise ImportFormatError(f"Zu viele Zeilen (max {MAX_IMPORT_ROWS})")
+        entries, errors, total = self.validate(rows, first_row=first_row)
+        imported = 0 if dry_run else self.insert(entries)
+        return {
+            "total_rows": total,
+            "valid_rows": len(entries),
+            "imported": imported,
+            "failed": len(errors),
+            "dry_run": dry_run,
+            "errors": errors[:MAX_REPORTED_ERRORS],
+            "errors_truncated": len(errors) > MAX_REPORTED_ERRORS,
+        }
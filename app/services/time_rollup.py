@@ -0,0 +1,387 @@
+"""Tagesverdichtung der Stundeneinträge.
+
+``time_entry_daily`` hält je Mandant, Projekt, Mitarbeiter und Arbeitstag die
+Anzahl der Einträge sowie Summen von Stunden, Pausenminuten und Kosten. Jeder
+Flush, der Stundeneinträge anlegt, ändert oder löscht, schreibt die Differenz
+in derselben Transaktion fort (Upsert je Tag); Massenimporte rufen
+``record_bulk_insert`` auf. Auswertungen über Stunden (Rechnungsgenerierung,
+Personalkosten, ``GET /time-entries/summary``) lesen nur noch diese Tabelle.
+
+``total_cost`` summiert Stunden × Stundensatz des Eintrags. Stunden ohne Satz
+stehen zusätzlich in ``unrated_hours``, damit Auswertungen den aktuellen Satz
+des Mitarbeiters einsetzen können.
+
+Bestandsdaten überträgt die Migration ``b7d3e8a1c642``. Datenbanken, deren
+Tabelle ohne Migration angelegt wurde (``create_all``), baut ``ensure`` beim
+ersten Lesezugriff eines Mandanten auf, der Einträge, aber keine Tageszeilen hat.
+
+Aufruf:
+    python -m app.services.time_rollup rebuild [--tenant-id ID]
+    python -m app.services.time_rollup check [--tenant-id ID]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, bindparam, case, event, inspect
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session, func, select
+
+from app.models import Employee, Tenant, TimeEntry, TimeEntryDaily
+from app.services.tenant_stats import old_values
+
+KEY_COLUMNS = ("tenant_id", "project_id", "employee_id", "work_date")
+SUM_COLUMNS = ("entry_count", "invalid_entries", "hours_worked", "break_minutes", "total_cost", "unrated_hours")
+FLOAT_COLUMNS = ("hours_worked", "total_cost", "unrated_hours")
+# Felder des Stundeneintrags, die in die Verdichtung eingehen
+FIELDS = ("tenant_id", "project_id", "employee_id", "work_date", "hours_worked", "total_break_minutes", "hourly_rate")
+GROUP_BY_COLUMNS = {"day": "work_date", "project": "project_id", "employee": "employee_id"}
+
+# Abweichungen unterhalb dieser Schwelle gelten als Rundungsrauschen
+FLOAT_TOLERANCE = 0.01
+
+_PENDING_KEY = "time_rollup_deltas"
+
+Key = Tuple[int, int, int, date]
+
+
+def _day(value: Any) -> Any:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _key(values: Dict[str, Any]) -> Optional[Key]:
+    key = (values["tenant_id"], values["project_id"], values["employee_id"], _day(values["work_date"]))
+    return None if None in key else key
+
+
+def _contribution(values: Dict[str, Any]) -> Dict[str, float]:
+    hours = values["hours_worked"] or 0.0
+    rate = values["hourly_rate"]
+    return {
+        "entry_count": 1,
+        "invalid_entries": 1 if hours <= 0 else 0,
+        "hours_worked": hours,
+        "break_minutes": values["total_break_minutes"] or 0,
+        "total_cost": hours * (rate or 0.0),
+        "unrated_hours": hours if rate is None else 0.0,
+    }
+
+
+def _add(deltas: Dict[Key, Dict[str, float]], values: Dict[str, Any], sign: int) -> None:
+    key = _key(values)
+    if key is None:
+        return
+    for column, value in _contribution(values).items():
+        deltas[key][column] += sign * value
+
+
+# ---------------------------------------------------------------------------
+# Fortschreiben
+# ---------------------------------------------------------------------------
+
+def _write_deltas(connection: Any, deltas: Dict[Key, Dict[str, float]]) -> None:
+    rows = [
+        {
+            **dict(zip(KEY_COLUMNS, key)),
+            **{column: delta[column] if column in FLOAT_COLUMNS else int(delta[column]) for column in SUM_COLUMNS},
+        }
+        for key, delta in deltas.items()
+        if any(delta[column] for column in SUM_COLUMNS)
+    ]
+    if not rows:
+        return
+
+    table = TimeEntryDaily.__table__
+    statement = sqlite_insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=list(KEY_COLUMNS),
+        set_={
+            column: (
+                func.round(table.c[column] + statement.excluded[column], 6)
+                if column in FLOAT_COLUMNS
+                else table.c[column] + statement.excluded[column]
+            )
+            for column in SUM_COLUMNS
+        },
+    )
+    # Tage ohne verbleibende Einträge entfernen (nur wo Einträge weggefallen sind)
+    emptied = [dict(zip(KEY_COLUMNS, key)) for key, delta in deltas.items() if delta["entry_count"] < 0]
+    try:
+        connection.execute(statement, rows)
+        if emptied:
+            connection.execute(
+                table.delete().where(
+                    *(table.c[column] == bindparam(f"k_{column}") for column in KEY_COLUMNS),
+                    table.c.entry_count <= 0,
+                ),
+                [{f"k_{column}": row[column] for column in KEY_COLUMNS} for row in emptied],
+            )
+    except OperationalError as exc:
+        # Legacy-Datenbank ohne time_entry_daily: Verdichtung nicht pflegen
+        if "no such table" not in str(exc):
+            raise
+
+
+def _collect_deltas(session: OrmSession, flush_context: Any, instances: Any) -> None:
+    deltas: Dict[Key, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+
+    for obj in session.new:
+        if type(obj) is TimeEntry:
+            _add(deltas, {field: getattr(obj, field) for field in FIELDS}, 1)
+
+    for obj in session.dirty:
+        if type(obj) is not TimeEntry or not session.is_modified(obj, include_collections=False):
+            continue
+        state = inspect(obj)
+        if not any(state.attrs[field].history.has_changes() for field in FIELDS):
+            continue
+        _add(deltas, old_values(session, obj, FIELDS), -1)
+        _add(deltas, {field: getattr(obj, field) for field in FIELDS}, 1)
+
+    for obj in session.deleted:
+        if type(obj) is TimeEntry:
+            _add(deltas, old_values(session, obj, FIELDS), -1)
+
+    if deltas:
+        session.info[_PENDING_KEY] = deltas
+
+
+def _apply_deltas(session: OrmSession, flush_context: Any) -> None:
+    deltas = session.info.pop(_PENDING_KEY, None)
+    if deltas:
+        _write_deltas(session.connection(), deltas)
+
+
+def record_bulk_insert(session: OrmSession, rows: Iterable[Dict[str, Any]]) -> None:
+    """
+    Verdichtung für Stundeneinträge fortschreiben, die per Core-Insert am ORM
+    vorbei angelegt wurden (z. B. Massenimport). Läuft in der Transaktion der Session.
+    """
+    deltas: Dict[Key, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    for values in rows:
+        _add(deltas, {field: values.get(field) for field in FIELDS}, 1)
+    _write_deltas(session.connection(), deltas)
+
+
+def register_time_rollup_listeners() -> None:
+    """Registriert die Flush-Listener (idempotent)."""
+    if not event.contains(OrmSession, "before_flush", _collect_deltas):
+        event.listen(OrmSession, "before_flush", _collect_deltas)
+        event.listen(OrmSession, "after_flush", _apply_deltas)
+
+
+register_time_rollup_listeners()
+
+
+# ---------------------------------------------------------------------------
+# Auswertungen
+# ---------------------------------------------------------------------------
+
+def day_filter(tenant_id: int, start: Optional[date] = None, end: Optional[date] = None) -> List[Any]:
+    """
+    Bedingungen für einen Zeitraum ganzer Tage (Grenzen inklusive).
+
+    Zeitpunkte werden auf ihren Tag gekürzt – ``work_date`` kennt keine Uhrzeit.
+    """
+    conditions = [TimeEntryDaily.tenant_id == tenant_id]
+    if start is not None:
+        conditions.append(TimeEntryDaily.work_date >= _day(start))
+    if end is not None:
+        conditions.append(TimeEntryDaily.work_date <= _day(end))
+    return conditions
+
+
+def labor_cost():
+    """Kosten je Tageszeile; Stunden ohne Satz mit dem Satz des Mitarbeiters (Join auf ``Employee``)."""
+    return TimeEntryDaily.total_cost + TimeEntryDaily.unrated_hours * func.coalesce(Employee.hourly_rate, 0.0)
+
+
+def join_employee(statement: Any, tenant_id: int) -> Any:
+    return statement.outerjoin(
+        Employee, and_(Employee.id == TimeEntryDaily.employee_id, Employee.tenant_id == tenant_id)
+    )
+
+
+def summarize(
+    session: Session,
+    tenant_id: int,
+    group_by: Sequence[str] = ("day",),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    project_id: Optional[int] = None,
+    employee_id: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Stunden, Pausen und Kosten gruppiert nach Tag, Projekt und/oder Mitarbeiter.
+
+    Raises:
+        ValueError: Bei unbekannter Gruppierung
+    """
+    unknown = [name for name in group_by if name not in GROUP_BY_COLUMNS]
+    if unknown or not group_by:
+        raise ValueError(f"Ungültige Gruppierung: {', '.join(unknown) or '-'} (erlaubt: day, project, employee)")
+    keys = [getattr(TimeEntryDaily, GROUP_BY_COLUMNS[name]) for name in dict.fromkeys(group_by)]
+
+    TimeRollupService(session).ensure(tenant_id)
+    conditions = day_filter(tenant_id, start, end)
+    if project_id is not None:
+        conditions.append(TimeEntryDaily.project_id == project_id)
+    if employee_id is not None:
+        conditions.append(TimeEntryDaily.employee_id == employee_id)
+
+    statement = join_employee(
+        select(
+            *keys,
+            func.sum(TimeEntryDaily.entry_count).label("entry_count"),
+            func.sum(TimeEntryDaily.hours_worked).label("hours_worked"),
+            func.sum(TimeEntryDaily.break_minutes).label("break_minutes"),
+            func.sum(labor_cost()).label("total_cost"),
+        ).select_from(TimeEntryDaily),
+        tenant_id,
+    ).where(*conditions).group_by(*keys).order_by(*keys)
+
+    return [
+        {**row._asdict(), "hours_worked": round(row.hours_worked, 2), "total_cost": round(row.total_cost, 2)}
+        for row in session.exec(statement).all()
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Neuaufbau und Prüfung
+# ---------------------------------------------------------------------------
+
+def _source_select(tenant_id: int) -> Any:
+    """Verdichtung direkt aus ``timeentry`` (Spalten in der Reihenfolge KEY_COLUMNS + SUM_COLUMNS)."""
+    hours = func.coalesce(TimeEntry.hours_worked, 0.0)
+    keys = [getattr(TimeEntry, column) for column in KEY_COLUMNS]
+    return (
+        select(
+            *keys,
+            func.count(TimeEntry.id),
+            func.sum(case((hours <= 0, 1), else_=0)),
+            func.round(func.sum(hours), 6),
+            func.sum(func.coalesce(TimeEntry.total_break_minutes, 0)),
+            func.round(func.sum(hours * func.coalesce(TimeEntry.hourly_rate, 0.0)), 6),
+            func.round(func.sum(case((TimeEntry.hourly_rate.is_(None), hours), else_=0.0)), 6),
+        )
+        .where(
+            TimeEntry.tenant_id == tenant_id,
+            TimeEntry.project_id.is_not(None),
+            TimeEntry.employee_id.is_not(None),
+            TimeEntry.work_date.is_not(None),
+        )
+        .group_by(*keys)
+    )
+
+
+class TimeRollupService:
+    """Neuaufbau und Konsistenzprüfung der Tagesverdichtung."""
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def rebuild(self, tenant_id: int) -> int:
+        """Zeilen des Mandanten aus ``timeentry`` neu aufbauen; liefert die Anzahl Tageszeilen."""
+        table = TimeEntryDaily.__table__
+        connection = self.session.connection()
+        connection.execute(table.delete().where(table.c.tenant_id == tenant_id))
+        result = connection.execute(
+            table.insert().from_select(list(KEY_COLUMNS + SUM_COLUMNS), _source_select(tenant_id))
+        )
+        self.session.commit()
+        return result.rowcount
+
+    def needs_rebuild(self, tenant_id: int) -> bool:
+        """True, wenn der Mandant Stundeneinträge, aber keine einzige Tageszeile hat."""
+        has_rows = self.session.exec(
+            select(TimeEntryDaily.tenant_id).where(TimeEntryDaily.tenant_id == tenant_id).limit(1)
+        ).first()
+        if has_rows is not None:
+            return False
+        has_entries = self.session.exec(
+            select(TimeEntry.id).where(
+                TimeEntry.tenant_id == tenant_id,
+                TimeEntry.project_id.is_not(None),
+                TimeEntry.employee_id.is_not(None),
+                TimeEntry.work_date.is_not(None),
+            ).limit(1)
+        ).first()
+        return has_entries is not None
+
+    def ensure(self, tenant_id: int) -> bool:
+        """
+        Verdichtung vor dem Lesen einmalig aufbauen, falls sie für den Mandanten fehlt.
+
+        Schreibt und committet nur im Fehlfall, Aufrufer brauchen daher eine
+        Schreib-Session ohne offene Änderungen (wie ``TenantStatsService.get_or_rebuild``).
+
+        Returns:
+            bool: True, wenn neu aufgebaut wurde
+        """
+        if not self.needs_rebuild(tenant_id):
+            return False
+        self.rebuild(tenant_id)
+        return True
+
+    def check(self, tenant_id: int) -> List[str]:
+        """Gespeicherte Verdichtung mit einer Neuberechnung vergleichen."""
+        expected = {tuple(row[:4]): row[4:] for row in self.session.exec(_source_select(tenant_id)).all()}
+        stored = {
+            tuple(row[:4]): row[4:]
+            for row in self.session.exec(
+                select(*(getattr(TimeEntryDaily, column) for column in KEY_COLUMNS + SUM_COLUMNS))
+                .where(TimeEntryDaily.tenant_id == tenant_id)
+            ).all()
+        }
+
+        differences = []
+        for key in sorted(set(stored) | set(expected)):
+            have = stored.get(key, (0,) * len(SUM_COLUMNS))
+            want = expected.get(key, (0,) * len(SUM_COLUMNS))
+            for column, have_value, want_value in zip(SUM_COLUMNS, have, want):
+                if abs((have_value or 0) - (want_value or 0)) > FLOAT_TOLERANCE:
+                    differences.append(
+                        f"Mandant {tenant_id}: Projekt {key[1]}, Mitarbeiter {key[2]}, {key[3]}: "
+                        f"{column} gespeichert={have_value} erwartet={want_value}"
+                    )
+        return differences
+
+    def tenant_ids(self) -> List[int]:
+        return list(self.session.exec(select(Tenant.id).order_by(Tenant.id)).all())
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Tagesverdichtung der Stundeneinträge neu aufbauen oder prüfen")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--tenant-id", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    from app.database import engine
+
+    with Session(engine) as session:
+        service = TimeRollupService(session)
+        tenant_ids = [args.tenant_id] if args.tenant_id else service.tenant_ids()
+
+        if args.command == "rebuild":
+            for tenant_id in tenant_ids:
+                rows = service.rebuild(tenant_id)
+                print(f"Mandant {tenant_id}: {rows} Tageszeile(n) neu aufgebaut")
+            return 0
+
+        differences = [line for tenant_id in tenant_ids for line in service.check(tenant_id)]
+        for line in differences:
+            print(line)
+        if not differences:
+            print(f"{len(tenant_ids)} Mandant(en) konsistent")
+        return 1 if differences else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
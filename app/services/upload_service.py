@@ -0,0 +1,147 @@
+"""Gemeinsamer Upload-Pfad für Berichts- und Projektfotos.
+
+Uploads werden nie vollständig in den Speicher gelesen: ``copy_stream`` aus
+dem Blob-Speicher kopiert sie in festen Blöcken auf die Platte, berechnet
+dabei SHA-256 und Größe und bricht ab, sobald die Grenze des Mandanten
+überschritten ist. Der erste Block wird anhand der Magic Bytes geprüft; der
+vom Browser gemeldete ``Content-Type`` allein reicht nicht. Auch die Endung
+des Blobs und der ausgelieferte MIME-Type folgen dem erkannten Bildformat,
+nie dem Dateinamen des Clients (sonst würde ``x.html`` mit GIF-Kopf als
+``text/html`` ausgeliefert).
+
+Die Größengrenze stammt aus ``TenantSettings.max_upload_mb`` und fällt auf
+``MAX_UPLOAD_MB`` (Standard: 10) zurück.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Optional
+
+from fastapi import HTTPException, UploadFile
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import TenantSettings
+from app.services.blob_store import BlobTooLarge, StoredFile, blob_store
+
+DEFAULT_MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "10"))
+
+# Dateianfänge der Bildformate, die Pillow für Vorschaubilder lesen kann
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+    (b"BM", ".bmp"),
+    (b"II*\x00", ".tif"),
+    (b"MM\x00*", ".tif"),
+)
+
+IMAGE_MEDIA_TYPES = {
+    ".jpg": "image/jpeg",
+    ".png": "image/png",
+    ".gif": "image/gif",
+    ".bmp": "image/bmp",
+    ".tif": "image/tiff",
+    ".webp": "image/webp",
+}
+
+
+class InvalidUpload(ValueError):
+    """Inhalt des Uploads passt nicht zum erlaubten Dateityp."""
+
+
+def detect_image_type(head: bytes) -> Optional[str]:
+    """Dateiendung anhand der Magic Bytes oder ``None``."""
+    for signature, extension in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+
+def validate_image_head(head: bytes) -> str:
+    """Ersten Block prüfen und die erkannte Dateiendung liefern.
+
+    Raises:
+        InvalidUpload: Wenn der Inhalt kein unterstütztes Bild ist
+    """
+    extension = detect_image_type(head)
+    if extension is None:
+        raise InvalidUpload("Datei ist kein unterstütztes Bild")
+    return extension
+
+
+def image_media_type(path: str) -> str:
+    """MIME-Type einer gespeicherten Bilddatei anhand ihrer Magic Bytes.
+
+    Gilt auch für Blobs, die noch mit der Endung des Clients abgelegt wurden;
+    unbekannter Inhalt wird nie als HTML o. Ä. ausgeliefert.
+    """
+    with open(path, "rb") as handle:
+        extension = detect_image_type(handle.read(16))
+    return IMAGE_MEDIA_TYPES.get(extension, "application/octet-stream")
+
+
+def _limit_statement(tenant_id: int):
+    return select(TenantSettings.max_upload_mb).where(TenantSettings.tenant_id == tenant_id)
+
+
+def _limit_bytes(max_upload_mb: Optional[int]) -> int:
+    return (max_upload_mb or DEFAULT_MAX_UPLOAD_MB) * 1024 * 1024
+
+
+def upload_limit_bytes(session: Session, tenant_id: int) -> int:
+    """Upload-Grenze des Mandanten in Bytes."""
+    return _limit_bytes(session.exec(_limit_statement(tenant_id)).first())
+
+
+async def upload_limit_bytes_async(session: AsyncSession, tenant_id: int) -> int:
+    """Upload-Grenze des Mandanten in Bytes (async Session)."""
+    return _limit_bytes((await session.exec(_limit_statement(tenant_id))).first())
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Datei ist zu groß (max {max_bytes // (1024 * 1024)} MB)")
+
+
+def _check_declared_size(file: UploadFile, max_bytes: int) -> None:
+    # Starlette kennt die Größe bereits, wenn der Body vollständig empfangen ist
+    size = getattr(file, "size", None)
+    if size is not None and size > max_bytes:
+        raise _too_large(max_bytes)
+
+
+def store_image_upload(file: UploadFile, max_bytes: int) -> StoredFile:
+    """
+    Bild-Upload in den Blob-Speicher streamen (blockierend, im Threadpool aufrufen).
+
+    Raises:
+        HTTPException: 413 bei Überschreitung der Grenze, 400 bei ungültigem Inhalt
+    """
+    _check_declared_size(file, max_bytes)
+    try:
+        # Endung liefert validate_image_head aus den Magic Bytes
+        return blob_store.store_stream(file.file, max_bytes=max_bytes, validate_head=validate_image_head)
+    except BlobTooLarge:
+        raise _too_large(max_bytes)
+    except InvalidUpload as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except OSError as exc:  # pragma: no cover - Dateisystemfehler
+        raise HTTPException(status_code=500, detail=f"Fehler beim Speichern der Datei: {exc}")
+
+
+def read_upload(file: UploadFile, max_bytes: int) -> bytes:
+    """
+    Kleinen Upload (z. B. Importdatei) vollständig lesen, höchstens ``max_bytes``.
+
+    Raises:
+        HTTPException: 413 bei Überschreitung der Grenze
+    """
+    _check_declared_size(file, max_bytes)
+    data = file.file.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        raise _too_large(max_bytes)
+    return data
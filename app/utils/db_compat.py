@@ -15,6 +15,7 @@ TENANT_SETTINGS_LEGACY_COLUMNS = {
     "bank_bic": "TEXT",
     "tax_number": "TEXT",
     "vat_id": "TEXT",
+    "max_upload_mb": "INTEGER",
 }
 
 
@@ -0,0 +1,207 @@
+"""Schneller JSON-Antwortpfad für alle Router.
+
+Standardmäßig validiert FastAPI jede Rückgabe erneut gegen ``response_model``
+und kodiert sie anschließend über ``jsonable_encoder`` und das ``json``-Modul.
+Für Listen mit tausenden ORM-Zeilen kostet das ein Vielfaches der eigentlichen
+Abfrage.
+
+``FastJSONRoute`` behält ``response_model`` für OpenAPI-Schema und Doku,
+projiziert die Rückgabe aber nur noch auf dessen Felder (ORM-Objekte, Dicts
+und Pydantic-Modelle gleichermaßen) und kodiert direkt mit orjson zu Bytes.
+Felder außerhalb des Schemas (z. B. ``hashed_password``) bleiben damit wie
+bisher unsichtbar; Werte werden dabei nicht erneut validiert oder umgewandelt.
+
+Konfiguration:
+- ``FAST_JSON_RESPONSES``: ``1`` (Standard) aktiviert den Pfad, ``0`` nutzt
+  die FastAPI-Standardserialisierung. Ohne installiertes orjson ist er aus.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import os
+import types
+from decimal import Decimal
+from functools import wraps
+from typing import Any, Callable, List, Optional, Tuple, Union, get_args, get_origin
+
+from fastapi import Response
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.dependencies.utils import get_dependant, get_parameterless_sub_dependant, get_typed_signature
+from fastapi.routing import APIRoute, get_request_handler
+from pydantic import BaseModel
+
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:  # pragma: no cover - abhängig von der Installation
+    ORJSON_AVAILABLE = False
+    orjson = None
+
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "1").lower() not in {"0", "false", "no", "off"}
+
+_MISSING = object()
+_NO_VALUES: dict = {}
+_RESPONSE_PARAM = "_fast_json_response"
+_SEQUENCE_ORIGINS = (list, tuple, set, frozenset)
+
+Projector = Callable[[Any], Any]
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _model_projector(model: type) -> Projector:
+    fields: List[Tuple[str, str, Optional[Projector], Callable[[], Any]]] = []
+    for name, field in model.model_fields.items():
+        if field.is_required():
+            default = lambda: None  # noqa: E731 - Validierung entfällt, fehlende Pflichtfelder werden null
+        else:
+            default = lambda field=field: field.get_default(call_default_factory=True)  # noqa: E731
+        sub_project = build_projector(field.annotation)
+        fields.append((field.alias or name, name, None if sub_project is _identity else sub_project, default))
+
+    def project(obj: Any) -> Any:
+        if obj is None:
+            return None
+        # Geladene Spalten liegen bei ORM-Objekten und Pydantic-Modellen im __dict__;
+        # getattr nur für Properties oder abgelaufene Attribute
+        values = obj if isinstance(obj, dict) else getattr(obj, "__dict__", _NO_VALUES)
+        result = {}
+        for key, name, sub_project, default in fields:
+            value = values.get(name, _MISSING)
+            if value is _MISSING and values is not obj:
+                value = getattr(obj, name, _MISSING)
+            if value is _MISSING:
+                value = default()
+            elif sub_project is not None:
+                value = sub_project(value)
+            result[key] = value
+        return result
+
+    return project
+
+
+def build_projector(annotation: Any) -> Projector:
+    """
+    Projektion einer Rückgabe auf die Felder des Response-Modells.
+
+    Verschachtelte Modelle (auch in Listen und ``Optional``) werden rekursiv
+    projiziert; alle anderen Typen werden unverändert übernommen.
+    """
+    origin = get_origin(annotation)
+    if origin in _SEQUENCE_ORIGINS:
+        args = get_args(annotation)
+        item_project = build_projector(args[0]) if args else _identity
+        if item_project is _identity:
+            return _identity
+        return lambda values: None if values is None else [item_project(value) for value in values]
+    if origin in (Union, types.UnionType):
+        models = [arg for arg in get_args(annotation) if inspect.isclass(arg) and issubclass(arg, BaseModel)]
+        return _model_projector(models[0]) if len(models) == 1 else _identity
+    if inspect.isclass(annotation) and issubclass(annotation, BaseModel):
+        return _model_projector(annotation)
+    return _identity
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Typ {type(value).__name__} ist nicht JSON-serialisierbar")
+
+
+def dumps(content: Any) -> bytes:
+    """Inhalt mit orjson kodieren (nicht-String-Schlüssel erlaubt)."""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONRoute(APIRoute):
+    """
+    APIRoute mit orjson-Kodierung ohne zweite Validierung der Rückgabe.
+
+    Routen mit eigener ``response_class``, Include-/Exclude-Optionen oder
+    Status 204 laufen weiter über den Standardpfad.
+    """
+
+    enabled = FAST_JSON_RESPONSES and ORJSON_AVAILABLE
+
+    def _fast_json_applicable(self) -> bool:
+        return (
+            self.enabled
+            and isinstance(self.response_class, DefaultPlaceholder)
+            and self.status_code != 204
+            and self.response_model_include is None
+            and self.response_model_exclude is None
+            and not self.response_model_exclude_unset
+            and not self.response_model_exclude_defaults
+            and not self.response_model_exclude_none
+        )
+
+    def _fast_json_endpoint(self) -> Callable[..., Any]:
+        endpoint = self.endpoint
+        project = build_projector(self.response_model) if self.response_model else _identity
+        default_status = self.status_code
+
+        signature = get_typed_signature(endpoint)
+        parameters = list(signature.parameters.values())
+        # Derselbe Sub-Response, den FastAPI an den Endpunkt gibt (Header, Status)
+        response_param = next((p.name for p in parameters if p.annotation is Response), None)
+        own_param = response_param is None
+        if own_param:
+            response_param = _RESPONSE_PARAM
+            parameters.append(
+                inspect.Parameter(response_param, inspect.Parameter.KEYWORD_ONLY, annotation=Response)
+            )
+
+        def encode(result: Any, sub_response: Response) -> Response:
+            if isinstance(result, Response):
+                return result
+            response = Response(
+                content=dumps(project(result)),
+                status_code=sub_response.status_code or default_status or 200,
+                media_type="application/json",
+            )
+            response.headers.raw.extend(sub_response.headers.raw)
+            return response
+
+        def split(kwargs: dict) -> Response:
+            return kwargs.pop(response_param) if own_param else kwargs[response_param]
+
+        if asyncio.iscoroutinefunction(endpoint):
+            @wraps(endpoint)
+            async def call(**kwargs: Any) -> Response:
+                sub_response = split(kwargs)
+                return encode(await endpoint(**kwargs), sub_response)
+        else:
+            @wraps(endpoint)
+            def call(**kwargs: Any) -> Response:
+                sub_response = split(kwargs)
+                return encode(endpoint(**kwargs), sub_response)
+
+        call.__signature__ = inspect.Signature(parameters)
+        return call
+
+    def get_route_handler(self) -> Callable:
+        if not self._fast_json_applicable():
+            return super().get_route_handler()
+
+        dependant = get_dependant(path=self.path_format, call=self._fast_json_endpoint())
+        for depends in self.dependencies[::-1]:
+            dependant.dependencies.insert(
+                0, get_parameterless_sub_dependant(depends=depends, path=self.path_format)
+            )
+        return get_request_handler(
+            dependant=dependant,
+            body_field=self.body_field,
+            status_code=self.status_code,
+            response_class=self.response_class,
+            response_field=None,
+            dependency_overrides_provider=self.dependency_overrides_provider,
+        )
@@ -0,0 +1,174 @@
+"""HTTP-Caching für ausgelieferte Dateien (Bilder, Logos, Anhänge).
+
+``cached_file_response`` ergänzt ``FileResponse`` um:
+
+- starke ETags aus dem Inhalts-Hash (Blob-Speicher) bzw. aus mtime und Größe,
+- ``If-None-Match`` / ``If-Modified-Since`` mit Antwort ``304 Not Modified``,
+- einfache Byte-Ranges (``Range: bytes=a-b``) mit ``206``/``416`` und ``If-Range``,
+- ``Cache-Control``: ``immutable`` für inhaltsadressierte URLs (``?v=<hash>``),
+  sonst Revalidierung per ETag bei jedem Abruf.
+
+Die Antworten sind ``private``: Die Dateien gehören zu einem Mandanten und
+werden nur an angemeldete Benutzer ausgeliefert.
+"""
+
+from __future__ import annotations
+
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from mimetypes import guess_type
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+import anyio
+from fastapi import HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+RANGE_CHUNK_SIZE = 64 * 1024
+
+
+def file_etag(stat_result: os.stat_result, content_hash: Optional[str] = None, variant: Optional[str] = None) -> str:
+    """Starker ETag (in Anführungszeichen) aus Inhalts-Hash oder mtime/Größe."""
+    if content_hash:
+        token = content_hash
+    else:
+        token = f"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"
+    if variant:
+        token = f"{token}-{variant}"
+    return f'"{token}"'
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """Prüft, ob ein ``If-None-Match``-Header den ETag enthält."""
+    if header.strip() == "*":
+        return True
+    # If-None-Match vergleicht schwach: W/"x" passt zu "x"
+    candidates = [value.strip() for value in header.split(",")]
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(mtime) <= since
+    return False
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Einzelnen Byte-Bereich auswerten.
+
+    Returns:
+        Tuple[int, int]: Start und Ende (inklusive) oder ``None`` für „ganze Datei"
+
+    Raises:
+        HTTPException: 416, wenn der Bereich außerhalb der Datei liegt
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None  # Mehrere Bereiche: vollständige Antwort ist erlaubt
+    start_text, _, end_text = spec.strip().partition("-")
+    try:
+        if start_text == "":
+            length = int(end_text)
+            if length <= 0:
+                raise ValueError
+            start, end = max(0, size - length), size - 1
+        else:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=416,
+            detail="Angeforderter Bereich liegt außerhalb der Datei",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, min(end, size - 1)
+
+
+def _range_allowed(request: Request, etag: str, last_modified: str) -> bool:
+    if_range = request.headers.get("if-range")
+    return if_range is None or if_range.strip() in (etag, last_modified)
+
+
+async def _iter_file_range(path: str, start: int, end: int) -> AsyncIterator[bytes]:
+    async with await anyio.open_file(path, mode="rb") as handle:
+        await handle.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await handle.read(min(RANGE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def cached_file_response(
+    request: Request,
+    path: str,
+    *,
+    media_type: Optional[str] = None,
+    filename: Optional[str] = None,
+    content_hash: Optional[str] = None,
+    variant: Optional[str] = None,
+    immutable: bool = False,
+) -> Response:
+    """
+    Datei mit ETag, Last-Modified, Cache-Control und Range-Unterstützung ausliefern.
+
+    Args:
+        request: Aktueller Request (für Bedingungs- und Range-Header)
+        path: Dateipfad
+        media_type: MIME-Type (Standard: aus dem Dateinamen geraten)
+        filename: Dateiname für ``Content-Disposition: attachment``
+        content_hash: SHA-256 aus dem Blob-Speicher für den ETag
+        variant: Zusatz zum ETag für abgeleitete Dateien (z. B. Vorschaugröße)
+        immutable: Inhaltsadressierte URL; darf ein Jahr ungeprüft gecacht werden
+    """
+    stat_result = os.stat(path)
+    etag = file_etag(stat_result, content_hash, variant)
+    last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+    headers: Dict[str, str] = {
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Cache-Control": (
+            f"private, max-age={IMMUTABLE_MAX_AGE}, immutable" if immutable else "private, no-cache"
+        ),
+        "Accept-Ranges": "bytes",
+    }
+
+    if _not_modified(request, etag, stat_result.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if range_header and _range_allowed(request, etag, last_modified):
+        byte_range = _parse_range(range_header, stat_result.st_size)
+        if byte_range is not None:
+            start, end = byte_range
+            return StreamingResponse(
+                _iter_file_range(path, start, end),
+                status_code=206,
+                media_type=media_type or guess_type(filename or path)[0] or "application/octet-stream",
+                headers={
+                    **headers,
+                    "Content-Range": f"bytes {start}-{end}/{stat_result.st_size}",
+                    "Content-Length": str(end - start + 1),
+                },
+            )
+
+    return FileResponse(
+        path,
+        media_type=media_type,
+        filename=filename,
+        headers=headers,
+        stat_result=stat_result,
+    )
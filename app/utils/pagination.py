@@ -0,0 +1,130 @@
+"""Cursor-basierte (Keyset-)Paginierung für Listen-Endpunkte.
+
+Der Cursor ist ein opakes, URL-sicheres Token mit den Sortierwerten der letzten
+gelieferten Zeile. Die nächste Seite wird per ``WHERE (a, b) > (x, y)`` statt
+``OFFSET`` geladen und bleibt damit auch bei großen Tabellen gleich schnell.
+
+Ohne ``limit`` und ``cursor`` liefern die Endpunkte weiterhin alle Zeilen
+(Kompatibilität für bestehende Clients). Der Cursor der nächsten Seite wird im
+Header ``X-Next-Cursor`` zurückgegeben, damit das Listenformat unverändert bleibt.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_
+from sqlalchemy.sql import Select
+from sqlmodel import Session
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MAX_PAGE_LIMIT = 500
+
+# (Spalte, absteigend)
+KeysetColumn = Tuple[Any, bool]
+
+
+def _encode_value(value: Any) -> List[Any]:
+    if isinstance(value, datetime):
+        return ["dt", value.isoformat()]
+    if isinstance(value, date):
+        return ["d", value.isoformat()]
+    return ["v", value]
+
+
+def _decode_value(item: Sequence[Any]) -> Any:
+    kind, value = item
+    if kind == "dt":
+        return datetime.fromisoformat(value)
+    if kind == "d":
+        return date.fromisoformat(value)
+    if kind == "v":
+        return value
+    raise ValueError(f"Unbekannter Cursor-Typ: {kind}")
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Sortierwerte in ein opakes Cursor-Token umwandeln."""
+    payload = json.dumps([_encode_value(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, expected_length: int) -> List[Any]:
+    """Cursor-Token dekodieren; ungültige Token führen zu HTTP 400."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        items = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        values = [_decode_value(item) for item in items]
+    except (ValueError, TypeError, binascii.Error, UnicodeError):
+        raise HTTPException(status_code=400, detail="Ungültiger Cursor")
+    if len(values) != expected_length:
+        raise HTTPException(status_code=400, detail="Ungültiger Cursor")
+    return values
+
+
+def _keyset_condition(keyset: Sequence[KeysetColumn], values: Sequence[Any]):
+    """Bedingung "Zeile liegt hinter dem Cursor" für beliebige Sortierrichtungen."""
+    clauses = []
+    for position, (column, descending) in enumerate(keyset):
+        equal_prefix = [keyset[i][0] == values[i] for i in range(position)]
+        after = column < values[position] if descending else column > values[position]
+        clauses.append(and_(*equal_prefix, after))
+    return or_(*clauses)
+
+
+def paginate(
+    session: Session,
+    statement: Select,
+    keyset: Sequence[KeysetColumn],
+    *,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    response: Optional[Response] = None,
+    entity: Callable[[Any], Any] = lambda row: row,
+) -> list:
+    """
+    Abfrage stabil sortieren und optional seitenweise ausführen.
+
+    Args:
+        session: Datenbank-Session
+        statement: Bereits mandantengefilterte Abfrage
+        keyset: Eindeutige Sortierung, z. B. ``[(Invoice.created_at, True), (Invoice.id, True)]``
+        limit: Seitengröße; ``None`` liefert alle Zeilen
+        cursor: Cursor aus ``X-Next-Cursor`` der vorherigen Seite
+        response: Response, in deren Header der nächste Cursor gesetzt wird
+        entity: Liefert das Modell einer Ergebniszeile (bei Mehrspalten-Selects)
+
+    Returns:
+        list: Zeilen der angeforderten Seite
+    """
+    statement = statement.order_by(
+        *[column.desc() if descending else column.asc() for column, descending in keyset]
+    )
+
+    if limit is None and cursor is None:
+        return session.exec(statement).all()
+
+    if limit is None:
+        limit = MAX_PAGE_LIMIT
+    if limit < 1 or limit > MAX_PAGE_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit muss zwischen 1 und {MAX_PAGE_LIMIT} liegen")
+
+    if cursor:
+        values = decode_cursor(cursor, len(keyset))
+        statement = statement.where(_keyset_condition(keyset, values))
+
+    rows = session.exec(statement.limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    if has_more and response is not None:
+        last = entity(rows[-1])
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            [getattr(last, column.key) for column, _ in keyset]
+        )
+    return rows
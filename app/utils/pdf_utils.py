@@ -4,10 +4,43 @@ Verwendet fpdf2 für die PDF-Generierung.
 """
 
 from fpdf import FPDF
-from typing import List, Dict, Any, Union
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, AsyncIterator, Union
 import json
 from datetime import datetime
 
+# Blockgröße beim Ausliefern von PDFs aus dem Speicher
+PDF_CHUNK_SIZE = 64 * 1024
+
+
+async def _iter_chunks(data: bytes, chunk_size: int) -> AsyncIterator[bytes]:
+    # Async-Generator: Starlette muss dafür keinen Threadpool bemühen
+    view = memoryview(data)
+    for start in range(0, len(view), chunk_size):
+        yield bytes(view[start:start + chunk_size])
+
+
+def pdf_streaming_response(pdf_bytes: bytes, filename: str, chunk_size: int = PDF_CHUNK_SIZE) -> StreamingResponse:
+    """
+    PDF aus dem Speicher als Download streamen (ohne temporäre Datei).
+
+    Args:
+        pdf_bytes: Gerenderte PDF
+        filename: Dateiname für ``Content-Disposition``
+        chunk_size: Blockgröße der Übertragung
+
+    Returns:
+        StreamingResponse: Antwort mit korrektem ``Content-Length``
+    """
+    return StreamingResponse(
+        _iter_chunks(pdf_bytes, chunk_size),
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            "Content-Length": str(len(pdf_bytes)),
+        },
+    )
+
 class OfferPDF(FPDF):
     """
     PDF-Klasse für die Erstellung von Angeboten.
@@ -0,0 +1,67 @@
+"""ZIP-Archive blockweise erzeugen, ohne das Archiv im Speicher zu halten.
+
+``zipfile`` kann in nicht-seekbare Ströme schreiben (Größen stehen dann im
+Data-Descriptor hinter jedem Eintrag). ``stream_zip`` gibt nach jedem Eintrag
+die bis dahin geschriebenen Bytes weiter; im Speicher liegt also höchstens ein
+Dokument plus der Zentralverzeichnis-Puffer.
+"""
+
+from __future__ import annotations
+
+import zipfile
+from datetime import datetime
+from typing import Iterable, Iterator, List, Tuple
+
+
+class _ChunkSink:
+    """Schreibziel für ``ZipFile``, das geschriebene Bytes zwischenpuffert."""
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(
+    files: Iterable[Tuple[str, bytes]],
+    compression: int = zipfile.ZIP_STORED,
+) -> Iterator[bytes]:
+    """
+    ZIP-Archiv aus ``(Dateiname, Inhalt)``-Paaren als Byte-Blöcke erzeugen.
+
+    Args:
+        files: Dateien in Archiv-Reihenfolge (darf ein Generator sein)
+        compression: ``ZIP_STORED`` (Standard, PDFs sind bereits komprimiert)
+            oder ``ZIP_DEFLATED``
+
+    Yields:
+        bytes: Fortlaufende Teile des Archivs
+    """
+    sink = _ChunkSink()
+    timestamp = datetime.now().timetuple()[:6]
+    with zipfile.ZipFile(sink, mode="w", compression=compression) as archive:
+        for name, data in files:
+            info = zipfile.ZipInfo(name, date_time=timestamp)
+            info.compress_type = compression
+            archive.writestr(info, data)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    tail = sink.drain()
+    if tail:
+        yield tail
@@ -0,0 +1,119 @@
+"""
+Benchmark: Latenz schneller Requests, während langsame Queries laufen.
+
+Simuliert ``async def``-Endpunkte auf einer Event-Loop: einige "langsame"
+Handler führen eine teure Aggregation aus, gleichzeitig laufen viele schnelle
+Handler (z. B. ``/auth/me``), deren Antwortzeit gemessen wird.
+
+Verglichen werden eine synchrone ``Session`` direkt in der Coroutine (bisheriges
+Verhalten, blockiert die Loop) und ``AsyncSession`` über aiosqlite.
+
+Aufruf:
+    python -m benchmarks.bench_event_loop [--fast 400] [--clients 20] [--slow 8] [--rows 200000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import text
+from sqlmodel import Session, SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.database import create_sqlite_engine
+import app.models  # noqa: F401  (Tabellen registrieren)
+
+# Bewusst teure Abfrage: Summe über eine rekursiv erzeugte Zahlenreihe
+SLOW_QUERY = text(
+    "WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < :rows) "
+    "SELECT sum(n % 7) FROM seq"
+)
+FAST_QUERY = text("SELECT 1")
+
+
+def _percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def _run_mode(mode: str, url: str, fast: int, clients: int, slow: int, rows: int) -> dict:
+    # Langsame Handler bekommen in beiden Modi einen eigenen Pool, damit nur
+    # das Blockieren der Loop gemessen wird und nicht Pool-Wartezeiten.
+    sync_engine = create_sqlite_engine(url, "production")
+    slow_async_engine = create_sqlite_engine(url, "production", use_async=True)
+    async_engine = create_sqlite_engine(url, "production", use_async=True)
+    latencies: list = []
+
+    async def slow_handler(delay: float) -> None:
+        # Langsame Requests treffen verteilt über die Messung ein
+        await asyncio.sleep(delay)
+        if mode == "sync":
+            with Session(sync_engine) as session:
+                session.exec(SLOW_QUERY, params={"rows": rows}).one()
+        else:
+            async with AsyncSession(slow_async_engine) as session:
+                (await session.exec(SLOW_QUERY, params={"rows": rows})).one()
+
+    async def fast_handler() -> None:
+        start = time.perf_counter()
+        async with AsyncSession(async_engine) as session:
+            (await session.exec(FAST_QUERY)).one()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    async def fast_client() -> None:
+        for _ in range(fast // clients):
+            await fast_handler()
+            await asyncio.sleep(0.005)
+
+    started = time.perf_counter()
+    spread = (fast // clients) * 0.005
+    await asyncio.gather(
+        *[fast_client() for _ in range(clients)],
+        *[slow_handler(spread * i / slow) for i in range(slow)],
+    )
+    elapsed = time.perf_counter() - started
+
+    await async_engine.dispose()
+    await slow_async_engine.dispose()
+    sync_engine.dispose()
+    return {
+        "mode": mode,
+        "p50": statistics.median(latencies),
+        "p95": _percentile(latencies, 95),
+        "p99": _percentile(latencies, 99),
+        "max": max(latencies),
+        "seconds": elapsed,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fast", type=int, default=400, help="Anzahl schneller Requests")
+    parser.add_argument("--clients", type=int, default=20, help="Parallele schnelle Clients")
+    parser.add_argument("--slow", type=int, default=8, help="Anzahl langsamer Requests")
+    parser.add_argument("--rows", type=int, default=200000, help="Größe der teuren Abfrage")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="bench_loop_")
+    url = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    seed_engine = create_sqlite_engine(url, "production")
+    SQLModel.metadata.create_all(seed_engine)
+    seed_engine.dispose()
+
+    print(f"{'Modus':<8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'Dauer s':>10}")
+    for mode in ("sync", "async"):
+        result = asyncio.run(_run_mode(mode, url, args.fast, args.clients, args.slow, args.rows))
+        print(
+            f"{result['mode']:<8}{result['p50']:>10.2f}{result['p95']:>10.2f}"
+            f"{result['p99']:>10.2f}{result['max']:>10.2f}{result['seconds']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Benchmark: Rechnungsgenerierung aus 100 000 Stundeneinträgen.
+
+``python`` bildet den bisherigen Pfad nach: komplette ORM-Objekte laden, ihr
+``__dict__`` kopieren, in Python je Mitarbeiter summieren und für jeden
+Eintrag linear in allen Mitarbeitern des Mandanten suchen. ``sql`` gruppiert
+die Stundeneinträge per GROUP BY in SQLite und liefert nur die benötigten
+Spalten. ``tagesverdichtung`` ist ``InvoiceGenerator``, der die vorab
+verdichteten Tageszeilen aus ``time_entry_daily`` summiert. Alle Pfade müssen
+dieselben Positionen ergeben.
+
+Aufruf:
+    python -m benchmarks.bench_invoice_generation [--entries 100000] [--employees 200] [--iterations 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import and_, insert
+from sqlmodel import Session, SQLModel, func, select
+
+from app.database import create_sqlite_engine
+from app.models import Employee, MaterialUsage, Project, Tenant, TimeEntry
+from app.schemas import InvoiceGenerationRequest
+from app.services.invoice_generator import InvoiceGenerator
+from app.services.time_rollup import TimeRollupService
+
+
+def _seed(engine, entries: int, employees: int) -> None:
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Tenant(id=1, name="Bench GmbH"))
+        session.commit()
+        session.add(Project(id=1, tenant_id=1, name="Bench"))
+        session.commit()
+        session.execute(insert(Employee), [
+            {"id": index, "tenant_id": 1, "full_name": f"Mitarbeiter {index}", "hourly_rate": 40.0}
+            for index in range(1, employees + 1)
+        ])
+        now = datetime.utcnow()
+        session.execute(insert(TimeEntry), [
+            {
+                "tenant_id": 1, "project_id": 1, "employee_id": 1 + index % employees,
+                "work_date": date.today() - timedelta(days=index % 28), "hours_worked": 8.0,
+                "hourly_rate": 40.0 + index % 3, "total_break_minutes": 0, "is_edited": False,
+                "created_at": now, "updated_at": now,
+            }
+            for index in range(entries)
+        ])
+        session.execute(insert(MaterialUsage), [
+            {
+                "tenant_id": 1, "project_id": 1, "material_name": f"Material {index % 20}", "quantity": 2.0,
+                "unit": "Stk", "unit_price": 5.0, "total_cost": 10.0, "usage_date": now, "created_at": now,
+            }
+            for index in range(entries // 100)
+        ])
+        session.commit()
+        # Core-Inserts umgehen die Flush-Listener
+        TimeRollupService(session).rebuild(1)
+
+
+def _python_path(session: Session, request: InvoiceGenerationRequest) -> list:
+    """Bisheriger Pfad: ganze Objekte laden, in Python gruppieren."""
+    start_date = request.start_date
+    end_date = request.end_date
+    time_entries = [entry.__dict__ for entry in session.exec(select(TimeEntry).where(
+        TimeEntry.tenant_id == 1, TimeEntry.project_id == request.project_id,
+        TimeEntry.work_date >= start_date, TimeEntry.work_date <= end_date,
+    )).all()]
+    employees = [employee.__dict__ for employee in session.exec(select(Employee).where(Employee.tenant_id == 1)).all()]
+
+    employee_hours = {}
+    for entry in time_entries:
+        employee_id = entry.get('employee_id')
+        if employee_id not in employee_hours:
+            employee_hours[employee_id] = {'total_hours': 0, 'total_cost': 0, 'employee': None}
+        employee_hours[employee_id]['total_hours'] += entry.get('hours_worked', 0)
+        employee_hours[employee_id]['total_cost'] += entry.get('hours_worked', 0) * entry.get('hourly_rate', 0)
+        for emp in employees:
+            if emp['id'] == employee_id:
+                employee_hours[employee_id]['employee'] = emp
+                break
+
+    return sorted(
+        (f"Arbeitsstunden - {values['employee']['full_name']}", round(values['total_hours'], 2), round(values['total_cost'], 2))
+        for values in employee_hours.values()
+    )
+
+
+def _sql_path(session: Session, request: InvoiceGenerationRequest) -> list:
+    """GROUP BY direkt über die Stundeneinträge."""
+    rows = session.exec(
+        select(
+            Employee.full_name,
+            func.sum(TimeEntry.hours_worked),
+            func.sum(TimeEntry.hours_worked * func.coalesce(TimeEntry.hourly_rate, 0.0)),
+        )
+        .outerjoin(Employee, and_(Employee.id == TimeEntry.employee_id, Employee.tenant_id == 1))
+        .where(
+            TimeEntry.tenant_id == 1, TimeEntry.project_id == request.project_id,
+            TimeEntry.work_date >= request.start_date.date(), TimeEntry.work_date <= request.end_date.date(),
+        )
+        .group_by(TimeEntry.employee_id, Employee.full_name)
+    ).all()
+    return sorted((f"Arbeitsstunden - {name}", round(hours, 2), round(cost, 2)) for name, hours, cost in rows)
+
+
+def _rollup_path(session: Session, request: InvoiceGenerationRequest) -> list:
+    generator = InvoiceGenerator(session, tenant_id=1)
+    items = generator._generate_from_time_entries(generator._collect_invoice_data(request), request)
+    return sorted((item.description, item.quantity, item.total_price) for item in items)
+
+
+def _measure(func, iterations: int) -> float:
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--employees", type=int, default=200)
+    parser.add_argument("--iterations", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_sqlite_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}", "production")
+        _seed(engine, args.entries, args.employees)
+        request = InvoiceGenerationRequest(
+            project_id=1, generation_method="time_entries",
+            start_date=datetime.now() - timedelta(days=60), end_date=datetime.now() + timedelta(days=1),
+        )
+
+        with Session(engine) as session:
+            expected = _python_path(session, request)
+            if not expected == _sql_path(session, request) == _rollup_path(session, request):
+                raise SystemExit("Positionen unterscheiden sich")
+            python_ms = _measure(lambda: (_python_path(session, request), session.expunge_all()), args.iterations)
+            sql_ms = _measure(lambda: _sql_path(session, request), args.iterations)
+            rollup_ms = _measure(lambda: _rollup_path(session, request), args.iterations)
+        engine.dispose()
+
+    print(f"{'Variante':<38}{'Median ms':>12}")
+    print(f"{'python (ORM-Objekte, Schleifen)':<38}{python_ms:>12.1f}")
+    print(f"{'sql (GROUP BY, Spaltenauswahl)':<38}{sql_ms:>12.1f}")
+    print(f"{'tagesverdichtung (time_entry_daily)':<38}{rollup_ms:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
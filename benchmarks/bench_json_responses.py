@@ -0,0 +1,109 @@
+"""
+Benchmark: JSON-Antwort mit 10 000 Stundeneinträgen.
+
+``fastapi`` ist der bisherige Pfad: handgebaute Dicts, erneute Validierung
+gegen ``response_model``, ``jsonable_encoder`` und ``json``. ``orjson`` ist
+``FastJSONRoute``: ORM-Zeilen werden auf die Schemafelder projiziert und
+direkt zu Bytes kodiert. Gemessen wird der komplette Route-Handler (ohne
+HTTP-Server und Datenbank).
+
+Aufruf:
+    python -m benchmarks.bench_json_responses [--rows 10000] [--iterations 10]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from datetime import date, datetime, timedelta
+from typing import List
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+from fastapi.routing import APIRoute  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+
+from app.models import TimeEntry  # noqa: E402
+from app.schemas import TimeEntry as TimeEntrySchema  # noqa: E402
+from app.utils.fast_json import FastJSONRoute  # noqa: E402
+
+
+def _rows(count: int) -> List[TimeEntry]:
+    start = date(2025, 1, 1)
+    return [
+        TimeEntry(
+            id=index, tenant_id=1, project_id=1 + index % 20, employee_id=1 + index % 7,
+            work_date=start + timedelta(days=index % 365), clock_in="07:00", clock_out="15:30",
+            total_break_minutes=30, hours_worked=8.0, description=f"Trockenbau Abschnitt {index}",
+            hourly_rate=45.0, total_cost=360.0, created_at=datetime(2025, 1, 1, 7, 0),
+            updated_at=datetime(2025, 1, 1, 15, 30),
+        )
+        for index in range(count)
+    ]
+
+
+def _as_dicts(rows: List[TimeEntry]) -> List[dict]:
+    # Entspricht der bisherigen manuellen Serialisierung in get_time_entries
+    return [
+        {
+            "id": entry.id, "project_id": entry.project_id, "employee_id": entry.employee_id,
+            "work_date": entry.work_date.isoformat(), "clock_in": entry.clock_in, "clock_out": entry.clock_out,
+            "break_start": entry.break_start, "break_end": entry.break_end,
+            "total_break_minutes": entry.total_break_minutes, "hours_worked": entry.hours_worked,
+            "description": entry.description, "hourly_rate": entry.hourly_rate, "total_cost": entry.total_cost,
+            "is_edited": entry.is_edited, "edit_reason": entry.edit_reason, "edited_by": entry.edited_by,
+            "created_at": entry.created_at, "updated_at": entry.updated_at,
+        }
+        for entry in rows
+    ]
+
+
+def _handler(route_class: type, endpoint) -> callable:
+    route = route_class("/time-entries/", endpoint, response_model=List[TimeEntrySchema])
+    return route.get_route_handler()
+
+
+async def _call(handler) -> bytes:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    request = Request({"type": "http", "method": "GET", "path": "/time-entries/", "headers": [], "query_string": b""}, receive)
+    response = await handler(request)
+    return response.body
+
+
+def _measure(handler, iterations: int) -> float:
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        asyncio.run(_call(handler))
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--iterations", type=int, default=10)
+    args = parser.parse_args()
+
+    rows = _rows(args.rows)
+    standard = _handler(APIRoute, lambda: _as_dicts(rows))
+    fast = _handler(FastJSONRoute, lambda: rows)
+    if json.loads(asyncio.run(_call(standard))) != json.loads(asyncio.run(_call(fast))):
+        raise SystemExit("Antworten unterscheiden sich")
+
+    standard_ms = _measure(standard, args.iterations)
+    fast_ms = _measure(fast, args.iterations)
+
+    print(f"{'Variante':<38}{'Median ms':>12}")
+    print(f"{'fastapi (Dicts, Validierung, json)':<38}{standard_ms:>12.1f}")
+    print(f"{'orjson (FastJSONRoute, ORM-Zeilen)':<38}{fast_ms:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
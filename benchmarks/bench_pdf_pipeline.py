@@ -0,0 +1,121 @@
+"""
+Benchmark: Rechnungs-PDF über temporäre Dateien vs. komplett im Speicher.
+
+``tempfile`` bildet den bisherigen Ablauf nach: der Generator schreibt die PDF
+in eine ``NamedTemporaryFile`` und liest sie zurück, der Router schreibt die
+Bytes in eine zweite temporäre Datei, ``FileResponse`` liest sie blockweise
+und ein Hintergrund-Task löscht sie. ``memory`` rendert in einen ``BytesIO``
+und streamt die Bytes direkt (``pdf_streaming_response``).
+
+Gemessen werden Latenz pro Download sowie Lese-/Schreib-Syscalls und
+geschriebene Bytes aus ``/proc/self/io`` (nur Linux).
+
+Aufruf:
+    python -m benchmarks.bench_pdf_pipeline [--iterations 200]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import Dict, Optional
+
+from app.services.beautiful_pdf_generator import load_invoice_branding, render_invoice_pdf
+from app.utils.pdf_utils import PDF_CHUNK_SIZE, pdf_streaming_response
+
+INVOICE_DATA = {
+    "invoice_number": "R-2025-001",
+    "client_name": "Kunde GmbH",
+    "client_address": "Hauptstraße 1, 70173 Stuttgart",
+    "total_amount": 2380.0,
+    "invoice_date": "2025-01-15T00:00:00",
+    "due_date": "2025-02-14T00:00:00",
+    "items": [
+        {"description": f"Position {i}", "quantity": 2, "unit": "m²", "unit_price": 50.0, "total_price": 100.0}
+        for i in range(20)
+    ],
+}
+
+
+def _read_proc_io() -> Optional[Dict[str, int]]:
+    try:
+        with open("/proc/self/io", "r", encoding="ascii") as handle:
+            return {key: int(value) for key, value in (line.split(": ") for line in handle.read().splitlines())}
+    except OSError:
+        return None
+
+
+async def _download_tempfile(branding: dict) -> int:
+    # Generator: Rendern in eine temporäre Datei und Zurücklesen
+    pdf = render_invoice_pdf(INVOICE_DATA, branding)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
+        tmp_file.write(pdf)
+        first_path = tmp_file.name
+    with open(first_path, "rb") as handle:
+        pdf = handle.read()
+    os.unlink(first_path)
+
+    # Router: zweite temporäre Datei, FileResponse liest blockweise, Cleanup-Task
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
+        tmp_file.write(pdf)
+        second_path = tmp_file.name
+    sent = 0
+    with open(second_path, "rb") as handle:
+        while chunk := handle.read(PDF_CHUNK_SIZE):
+            sent += len(chunk)
+    os.unlink(second_path)
+    return sent
+
+
+async def _download_memory(branding: dict) -> int:
+    response = pdf_streaming_response(render_invoice_pdf(INVOICE_DATA, branding), "Rechnung.pdf")
+    sent = 0
+    async for chunk in response.body_iterator:
+        sent += len(chunk)
+    return sent
+
+
+async def run(mode: str, iterations: int) -> dict:
+    branding = load_invoice_branding(None, None)
+    download = _download_tempfile if mode == "tempfile" else _download_memory
+    await download(branding)  # Aufwärmen (Fonts, Imports)
+
+    before = _read_proc_io()
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await download(branding)
+        latencies.append((time.perf_counter() - started) * 1000)
+    after = _read_proc_io()
+
+    result = {
+        "mode": mode,
+        "p50": statistics.median(latencies),
+        "p95": sorted(latencies)[int(0.95 * (len(latencies) - 1))],
+    }
+    if before and after:
+        result["syscalls"] = ((after["syscr"] - before["syscr"]) + (after["syscw"] - before["syscw"])) / iterations
+        result["written_kb"] = (after["wchar"] - before["wchar"]) / iterations / 1024
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'Modus':<10}{'p50 ms':>10}{'p95 ms':>10}{'I/O-Syscalls':>14}{'geschr. KiB':>13}")
+    for mode in ("tempfile", "memory"):
+        result = asyncio.run(run(mode, args.iterations))
+        print(
+            f"{result['mode']:<10}{result['p50']:>10.2f}{result['p95']:>10.2f}"
+            f"{result.get('syscalls', float('nan')):>14.1f}{result.get('written_kb', float('nan')):>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
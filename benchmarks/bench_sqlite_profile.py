@@ -0,0 +1,139 @@
+"""
+Benchmark: Lese-/Schreibdurchsatz der SQLite-Engine-Profile.
+
+Simuliert Schichtbeginn: mehrere Threads buchen Stundeneinträge (Schreiber),
+während weitere Threads Dashboard-ähnliche Aggregationen lesen.
+Verglichen werden das bisherige Verhalten (``legacy``) und ``production``.
+
+Aufruf:
+    python -m benchmarks.bench_sqlite_profile [--seconds 5] [--writers 4] [--readers 8]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, SQLModel, select, func
+
+from app.database import create_sqlite_engine
+from app.models import Employee, Project, Tenant, TimeEntry
+
+
+def _seed(engine) -> tuple[int, int, int]:
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        tenant = Tenant(name="Bench GmbH")
+        session.add(tenant)
+        session.commit()
+        session.refresh(tenant)
+        project = Project(name="Bench", tenant_id=tenant.id)
+        employee = Employee(full_name="Max Muster", hourly_rate=40.0, tenant_id=tenant.id)
+        session.add(project)
+        session.add(employee)
+        session.commit()
+        session.refresh(project)
+        session.refresh(employee)
+        for _ in range(2000):
+            session.add(TimeEntry(
+                tenant_id=tenant.id,
+                project_id=project.id,
+                employee_id=employee.id,
+                work_date=datetime.combine(date.today(), datetime.min.time()),
+                hours_worked=8.0,
+            ))
+        session.commit()
+        return tenant.id, project.id, employee.id
+
+
+def run_profile(profile: str, seconds: float, writers: int, readers: int) -> dict:
+    tmpdir = tempfile.mkdtemp(prefix="bench_sqlite_")
+    url = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    write_engine = create_sqlite_engine(url, profile)
+    read_engine = write_engine if profile == "legacy" else create_sqlite_engine(url, profile, read_only=True)
+    tenant_id, project_id, employee_id = _seed(write_engine)
+
+    counters = {"writes": 0, "reads": 0, "locked": 0}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def bump(key: str) -> None:
+        with lock:
+            counters[key] += 1
+
+    def writer() -> None:
+        while not stop.is_set():
+            try:
+                with Session(write_engine) as session:
+                    session.add(TimeEntry(
+                        tenant_id=tenant_id,
+                        project_id=project_id,
+                        employee_id=employee_id,
+                        work_date=datetime.utcnow(),
+                        hours_worked=1.0,
+                    ))
+                    session.commit()
+                bump("writes")
+            except OperationalError:
+                bump("locked")
+
+    def reader() -> None:
+        while not stop.is_set():
+            try:
+                with Session(read_engine) as session:
+                    session.exec(
+                        select(func.count(TimeEntry.id), func.sum(TimeEntry.hours_worked))
+                        .where(TimeEntry.tenant_id == tenant_id)
+                    ).one()
+                bump("reads")
+            except OperationalError:
+                bump("locked")
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    with write_engine.connect() as conn:
+        journal_mode = conn.execute(text("PRAGMA journal_mode")).scalar()
+    write_engine.dispose()
+    if read_engine is not write_engine:
+        read_engine.dispose()
+
+    return {
+        "profile": profile,
+        "journal_mode": journal_mode,
+        "writes_per_s": counters["writes"] / seconds,
+        "reads_per_s": counters["reads"] / seconds,
+        "locked_errors": counters["locked"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    args = parser.parse_args()
+
+    print(f"{'Profil':<12}{'Journal':<10}{'Writes/s':>12}{'Reads/s':>12}{'Locked':>10}")
+    for profile in ("legacy", "production"):
+        result = run_profile(profile, args.seconds, args.writers, args.readers)
+        print(
+            f"{result['profile']:<12}{result['journal_mode']:<10}"
+            f"{result['writes_per_s']:>12.1f}{result['reads_per_s']:>12.1f}{result['locked_errors']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
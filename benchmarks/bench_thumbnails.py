@@ -0,0 +1,82 @@
+"""
+Benchmark: Vorschaubilder aus einem 12-MP-Handyfoto.
+
+``full`` bildet den bisherigen Upload-Pfad der Projektbilder nach: volles
+Dekodieren und ``thumbnail((1920, 1080), LANCZOS)`` im Request. ``draft``
+nutzt ``generate_thumbnails`` (Draft-Dekodierung, alle Größen aus
+``THUMBNAIL_SIZES`` kaskadiert). Zusätzlich wird gemessen, wie lange ein Upload
+auf die Pipeline wartet, wenn sie im Hintergrund läuft.
+
+Aufruf:
+    python -m benchmarks.bench_thumbnails [--iterations 10]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from PIL import Image
+
+from app.services.thumbnail_service import ThumbnailPipeline, generate_thumbnails
+
+
+def _write_photo(path: str) -> None:
+    # Verlauf statt Einfarbfläche, damit der JPEG-Decoder realistisch arbeitet
+    gradient = Image.linear_gradient("L").resize((4000, 3000))
+    Image.merge("RGB", (gradient, gradient.transpose(Image.Transpose.ROTATE_180), gradient)).save(
+        path, "JPEG", quality=90
+    )
+
+
+def _full(path: str, target: str) -> None:
+    with Image.open(path) as image:
+        image.load()
+        image.thumbnail((1920, 1080), Image.Resampling.LANCZOS)
+        image.save(target, "JPEG", quality=85, optimize=True)
+
+
+def _measure(func, iterations: int) -> float:
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        photo = os.path.join(directory, "foto.jpg")
+        _write_photo(photo)
+        full_ms = _measure(lambda: _full(photo, os.path.join(directory, "full.jpg")), args.iterations)
+        draft_ms = _measure(lambda: generate_thumbnails(photo), args.iterations)
+
+        # Jede Datei einzeln, da Aufträge für dasselbe Bild zusammengefasst werden
+        copies = []
+        for index in range(args.iterations):
+            copy = os.path.join(directory, f"upload_{index}.jpg")
+            shutil.copyfile(photo, copy)
+            copies.append(copy)
+        pipeline = ThumbnailPipeline(workers=2, max_queue=args.iterations)
+        try:
+            enqueue_ms = _measure(lambda: pipeline.enqueue(copies.pop()), args.iterations)
+        finally:
+            pipeline.shutdown()
+
+    print(f"{'Variante':<38}{'Median ms':>12}")
+    print(f"{'voll dekodiert, 1920 px (alt)':<38}{full_ms:>12.1f}")
+    print(f"{'Draft, 1280/480/160 px':<38}{draft_ms:>12.1f}")
+    print(f"{'Upload-Wartezeit mit Pipeline':<38}{enqueue_ms:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark: Stundeneinträge einzeln anlegen gegenüber Massenimport.
+
+``einzeln`` ruft den Endpunkt ``POST /time-entries`` je Zeile auf (zwei
+Lookups und ein Commit je Eintrag). ``csv-import`` liest eine CSV-Datei mit
+``--rows`` Zeilen, prüft sie gegen vorab geladene Projekte und Mitarbeiter und
+fügt sie per executemany blockweise ein. Gemessen auf einer Datei-Datenbank
+mit Produktionsprofil (WAL).
+
+Aufruf:
+    python -m benchmarks.bench_time_entry_import [--rows 50000] [--single-rows 2000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy import func
+from sqlmodel import Session, SQLModel, select
+
+from app.database import create_sqlite_engine
+from app.models import Employee, Project, Tenant, TimeEntry
+from app.routers.time_entries import create_time_entry
+from app.schemas import TimeEntryCreate
+from app.services.time_entry_import import TimeEntryImporter, parse_import_file
+
+PROJECTS = 50
+EMPLOYEES = 40
+
+
+def _seed(engine) -> None:
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Tenant(id=1, name="Bench GmbH"))
+        session.commit()
+        for index in range(1, PROJECTS + 1):
+            session.add(Project(id=index, tenant_id=1, name=f"Projekt {index}"))
+        for index in range(1, EMPLOYEES + 1):
+            session.add(Employee(id=index, tenant_id=1, full_name=f"Mitarbeiter {index}", hourly_rate=40.0 + index % 5))
+        session.commit()
+
+
+def _row(index: int) -> tuple:
+    work_date = date(2025, 1, 1) + timedelta(days=index % 300)
+    return 1 + index % PROJECTS, 1 + index % EMPLOYEES, work_date, 4 + index % 5
+
+
+def _csv(rows: int) -> bytes:
+    lines = ["Projekt;Mitarbeiter;Datum;Stunden;Tätigkeit"]
+    for index in range(rows):
+        project_id, employee_id, work_date, hours = _row(index)
+        lines.append(f"{project_id};{employee_id};{work_date:%d.%m.%Y};{hours},5;Trockenbau")
+    return "\n".join(lines).encode("utf-8")
+
+
+def _count(engine) -> int:
+    with Session(engine) as session:
+        return session.exec(select(func.count()).select_from(TimeEntry)).one()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--single-rows", type=int, default=2_000)
+    args = parser.parse_args()
+    user = SimpleNamespace(id=1, tenant_id=1, role="admin")
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_sqlite_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}", "production")
+        _seed(engine)
+
+        started = time.perf_counter()
+        with Session(engine) as session:
+            for index in range(args.single_rows):
+                project_id, employee_id, work_date, hours = _row(index)
+                create_time_entry(
+                    TimeEntryCreate(
+                        project_id=project_id, employee_id=employee_id, work_date=work_date.isoformat(),
+                        hours_worked=hours + 0.5, description="Trockenbau",
+                    ),
+                    session=session, current_user=user,
+                )
+        single_ms = (time.perf_counter() - started) * 1000
+
+        data = _csv(args.rows)
+        started = time.perf_counter()
+        with Session(engine) as session:
+            result = TimeEntryImporter(session, 1).run(parse_import_file(data, "bench.csv"), first_row=2)
+        bulk_ms = (time.perf_counter() - started) * 1000
+        if result["imported"] != args.rows or _count(engine) != args.single_rows + args.rows:
+            raise SystemExit(f"Import unvollständig: {result['imported']} von {args.rows}")
+        engine.dispose()
+
+    print(f"{'Variante':<38}{'Zeilen':>10}{'ms':>12}{'Zeilen/s':>12}")
+    print(f"{'einzeln (POST /time-entries)':<38}{args.single_rows:>10}{single_ms:>12.1f}{args.single_rows / single_ms * 1000:>12.0f}")
+    print(f"{'csv-import (executemany, Blöcke)':<38}{args.rows:>10}{bulk_ms:>12.1f}{args.rows / bulk_ms * 1000:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -270,7 +270,7 @@ function renderCurrentLogo(logo) {
 
     container.innerHTML = `
         <div class="text-center">
-            <img src="/company-logo/view?logo_id=${logo.id}&ts=${Date.now()}" alt="Firmenlogo" class="img-fluid mb-3 rounded shadow-sm" style="max-height: 180px; object-fit: contain;">
+            <img src="/company-logo/view?logo_id=${logo.id}&${logo.content_hash ? `v=${logo.content_hash}` : `ts=${Date.now()}`}" alt="Firmenlogo" class="img-fluid mb-3 rounded shadow-sm" style="max-height: 180px; object-fit: contain;">
             <h6 class="fw-bold">${logo.original_filename || 'Logo'}</h6>
             <small class="text-muted d-block">${sizeKb} KB • ${createdAt}</small>
             <div class="mt-3">
@@ -0,0 +1,100 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import text
+from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from app.auth import authenticate_user_async, create_access_token, get_current_user, get_password_hash  # noqa: E402
+from app.database import create_sqlite_engine  # noqa: E402
+from app.models import Tenant, User, UserRole  # noqa: E402
+from app.routers.user_settings import read_user_settings, update_user_settings  # noqa: E402
+from app.schemas import UserSettingsUpdate  # noqa: E402
+
+
+@pytest.fixture()
+def db_url(tmp_path):
+    url = f"sqlite:///{tmp_path / 'async.db'}"
+    engine = create_engine(url)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Tenant(id=1, name="Tenant A"))
+        session.commit()
+        session.add(User(
+            id=1, tenant_id=1, username="anna", email="anna@example.com",
+            full_name="Anna Admin", role=UserRole.ADMIN,
+            hashed_password=get_password_hash("Geheim123!"),
+        ))
+        session.commit()
+    engine.dispose()
+    return url
+
+
+def run_with_session(db_url, func):
+    """Führt ``func(async_session)`` auf einer eigenen aiosqlite-Engine aus."""
+
+    async def runner():
+        engine = create_sqlite_engine(db_url, "production", use_async=True)
+        try:
+            async with AsyncSession(engine, expire_on_commit=False) as session:
+                return await func(session)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(runner())
+
+
+def test_async_engine_applies_profile_pragmas(db_url):
+    async def journal_mode(session):
+        return (await session.exec(text("PRAGMA journal_mode"))).scalar()
+
+    assert run_with_session(db_url, journal_mode) == "wal"
+
+
+def test_authenticate_user_async(db_url):
+    user = run_with_session(db_url, lambda s: authenticate_user_async(s, "anna", "Geheim123!"))
+    assert user is not None and user.username == "anna"
+
+    assert run_with_session(db_url, lambda s: authenticate_user_async(s, "anna", "falsch")) is None
+    assert run_with_session(db_url, lambda s: authenticate_user_async(s, "niemand", "Geheim123!")) is None
+
+
+def test_get_current_user_resolves_token(db_url):
+    token = create_access_token({"sub": "anna"})
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    user = run_with_session(db_url, lambda s: get_current_user(credentials=credentials, session=s))
+    assert user.id == 1 and user.tenant_id == 1
+
+    unknown = HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_access_token({"sub": "niemand"}))
+    with pytest.raises(HTTPException) as exc:
+        run_with_session(db_url, lambda s: get_current_user(credentials=unknown, session=s))
+    assert exc.value.status_code == 401
+
+
+def test_user_settings_are_created_and_updated_async(db_url):
+    async def flow(session):
+        user = await session.get(User, 1)
+        created = await read_user_settings(current_user=user, session=session)
+        updated = await update_user_settings(
+            UserSettingsUpdate(theme_preference="DARK"), current_user=user, session=session
+        )
+        return created, updated
+
+    created, updated = run_with_session(db_url, flow)
+    assert created.theme_preference is None
+    assert updated.theme_preference == "dark"
+
+    async def reload(session):
+        user = await session.get(User, 1)
+        return await read_user_settings(current_user=user, session=session)
+
+    assert run_with_session(db_url, reload).theme_preference == "dark"
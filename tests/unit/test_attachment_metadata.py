@@ -0,0 +1,149 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from app.database import create_sqlite_engine  # noqa: E402
+from app.models import Project, ProjectImage, Report, ReportImage, Tenant  # noqa: E402
+from app.routers import reports as reports_router  # noqa: E402
+from app.services.attachment_metadata import read_metadata, reconcile  # noqa: E402
+
+# EXIF-Tag 0x0112: Orientierung 6 = um 90° im Uhrzeigersinn drehen
+ORIENTATION_TAG = 0x0112
+
+
+def write_jpeg(path, size=(60, 40), orientation=None) -> str:
+    image = Image.new("RGB", size, "navy")
+    exif = image.getexif()
+    if orientation:
+        exif[ORIENTATION_TAG] = orientation
+    image.save(path, "JPEG", exif=exif)
+    return str(path)
+
+
+@pytest.fixture()
+def db_url(tmp_path):
+    url = f"sqlite:///{tmp_path / 'images.db'}"
+    engine = create_engine(url)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Tenant(id=1, name="Tenant A"))
+        session.add(Tenant(id=2, name="Tenant B"))
+        session.commit()
+        session.add(Project(id=1, tenant_id=1, name="Projekt A"))
+        session.add(Report(id=1, tenant_id=1, project_id=1, title="Bericht A"))
+        session.add(Project(id=2, tenant_id=2, name="Projekt B"))
+        session.add(Report(id=2, tenant_id=2, project_id=2, title="Bericht B"))
+        session.commit()
+    engine.dispose()
+    return url
+
+
+def add_image(session, path, report_id=1, tenant_id=1, **values):
+    image = ReportImage(
+        tenant_id=tenant_id, report_id=report_id, filename=os.path.basename(path),
+        original_filename="foto.jpg", file_path=path, **values,
+    )
+    session.add(image)
+    session.commit()
+    return image
+
+
+def test_read_metadata_respects_exif_orientation(tmp_path):
+    metadata = read_metadata(write_jpeg(tmp_path / "hoch.jpg", orientation=6))
+
+    assert (metadata["width"], metadata["height"]) == (40, 60)
+    assert metadata["mime_type"] == "image/jpeg"
+    assert metadata["file_size"] == os.path.getsize(tmp_path / "hoch.jpg")
+    assert metadata["file_missing"] is False
+
+
+def test_reconcile_updates_changed_and_missing_files(db_url, tmp_path):
+    engine = create_engine(db_url)
+    current = write_jpeg(tmp_path / "aktuell.jpg")
+    changed = write_jpeg(tmp_path / "geaendert.jpg")
+    gone = write_jpeg(tmp_path / "weg.jpg")
+    with Session(engine) as session:
+        add_image(session, current, **read_metadata(current))
+        add_image(session, changed, **read_metadata(changed))
+        add_image(session, gone, **read_metadata(gone))
+        session.add(ProjectImage(
+            tenant_id=2, project_id=2, filename="alt.jpg", original_filename="alt.jpg", file_path=current,
+        ))
+        session.commit()
+
+    write_jpeg(changed, size=(300, 200))
+    os.utime(changed, (1_700_000_000, 1_700_000_000))
+    os.remove(gone)
+
+    with Session(engine) as session:
+        preview = reconcile(session, apply=False)
+        assert (preview.checked, preview.updated, preview.missing) == (4, 3, 1)
+        assert session.get(ReportImage, 3).file_missing is False
+
+        tenant_only = reconcile(session, tenant_id=2, apply=False)
+        assert tenant_only.checked == 1
+
+        result = reconcile(session)
+        assert (result.updated, result.missing) == (3, 1)
+        assert (session.get(ReportImage, 2).width, session.get(ReportImage, 2).height) == (300, 200)
+        assert session.get(ReportImage, 3).file_missing is True
+        assert session.get(ProjectImage, 1).mime_type == "image/jpeg"
+
+        assert reconcile(session, apply=False).updated == 0
+
+    write_jpeg(gone)
+    with Session(engine) as session:
+        reconcile(session)
+        assert session.get(ReportImage, 3).file_missing is False
+
+
+def test_report_files_come_from_metadata_only(db_url, tmp_path, monkeypatch):
+    engine = create_engine(db_url)
+    path = write_jpeg(tmp_path / "foto.jpg")
+    with Session(engine) as session:
+        add_image(session, path, **read_metadata(path))
+        add_image(session, str(tmp_path / "fehlt.jpg"), file_missing=True)
+
+    # Fremde Dateien im Upload-Verzeichnis dürfen nicht mehr auftauchen
+    upload_dir = tmp_path / "uploads"
+    upload_dir.mkdir()
+    write_jpeg(upload_dir / "anderer_mandant.jpg")
+    monkeypatch.setattr(reports_router, "UPLOAD_DIR", str(upload_dir))
+    # Bis zum nächsten Abgleich gelten die gespeicherten Metadaten, auch ohne Datei
+    os.remove(path)
+
+    # reports.py definiert die Route mehrfach; aktiv ist die zuerst registrierte
+    get_report_files = next(
+        route.endpoint for route in reports_router.router.routes
+        if route.path == "/reports/{report_id}/files" and "GET" in route.methods
+    )
+
+    async def run(report_id, tenant_id):
+        async_engine = create_sqlite_engine(db_url, "production", use_async=True)
+        try:
+            async with AsyncSession(async_engine, expire_on_commit=False) as session:
+                return await get_report_files(
+                    report_id=report_id, session=session,
+                    current_user=SimpleNamespace(id=1, tenant_id=tenant_id, role="admin"),
+                )
+        finally:
+            await async_engine.dispose()
+
+    files = asyncio.run(run(1, 1))
+    assert [entry["filename"] for entry in files] == ["foto.jpg"]
+    assert files[0]["width"] == 60 and files[0]["mime_type"] == "image/jpeg"
+
+    assert asyncio.run(run(2, 2)) == []
+    with pytest.raises(HTTPException):
+        asyncio.run(run(2, 1))
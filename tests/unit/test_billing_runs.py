@@ -0,0 +1,164 @@
+import os
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from fastapi import BackgroundTasks, HTTPException
+from sqlmodel import SQLModel, Session, select
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from app.database import create_sqlite_engine  # noqa: E402
+from app.models import (  # noqa: E402
+    BillingRun, BillingRunItem, Employee, Invoice, InvoiceLineItem, Project, Tenant, TenantSettings, TimeEntry,
+)
+from app.routers import invoice_generation  # noqa: E402
+from app.schemas import BillingRunCreate  # noqa: E402
+from app.services.billing_runs import BillingRunError, BillingRunLeaseLost, BillingRunService  # noqa: E402
+
+PERIOD = BillingRunCreate(start_date=date(2025, 3, 1), end_date=date(2025, 3, 31), generation_method="time_entries")
+BILLABLE = (1, 2, 3, 5)
+
+
+@pytest.fixture()
+def engine(tmp_path):
+    engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'billing.db'}", "production")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Tenant(id=1, name="Tenant A"))
+        session.add(Tenant(id=2, name="Tenant B"))
+        session.commit()
+        session.add(TenantSettings(tenant_id=1, invoice_prefix="SR", invoice_next_number=100))
+        session.add(Employee(id=1, tenant_id=1, full_name="Max Muster", hourly_rate=40.0))
+        session.add(Employee(id=2, tenant_id=2, full_name="Fremd", hourly_rate=40.0))
+        for project_id in range(1, 8):
+            session.add(Project(id=project_id, tenant_id=2 if project_id == 7 else 1, name=f"Projekt {project_id}"))
+        session.commit()
+        for project_id in BILLABLE:
+            session.add(TimeEntry(
+                tenant_id=1, project_id=project_id, employee_id=1, work_date=date(2025, 3, project_id),
+                hours_worked=project_id, hourly_rate=50.0,
+            ))
+        # Projekt 4: Stunden ohne Satz (übersprungen), Projekt 6: außerhalb des Zeitraums, Projekt 7: fremder Mandant
+        session.add(TimeEntry(tenant_id=1, project_id=4, employee_id=1, work_date=date(2025, 3, 4), hours_worked=2, hourly_rate=0.0))
+        session.add(TimeEntry(tenant_id=1, project_id=6, employee_id=1, work_date=date(2025, 4, 2), hours_worked=2, hourly_rate=50.0))
+        session.add(TimeEntry(tenant_id=2, project_id=7, employee_id=2, work_date=date(2025, 3, 2), hours_worked=2, hourly_rate=50.0))
+        session.commit()
+    yield engine
+    engine.dispose()
+
+
+def service(engine, **options) -> BillingRunService:
+    return BillingRunService(engine=engine, workers=3, batch_size=2, **options)
+
+
+def invoices(engine):
+    with Session(engine) as session:
+        return session.exec(select(Invoice).order_by(Invoice.invoice_number)).all()
+
+
+def test_run_creates_one_numbered_draft_per_billable_project(engine):
+    billing = service(engine)
+    created = billing.create_run(1, PERIOD, created_by=None)
+    assert created.total_projects == 5  # Projekte 1-5
+
+    run = billing.run(1, created.id)
+
+    assert (run.status, run.processed_projects, run.created_invoices, run.skipped_projects, run.failed_projects) == (
+        "abgeschlossen", 5, 4, 1, 0,
+    )
+    drafts = invoices(engine)
+    assert [(inv.project_id, inv.invoice_number, inv.total_amount) for inv in drafts] == [
+        (project_id, f"SR-{100 + index:05d}", round(project_id * 50.0 * 1.19, 2))
+        for index, project_id in enumerate(BILLABLE)
+    ]
+    assert {inv.status for inv in drafts} == {"entwurf"}
+    with Session(engine) as session:
+        items = {item.project_id: item for item in session.exec(select(BillingRunItem)).all()}
+        assert items[4].status == "uebersprungen"
+        assert items[1].invoice_id == drafts[0].id and items[1].invoice_number == "SR-00100"
+        assert session.exec(select(InvoiceLineItem).where(InvoiceLineItem.invoice_id == drafts[0].id)).all()
+
+    with pytest.raises(BillingRunError):
+        billing.run(1, created.id)
+
+
+def test_interrupted_run_resumes_without_duplicates(engine, monkeypatch):
+    billing = service(engine)
+    run_id = billing.create_run(1, PERIOD).id
+    original = BillingRunService._write_batch
+    calls = []
+
+    def fail_second_batch(self, run, token, batch):
+        calls.append(batch)
+        if len(calls) == 2:
+            raise RuntimeError("Verbindung verloren")
+        return original(self, run, token, batch)
+
+    monkeypatch.setattr(BillingRunService, "_write_batch", fail_second_batch)
+    run = billing.run(1, run_id)
+    assert (run.status, run.processed_projects, run.created_invoices) == ("fehlgeschlagen", 2, 2)
+    assert "Verbindung verloren" in run.error
+
+    monkeypatch.setattr(BillingRunService, "_write_batch", original)
+    run = billing.run(1, run_id)
+
+    assert (run.status, run.processed_projects, run.created_invoices) == ("abgeschlossen", 5, 4)
+    drafts = invoices(engine)
+    assert sorted(inv.project_id for inv in drafts) == list(BILLABLE)
+    assert [inv.invoice_number for inv in drafts] == [f"SR-{number:05d}" for number in range(100, 104)]
+
+
+def test_lease_prevents_parallel_workers_and_expires(engine):
+    billing = service(engine)
+    run_id = billing.create_run(1, PERIOD).id
+    assert billing.claim(1, run_id)
+    assert not billing.claim(1, run_id)
+    assert not billing.claim(2, run_id)
+
+    with Session(engine) as session:
+        run = session.get(BillingRun, run_id)
+        stale = run.heartbeat_at - timedelta(hours=1)
+        run.heartbeat_at = stale
+        session.add(run)
+        session.commit()
+
+    # Abgestürzter Worker: Lauf wird übernommen, der alte Worker darf nicht mehr schreiben
+    assert billing.claim(1, run_id)
+    with Session(engine) as session, pytest.raises(BillingRunLeaseLost):
+        billing._renew_lease(session, run_id, stale)
+    assert billing.process(1, run_id).created_invoices == 4
+
+
+def test_endpoints_start_and_resume_runs_in_background(engine, monkeypatch):
+    billing = service(engine)
+    monkeypatch.setattr(invoice_generation, "billing_run_service", billing)
+    user = SimpleNamespace(id=None, tenant_id=1, role="admin")
+
+    with Session(engine) as session:
+        tasks = BackgroundTasks()
+        run = invoice_generation.create_billing_run(PERIOD, tasks, session=session, current_user=user)
+        assert (run.status, run.total_projects, len(tasks.tasks)) == ("laeuft", 5, 1)
+        with pytest.raises(HTTPException) as conflict:
+            invoice_generation.resume_billing_run(run.id, BackgroundTasks(), session=session, current_user=user)
+        assert conflict.value.status_code == 409
+
+        task = tasks.tasks[0]
+        task.func(*task.args, **task.kwargs)
+        session.expire_all()
+        assert invoice_generation.get_billing_run(run.id, session=session, current_user=user).status == "abgeschlossen"
+        items = invoice_generation.get_billing_run_items(run.id, session=session, current_user=user)
+        assert [item.status for item in items] == ["erstellt", "erstellt", "erstellt", "uebersprungen", "erstellt"]
+
+        with pytest.raises(HTTPException) as missing:
+            invoice_generation.get_billing_run(run.id, session=session, current_user=SimpleNamespace(id=None, tenant_id=2))
+        assert missing.value.status_code == 404
+        with pytest.raises(HTTPException) as invalid:
+            invoice_generation.create_billing_run(
+                BillingRunCreate(start_date=date(2025, 4, 1), end_date=date(2025, 3, 1)), BackgroundTasks(),
+                session=session, current_user=user,
+            )
+        assert invalid.value.status_code == 400
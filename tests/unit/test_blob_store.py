@@ -0,0 +1,218 @@
+import asyncio
+import io
+import os
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+from sqlmodel import SQLModel, Session, create_engine, select
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.pool import StaticPool
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from app.models import Project, Report, ReportImage, StoredBlob, Tenant  # noqa: E402
+from app.routers import company_logo as company_logo_router  # noqa: E402
+from app.routers import project_images as project_images_router  # noqa: E402
+from app.services import upload_service  # noqa: E402
+from app.services.blob_store import BlobMissing, BlobStore, BlobTooLarge, collect_garbage  # noqa: E402
+from app.services.thumbnail_service import ThumbnailPipeline  # noqa: E402
+
+
+@pytest.fixture()
+def store(tmp_path):
+    return BlobStore(str(tmp_path / "blobs"))
+
+
+@pytest.fixture()
+def session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Tenant(id=1, name="Tenant A"))
+        session.commit()
+        session.add(Project(id=1, tenant_id=1, name="Projekt A"))
+        session.add(Report(id=1, tenant_id=1, project_id=1, title="Bericht 1"))
+        session.add(Report(id=2, tenant_id=1, project_id=1, title="Bericht 2"))
+        session.commit()
+        yield session
+
+
+def backdate(path, seconds=120):
+    old = time.time() - seconds
+    os.utime(path, (old, old))
+
+
+def stored_files(store):
+    return [name for _root, _dirs, files in os.walk(store.directory) for name in files]
+
+
+def _attach(session, report_id, stored):
+    image = ReportImage(
+        tenant_id=1, report_id=report_id, filename=f"foto_{report_id}.jpg", original_filename="foto.jpg",
+        file_path=stored.path, file_size=stored.size, content_hash=stored.content_hash,
+    )
+    session.add(image)
+    session.commit()
+    return image
+
+
+def test_identical_uploads_share_one_file(store):
+    first = store.store_stream(io.BytesIO(b"foto" * 1000), ".JPG")
+    second = store.store_stream(io.BytesIO(b"foto" * 1000), ".jpeg")
+
+    assert first.created is True and second.created is False
+    assert first.path == second.path
+    assert first.path.endswith(f"{first.content_hash}.jpg")
+    assert first.size == 4000
+    assert len([name for _root, _dirs, files in os.walk(store.directory) for name in files]) == 1
+
+
+def test_size_limit_aborts_without_leftovers(store):
+    with pytest.raises(BlobTooLarge):
+        store.store_stream(io.BytesIO(b"x" * 100), ".jpg", max_bytes=10)
+    assert [name for _root, _dirs, files in os.walk(store.directory) for name in files] == []
+
+
+def test_blob_is_removed_with_last_reference(store, session):
+    stored = store.store_bytes(b"gleiches Foto", ".jpg")
+    first = _attach(session, 1, stored)
+    second = _attach(session, 2, stored)
+    assert session.get(StoredBlob, stored.content_hash).ref_count == 2
+
+    session.delete(first)
+    session.commit()
+    assert os.path.exists(stored.path)
+    assert session.get(StoredBlob, stored.content_hash).ref_count == 1
+
+    # Zurückgerolltes Löschen behält Datei und Zähler
+    session.delete(second)
+    session.flush()
+    session.rollback()
+    assert os.path.exists(stored.path)
+
+    second = session.exec(select(ReportImage).where(ReportImage.report_id == 2)).one()
+    session.delete(second)
+    session.commit()
+    # Erst die Bereinigung löscht, und nur Dateien außerhalb der Schonfrist
+    assert session.get(StoredBlob, stored.content_hash).ref_count == 0
+    assert collect_garbage(session, grace_seconds=60) == []
+    assert os.path.exists(stored.path)
+
+    backdate(stored.path)
+    assert collect_garbage(session, grace_seconds=60) == [stored.path]
+    assert session.get(StoredBlob, stored.content_hash) is None
+    assert not os.path.exists(stored.path)
+
+
+def test_reuse_survives_concurrent_release_of_last_reference(store, session):
+    stored = store.store_bytes(b"gleiches Foto", ".jpg")
+    first = _attach(session, 1, stored)
+    backdate(stored.path)
+
+    # Upload A findet den Blob vor, B löscht den letzten Verweis, bevor A committet
+    reused = store.store_bytes(b"gleiches Foto", ".jpg")
+    assert reused.created is False and reused.path == stored.path
+    session.delete(first)
+    session.commit()
+    assert collect_garbage(session, grace_seconds=60) == []
+
+    second = _attach(session, 2, reused)
+    assert session.get(StoredBlob, stored.content_hash).ref_count == 1
+    assert os.path.exists(second.file_path)
+
+
+def test_new_reference_to_missing_file_fails(store, session):
+    stored = store.store_bytes(b"gleiches Foto", ".jpg")
+    os.remove(stored.path)
+    with pytest.raises(BlobMissing):
+        _attach(session, 1, stored)
+    session.rollback()
+    assert session.get(StoredBlob, stored.content_hash) is None
+    assert session.exec(select(ReportImage)).all() == []
+
+
+def test_project_image_uploads_are_deduplicated(store, session, monkeypatch):
+    monkeypatch.setattr(upload_service, "blob_store", store)
+    monkeypatch.setattr(project_images_router, "thumbnail_pipeline", ThumbnailPipeline(workers=0))
+    user = SimpleNamespace(id=1, tenant_id=1, role="admin")
+    photo = io.BytesIO()
+    Image.new("RGB", (64, 48)).save(photo, "JPEG")
+
+    images = [
+        project_images_router.create_project_image(
+            project_id=1,
+            file=SimpleNamespace(content_type="image/jpeg", filename=f"foto_{i}.jpg", file=io.BytesIO(photo.getvalue())),
+            session=session,
+            current_user=user,
+        )
+        for i in range(2)
+    ]
+
+    assert images[0].file_path == images[1].file_path
+    assert images[0].filename != images[1].filename
+    assert session.get(StoredBlob, images[0].content_hash).ref_count == 2
+
+    project_images_router.delete_project_image(image_id=images[0].id, session=session, current_user=user)
+    assert os.path.exists(images[1].file_path)
+    project_images_router.delete_project_image(image_id=images[1].id, session=session, current_user=user)
+    backdate(images[1].file_path)
+    assert collect_garbage(session, grace_seconds=60) == [images[1].file_path]
+    assert not os.path.exists(images[1].file_path)
+
+
+def test_failed_commits_remove_new_blobs(store, session, tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_service, "blob_store", store)
+    monkeypatch.setattr(company_logo_router, "blob_store", store)
+    pipeline = ThumbnailPipeline(workers=0)
+    monkeypatch.setattr(project_images_router, "thumbnail_pipeline", pipeline)
+    enqueued = []
+    monkeypatch.setattr(pipeline, "enqueue", enqueued.append)
+    user = SimpleNamespace(id=1, tenant_id=1, role="admin")
+    photo = io.BytesIO()
+    Image.new("RGB", (64, 48)).save(photo, "JPEG")
+
+    def failing_commit(*args):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(session, "commit", failing_commit)
+    with pytest.raises(HTTPException) as exc:
+        project_images_router.create_project_image(
+            project_id=1,
+            file=SimpleNamespace(content_type="image/jpeg", filename="foto.jpg", file=io.BytesIO(photo.getvalue())),
+            session=session,
+            current_user=user,
+        )
+    assert exc.value.status_code == 500
+    assert stored_files(store) == [] and enqueued == []
+
+    async def upload_logo():
+        async_engine = create_async_engine("sqlite+aiosqlite://")
+        try:
+            async with async_engine.begin() as connection:
+                await connection.run_sync(SQLModel.metadata.create_all)
+            async with AsyncSession(async_engine, expire_on_commit=False) as async_session:
+                monkeypatch.setattr(AsyncSession, "commit", failing_commit_async)
+                return await company_logo_router.upload_logo(
+                    file=SimpleNamespace(
+                        content_type="image/png", filename="logo.png", file=io.BytesIO(b"\x89PNG\r\n\x1a\n logo"),
+                    ),
+                    session=async_session,
+                    current_user=user,
+                )
+        finally:
+            await async_engine.dispose()
+
+    async def failing_commit_async(self):
+        raise RuntimeError("database is locked")
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(upload_logo())
+    assert exc.value.status_code == 500
+    assert stored_files(store) == []
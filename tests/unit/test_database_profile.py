@@ -0,0 +1,32 @@
+from sqlalchemy import text
+
+from app.database import create_sqlite_engine
+
+
+def test_production_profile_sets_pragmas(tmp_path):
+    engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'prod.db'}", "production")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        assert conn.execute(text("PRAGMA temp_store")).scalar() == 2  # MEMORY
+    engine.dispose()
+
+
+def test_read_engine_is_query_only(tmp_path):
+    url = f"sqlite:///{tmp_path / 'ro.db'}"
+    writer = create_sqlite_engine(url, "production")
+    reader = create_sqlite_engine(url, "production", read_only=True)
+    with writer.begin() as conn:
+        conn.execute(text("CREATE TABLE t (id INTEGER)"))
+    with reader.connect() as conn:
+        assert conn.execute(text("PRAGMA query_only")).scalar() == 1
+    writer.dispose()
+    reader.dispose()
+
+
+def test_legacy_profile_keeps_rollback_journal(tmp_path):
+    engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'legacy.db'}", "legacy")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "delete"
+    engine.dispose()
@@ -0,0 +1,117 @@
+import asyncio
+import json
+import os
+import sys
+from datetime import date, datetime
+from pathlib import Path
+from typing import List, Optional
+
+from fastapi import FastAPI, Response
+from fastapi.responses import PlainTextResponse
+from fastapi.routing import APIRoute, APIRouter
+from pydantic import BaseModel
+from starlette.requests import Request
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from app.models import TimeEntry, User  # noqa: E402
+from app.routers import time_entries as time_entries_router  # noqa: E402
+from app.schemas import TimeEntry as TimeEntrySchema, User as UserSchema  # noqa: E402
+from app.utils.fast_json import FastJSONRoute, build_projector  # noqa: E402
+
+
+def rows():
+    return [
+        TimeEntry(
+            id=index, tenant_id=7, project_id=1, employee_id=2, work_date=date(2025, 3, index + 1),
+            clock_in="07:00", hours_worked=7.5, hourly_rate=45.0,
+            created_at=datetime(2025, 3, 1, 7, 0, 0, 123456), updated_at=datetime(2025, 3, 1, 15, 30),
+        )
+        for index in range(3)
+    ]
+
+
+def call(route, query_string=b""):
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    scope = {"type": "http", "method": "GET", "path": route.path, "headers": [], "query_string": query_string}
+    return asyncio.run(route.get_route_handler()(Request(scope, receive)))
+
+
+def test_fast_route_matches_fastapi_output_for_orm_rows():
+    def endpoint():
+        return rows()
+
+    standard = call(APIRoute("/entries", endpoint, response_model=List[TimeEntrySchema]))
+    fast = call(FastJSONRoute("/entries", endpoint, response_model=List[TimeEntrySchema]))
+
+    assert json.loads(fast.body) == json.loads(standard.body)
+    assert "tenant_id" not in json.loads(fast.body)[0]
+    assert fast.headers["content-type"] == "application/json"
+
+
+def test_fields_outside_the_schema_stay_hidden():
+    user = User(
+        id=1, tenant_id=1, username="max", email="max@example.com", full_name="Max", hashed_password="geheim",
+    )
+    body = json.loads(call(FastJSONRoute("/me", lambda: user, response_model=UserSchema)).body)
+    assert "hashed_password" not in body
+    assert body["username"] == "max"
+
+
+def test_sub_response_headers_status_and_parameters_are_kept():
+    async def endpoint(limit: Optional[int] = None, response: Response = None):
+        response.headers["X-Next-Cursor"] = "abc"
+        return [{"value": limit, "extra": "weg"}]
+
+    class Item(BaseModel):
+        value: Optional[int] = None
+        label: str = "standard"
+
+    response = call(
+        FastJSONRoute("/items", endpoint, response_model=List[Item], status_code=201), query_string=b"limit=5",
+    )
+    assert response.status_code == 201
+    assert response.headers["X-Next-Cursor"] == "abc"
+    assert json.loads(response.body) == [{"value": 5, "label": "standard"}]
+
+
+def test_responses_and_custom_response_classes_pass_through(monkeypatch):
+    text = call(FastJSONRoute("/text", lambda: PlainTextResponse("ok")))
+    assert text.body == b"ok"
+
+    plain = FastJSONRoute("/plain", lambda: "ok", response_class=PlainTextResponse)
+    assert call(plain).body == b"ok"
+
+    monkeypatch.setattr(FastJSONRoute, "enabled", False)
+    assert json.loads(call(FastJSONRoute("/entries", rows, response_model=List[TimeEntrySchema])).body)[0]["id"] == 0
+
+
+def test_openapi_schema_is_unchanged():
+    def schema(route_class):
+        router = APIRouter(route_class=route_class)
+        router.add_api_route("/entries", rows, response_model=List[TimeEntrySchema])
+        app = FastAPI()
+        app.include_router(router)
+        return app.openapi()
+
+    assert schema(FastJSONRoute) == schema(APIRoute)
+
+
+def test_routers_use_fast_route_and_projector_handles_nesting():
+    assert all(isinstance(route, FastJSONRoute) for route in time_entries_router.router.routes)
+
+    class Inner(BaseModel):
+        a: int
+
+    class Outer(BaseModel):
+        inner: Optional[Inner] = None
+        inners: List[Inner] = []
+
+    project = build_projector(Outer)
+    assert project({"inner": {"a": 1, "b": 2}, "inners": [{"a": 3, "c": 4}]}) == {
+        "inner": {"a": 1}, "inners": [{"a": 3}],
+    }
+    assert project({}) == {"inner": None, "inners": []}
@@ -0,0 +1,120 @@
+import asyncio
+import os
+import sys
+from email.utils import formatdate
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException, Request
+from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.pool import StaticPool
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from app.models import Project, Report, ReportImage, Tenant  # noqa: E402
+from app.routers import reports as reports_router  # noqa: E402
+from app.utils.http_cache import IMMUTABLE_MAX_AGE, cached_file_response  # noqa: E402
+
+CONTENT = bytes(range(256)) * 4
+
+
+def make_request(**headers) -> Request:
+    raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw, "query_string": b""})
+
+
+async def read_body(response) -> bytes:
+    chunks = []
+    async for chunk in response.body_iterator:
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+@pytest.fixture()
+def photo(tmp_path):
+    path = tmp_path / "foto.jpg"
+    path.write_bytes(CONTENT)
+    return str(path)
+
+
+def test_etag_and_cache_headers(photo):
+    response = cached_file_response(make_request(), photo, content_hash="abc")
+
+    assert response.status_code == 200
+    assert response.headers["etag"] == '"abc"'
+    assert response.headers["cache-control"] == "private, no-cache"
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["content-length"] == str(len(CONTENT))
+
+    immutable = cached_file_response(make_request(), photo, content_hash="abc", variant="480", immutable=True)
+    assert immutable.headers["etag"] == '"abc-480"'
+    assert immutable.headers["cache-control"] == f"private, max-age={IMMUTABLE_MAX_AGE}, immutable"
+
+
+def test_conditional_requests_return_304(photo):
+    etag = cached_file_response(make_request(), photo).headers["etag"]
+
+    assert cached_file_response(make_request(if_none_match=etag), photo).status_code == 304
+    assert cached_file_response(make_request(if_none_match=f'"x", W/{etag}'), photo).status_code == 304
+    assert cached_file_response(make_request(if_none_match='"anders"'), photo).status_code == 200
+
+    later = formatdate(os.stat(photo).st_mtime + 60, usegmt=True)
+    earlier = formatdate(os.stat(photo).st_mtime - 60, usegmt=True)
+    assert cached_file_response(make_request(if_modified_since=later), photo).status_code == 304
+    assert cached_file_response(make_request(if_modified_since=earlier), photo).status_code == 200
+    # If-None-Match hat Vorrang vor If-Modified-Since
+    assert cached_file_response(
+        make_request(if_none_match='"anders"', if_modified_since=later), photo
+    ).status_code == 200
+
+
+def test_range_requests(photo):
+    response = cached_file_response(make_request(range="bytes=10-19"), photo)
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 10-19/{len(CONTENT)}"
+    assert asyncio.run(read_body(response)) == CONTENT[10:20]
+
+    suffix = cached_file_response(make_request(range="bytes=-5"), photo)
+    assert asyncio.run(read_body(suffix)) == CONTENT[-5:]
+
+    # If-Range mit veraltetem ETag liefert die ganze Datei
+    assert cached_file_response(make_request(range="bytes=0-1", if_range='"alt"'), photo).status_code == 200
+
+    with pytest.raises(HTTPException) as exc:
+        cached_file_response(make_request(range=f"bytes={len(CONTENT)}-"), photo)
+    assert exc.value.status_code == 416
+    assert exc.value.headers["Content-Range"] == f"bytes */{len(CONTENT)}"
+
+
+def test_report_image_view_uses_content_hash(photo):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    user = SimpleNamespace(id=1, tenant_id=1, role="admin")
+    with Session(engine) as session:
+        session.add(Tenant(id=1, name="Tenant A"))
+        session.add(Project(id=1, tenant_id=1, name="Projekt A"))
+        session.add(Report(id=1, tenant_id=1, project_id=1, title="Bericht"))
+        session.add(ReportImage(
+            id=1, tenant_id=1, report_id=1, filename="foto.jpg", original_filename="foto.jpg",
+            file_path=photo, file_size=len(CONTENT), content_hash="c0ffee",
+        ))
+        session.commit()
+
+        fresh = reports_router.view_report_image(
+            image_id=1, request=make_request(), v="c0ffee", session=session, current_user=user
+        )
+        assert fresh.headers["etag"] == '"c0ffee"'
+        assert "immutable" in fresh.headers["cache-control"]
+
+        # Veraltete Version in der URL: nur mit Revalidierung cachen
+        stale = reports_router.view_report_image(
+            image_id=1, request=make_request(), v="alt", session=session, current_user=user
+        )
+        assert stale.headers["cache-control"] == "private, no-cache"
+
+        revalidated = reports_router.view_report_image(
+            image_id=1, request=make_request(if_none_match='"c0ffee"'), session=session, current_user=user
+        )
+        assert revalidated.status_code == 304
@@ -0,0 +1,111 @@
+import asyncio
+import io
+import os
+import sys
+import zipfile
+from datetime import date, datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.pool import StaticPool
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from app.models import Invoice, Project, Tenant, User, UserRole  # noqa: E402
+from app.routers import invoices as invoices_router  # noqa: E402
+from app.services.pdf_cache import PdfCache  # noqa: E402
+from app.services.pdf_render_service import PdfRenderService  # noqa: E402
+from app.utils.zip_stream import stream_zip  # noqa: E402
+
+
+async def read_body(response) -> bytes:
+    chunks = []
+    async for chunk in response.body_iterator:
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+@pytest.fixture()
+def session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Tenant(id=1, name="Tenant A"))
+        session.add(Tenant(id=2, name="Tenant B"))
+        session.commit()
+        session.add(User(
+            id=1, tenant_id=1, username="anna", email="anna@example.com", full_name="Anna",
+            role=UserRole.ADMIN, hashed_password="x",
+        ))
+        session.add(Project(id=1, tenant_id=1, name="Projekt A"))
+        session.add(Project(id=2, tenant_id=2, name="Projekt B"))
+        session.commit()
+        for invoice_id, tenant_id, number, day, status in [
+            (1, 1, "R-1", datetime(2025, 1, 5), "entwurf"),
+            (2, 1, "R/2", datetime(2025, 1, 31, 18, 0), "bezahlt"),
+            (3, 1, "R-3", datetime(2025, 2, 1), "bezahlt"),
+            (4, 2, "R-4", datetime(2025, 1, 10), "bezahlt"),
+        ]:
+            session.add(Invoice(
+                id=invoice_id, tenant_id=tenant_id, project_id=tenant_id, invoice_number=number,
+                title="Rechnung", client_name="Kunde", total_amount=119.0, items="[]",
+                invoice_date=day, status=status,
+            ))
+        session.commit()
+        yield session
+
+
+@pytest.fixture()
+def service(monkeypatch, tmp_path):
+    service = PdfRenderService(workers=0)
+    monkeypatch.setattr(invoices_router, "pdf_render_service", service)
+    monkeypatch.setattr(invoices_router, "pdf_cache", PdfCache(directory=str(tmp_path / "pdf"), max_bytes=1024 * 1024))
+    return service
+
+
+def _export(session, **params):
+    response = invoices_router.export_invoices_zip(
+        session=session, current_user=SimpleNamespace(id=1, tenant_id=1, role="admin"), **params
+    )
+    return response, zipfile.ZipFile(io.BytesIO(asyncio.run(read_body(response))))
+
+
+def test_stream_zip_produces_valid_archive():
+    chunks = list(stream_zip((f"datei_{i}.pdf", b"%PDF" * i) for i in range(1, 4)))
+    assert len(chunks) > 1
+
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+    assert archive.testzip() is None
+    assert archive.read("datei_3.pdf") == b"%PDF" * 3
+
+
+def test_export_contains_tenant_invoices_of_period(session, service):
+    response, archive = _export(session, start_date=date(2025, 1, 1), end_date=date(2025, 1, 31))
+
+    assert response.media_type == "application/zip"
+    assert "Rechnungen_2025-01-01_2025-01-31.zip" in response.headers["content-disposition"]
+    assert archive.namelist() == ["Rechnung_R-1_1.pdf", "Rechnung_R_2_2.pdf"]
+    assert all(archive.read(name).startswith(b"%PDF") for name in archive.namelist())
+    assert service.metrics()["completed"] == 2
+
+
+def test_export_filters_status_and_reuses_cache(session, service):
+    _export(session, start_date=date(2025, 1, 1), end_date=date(2025, 2, 28), status="bezahlt")
+    _response, archive = _export(session, start_date=date(2025, 1, 1), end_date=date(2025, 2, 28), status="bezahlt")
+
+    assert archive.namelist() == ["Rechnung_R_2_2.pdf", "Rechnung_R-3_3.pdf"]
+    assert service.metrics()["completed"] == 2
+
+
+def test_export_rejects_empty_or_inverted_period(session, service):
+    with pytest.raises(HTTPException) as exc:
+        _export(session, start_date=date(2025, 3, 1), end_date=date(2025, 3, 31))
+    assert exc.value.status_code == 404
+
+    with pytest.raises(HTTPException) as exc:
+        _export(session, start_date=date(2025, 2, 1), end_date=date(2025, 1, 1))
+    assert exc.value.status_code == 400
@@ -0,0 +1,110 @@
+import os
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event
+from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.pool import StaticPool
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from app.models import Employee, MaterialUsage, Project, Report, Tenant, TimeEntry  # noqa: E402
+from app.schemas import InvoiceGenerationRequest  # noqa: E402
+from app.services.invoice_generator import InvoiceGenerator  # noqa: E402
+
+TODAY = date.today()
+
+
+@pytest.fixture()
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Tenant(id=1, name="Tenant A"))
+        session.add(Tenant(id=2, name="Tenant B"))
+        session.commit()
+        session.add(Project(id=1, tenant_id=1, name="Projekt A"))
+        session.add(Employee(id=1, tenant_id=1, full_name="Max Muster", hourly_rate=40.0))
+        session.add(Employee(id=2, tenant_id=1, full_name="Erika Beispiel", hourly_rate=50.0))
+        session.add(Employee(id=3, tenant_id=2, full_name="Fremd", hourly_rate=10.0))
+        session.commit()
+    yield engine
+
+
+def add_entries(session, count: int) -> None:
+    for index in range(count):
+        session.add(TimeEntry(
+            tenant_id=1, project_id=1, employee_id=1 + index % 2, work_date=TODAY - timedelta(days=index % 5),
+            hours_worked=2.0, hourly_rate=40.0 if index % 2 == 0 else 50.0,
+        ))
+    session.commit()
+
+
+def request(method: str, **values) -> InvoiceGenerationRequest:
+    return InvoiceGenerationRequest(project_id=1, generation_method=method, end_date=datetime.now() + timedelta(days=1), **values)
+
+
+def test_time_entries_are_grouped_per_employee_in_sql(engine):
+    with Session(engine) as session:
+        add_entries(session, 10)
+        # Ohne Stundensatz zählt der Eintrag mit 0 €; Mitarbeiter ohne Datensatz im Mandanten behält seine ID
+        session.add(TimeEntry(tenant_id=1, project_id=1, employee_id=1, work_date=TODAY, hours_worked=1.0))
+        session.add(TimeEntry(tenant_id=1, project_id=1, employee_id=3, work_date=TODAY, hours_worked=1.0, hourly_rate=10.0))
+        session.commit()
+
+        result = InvoiceGenerator(session, tenant_id=1).generate_invoice(request("time_entries", labor_cost_percentage=25))
+
+    assert [(item.description, item.quantity, item.unit_price, item.total_price) for item in result.items] == [
+        ("Arbeitsstunden - Max Muster", 11.0, 36.36, 400.0),
+        ("Arbeitsstunden - Erika Beispiel", 10.0, 50.0, 500.0),
+        ("Arbeitsstunden - Mitarbeiter 3", 1.0, 10.0, 10.0),
+    ]
+    assert result.total_labor_cost == 227.5
+    assert result.subtotal == 910.0
+
+
+def test_materials_and_reports_are_aggregated(engine):
+    with Session(engine) as session:
+        for quantity, total_cost in ((10, 65.0), (5, None)):
+            session.add(MaterialUsage(
+                tenant_id=1, project_id=1, material_name="Gipskarton", quantity=quantity, unit="m²",
+                unit_price=6.5, total_cost=total_cost,
+            ))
+        for work_type in ("Dämmung", "Dämmung", None):
+            session.add(Report(tenant_id=1, project_id=1, title=f"Bericht {work_type}", work_type=work_type))
+        session.commit()
+        generator = InvoiceGenerator(session, tenant_id=1)
+
+        hybrid = generator.generate_invoice(request("hybrid"))
+        reports = generator.generate_invoice(request("reports"))
+
+    material = hybrid.items[0]
+    assert (material.description, material.quantity, material.unit_price, material.total_price) == (
+        "Material: Gipskarton", 15.0, 6.5, 97.5,
+    )
+    assert len(hybrid.items) == 4  # 1 Materialsumme + 3 Berichte
+    assert [(item.description, item.quantity) for item in reports.items] == [
+        ("Bericht: Allgemeine Arbeiten", 1.0), ("Bericht: Dämmung", 2.0),
+    ]
+
+
+def test_query_count_does_not_grow_with_entries(engine):
+    def count(entries: int) -> int:
+        with Session(engine) as session:
+            add_entries(session, entries)
+            statements = []
+
+            def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+                statements.append(statement)
+
+            event.listen(engine, "before_cursor_execute", before_cursor_execute)
+            try:
+                InvoiceGenerator(session, tenant_id=1).generate_invoice(request("hybrid"))
+            finally:
+                event.remove(engine, "before_cursor_execute", before_cursor_execute)
+            return len(statements)
+
+    assert count(5) == count(200)
@@ -0,0 +1,206 @@
+import os
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlmodel import SQLModel, Session, create_engine, select
+from sqlmodel.pool import StaticPool
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from app.database import create_sqlite_engine  # noqa: E402
+from app.models import Invoice, Project, Tenant, TenantSettings  # noqa: E402
+from app.routers import invoice_generation  # noqa: E402
+from app.routers.invoices import create_invoice, create_invoice_from_calculation  # noqa: E402
+from app.schemas import InvoiceCreate  # noqa: E402
+from app.services.invoice_numbers import InvoiceNumberAllocator  # noqa: E402
+
+
+def seed(engine) -> None:
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Tenant(id=1, name="Tenant A"))
+        session.add(Tenant(id=2, name="Tenant B"))
+        session.commit()
+        session.add(TenantSettings(tenant_id=1, invoice_prefix="TB", invoice_next_number=41))
+        session.add(Project(id=1, tenant_id=1, name="Projekt A"))
+        session.commit()
+
+
+@pytest.fixture()
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    seed(engine)
+    yield engine
+
+
+def next_counter(session, tenant_id: int) -> int:
+    return session.exec(select(TenantSettings.invoice_next_number).where(TenantSettings.tenant_id == tenant_id)).one()
+
+
+def test_numbers_are_sequential_and_rollback_leaves_no_gap(engine):
+    with Session(engine) as session:
+        allocator = InvoiceNumberAllocator(session, 1)
+        assert [allocator.next_number(), allocator.next_number()] == ["TB-00041", "TB-00042"]
+        session.commit()
+
+        assert allocator.next_number() == "TB-00043"
+        session.rollback()
+        assert allocator.next_number() == "TB-00043"
+        session.commit()
+        assert next_counter(session, 1) == 44
+
+        # Mandant ohne Einstellungen: Zeile mit Standardwerten anlegen
+        assert InvoiceNumberAllocator(session, 2).next_number() == "INV-00001"
+        session.commit()
+        assert next_counter(session, 2) == 2
+
+
+def test_blocks_can_be_reserved_and_partially_released(engine):
+    with Session(engine) as session:
+        allocator = InvoiceNumberAllocator(session, 1)
+        block = allocator.allocate(5)
+        assert block.numbers() == [f"TB-000{number}" for number in range(41, 46)]
+        assert allocator.release(block, used=3)
+        assert allocator.next_number() == "TB-00044"
+
+        # Nach einer weiteren Vergabe liegt der Block nicht mehr am Zählerende
+        second = allocator.allocate(2)
+        allocator.next_number()
+        assert not allocator.release(second, used=0)
+        session.commit()
+        assert next_counter(session, 1) == 48
+
+        with pytest.raises(ValueError):
+            allocator.allocate(0)
+
+
+def test_manual_invoice_routes_use_counter_and_reject_duplicates(engine):
+    user = SimpleNamespace(id=1, tenant_id=1, role="admin")
+    with Session(engine) as session:
+        session.add(Invoice(
+            tenant_id=2, project_id=1, invoice_number="RE-2025-7", title="Fremd", client_name="Kunde",
+            total_amount=1.0, items="[]",
+        ))
+        session.commit()
+
+        def create(number=None):
+            invoice = InvoiceCreate(
+                project_id=1, invoice_number=number, title="Manuell", client_name="Kunde", total_amount=10.0,
+                items=[{"description": "Arbeit", "quantity": 1, "unit_price": 10.0}],
+            )
+            return create_invoice(invoice, session=session, current_user=user)
+
+        assert create().invoice_number == "TB-00041"
+        # Nummern anderer Mandanten blockieren nicht
+        assert create("RE-2025-7").invoice_number == "RE-2025-7"
+
+        calculation = {"total_amount": 5.0, "items": []}
+        from_route = create_invoice_from_calculation(
+            1, {"calculation": calculation, "client_name": "Kunde"}, session=session, current_user=user
+        )
+        from_generation = invoice_generation.create_invoice_from_calculation(
+            {"project_id": 1, "calculation": calculation, "client_name": "Kunde"}, session=session, current_user=user
+        )
+        assert (from_route.invoice_number, from_generation.invoice_number) == ("TB-00042", "TB-00043")
+
+        for attempt in (
+            lambda: create("TB-00041"),
+            lambda: create_invoice_from_calculation(
+                1, {"calculation": calculation, "client_name": "Kunde", "invoice_number": "RE-2025-7"},
+                session=session, current_user=user,
+            ),
+            lambda: invoice_generation.create_invoice_from_calculation(
+                {"project_id": 1, "calculation": calculation, "client_name": "Kunde", "invoice_number": " TB-00043 "},
+                session=session, current_user=user,
+            ),
+        ):
+            with pytest.raises(HTTPException) as exc:
+                attempt()
+            assert exc.value.status_code == 409
+
+        session.rollback()
+        assert next_counter(session, 1) == 44
+        numbers = session.exec(select(Invoice.invoice_number).where(Invoice.tenant_id == 1)).all()
+        assert sorted(numbers) == ["RE-2025-7", "TB-00041", "TB-00042", "TB-00043"]
+
+
+def test_counter_format_is_reserved_and_unique_index_maps_to_409(engine, monkeypatch):
+    user = SimpleNamespace(id=1, tenant_id=1, role="admin")
+    with Session(engine) as session:
+        def create(number=None):
+            invoice = InvoiceCreate(
+                project_id=1, invoice_number=number, title="Manuell", client_name="Kunde", total_amount=10.0,
+                items=[{"description": "Arbeit", "quantity": 1, "unit_price": 10.0}],
+            )
+            return create_invoice(invoice, session=session, current_user=user)
+
+        # Eine vorweggenommene Zählernummer würde später doppelt vergeben
+        with pytest.raises(HTTPException) as reserved:
+            create("tb-00042")
+        assert reserved.value.status_code == 409
+        assert [create().invoice_number, create().invoice_number] == ["TB-00041", "TB-00042"]
+        # Fremdes Präfix ist frei (Mandant ohne Einstellungen: Standardpräfix)
+        assert create("RE-00001").invoice_number == "RE-00001"
+
+        # Prüfung und Insert sind nicht atomar: der Index fängt die parallele Dublette ab
+        monkeypatch.setattr(InvoiceNumberAllocator, "assign", lambda self, requested=None: "RE-00001")
+        calculation = {"calculation": {"total_amount": 5.0, "items": []}, "client_name": "Kunde"}
+        for attempt in (
+            lambda: create("RE-00001"),
+            lambda: create_invoice_from_calculation(1, calculation, session=session, current_user=user),
+            lambda: invoice_generation.create_invoice_from_calculation(
+                {"project_id": 1, **calculation}, session=session, current_user=user,
+            ),
+        ):
+            with pytest.raises(HTTPException) as exc:
+                attempt()
+            assert exc.value.status_code == 409
+
+        numbers = session.exec(select(Invoice.invoice_number).where(Invoice.tenant_id == 1)).all()
+        assert sorted(numbers) == ["RE-00001", "TB-00041", "TB-00042"]
+        assert next_counter(session, 1) == 43
+
+
+def test_concurrent_allocation_has_no_duplicates_or_gaps(tmp_path):
+    engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'numbers.db'}", "production")
+    seed(engine)
+    threads, per_thread = 8, 25
+    errors = []
+    barrier = threading.Barrier(threads)
+
+    def worker(worker_id: int) -> None:
+        try:
+            barrier.wait()
+            for index in range(per_thread):
+                with Session(engine) as session:
+                    number = InvoiceNumberAllocator(session, 1).next_number()
+                    session.add(Invoice(
+                        tenant_id=1, project_id=1, invoice_number=number, title=f"Rechnung {worker_id}/{index}",
+                        client_name="Kunde", total_amount=1.0, items="[]",
+                    ))
+                    if index % 5 == 4:
+                        # Abgebrochene Rechnungen dürfen keine Nummer verbrauchen
+                        session.rollback()
+                    else:
+                        session.commit()
+        except Exception as exc:  # pragma: no cover - Fehler werden unten gemeldet
+            errors.append(exc)
+
+    workers = [threading.Thread(target=worker, args=(worker_id,)) for worker_id in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    assert errors == []
+    committed = threads * (per_thread - per_thread // 5)
+    with Session(engine) as session:
+        numbers = session.exec(select(Invoice.invoice_number).where(Invoice.tenant_id == 1)).all()
+        assert sorted(numbers) == [f"TB-{number:05d}" for number in range(41, 41 + committed)]
+        assert next_counter(session, 1) == 41 + committed
+    engine.dispose()
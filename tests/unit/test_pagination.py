@@ -0,0 +1,121 @@
+import os
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException, Response
+from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.pool import StaticPool
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from app.models import Employee, Invoice, Project, Tenant, TimeEntry  # noqa: E402
+from app.routers.invoices import get_invoices  # noqa: E402
+from app.routers.time_entries import get_time_entries  # noqa: E402
+from app.utils.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor  # noqa: E402
+
+
+@pytest.fixture()
+def session():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Tenant(id=1, name="Tenant A"))
+        session.add(Tenant(id=2, name="Tenant B"))
+        session.add(Project(id=1, tenant_id=1, name="Projekt A"))
+        session.add(Employee(id=1, tenant_id=1, full_name="Max Muster"))
+        session.commit()
+        yield session
+    SQLModel.metadata.drop_all(engine)
+
+
+def make_user(tenant_id: int, role: str = "admin") -> SimpleNamespace:
+    return SimpleNamespace(id=tenant_id * 10, tenant_id=tenant_id, role=role)
+
+
+def collect_pages(fetch, limit):
+    pages = []
+    cursor = None
+    while True:
+        response = Response()
+        page = fetch(limit=limit, cursor=cursor, response=response)
+        pages.append(page)
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return pages
+
+
+def test_time_entries_keyset_pages_cover_all_rows_in_order(session):
+    start = date(2025, 3, 1)
+    # Mehrere Einträge pro Tag, damit die ID als Tie-Breaker greift
+    for i in range(11):
+        session.add(TimeEntry(
+            tenant_id=1, project_id=1, employee_id=1,
+            work_date=start + timedelta(days=(10 - i) // 3), hours_worked=1.0,
+        ))
+    session.commit()
+    user = make_user(1)
+
+    def fetch(**kwargs):
+        return get_time_entries(session=session, current_user=user, **kwargs)
+
+    pages = collect_pages(fetch, limit=4)
+    assert [len(page) for page in pages] == [4, 4, 3]
+
+    rows = [entry for page in pages for entry in page]
+    keys = [(entry.work_date, entry.id) for entry in rows]
+    assert keys == sorted(keys)
+    assert len({entry.id for entry in rows}) == 11
+    assert fetch(limit=None, cursor=None, response=Response()) == rows
+
+
+def test_invoices_paginate_newest_first_and_stay_tenant_scoped(session):
+    base = datetime(2025, 1, 1, 12, 0)
+    for i in range(5):
+        session.add(Invoice(
+            tenant_id=1, project_id=1, invoice_number=f"R-{i}", title="Rechnung",
+            client_name="Kunde", total_amount=100.0, items="[]",
+            created_at=base + timedelta(minutes=i % 3),
+        ))
+    session.add(Invoice(
+        tenant_id=2, project_id=1, invoice_number="X-1", title="Fremd",
+        client_name="Kunde", total_amount=1.0, items="[]", created_at=base,
+    ))
+    session.commit()
+    user = make_user(1, role="buchhalter")
+
+    def fetch(**kwargs):
+        return get_invoices(session=session, current_user=user, **kwargs)
+
+    rows = [invoice for page in collect_pages(fetch, limit=2) for invoice in page]
+    assert [inv.invoice_number for inv in rows] == ["R-2", "R-4", "R-1", "R-3", "R-0"]
+
+
+def test_unpaginated_call_sets_no_cursor(session):
+    response = Response()
+    result = get_time_entries(session=session, current_user=make_user(1), response=response)
+    assert result == []
+    assert NEXT_CURSOR_HEADER not in response.headers
+
+
+def test_invalid_cursor_and_limit_are_rejected(session):
+    user = make_user(1)
+    with pytest.raises(HTTPException) as exc:
+        get_time_entries(session=session, current_user=user, limit=10, cursor="kaputt")
+    assert exc.value.status_code == 400
+
+    with pytest.raises(HTTPException) as exc:
+        get_time_entries(session=session, current_user=user, limit=0)
+    assert exc.value.status_code == 400
+
+
+def test_cursor_roundtrip_preserves_types():
+    values = [date(2025, 3, 1), datetime(2025, 3, 1, 8, 30), 42]
+    assert decode_cursor(encode_cursor(values), 3) == values
@@ -0,0 +1,106 @@
+import asyncio
+import hashlib
+import os
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+from fastapi import BackgroundTasks, HTTPException
+from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+import app.database  # noqa: E402
+from app.auth import needs_rehash, verify_password, verify_password_async  # noqa: E402
+from app.database import create_sqlite_engine  # noqa: E402
+from app.models import Tenant, User, UserRole  # noqa: E402
+from app.routers.auth import login  # noqa: E402
+from app.schemas import UserLogin  # noqa: E402
+from app.services.password_hasher import PasswordHashPool, password_hash_pool  # noqa: E402
+
+
+def test_pool_rejects_when_queue_is_full():
+    pool = PasswordHashPool(workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        first = asyncio.ensure_future(pool.run("hash", release.wait))
+        second = asyncio.ensure_future(pool.run("hash", release.wait))
+        await asyncio.sleep(0.05)
+        assert pool.metrics()["in_progress"] == 1
+        assert pool.metrics()["queue_depth"] == 1
+
+        with pytest.raises(HTTPException) as exc:
+            await pool.run("hash", release.wait)
+        assert exc.value.status_code == 503
+
+        release.set()
+        await asyncio.gather(first, second)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+
+    metrics = pool.metrics()
+    assert metrics["rejected"] == 1
+    assert metrics["queue_depth"] == 0
+    assert metrics["operations"]["hash"]["count"] == 2
+
+
+def test_verify_password_async_matches_sync():
+    legacy_hash = "sha256:" + hashlib.sha256(b"admin123").hexdigest()
+    assert asyncio.run(verify_password_async("admin123", legacy_hash)) is True
+    assert asyncio.run(verify_password_async("falsch", legacy_hash)) is False
+    assert password_hash_pool.metrics()["operations"]["verify"]["count"] >= 2
+
+
+def test_login_rehashes_legacy_password_in_background(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'login.db'}"
+    legacy_hash = "sha256:" + hashlib.sha256(b"admin123").hexdigest()
+    engine = create_engine(url)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Tenant(id=1, name="Tenant A"))
+        session.commit()
+        session.add(User(
+            id=1, tenant_id=1, username="admin", email="admin@example.com",
+            full_name="Admin", role=UserRole.ADMIN, hashed_password=legacy_hash,
+        ))
+        session.commit()
+
+    async def scenario():
+        async_engine = create_sqlite_engine(url, "production", use_async=True)
+        monkeypatch.setattr(app.database, "async_engine", async_engine)
+        background = BackgroundTasks()
+        try:
+            async with AsyncSession(async_engine, expire_on_commit=False) as async_session:
+                token = await login(UserLogin(username="admin", password="admin123"), background, async_session)
+            # Antwort ist fertig, der Hash ist noch unverändert
+            with Session(engine) as check:
+                assert check.get(User, 1).hashed_password == legacy_hash
+            await background()
+        finally:
+            await async_engine.dispose()
+        return token
+
+    token = asyncio.run(scenario())
+    assert token["token_type"] == "bearer"
+
+    with Session(engine) as check:
+        new_hash = check.get(User, 1).hashed_password
+    assert new_hash.startswith("$argon2")
+    assert not needs_rehash(new_hash)
+    assert verify_password("admin123", new_hash)
+    engine.dispose()
+
+
+def test_metrics_endpoint_requires_admin():
+    from app.auth import require_admin
+    from app.main import app as application
+
+    route = next(route for route in application.routes if getattr(route, "path", None) == "/health/metrics")
+    assert require_admin in [dependency.call for dependency in route.dependant.dependencies]
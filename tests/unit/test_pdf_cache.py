@@ -0,0 +1,138 @@
+import os
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from sqlmodel import SQLModel, Session, create_engine, select
+from sqlmodel.pool import StaticPool
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from app.models import Invoice, Project, Tenant, TenantSettings, User, UserRole  # noqa: E402
+from app.routers import invoices as invoices_router  # noqa: E402
+from app.schemas import InvoiceUpdate  # noqa: E402
+from app.services import pdf_cache as pdf_cache_module  # noqa: E402
+from app.services.pdf_cache import PdfCache, cache_key, logo_fingerprint  # noqa: E402
+from app.services.pdf_render_service import PdfRenderService  # noqa: E402
+
+
+@pytest.fixture()
+def cache(tmp_path):
+    return PdfCache(directory=str(tmp_path / "pdf"), max_bytes=1024 * 1024, max_age_days=1)
+
+
+@pytest.fixture()
+def session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Tenant(id=1, name="Tenant A"))
+        session.commit()
+        session.add(User(
+            id=1, tenant_id=1, username="anna", email="anna@example.com", full_name="Anna",
+            role=UserRole.ADMIN, hashed_password="x",
+        ))
+        session.add(Project(id=1, tenant_id=1, name="Projekt A"))
+        session.add(Invoice(
+            id=1, tenant_id=1, project_id=1, invoice_number="R-1", title="Rechnung",
+            client_name="Kunde", total_amount=119.0, items="[]",
+        ))
+        session.commit()
+        yield session
+
+
+def test_key_changes_with_every_render_input(tmp_path):
+    logo = tmp_path / "logo.png"
+    logo.write_bytes(b"alt")
+    base = cache_key("invoice", {"total_amount": 1.0}, {"company_name": "A"}, logo_fingerprint(str(logo)))
+
+    assert base == cache_key("invoice", {"total_amount": 1.0}, {"company_name": "A"}, logo_fingerprint(str(logo)))
+    assert base != cache_key("invoice", {"total_amount": 2.0}, {"company_name": "A"}, logo_fingerprint(str(logo)))
+    assert base != cache_key("invoice", {"total_amount": 1.0}, {"company_name": "B"}, logo_fingerprint(str(logo)))
+
+    logo.write_bytes(b"neues Logo")
+    assert base != cache_key("invoice", {"total_amount": 1.0}, {"company_name": "A"}, logo_fingerprint(str(logo)))
+
+
+def test_get_or_render_counts_hits_and_misses(cache):
+    calls = []
+
+    def render():
+        calls.append(1)
+        return b"%PDF-1"
+
+    assert cache.get_or_render(1, "invoice", 7, "abc", render) == b"%PDF-1"
+    assert cache.get_or_render(1, "invoice", 7, "abc", render) == b"%PDF-1"
+    assert len(calls) == 1
+
+    metrics = cache.metrics()
+    assert (metrics["hits"], metrics["misses"], metrics["stores"]) == (1, 1, 1)
+    assert metrics["hit_ratio"] == 0.5
+
+
+def test_size_limit_evicts_least_recently_used(tmp_path):
+    cache = PdfCache(directory=str(tmp_path / "pdf"), max_bytes=250, max_age_days=1)
+    cache.put(1, "invoice", 1, "a", b"x" * 100)
+    cache.put(1, "invoice", 2, "b", b"x" * 100)
+    # Zugriff auf den älteren Eintrag macht den zweiten zum LRU-Kandidaten
+    os.utime(cache._path(1, "invoice", 2, "b"), (time.time() - 100, time.time()))
+    assert cache.get(1, "invoice", 1, "a") is not None
+
+    cache.put(1, "invoice", 3, "c", b"x" * 100)
+
+    assert cache.get(1, "invoice", 2, "b") is None
+    assert cache.get(1, "invoice", 1, "a") is not None
+    assert cache.get(1, "invoice", 3, "c") is not None
+    assert cache.metrics()["evictions"] == 1
+    assert cache.metrics()["size_bytes"] == 200
+
+
+def test_expired_entries_are_not_served(cache):
+    cache.put(1, "offer", 1, "k", b"%PDF")
+    old = time.time() - 2 * 86400
+    os.utime(cache._path(1, "offer", 1, "k"), (old, old))
+
+    assert cache.get(1, "offer", 1, "k") is None
+    assert not os.path.exists(cache._path(1, "offer", 1, "k"))
+
+
+def test_commits_invalidate_documents_and_branding(cache, session, monkeypatch):
+    monkeypatch.setattr(pdf_cache_module, "pdf_cache", cache)
+    cache.put(1, "invoice", 1, "k1", b"%PDF")
+    cache.put(1, "invoice", 2, "k2", b"%PDF")
+
+    invoices_router.update_invoice(
+        1, InvoiceUpdate(title="Geändert"), session=session,
+        current_user=SimpleNamespace(id=1, tenant_id=1, role="admin"),
+    )
+    assert cache.get(1, "invoice", 1, "k1") is None
+    assert cache.get(1, "invoice", 2, "k2") is not None
+
+    # Briefkopf-Änderung leert den Cache des Mandanten
+    session.add(TenantSettings(tenant_id=1, company_name="Neu GmbH"))
+    session.commit()
+    assert cache.get(1, "invoice", 2, "k2") is None
+
+    # Zurückgerollte Änderungen invalidieren nichts
+    cache.put(1, "invoice", 1, "k3", b"%PDF")
+    invoice = session.exec(select(Invoice).where(Invoice.id == 1)).one()
+    invoice.title = "Verworfen"
+    session.flush()
+    session.rollback()
+    assert cache.get(1, "invoice", 1, "k3") is not None
+
+
+def test_invoice_pdf_route_serves_cached_pdf(cache, session, monkeypatch):
+    service = PdfRenderService(workers=0)
+    monkeypatch.setattr(invoices_router, "pdf_render_service", service)
+    monkeypatch.setattr(invoices_router, "pdf_cache", cache)
+    user = SimpleNamespace(id=1, tenant_id=1, role="admin")
+
+    for _ in range(2):
+        invoices_router.generate_invoice_pdf(invoice_id=1, session=session, current_user=user)
+
+    assert service.metrics()["completed"] == 1
+    assert cache.metrics()["hits"] == 1
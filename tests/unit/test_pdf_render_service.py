@@ -0,0 +1,165 @@
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.pool import StaticPool
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from app.models import Invoice, Project, Tenant, TenantSettings, User, UserRole  # noqa: E402
+from app.routers import invoices as invoices_router  # noqa: E402
+from app.services.beautiful_pdf_generator import load_invoice_branding  # noqa: E402
+from app.services.pdf_cache import PdfCache  # noqa: E402
+from app.services.pdf_render_service import RENDERERS, PdfRenderService  # noqa: E402
+
+INVOICE_DATA = {
+    "invoice_number": "R-2025-001",
+    "client_name": "Kunde GmbH",
+    "client_address": "Hauptstraße 1",
+    "total_amount": 119.0,
+    "invoice_date": "2025-01-15T00:00:00",
+    "due_date": "2025-02-14T00:00:00",
+    "items": '[{"description": "Trockenbau", "quantity": 1, "unit": "Stk", "unit_price": 100.0, "total_price": 100.0}]',
+}
+
+
+def _slow_renderer(seconds: float) -> bytes:
+    time.sleep(seconds)
+    return b"%PDF-slow"
+
+
+@pytest.fixture()
+def session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Tenant(id=1, name="Tenant A"))
+        session.commit()
+        session.add(User(
+            id=1, tenant_id=1, username="anna", email="anna@example.com", full_name="Anna",
+            role=UserRole.ADMIN, hashed_password="x",
+        ))
+        session.add(TenantSettings(tenant_id=1, company_name="Muster Bau GmbH", bank_iban="DE00 1111"))
+        session.add(Project(id=1, tenant_id=1, name="Projekt A"))
+        session.commit()
+        yield session
+
+
+def test_branding_is_loaded_from_tenant_settings(session):
+    branding = load_invoice_branding(session, 1)
+    assert branding["company_name"] == "Muster Bau GmbH"
+    assert branding["bank_iban"] == "DE00 1111"
+    assert branding["logo_path"] is None
+    assert load_invoice_branding(None, None)["company_name"] == "Trockenbau Stuttgart GmbH"
+
+
+def test_inline_mode_renders_and_tracks_jobs():
+    service = PdfRenderService(workers=0)
+    job_id = service.submit("offer", {"title": "Angebot", "client_name": "Kunde", "total_amount": 10.0, "items": "[]"})
+
+    assert service.status(job_id) == "done"
+    assert service.result(job_id).startswith(b"%PDF")
+    assert asyncio.run(service.render("invoice", INVOICE_DATA, load_invoice_branding(None, None))).startswith(b"%PDF")
+    assert service.metrics()["completed"] == 2
+
+    with pytest.raises(ValueError):
+        service.submit("unbekannt")
+
+
+def test_process_pool_renders_invoice():
+    service = PdfRenderService(workers=1, timeout=60)
+    try:
+        pdf = service.render_sync("invoice", INVOICE_DATA, load_invoice_branding(None, None))
+    finally:
+        service.shutdown()
+    assert pdf.startswith(b"%PDF")
+    assert service.metrics()["completed"] == 1
+
+
+def test_timeout_runs_from_job_start_and_recycles_hung_worker(monkeypatch):
+    monkeypatch.setitem(RENDERERS, "slow", _slow_renderer)
+    service = PdfRenderService(workers=1, timeout=1.0)
+    try:
+        first = service.submit("slow", 0.6)
+        second = service.submit("slow", 0.6)
+        assert service.status(second) == "pending"
+        # Zusammen länger als der Timeout, aber jeder Job für sich darunter
+        assert service.result(first) == b"%PDF-slow"
+        assert service.result(second) == b"%PDF-slow"
+
+        hung = service.submit("slow", 60.0)
+        after = service.submit("slow", 0.0)
+        started = time.monotonic()
+        with pytest.raises(HTTPException) as exc:
+            service.result(hung)
+        assert exc.value.status_code == 504
+        assert service.status(hung) == "timeout"
+
+        # Der hängende Prozess wurde ersetzt, der nächste Job läuft sofort
+        assert service.result(after) == b"%PDF-slow"
+        assert time.monotonic() - started < 10
+    finally:
+        service.shutdown()
+
+    metrics = service.metrics()
+    assert metrics["timeouts"] == 1
+    assert metrics["recycled"] == 1
+    assert metrics["completed"] == 3
+
+
+def test_full_queue_rejects_and_cancel_frees_running_worker(monkeypatch):
+    monkeypatch.setitem(RENDERERS, "slow", _slow_renderer)
+    service = PdfRenderService(workers=1, timeout=60, max_queue=1)
+    try:
+        running = service.submit("slow", 60.0)
+        queued = service.submit("slow", 0.0)
+        with pytest.raises(HTTPException) as exc:
+            service.submit("slow", 0.0)
+        assert exc.value.status_code == 503
+        assert service.metrics()["rejected"] == 1
+
+        assert service.cancel(running) is True
+        with pytest.raises(HTTPException) as exc:
+            service.result(running)
+        assert exc.value.status_code == 409
+        # Abbruch beendet den Worker-Prozess, der wartende Job rückt nach
+        assert service.result(queued) == b"%PDF-slow"
+
+        waiting = service.submit("slow", 60.0)
+        last = service.submit("slow", 0.0)
+        assert service.cancel(last) is True
+        assert service.status(last) == "cancelled"
+        assert service.cancel(waiting) is True
+    finally:
+        service.shutdown()
+
+    metrics = service.metrics()
+    assert metrics["cancelled"] == 3
+    assert metrics["recycled"] == 2
+    assert metrics["pending"] == 0 and metrics["running"] == 0
+
+
+def test_invoice_pdf_route_uses_render_service(session, monkeypatch):
+    session.add(Invoice(
+        id=1, tenant_id=1, project_id=1, invoice_number="R-1", title="Rechnung",
+        client_name="Kunde", total_amount=119.0, items="[]",
+    ))
+    session.commit()
+
+    service = PdfRenderService(workers=0)
+    monkeypatch.setattr(invoices_router, "pdf_render_service", service)
+    monkeypatch.setattr(invoices_router, "pdf_cache", PdfCache(max_bytes=0))
+
+    response = invoices_router.generate_invoice_pdf(
+        invoice_id=1, session=session, current_user=SimpleNamespace(id=1, tenant_id=1, role="admin")
+    )
+
+    assert response.media_type == "application/pdf"
+    assert service.metrics()["completed"] == 1
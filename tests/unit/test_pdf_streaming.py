@@ -0,0 +1,77 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.pool import StaticPool
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from app.models import Offer, Project, Tenant  # noqa: E402
+from app.routers import offers as offers_router  # noqa: E402
+from app.services import beautiful_pdf_generator  # noqa: E402
+from app.services.pdf_cache import PdfCache  # noqa: E402
+from app.services.pdf_render_service import PdfRenderService  # noqa: E402
+from app.utils.pdf_utils import pdf_streaming_response  # noqa: E402
+
+
+async def read_body(response) -> bytes:
+    chunks = []
+    async for chunk in response.body_iterator:
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def test_streaming_response_sets_length_and_chunks():
+    payload = b"%PDF-" + b"x" * 150_000
+    response = pdf_streaming_response(payload, "Rechnung_1.pdf", chunk_size=64 * 1024)
+
+    assert response.headers["content-length"] == str(len(payload))
+    assert response.headers["content-disposition"] == "attachment; filename=Rechnung_1.pdf"
+    assert asyncio.run(read_body(response)) == payload
+
+
+def test_invoice_renderer_does_not_touch_the_filesystem(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("Dateisystemzugriff beim Rendern")
+
+    monkeypatch.setattr("tempfile.NamedTemporaryFile", fail)
+    pdf = beautiful_pdf_generator.render_invoice_pdf(
+        {"invoice_number": "R-1", "total_amount": 119.0, "items": "[]"},
+        beautiful_pdf_generator.load_invoice_branding(None, None),
+    )
+    assert pdf.startswith(b"%PDF")
+
+
+@pytest.fixture()
+def session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Tenant(id=1, name="Tenant A"))
+        session.commit()
+        session.add(Project(id=1, tenant_id=1, name="Projekt A"))
+        session.add(Offer(
+            id=1, tenant_id=1, project_id=1, title="Angebot Bad", client_name="Kunde",
+            total_amount=50.0, items="[]",
+        ))
+        session.commit()
+        yield session
+
+
+def test_offer_pdf_route_streams_from_memory(session, monkeypatch):
+    monkeypatch.setattr(offers_router, "pdf_render_service", PdfRenderService(workers=0))
+    monkeypatch.setattr(offers_router, "pdf_cache", PdfCache(max_bytes=0))
+
+    response = offers_router.generate_offer_pdf(
+        offer_id=1, session=session, current_user=SimpleNamespace(id=1, tenant_id=1, role="admin")
+    )
+    body = asyncio.run(read_body(response))
+
+    assert body.startswith(b"%PDF")
+    assert response.headers["content-length"] == str(len(body))
+    assert "Angebot_Angebot_Bad_1.pdf" in response.headers["content-disposition"]
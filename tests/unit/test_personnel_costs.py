@@ -0,0 +1,101 @@
+import os
+import sys
+from datetime import date
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event
+from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.pool import StaticPool
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from app.models import Employee, MaterialUsage, Project, Tenant, TimeEntry  # noqa: E402
+from app.routers.invoices import _collect_project_items, auto_generate_invoice  # noqa: E402
+
+
+@pytest.fixture()
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Tenant(id=1, name="Tenant A"))
+        session.add(Tenant(id=2, name="Tenant B"))
+        session.commit()
+        session.add(Project(id=1, tenant_id=1, name="Projekt A", client_name="Kunde"))
+        session.add(Project(id=2, tenant_id=1, name="Leer", client_name="Kunde"))
+        session.add(Employee(id=1, tenant_id=1, full_name="Mit Satz", hourly_rate=40.0))
+        session.add(Employee(id=2, tenant_id=1, full_name="Ohne Satz", hourly_rate=None))
+        session.add(Employee(id=3, tenant_id=2, full_name="Fremd", hourly_rate=99.0))
+        session.commit()
+    yield engine
+
+
+def add_costs(session, entries: int = 1) -> None:
+    for _ in range(entries):
+        # Satz am Eintrag hat Vorrang, auch wenn er 0 ist
+        session.add(TimeEntry(tenant_id=1, project_id=1, employee_id=1, work_date=date.today(), hours_worked=2.0, hourly_rate=55.0))
+        session.add(TimeEntry(tenant_id=1, project_id=1, employee_id=1, work_date=date.today(), hours_worked=1.0, hourly_rate=0.0))
+        # Ohne Satz am Eintrag: Satz des Mitarbeiters, sonst 0 (auch für fremde Mitarbeiter)
+        session.add(TimeEntry(tenant_id=1, project_id=1, employee_id=1, work_date=date.today(), hours_worked=3.0))
+        session.add(TimeEntry(tenant_id=1, project_id=1, employee_id=2, work_date=date.today(), hours_worked=4.0))
+        session.add(TimeEntry(tenant_id=1, project_id=1, employee_id=3, work_date=date.today(), hours_worked=5.0))
+    session.add(MaterialUsage(tenant_id=1, project_id=1, material_name="Gips", quantity=3, unit="Sack", unit_price=9.99, total_cost=30.0))
+    session.add(MaterialUsage(tenant_id=1, project_id=1, material_name="Profil", quantity=2.5, unit="", unit_price=4.0))
+    session.add(MaterialUsage(tenant_id=1, project_id=1, material_name="Schrauben", quantity=1, unit="Pck"))
+    session.commit()
+
+
+def count_queries(engine, func):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        result = func()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return len(statements), result
+
+
+def test_project_items_match_previous_calculation(engine):
+    with Session(engine) as session:
+        add_costs(session)
+        items, total = _collect_project_items(session, 1, 1)
+
+    assert [item.model_dump(exclude={"item_type"}) for item in items] == [
+        {"description": "Personalkosten", "quantity": 15.0, "unit": "Std", "unit_price": 15.33,
+         "total_price": 230.0, "labor_cost": 230.0, "material_cost": None, "service_cost": 0.0},
+        {"description": "Material: Gips", "quantity": 3.0, "unit": "Sack", "unit_price": 9.99,
+         "total_price": 30.0, "labor_cost": None, "material_cost": 30.0, "service_cost": None},
+        {"description": "Material: Profil", "quantity": 2.5, "unit": "Stk", "unit_price": 4.0,
+         "total_price": 10.0, "labor_cost": None, "material_cost": 10.0, "service_cost": None},
+        {"description": "Material: Schrauben", "quantity": 1.0, "unit": "Pck", "unit_price": 0.0,
+         "total_price": 0.0, "labor_cost": None, "material_cost": 0.0, "service_cost": None},
+    ]
+    assert total == 270.0
+
+
+def test_project_items_use_one_query(engine):
+    with Session(engine) as session:
+        add_costs(session, entries=1)
+        few, _ = count_queries(engine, lambda: _collect_project_items(session, 1, 1))
+        add_costs(session, entries=50)
+        many, (items, _) = count_queries(engine, lambda: _collect_project_items(session, 1, 1))
+        empty, (no_items, total) = count_queries(engine, lambda: _collect_project_items(session, 2, 1))
+
+    # Kostenabfrage plus Prüfung, ob die Tagesverdichtung des Mandanten vorhanden ist
+    assert few == many == empty == 2
+    assert items[0].quantity == 51 * 15.0
+    assert (no_items, total) == ([], 0.0)
+
+
+def test_auto_generate_invoice_uses_aggregated_costs(engine):
+    with Session(engine) as session:
+        add_costs(session)
+        invoice = auto_generate_invoice(1, session=session, current_user=SimpleNamespace(id=1, tenant_id=1, role="admin"))
+    assert invoice.total_amount == 270.0
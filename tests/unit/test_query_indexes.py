@@ -0,0 +1,150 @@
+import importlib.util
+import os
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+import pytest
+from sqlmodel import SQLModel, Session, create_engine, select, func
+from sqlmodel.pool import StaticPool
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.append(str(ROOT))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from app.models import (  # noqa: E402
+    CompanyLogo,
+    Invoice,
+    MaterialUsage,
+    Offer,
+    Project,
+    ProjectImage,
+    Report,
+    ReportImage,
+    TenantInvitation,
+    TimeEntry,
+)
+from app.utils.tenant_scoping import add_tenant_filter  # noqa: E402
+
+
+@pytest.fixture()
+def engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    SQLModel.metadata.drop_all(engine)
+
+
+def query_plan(engine, statement) -> str:
+    compiled = statement.compile(dialect=engine.dialect)
+    params = [compiled.params[name] for name in compiled.positiontup]
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", tuple(params)).all()
+    return "\n".join(row[-1] for row in rows)
+
+
+START = datetime(2025, 1, 1)
+END = datetime(2025, 1, 31)
+
+HOT_QUERIES = [
+    (
+        "ix_timeentry_tenant_project_date",
+        add_tenant_filter(
+            select(TimeEntry).where(
+                TimeEntry.project_id == 1, TimeEntry.work_date >= START, TimeEntry.work_date <= END
+            ),
+            TimeEntry,
+            1,
+        ),
+    ),
+    (
+        "ix_timeentry_tenant_employee_date",
+        add_tenant_filter(select(TimeEntry).where(TimeEntry.employee_id == 1), TimeEntry, 1),
+    ),
+    (
+        "ix_timeentry_tenant_date",
+        select(func.sum(TimeEntry.hours_worked)).where(
+            TimeEntry.tenant_id == 1,
+            TimeEntry.work_date >= date(2025, 1, 6),
+            TimeEntry.work_date <= date(2025, 1, 12),
+        ),
+    ),
+    (
+        "ix_invoice_tenant_created",
+        add_tenant_filter(select(Invoice).order_by(Invoice.created_at.desc()), Invoice, 1),
+    ),
+    ("ix_invoice_tenant_project", add_tenant_filter(select(Invoice).where(Invoice.project_id == 1), Invoice, 1)),
+    ("ix_invoice_tenant_offer", add_tenant_filter(select(Invoice).where(Invoice.offer_id == 1), Invoice, 1)),
+    ("ix_invoice_tenant_status", add_tenant_filter(select(Invoice).where(Invoice.status == "bezahlt"), Invoice, 1)),
+    (
+        "ix_invoice_tenant_date",
+        select(func.sum(Invoice.total_amount)).where(Invoice.tenant_id == 1, Invoice.invoice_date >= START),
+    ),
+    ("ix_offer_tenant_project", add_tenant_filter(select(Offer).where(Offer.project_id == 1), Offer, 1)),
+    (
+        "ix_offer_tenant_status",
+        select(func.count()).select_from(Offer).where(Offer.tenant_id == 1, Offer.status == "offen"),
+    ),
+    (
+        "ix_project_tenant_status",
+        select(func.count()).select_from(Project).where(Project.tenant_id == 1, Project.status == "aktiv"),
+    ),
+    (
+        "ix_report_tenant_project_date",
+        add_tenant_filter(
+            select(Report).where(
+                Report.project_id == 1, Report.report_date >= START, Report.report_date <= END
+            ),
+            Report,
+            1,
+        ),
+    ),
+    (
+        "ix_materialusage_tenant_project_date",
+        add_tenant_filter(
+            select(MaterialUsage).where(
+                MaterialUsage.project_id == 1,
+                MaterialUsage.usage_date >= START,
+                MaterialUsage.usage_date <= END,
+            ),
+            MaterialUsage,
+            1,
+        ),
+    ),
+    (
+        "ix_projectimage_tenant_project",
+        add_tenant_filter(select(ProjectImage).where(ProjectImage.project_id == 1), ProjectImage, 1),
+    ),
+    ("ix_reportimage_report_id", select(ReportImage).where(ReportImage.report_id == 1)),
+    (
+        "ix_companylogo_tenant_created",
+        select(CompanyLogo).where(CompanyLogo.tenant_id == 1).order_by(CompanyLogo.created_at.desc()),
+    ),
+    ("ix_tenant_invitation_token_hash", select(TenantInvitation).where(TenantInvitation.token_hash == "abc")),
+]
+
+
+@pytest.mark.parametrize("index_name, statement", HOT_QUERIES, ids=[name for name, _ in HOT_QUERIES])
+def test_hot_queries_use_composite_index(engine, index_name, statement):
+    plan = query_plan(engine, statement)
+    assert f"INDEX {index_name}" in plan, plan
+    assert "TEMP B-TREE" not in plan, plan
+
+
+def test_migration_matches_model_indexes():
+    path = ROOT / "alembic" / "versions" / "7a1c9e4b2d30_add_composite_tenant_indexes.py"
+    spec = importlib.util.spec_from_file_location("composite_index_migration", path)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+
+    model_indexes = {
+        index.name: (table.name, [column.name for column in index.columns], bool(index.unique))
+        for table in SQLModel.metadata.tables.values()
+        for index in table.indexes
+    }
+    for table, name, columns, unique in migration.COMPOSITE_INDEXES:
+        assert model_indexes[name] == (table, columns, unique)
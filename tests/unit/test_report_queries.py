@@ -0,0 +1,104 @@
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event
+from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.pool import StaticPool
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from app.models import Project, Report, ReportImage, Tenant  # noqa: E402
+from app.routers.reports import get_reports  # noqa: E402
+
+
+@pytest.fixture()
+def engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Tenant(id=1, name="Tenant A"))
+        session.add(Tenant(id=2, name="Tenant B"))
+        session.add(Project(id=1, tenant_id=1, name="Projekt A"))
+        session.add(Project(id=2, tenant_id=2, name="Projekt B"))
+        session.commit()
+    yield engine
+    SQLModel.metadata.drop_all(engine)
+
+
+def make_user(tenant_id: int) -> SimpleNamespace:
+    return SimpleNamespace(id=tenant_id * 10, tenant_id=tenant_id, role="admin")
+
+
+def add_reports(engine, count: int, tenant_id: int = 1, project_id: int = 1) -> None:
+    with Session(engine) as session:
+        for i in range(count):
+            report = Report(tenant_id=tenant_id, project_id=project_id, title=f"Bericht {i}")
+            session.add(report)
+            session.flush()
+            for j in range(2):
+                session.add(ReportImage(
+                    tenant_id=tenant_id,
+                    report_id=report.id,
+                    filename=f"r{report.id}_{j}.jpg",
+                    original_filename=f"bild{j}.jpg",
+                    file_path=f"uploads/images/r{report.id}_{j}.jpg",
+                    file_size=100,
+                ))
+        session.commit()
+
+
+def count_queries(engine, user) -> tuple[int, list]:
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        with Session(engine) as session:
+            result = get_reports(session=session, current_user=user)
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return len(statements), result
+
+
+def test_get_reports_query_count_is_constant(engine):
+    user = make_user(1)
+
+    add_reports(engine, 3)
+    small_count, small_result = count_queries(engine, user)
+
+    add_reports(engine, 30)
+    large_count, large_result = count_queries(engine, user)
+
+    assert len(small_result) == 3
+    assert len(large_result) == 33
+    assert small_count == large_count == 2
+
+
+def test_get_reports_keeps_response_shape_and_scoping(engine):
+    add_reports(engine, 2, tenant_id=1, project_id=1)
+    add_reports(engine, 1, tenant_id=2, project_id=2)
+
+    _, result = count_queries(engine, make_user(1))
+
+    assert [report["id"] for report in result] == [2, 1]
+    first = result[0]
+    assert first["project_name"] == "Projekt A"
+    assert [a["filename"] for a in first["attachments"]] == ["r2_0.jpg", "r2_1.jpg"]
+    assert first["attachments"][0] == {
+        "filename": "r2_0.jpg",
+        "original_filename": "bild0.jpg",
+        "size": 100,
+        "description": None,
+        "image_type": "progress",
+        "content_hash": None,
+    }
@@ -0,0 +1,73 @@
+import gzip
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import Request
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from app.services.static_assets import StaticAssetBundle, negotiate_encoding  # noqa: E402
+
+SCRIPT = b"function hallo() { return 'Bau-Doku'; }\n" * 200
+
+
+def make_request(**headers) -> Request:
+    raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw, "query_string": b""})
+
+
+@pytest.fixture()
+def bundle(tmp_path):
+    (tmp_path / "app.js").write_bytes(SCRIPT)
+    (tmp_path / "index.html").write_text(
+        '<html><body>' + "<p>Inhalt</p>" * 200 + '<script src="static/app.js"></script>'
+        '<script src="static/fehlt.js"></script></body></html>',
+        encoding="utf-8",
+    )
+    bundle = StaticAssetBundle(str(tmp_path), names=("index.html", "app.js", "login.html"))
+    bundle.load()
+    return bundle
+
+
+def test_negotiate_encoding_respects_weights():
+    available = {"identity": b"", "gzip": b"", "br": b""}
+    assert negotiate_encoding(None, available) == "identity"
+    assert negotiate_encoding("gzip, deflate, br", available) == "br"
+    assert negotiate_encoding("gzip, br;q=0.5", available) == "gzip"
+    assert negotiate_encoding("br;q=0, gzip;q=0", available) == "identity"
+    assert negotiate_encoding("*", available) == "br"
+    assert negotiate_encoding("br", {"identity": b"", "gzip": b""}) == "identity"
+
+
+def test_html_references_fingerprinted_assets(bundle):
+    script = bundle.get("app.js")
+    html = bundle.get("index.html").bodies["identity"].decode("utf-8")
+
+    assert f'src="{script.url}"' in html
+    assert 'src="static/fehlt.js"' in html
+    assert bundle.get_hashed(script.hashed_name) is script
+    assert bundle.get("login.html") is None
+    assert gzip.decompress(script.bodies["gzip"]) == SCRIPT
+
+
+def test_response_serves_encoding_and_cache_headers(bundle):
+    script = bundle.get("app.js")
+
+    response = bundle.response(make_request(accept_encoding="gzip"), script, immutable=True)
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert "immutable" in response.headers["cache-control"]
+    assert gzip.decompress(response.body) == SCRIPT
+
+    plain = bundle.response(make_request(), script)
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["cache-control"] == "no-cache"
+    assert plain.body == SCRIPT
+
+    revalidated = bundle.response(make_request(accept_encoding="gzip", if_none_match=response.headers["etag"]), script)
+    assert revalidated.status_code == 304
+    # ETag einer anderen Kodierung passt nicht
+    assert bundle.response(make_request(if_none_match=response.headers["etag"]), script).status_code == 200
@@ -74,8 +74,8 @@ def test_get_projects_filters_to_current_tenant(session, tenants):
     projects_a = get_projects(session=session, current_user=user_a)
     projects_b = get_projects(session=session, current_user=user_b)
 
-    assert {project["name"] for project in projects_a} == {"A"}
-    assert {project["name"] for project in projects_b} == {"B"}
+    assert {project.name for project in projects_a} == {"A"}
+    assert {project.name for project in projects_b} == {"B"}
 
 
 def test_get_project_raises_for_foreign_tenant(session, tenants):
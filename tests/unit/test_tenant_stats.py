@@ -0,0 +1,157 @@
+import asyncio
+import os
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from sqlmodel import SQLModel, Session, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from app.database import create_sqlite_engine  # noqa: E402
+from app.models import Employee, Invoice, Offer, Project, Report, Tenant, TenantStats, TimeEntry  # noqa: E402
+from app.routers.dashboard import get_dashboard_data  # noqa: E402
+from app.routers.invoices import delete_invoice, update_invoice  # noqa: E402
+from app.routers.time_entries import delete_time_entry, update_time_entry  # noqa: E402
+from app.schemas import InvoiceUpdate, TimeEntryUpdate  # noqa: E402
+from app.services.tenant_stats import TenantStatsService, main as stats_cli  # noqa: E402
+
+
+@pytest.fixture()
+def db_url(tmp_path):
+    # Dateidatenbank, damit synchrone und asynchrone Engine dieselben Daten sehen
+    return f"sqlite:///{tmp_path / 'stats.db'}"
+
+
+@pytest.fixture()
+def session(db_url):
+    engine = create_engine(db_url, connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Tenant(id=1, name="Tenant A"))
+        session.add(Tenant(id=2, name="Tenant B"))
+        session.commit()
+        session.add(Project(id=1, tenant_id=1, name="Projekt A", status="aktiv"))
+        session.add(Project(id=2, tenant_id=1, name="Projekt B", status="abgeschlossen"))
+        session.add(Project(id=3, tenant_id=2, name="Fremd", status="aktiv"))
+        session.add(Employee(id=1, tenant_id=1, full_name="Max Muster", hourly_rate=40.0))
+        session.commit()
+        yield session
+    SQLModel.metadata.drop_all(engine)
+    engine.dispose()
+
+
+def make_user(tenant_id: int, role: str = "admin") -> SimpleNamespace:
+    return SimpleNamespace(id=tenant_id * 10, tenant_id=tenant_id, role=role, username=f"user_{tenant_id}")
+
+
+def add_activity(session, tenant_id: int = 1, project_id: int = 1) -> None:
+    today = datetime.now()
+    for i, status in enumerate(["entwurf", "bezahlt", "bezahlt"]):
+        session.add(Invoice(
+            tenant_id=tenant_id, project_id=project_id, invoice_number=f"R-{tenant_id}-{i}",
+            title="Rechnung", client_name="Kunde", total_amount=100.0 * (i + 1), items="[]",
+            status=status, invoice_date=today - timedelta(days=40 * i),
+        ))
+    session.add(Offer(
+        tenant_id=tenant_id, project_id=project_id, title="Angebot", client_name="Kunde",
+        total_amount=50.0, items="[]", status="offen",
+    ))
+    session.add(Report(tenant_id=tenant_id, project_id=project_id, title="Bericht"))
+    for days_ago in (0, 1, 9):
+        session.add(TimeEntry(
+            tenant_id=tenant_id, project_id=project_id, employee_id=1,
+            work_date=date.today() - timedelta(days=days_ago), hours_worked=7.5,
+        ))
+    session.commit()
+
+
+def test_incremental_stats_match_rebuild(session):
+    add_activity(session)
+    add_activity(session, tenant_id=2, project_id=3)
+    service = TenantStatsService(session)
+
+    assert service.check(1) == []
+    assert service.check(2) == []
+    assert service.get(1) == service.compute(1)
+    assert service.get(1)["invoice_status_counts"] == {"bezahlt": 2, "entwurf": 1}
+    assert service.get(1)["project_status_counts"] == {"abgeschlossen": 1, "aktiv": 1}
+
+
+def test_updates_and_deletes_through_routers_keep_stats_consistent(session):
+    add_activity(session)
+    user = make_user(1)
+    invoice = session.exec(select(Invoice).where(Invoice.status == "entwurf")).first()
+    entry = session.exec(select(TimeEntry)).first()
+
+    update_invoice(invoice.id, InvoiceUpdate(status="bezahlt", total_amount=250.0), session=session, current_user=user)
+    update_time_entry(
+        entry.id,
+        TimeEntryUpdate(hours_worked=3.0, work_date=(date.today() - timedelta(days=21)).isoformat()),
+        session=session,
+        current_user=user,
+    )
+    delete_time_entry(session.exec(select(TimeEntry).order_by(TimeEntry.id.desc())).first().id, session=session, current_user=user)
+    delete_invoice(session.exec(select(Invoice).order_by(Invoice.id.desc())).first().id, session=session, current_user=user)
+
+    # Änderung an einem abgelaufenen Objekt ohne vorheriges Laden
+    project = session.get(Project, 1)
+    session.expire(project)
+    project.status = "pausiert"
+    session.commit()
+
+    service = TenantStatsService(session)
+    assert service.check(1) == []
+    assert service.get(1)["project_status_counts"] == {"abgeschlossen": 1, "pausiert": 1}
+
+
+def test_dashboard_reads_stats_and_rebuilds_missing_row(session, db_url):
+    add_activity(session)
+    session.delete(session.get(TenantStats, 1))
+    session.commit()
+
+    async def load_dashboard():
+        async_engine = create_sqlite_engine(db_url, "production", use_async=True)
+        try:
+            async with AsyncSession(async_engine, expire_on_commit=False) as async_session:
+                return await get_dashboard_data(session=async_session, current_user=make_user(1))
+        finally:
+            await async_engine.dispose()
+
+    data = asyncio.run(load_dashboard())
+
+    session.expire_all()
+    assert session.get(TenantStats, 1) is not None
+    assert data["projects"] == {"total": 2, "active": 1}
+    assert data["invoices"] == {"total": 3, "open": 1, "total_revenue": 600.0}
+    assert data["offers"] == {"total": 1, "pending": 1}
+    assert data["reports"] == {"total": 1}
+    assert data["time_tracking"]["total_hours"] == 22.5
+    assert data["revenue"]["this_month"] == 100.0
+
+
+def test_check_detects_drift_and_rebuild_repairs_it(session):
+    add_activity(session)
+    row = session.get(TenantStats, 1)
+    row.report_count = 99
+    session.commit()
+
+    service = TenantStatsService(session)
+    assert any("report_count" in line for line in service.check(1))
+
+    service.rebuild(1)
+    assert service.check(1) == []
+
+
+def test_cli_check_reports_consistency(session, monkeypatch, capsys):
+    import app.database
+
+    add_activity(session)
+    monkeypatch.setattr(app.database, "engine", session.get_bind())
+
+    assert stats_cli(["check"]) == 0
+    assert "konsistent" in capsys.readouterr().out
@@ -0,0 +1,140 @@
+import io
+import os
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException, Request
+from PIL import Image
+from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.pool import StaticPool
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from app.models import Project, ProjectImage, Tenant  # noqa: E402
+from app.routers import project_images as project_images_router  # noqa: E402
+from app.services import thumbnail_service, upload_service  # noqa: E402
+from app.services.blob_store import BlobStore, collect_garbage  # noqa: E402
+from app.services.thumbnail_service import (  # noqa: E402
+    THUMBNAIL_SIZES,
+    ThumbnailPipeline,
+    generate_thumbnails,
+    rendition_path,
+    thumbnail_path,
+)
+
+# EXIF-Tag 0x0112: Orientierung 6 = um 90° im Uhrzeigersinn drehen
+ORIENTATION_TAG = 0x0112
+
+
+def _write_photo(path: Path, size=(3000, 2000), orientation=None) -> str:
+    image = Image.new("RGB", size, (200, 120, 40))
+    exif = Image.Exif()
+    if orientation is not None:
+        exif[ORIENTATION_TAG] = orientation
+    image.save(path, "JPEG", exif=exif.tobytes())
+    return str(path)
+
+
+def test_generates_all_sizes_with_exif_orientation(tmp_path):
+    original = _write_photo(tmp_path / "foto.jpg", orientation=6)
+
+    created = generate_thumbnails(original)
+
+    assert sorted(created) == sorted(THUMBNAIL_SIZES)
+    for size, path in created.items():
+        assert path == thumbnail_path(original, size)
+        with Image.open(path) as thumb:
+            # Hochformat nach Anwendung der EXIF-Orientierung
+            assert thumb.height == size
+            assert abs(thumb.width - size * 2 / 3) <= 1
+
+
+def test_pipeline_runs_in_background_and_serves_on_demand(tmp_path):
+    pipeline = ThumbnailPipeline(workers=1, max_queue=4)
+    original = _write_photo(tmp_path / "foto.jpg")
+    try:
+        assert pipeline.enqueue(original) is True
+        # Abruf wartet auf den laufenden Auftrag statt doppelt zu rechnen
+        assert pipeline.ensure(original, 480) == thumbnail_path(original, 480)
+        deadline = time.time() + 5
+        while pipeline.metrics()["completed"] < 1 and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        pipeline.shutdown()
+
+    metrics = pipeline.metrics()
+    assert metrics["completed"] == 1
+    assert metrics["on_demand"] == 0
+
+    # Ohne Auftrag entsteht nur die angefragte Größe
+    other = _write_photo(tmp_path / "other.jpg", size=(800, 600))
+    assert os.path.exists(pipeline.ensure(other, 160))
+    assert not os.path.exists(thumbnail_path(other, 1280))
+    assert pipeline.metrics()["on_demand"] == 1
+
+
+def test_rendition_path_validates_size(tmp_path, monkeypatch):
+    monkeypatch.setattr(thumbnail_service, "thumbnail_pipeline", ThumbnailPipeline(workers=0))
+    original = _write_photo(tmp_path / "foto.jpg", size=(400, 300))
+
+    assert rendition_path(original, None) == (original, None)
+    assert rendition_path(original, 160) == (thumbnail_path(original, 160), "image/jpeg")
+    with pytest.raises(HTTPException) as exc:
+        rendition_path(original, 999)
+    assert exc.value.status_code == 400
+
+    # Dekompressionsbombe bzw. kein Bild: Original statt 500
+    bomb = _write_photo(tmp_path / "bombe.jpg", size=(400, 300))
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 1000)
+    assert rendition_path(bomb, 160) == (bomb, None)
+    broken = tmp_path / "kaputt.jpg"
+    broken.write_bytes(b"kein Bild")
+    assert rendition_path(str(broken), 160) == (str(broken), None)
+
+
+def test_project_image_upload_stores_original_and_view_serves_thumbnail(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_service, "blob_store", BlobStore(str(tmp_path / "blobs")))
+    pipeline = ThumbnailPipeline(workers=0)
+    monkeypatch.setattr(project_images_router, "thumbnail_pipeline", pipeline)
+    monkeypatch.setattr(thumbnail_service, "thumbnail_pipeline", pipeline)
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    user = SimpleNamespace(id=1, tenant_id=1, role="admin")
+    photo = io.BytesIO()
+    Image.new("RGB", (2400, 1600)).save(photo, "JPEG")
+    upload = SimpleNamespace(content_type="image/jpeg", filename="baustelle.jpg", file=io.BytesIO(photo.getvalue()))
+
+    with Session(engine) as session:
+        session.add(Tenant(id=1, name="Tenant A"))
+        session.add(Project(id=1, tenant_id=1, name="Projekt A"))
+        session.commit()
+
+        image = project_images_router.create_project_image(
+            project_id=1, file=upload, session=session, current_user=user
+        )
+        assert isinstance(image, ProjectImage)
+        assert image.file_size == len(photo.getvalue())
+        with Image.open(image.file_path) as stored:
+            assert stored.size == (2400, 1600)
+        assert pipeline.metrics()["completed"] == 1
+
+        response = project_images_router.view_project_image(
+            image_id=image.id,
+            request=Request({"type": "http", "method": "GET", "headers": []}),
+            size=480,
+            session=session,
+            current_user=user,
+        )
+        assert response.path == thumbnail_path(image.file_path, 480)
+        assert response.media_type == "image/jpeg"
+
+        project_images_router.delete_project_image(image_id=image.id, session=session, current_user=user)
+        old = time.time() - 120
+        os.utime(image.file_path, (old, old))
+        assert collect_garbage(session, grace_seconds=60) == [image.file_path]
+        assert not os.path.exists(thumbnail_path(image.file_path, 160))
@@ -0,0 +1,134 @@
+import io
+import os
+import sys
+from datetime import date
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import event
+from sqlmodel import SQLModel, Session, create_engine, select
+from sqlmodel.pool import StaticPool
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from app.models import Employee, Project, Tenant, TimeEntry  # noqa: E402
+from app.routers.time_entries import create_time_entries_bulk, import_time_entries  # noqa: E402
+from app.schemas import TimeEntryBulkCreate  # noqa: E402
+from app.services import time_entry_import  # noqa: E402
+from app.services.tenant_stats import TenantStatsService  # noqa: E402
+from app.services.time_entry_import import ImportFormatError, TimeEntryImporter, parse_import_file  # noqa: E402
+
+USER = SimpleNamespace(id=1, tenant_id=1, role="admin")
+
+
+@pytest.fixture()
+def session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Tenant(id=1, name="Tenant A"))
+        session.add(Tenant(id=2, name="Tenant B"))
+        session.commit()
+        session.add(Project(id=1, tenant_id=1, name="Projekt A"))
+        session.add(Project(id=2, tenant_id=2, name="Fremd"))
+        session.add(Employee(id=1, tenant_id=1, full_name="Max Muster", hourly_rate=40.0))
+        session.add(Employee(id=2, tenant_id=1, full_name="Ohne Satz", hourly_rate=None))
+        session.commit()
+        TenantStatsService(session).rebuild(1)
+        yield session
+
+
+def entries(session):
+    return session.exec(select(TimeEntry).order_by(TimeEntry.id)).all()
+
+
+def test_bulk_endpoint_imports_valid_rows_and_reports_errors(session):
+    payload = TimeEntryBulkCreate(entries=[
+        {"project_id": 1, "employee_id": 1, "work_date": "2025-03-03", "hours_worked": 8, "clock_in": "7:00"},
+        {"project_id": 1, "employee_id": 1, "work_date": "2025-03-04", "hours_worked": 2.5, "hourly_rate": 50},
+        {"project_id": 2, "employee_id": 3, "work_date": "2025-13-01", "hours_worked": 30},
+        {"project_id": 1, "employee_id": 2, "work_date": "2025-03-05", "hours_worked": 4, "clock_out": "25:00"},
+        {"project_id": 1, "employee_id": 2, "work_date": "2025-03-05", "hours_worked": 4},
+        {},
+    ])
+
+    result = create_time_entries_bulk(payload, session=session, current_user=USER)
+
+    assert (result["total_rows"], result["imported"], result["failed"]) == (5, 3, 2)
+    assert result["errors"] == [
+        {"row": 3, "errors": [
+            "Datum ist ungültig: 2025-13-01", "Projekt nicht gefunden", "Mitarbeiter nicht gefunden",
+            "Stunden müssen größer 0 und höchstens 24 sein",
+        ]},
+        {"row": 4, "errors": ["Uhrzeit clock_out ist ungültig: 25:00"]},
+    ]
+    assert [(e.work_date, e.clock_in, e.hourly_rate, e.total_cost, e.tenant_id) for e in entries(session)] == [
+        (date(2025, 3, 3), "07:00", 40.0, 320.0, 1),
+        (date(2025, 3, 4), None, 50.0, 125.0, 1),
+        (date(2025, 3, 5), None, None, 0.0, 1),
+    ]
+    assert TenantStatsService(session).check(1) == []
+
+
+def test_csv_with_german_headers_and_numbers(session):
+    data = (
+        "Projekt;Mitarbeiter;Datum;Stunden;Stundensatz;Tätigkeit;Pause\r\n"
+        "1;1;03.03.2025;7,5;;Spachteln;30\r\n"
+        ";;;;;;\r\n"
+        "1;1;04.03.2025;acht;;;\r\n"
+    ).encode("cp1252")
+
+    rows = parse_import_file(data, "stunden.csv")
+    result = TimeEntryImporter(session, 1).run(rows, first_row=2)
+
+    assert result["errors"] == [{"row": 4, "errors": ["Stunden ist ungültig: acht"]}]
+    entry = entries(session)[0]
+    assert (entry.hours_worked, entry.total_cost, entry.description, entry.total_break_minutes) == (
+        7.5, 300.0, "Spachteln", 30,
+    )
+    with pytest.raises(ImportFormatError, match="work_date"):
+        parse_import_file(b"Projekt;Mitarbeiter;Stunden\n1;1;8\n")
+
+
+def test_rows_are_inserted_in_chunks_with_executemany(session):
+    rows = [{"project_id": 1, "employee_id": 1, "work_date": "2025-03-03", "hours_worked": 1} for _ in range(5)]
+    inserts = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO timeentry"):
+            inserts.append((executemany, len(parameters)))
+
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        assert TimeEntryImporter(session, 1, chunk_size=2).run(rows, dry_run=True)["imported"] == 0
+        assert inserts == []
+        assert TimeEntryImporter(session, 1, chunk_size=2).run(rows)["imported"] == 5
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    # Drei Blöcke (2 + 2 + 1); ein einzelner Parametersatz läuft ohne executemany
+    assert inserts[:2] == [(True, 2), (True, 2)] and len(inserts) == 3
+    assert len(entries(session)) == 5
+
+
+def test_import_endpoint_reads_upload_and_rejects_bad_files(session, monkeypatch):
+    upload = UploadFile(io.BytesIO(b"project_id,employee_id,work_date,hours_worked\n1,1,2025-03-03,6\n"), filename="a.csv")
+    result = import_time_entries(file=upload, dry_run=False, session=session, current_user=USER)
+    assert (result["imported"], result["errors"]) == (1, [])
+
+    monkeypatch.setattr(time_entry_import, "OPENPYXL_AVAILABLE", False)
+    with pytest.raises(HTTPException) as missing_package:
+        import_time_entries(
+            file=UploadFile(io.BytesIO(b"PK\x03\x04"), filename="a.xlsx"), dry_run=False,
+            session=session, current_user=USER,
+        )
+    assert missing_package.value.status_code == 400
+
+    monkeypatch.setattr(time_entry_import, "MAX_IMPORT_ROWS", 1)
+    with pytest.raises(HTTPException) as too_many:
+        create_time_entries_bulk(TimeEntryBulkCreate(entries=[{}, {}]), session=session, current_user=USER)
+    assert too_many.value.status_code == 400
@@ -0,0 +1,239 @@
+import os
+import sys
+from datetime import date, datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event, insert
+from sqlmodel import SQLModel, Session, create_engine, select
+from sqlmodel.pool import StaticPool
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from app.models import Employee, Project, Tenant, TimeEntry, TimeEntryDaily  # noqa: E402
+from app.routers.invoices import _project_cost_rows  # noqa: E402
+from app.routers.time_entries import delete_time_entry, get_time_entry_summary, update_time_entry  # noqa: E402
+from app.schemas import InvoiceGenerationRequest, TimeEntryUpdate  # noqa: E402
+from app.services.billing_runs import BillingRunService  # noqa: E402
+from app.services.invoice_generator import InvoiceGenerator  # noqa: E402
+from app.services.tenant_stats import TenantStatsService  # noqa: E402
+from app.services.time_entry_import import TimeEntryImporter  # noqa: E402
+from app.services.time_rollup import TimeRollupService, main as rollup_cli  # noqa: E402
+
+ADMIN = SimpleNamespace(id=1, tenant_id=1, role="admin", username="admin")
+
+
+@pytest.fixture()
+def session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Tenant(id=1, name="Tenant A"))
+        session.add(Tenant(id=2, name="Tenant B"))
+        session.commit()
+        session.add(Project(id=1, tenant_id=1, name="Projekt A"))
+        session.add(Project(id=2, tenant_id=1, name="Projekt B"))
+        session.add(Project(id=3, tenant_id=2, name="Fremd"))
+        session.add(Employee(id=1, tenant_id=1, full_name="Max Muster", hourly_rate=40.0, user_id=7))
+        session.add(Employee(id=2, tenant_id=1, full_name="Erika Muster", hourly_rate=30.0))
+        session.add(Employee(id=3, tenant_id=2, full_name="Fremd", hourly_rate=99.0))
+        session.commit()
+        yield session
+
+
+def add_entry(session, **values) -> TimeEntry:
+    entry = TimeEntry(**{"tenant_id": 1, "project_id": 1, "employee_id": 1, "hourly_rate": 50.0, **values})
+    session.add(entry)
+    session.commit()
+    return entry
+
+
+def rollup(session):
+    return [
+        (row.project_id, row.employee_id, row.work_date, row.entry_count, row.hours_worked, row.total_cost, row.unrated_hours)
+        for row in session.exec(select(TimeEntryDaily).order_by(
+            TimeEntryDaily.tenant_id, TimeEntryDaily.project_id, TimeEntryDaily.employee_id, TimeEntryDaily.work_date,
+        )).all()
+    ]
+
+
+def test_create_update_delete_keep_daily_rows_in_sync(session):
+    first = add_entry(session, work_date=date(2025, 3, 3), hours_worked=8, total_break_minutes=30)
+    add_entry(session, work_date=date(2025, 3, 3), hours_worked=2.5)
+    unrated = add_entry(session, work_date=date(2025, 3, 4), hours_worked=3, hourly_rate=None)
+    add_entry(session, tenant_id=2, project_id=3, employee_id=3, work_date=date(2025, 3, 3), hours_worked=1)
+
+    assert rollup(session)[:2] == [
+        (1, 1, date(2025, 3, 3), 2, 10.5, 525.0, 0.0),
+        (1, 1, date(2025, 3, 4), 1, 3.0, 0.0, 3.0),
+    ]
+
+    # Verschieben auf einen anderen Tag und ein anderes Projekt
+    update_time_entry(
+        first.id, TimeEntryUpdate(work_date="2025-03-05", project_id=2, hours_worked=6),
+        session=session, current_user=ADMIN,
+    )
+    delete_time_entry(unrated.id, session=session, current_user=ADMIN)
+
+    assert rollup(session) == [
+        (1, 1, date(2025, 3, 3), 1, 2.5, 125.0, 0.0),
+        (2, 1, date(2025, 3, 5), 1, 6.0, 300.0, 0.0),
+        (3, 3, date(2025, 3, 3), 1, 1.0, 50.0, 0.0),
+    ]
+    daily = session.get(TimeEntryDaily, (1, 2, 1, date(2025, 3, 5)))
+    assert (daily.break_minutes, daily.invalid_entries) == (30, 0)
+    service = TimeRollupService(session)
+    assert service.check(1) == [] and service.check(2) == []
+
+
+def test_bulk_import_and_rebuild(session):
+    rows = [
+        {"project_id": 1, "employee_id": 1, "work_date": "2025-03-03", "hours_worked": 4},
+        {"project_id": 1, "employee_id": 2, "work_date": "2025-03-03", "hours_worked": 2},
+        {"project_id": 1, "employee_id": 1, "work_date": "2025-03-03", "hours_worked": 1, "hourly_rate": 60},
+    ]
+    TimeEntryImporter(session, 1, chunk_size=2).run(rows)
+    assert rollup(session) == [
+        (1, 1, date(2025, 3, 3), 2, 5.0, 220.0, 0.0),
+        (1, 2, date(2025, 3, 3), 1, 2.0, 60.0, 0.0),
+    ]
+    assert TimeRollupService(session).check(1) == []
+
+    # Altbestand am ORM vorbei: Prüfung schlägt an, Neuaufbau stellt her
+    now = datetime.utcnow()
+    session.execute(insert(TimeEntry), [{
+        "tenant_id": 1, "project_id": 2, "employee_id": 2, "work_date": date(2025, 3, 7), "hours_worked": 0,
+        "total_break_minutes": 0, "is_edited": False, "created_at": now, "updated_at": now,
+    }])
+    session.commit()
+    service = TimeRollupService(session)
+    assert len(service.check(1)) == 2  # entry_count und invalid_entries
+    assert service.rebuild(1) == 3
+    assert service.check(1) == []
+    assert session.get(TimeEntryDaily, (1, 2, 2, date(2025, 3, 7))).invalid_entries == 1
+
+
+def test_invoice_queries_read_the_rollup(session):
+    add_entry(session, work_date=date(2025, 3, 1), hours_worked=4)
+    add_entry(session, work_date=date(2025, 3, 31), hours_worked=2, hourly_rate=None)
+    add_entry(session, employee_id=2, work_date=date(2025, 3, 15), hours_worked=0)
+    add_entry(session, work_date=date(2025, 4, 1), hours_worked=8)
+
+    statements = []
+    engine = session.get_bind()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        request = InvoiceGenerationRequest(
+            project_id=1, generation_method="time_entries",
+            start_date=datetime(2025, 3, 1), end_date=datetime(2025, 3, 31, 12),
+        )
+        data = InvoiceGenerator(session, tenant_id=1)._collect_invoice_data(request)
+        personnel, = _project_cost_rows(session, 1, 1)
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    assert not any("FROM timeentry" in statement for statement in statements)
+    assert [
+        (row["employee_id"], row["entry_count"], row["invalid_entries"], row["total_hours"], row["total_cost"])
+        for row in data.employee_hours
+    ] == [(1, 2, 0, 6.0, 200.0), (2, 1, 1, 0.0, 0.0)]
+    # Ohne Satz am Eintrag gilt der Satz des Mitarbeiters (2 h × 40)
+    assert (personnel.quantity, personnel.total_price) == (14.0, 200.0 + 80.0 + 400.0)
+
+
+def test_summary_endpoint_groups_and_scopes_by_role(session):
+    add_entry(session, work_date=date(2025, 3, 3), hours_worked=8)
+    add_entry(session, employee_id=2, work_date=date(2025, 3, 3), hours_worked=4, hourly_rate=None)
+    add_entry(session, project_id=2, work_date=date(2025, 3, 4), hours_worked=2)
+    add_entry(session, tenant_id=2, project_id=3, employee_id=3, work_date=date(2025, 3, 3), hours_worked=5)
+
+    by_day = get_time_entry_summary(session=session, current_user=ADMIN)
+    assert [(row["work_date"], row["entry_count"], row["hours_worked"], row["total_cost"]) for row in by_day] == [
+        (date(2025, 3, 3), 2, 12.0, 520.0),
+        (date(2025, 3, 4), 1, 2.0, 100.0),
+    ]
+    by_project_employee = get_time_entry_summary(
+        group_by="project,employee", start_date=date(2025, 3, 4), session=session, current_user=ADMIN,
+    )
+    assert [(row["project_id"], row["employee_id"], row["hours_worked"]) for row in by_project_employee] == [(2, 1, 2.0)]
+
+    # Mitarbeiter: nur die eigenen Stunden, ohne Kosten
+    worker = SimpleNamespace(id=7, tenant_id=1, role="mitarbeiter")
+    own = get_time_entry_summary(group_by="employee", session=session, current_user=worker)
+    assert [(row["employee_id"], row["hours_worked"], row["total_cost"]) for row in own] == [(1, 10.0, 0.0)]
+    assert get_time_entry_summary(employee_id=2, session=session, current_user=worker) == []
+
+    with pytest.raises(HTTPException) as invalid:
+        get_time_entry_summary(group_by="week", session=session, current_user=ADMIN)
+    assert invalid.value.status_code == 400
+    with pytest.raises(HTTPException) as reversed_range:
+        get_time_entry_summary(
+            start_date=date(2025, 3, 5), end_date=date(2025, 3, 1), session=session, current_user=ADMIN,
+        )
+    assert reversed_range.value.status_code == 400
+
+
+def test_readers_rebuild_a_missing_rollup_once(session):
+    # Bestand am Listener vorbei, Tabelle leer wie nach create_all auf einer Altdatenbank
+    now = datetime.utcnow()
+    session.execute(insert(TimeEntry), [
+        {
+            "tenant_id": 1, "project_id": 1, "employee_id": employee_id, "work_date": date(2025, 3, 3),
+            "hours_worked": hours, "hourly_rate": rate, "total_break_minutes": 0, "is_edited": False,
+            "created_at": now, "updated_at": now,
+        }
+        for employee_id, hours, rate in ((1, 8.0, 50.0), (2, 4.0, None))
+    ])
+    session.commit()
+    request = InvoiceGenerationRequest(
+        project_id=1, generation_method="time_entries",
+        start_date=datetime(2025, 3, 1), end_date=datetime(2025, 3, 31),
+    )
+
+    readers = [
+        lambda: [
+            (row["employee_id"], row["total_hours"], row["total_cost"])
+            for row in InvoiceGenerator(session, tenant_id=1)._collect_invoice_data(request).employee_hours
+        ],
+        lambda: [(row.quantity, row.total_price) for row in _project_cost_rows(session, 1, 1)],
+        lambda: [
+            (row["hours_worked"], row["total_cost"])
+            for row in get_time_entry_summary(session=session, current_user=ADMIN)
+        ],
+        lambda: BillingRunService.candidate_project_ids(
+            session, 1, datetime(2025, 3, 1), datetime(2025, 3, 31), "time_entries",
+        ),
+        lambda: TenantStatsService(session).compute(1)["total_hours"],
+    ]
+    expected = [[(1, 8.0, 400.0), (2, 4.0, 0.0)], [(12.0, 520.0)], [(12.0, 520.0)], [1], 12.0]
+
+    for reader, want in zip(readers, expected):
+        session.execute(TimeEntryDaily.__table__.delete())
+        session.commit()
+        assert reader() == want
+        assert TimeRollupService(session).check(1) == []
+
+    # Vorhandene Tageszeilen werden nicht erneut aufgebaut
+    assert not TimeRollupService(session).ensure(1)
+    assert not TimeRollupService(session).ensure(2)
+
+
+def test_cli_rebuilds_and_checks(session, monkeypatch, capsys):
+    import app.database
+
+    monkeypatch.setattr(app.database, "engine", session.get_bind())
+    add_entry(session, work_date=date(2025, 3, 3), hours_worked=8)
+    session.execute(TimeEntryDaily.__table__.delete())
+    session.commit()
+
+    assert rollup_cli(["check", "--tenant-id", "1"]) == 1
+    assert rollup_cli(["rebuild"]) == 0
+    assert rollup_cli(["check"]) == 0
+    assert "2 Mandant(en) konsistent" in capsys.readouterr().out
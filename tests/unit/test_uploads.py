@@ -0,0 +1,251 @@
+import asyncio
+import hashlib
+import io
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException, Request
+from PIL import Image
+from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.pool import StaticPool
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from app.database import create_sqlite_engine  # noqa: E402
+from app.models import Project, Report, StoredBlob, Tenant, TenantSettings  # noqa: E402
+from app.routers import project_images as project_images_router  # noqa: E402
+from app.routers import reports as reports_router  # noqa: E402
+from app.services import upload_service  # noqa: E402
+from app.services.blob_store import CHUNK_SIZE, BlobStore, BlobTooLarge, copy_stream  # noqa: E402
+from app.services.thumbnail_service import ThumbnailPipeline  # noqa: E402
+from app.services.upload_service import (  # noqa: E402
+    DEFAULT_MAX_UPLOAD_MB,
+    detect_image_type,
+    store_image_upload,
+    upload_limit_bytes,
+)
+
+MB = 1024 * 1024
+
+
+class CountingReader(io.BytesIO):
+    """Merkt sich, wie viel pro ``read`` angefordert wurde."""
+
+    def __init__(self, data: bytes):
+        super().__init__(data)
+        self.reads = []
+
+    def read(self, size=-1):
+        self.reads.append(size)
+        return super().read(size)
+
+
+def jpeg_bytes() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 24), "orange").save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+def upload(data: bytes, filename: str = "foto.jpg", size=None):
+    return SimpleNamespace(content_type="image/jpeg", filename=filename, file=CountingReader(data), size=size)
+
+
+@pytest.fixture()
+def store(tmp_path, monkeypatch):
+    store = BlobStore(str(tmp_path / "blobs"))
+    monkeypatch.setattr(upload_service, "blob_store", store)
+    return store
+
+
+@pytest.fixture()
+def session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Tenant(id=1, name="Tenant A"))
+        session.add(Tenant(id=2, name="Tenant B"))
+        session.commit()
+        session.add(TenantSettings(tenant_id=2, max_upload_mb=1))
+        session.add(Project(id=1, tenant_id=2, name="Projekt B"))
+        session.add(Report(id=1, tenant_id=2, project_id=1, title="Bericht"))
+        session.commit()
+        yield session
+
+
+def stored_files(store):
+    return [name for _root, _dirs, files in os.walk(store.directory) for name in files]
+
+
+def test_detect_image_type_from_magic_bytes():
+    assert detect_image_type(jpeg_bytes()) == ".jpg"
+    assert detect_image_type(b"\x89PNG\r\n\x1a\n....") == ".png"
+    assert detect_image_type(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == ".webp"
+    assert detect_image_type(b"<html>kein Bild</html>") is None
+    assert detect_image_type(b"") is None
+
+
+def test_copy_stream_reads_fixed_chunks_and_stops_at_limit():
+    source = CountingReader(b"x" * (5 * CHUNK_SIZE))
+    with pytest.raises(BlobTooLarge):
+        copy_stream(source, io.BytesIO(), hashlib.sha256(), max_bytes=CHUNK_SIZE + 1)
+    assert source.reads == [CHUNK_SIZE, CHUNK_SIZE]
+
+
+def test_upload_limit_per_tenant(session):
+    assert upload_limit_bytes(session, 1) == DEFAULT_MAX_UPLOAD_MB * MB
+    assert upload_limit_bytes(session, 2) == 1 * MB
+
+
+def test_store_image_upload_hashes_on_the_fly(store):
+    content = jpeg_bytes()
+    stored = store_image_upload(upload(content), max_bytes=MB)
+
+    assert stored.content_hash == hashlib.sha256(content).hexdigest()
+    assert stored.size == len(content)
+    assert stored_files(store) == [os.path.basename(stored.path)]
+
+
+def test_store_image_upload_rejects_before_writing(store):
+    with pytest.raises(HTTPException) as exc:
+        store_image_upload(upload(b"MZ\x90\x00 kein Bild" * 100, filename="foto.jpg"), max_bytes=MB)
+    assert exc.value.status_code == 400
+
+    too_large = upload(jpeg_bytes() + b"\x00" * (2 * MB))
+    with pytest.raises(HTTPException) as exc:
+        store_image_upload(too_large, max_bytes=MB)
+    assert exc.value.status_code == 413
+    assert len(too_large.file.reads) == 2
+
+    # Bekannte Größe: Abweisung ohne einen Block zu lesen
+    declared = upload(jpeg_bytes(), size=2 * MB)
+    with pytest.raises(HTTPException) as exc:
+        store_image_upload(declared, max_bytes=MB)
+    assert exc.value.status_code == 413
+    assert declared.file.reads == []
+    assert stored_files(store) == []
+
+
+def test_blob_extension_and_media_type_follow_magic_bytes(store, session, monkeypatch):
+    pipeline = ThumbnailPipeline(workers=0)
+    monkeypatch.setattr(project_images_router, "thumbnail_pipeline", pipeline)
+    monkeypatch.setattr(pipeline, "enqueue", [].append)
+    user = SimpleNamespace(id=1, tenant_id=2, role="admin")
+    disguised = upload(b"GIF89a<script>alert(1)</script>", filename="x.html")
+    disguised.content_type = "image/gif"
+
+    image = project_images_router.create_project_image(
+        project_id=1, file=disguised, session=session, current_user=user
+    )
+    assert image.file_path.endswith(".gif")
+
+    def view():
+        return project_images_router.view_project_image(
+            image_id=image.id,
+            request=Request({"type": "http", "method": "GET", "headers": []}),
+            session=session,
+            current_user=user,
+        )
+
+    assert view().media_type == "image/gif"
+
+    # Vorher mit Client-Endung abgelegte Blobs werden ebenfalls als Bild ausgeliefert
+    legacy = image.file_path[: -len(".gif")] + ".html"
+    os.replace(image.file_path, legacy)
+    image.file_path = legacy
+    session.add(image)
+    session.commit()
+    assert view().media_type == "image/gif"
+
+
+def test_legacy_report_upload_stores_blob_and_row(store, session, monkeypatch):
+    pipeline = ThumbnailPipeline(workers=0)
+    monkeypatch.setattr(reports_router, "thumbnail_pipeline", pipeline)
+    enqueued = []
+    monkeypatch.setattr(pipeline, "enqueue", enqueued.append)
+    user = SimpleNamespace(id=1, tenant_id=2, role="admin")
+
+    # Nur noch eine Route: die frühere zweite Definition war verdeckt
+    routes = [route for route in reports_router.router.routes if route.path == "/reports/{report_id}/upload_image"]
+    assert [route.endpoint for route in routes] == [reports_router.upload_image]
+
+    first = reports_router.upload_image(
+        report_id=1, file=upload(jpeg_bytes()), description="Estrich", image_type="damage",
+        session=session, current_user=user,
+    )
+    second = reports_router.upload_image(report_id=1, file=upload(jpeg_bytes()), session=session, current_user=user)
+    assert (first.file_size, first.description, first.image_type) == (len(jpeg_bytes()), "Estrich", "damage")
+    assert second.image_type == "progress"
+    assert first.file_path == second.file_path and stored_files(store) == [os.path.basename(first.file_path)]
+    assert (first.content_hash, first.width) == (hashlib.sha256(jpeg_bytes()).hexdigest(), 32)
+    assert session.get(StoredBlob, first.content_hash).ref_count == 2
+    assert enqueued == [first.file_path] * 2
+
+    with pytest.raises(HTTPException) as exc:
+        reports_router.upload_image(
+            report_id=1, file=upload(jpeg_bytes() + b"\x00" * (2 * MB)), session=session, current_user=user
+        )
+    assert exc.value.status_code == 413
+    assert stored_files(store) == [os.path.basename(first.file_path)]
+
+
+def test_legacy_report_upload_removes_new_blob_when_commit_fails(store, session, monkeypatch):
+    pipeline = ThumbnailPipeline(workers=0)
+    monkeypatch.setattr(reports_router, "thumbnail_pipeline", pipeline)
+    enqueued = []
+    monkeypatch.setattr(pipeline, "enqueue", enqueued.append)
+
+    def failing_commit():
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(session, "commit", failing_commit)
+    with pytest.raises(HTTPException) as exc:
+        reports_router.upload_image(
+            report_id=1, file=upload(jpeg_bytes()), session=session,
+            current_user=SimpleNamespace(id=1, tenant_id=2, role="admin"),
+        )
+    assert exc.value.status_code == 500
+    assert stored_files(store) == [] and enqueued == []
+
+
+def test_report_upload_fails_and_removes_blob_when_row_cannot_be_saved(store, tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'uploads.db'}"
+    engine = create_engine(url)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as setup:
+        setup.add(Tenant(id=2, name="Tenant B"))
+        setup.commit()
+        setup.add(Project(id=1, tenant_id=2, name="Projekt B"))
+        setup.add(Report(id=1, tenant_id=2, project_id=1, title="Bericht"))
+        setup.commit()
+    engine.dispose()
+
+    pipeline = ThumbnailPipeline(workers=0)
+    monkeypatch.setattr(reports_router, "thumbnail_pipeline", pipeline)
+    enqueued = []
+    monkeypatch.setattr(pipeline, "enqueue", enqueued.append)
+
+    async def failing_commit(self):
+        raise RuntimeError("database is locked")
+
+    async def scenario():
+        async_engine = create_sqlite_engine(url, "production", use_async=True)
+        try:
+            async with AsyncSession(async_engine, expire_on_commit=False) as session:
+                monkeypatch.setattr(AsyncSession, "commit", failing_commit)
+                return await reports_router.upload_report_file(
+                    report_id=1, file=upload(jpeg_bytes()), session=session,
+                    current_user=SimpleNamespace(id=1, tenant_id=2, role="admin"),
+                )
+        finally:
+            await async_engine.dispose()
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(scenario())
+    assert exc.value.status_code == 500
+    assert stored_files(store) == []
+    assert enqueued == []